@@ -8,19 +8,20 @@ https://github.com/RIVM-bioinformatics/ViroConstrictor
 
 # pylint: disable=C0103
 
+from __future__ import annotations
+
 import sys
 from itertools import zip_longest
-from typing import Literal, NoReturn
-
-import pandas as pd
+from typing import TYPE_CHECKING, Literal, NoReturn
 
 from ViroConstrictor import __version__
 from ViroConstrictor.logging import log
-from ViroConstrictor.match_ref import process_match_ref
 from ViroConstrictor.parser import CLIparser
-from ViroConstrictor.runreport import WriteReport
-from ViroConstrictor.update import update
-from ViroConstrictor.workflow_executor import run_snakemake_workflow
+
+# The workflow stages import snakemake, pandas and fpdf, they are only imported once the arguments are valid so that
+# `--help`, `--version` and invalid input return quickly (see tests/unit/test_import_time.py).
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def get_preset_warning_list(
@@ -153,6 +154,11 @@ def main(args: list[str] | None = None, settings: str | None = None) -> NoReturn
         settings = "~/.ViroConstrictor_defaultprofile.ini"
     parsed_input = CLIparser(input_args=args, settings_path=settings)
 
+    from ViroConstrictor.match_ref import process_match_ref
+    from ViroConstrictor.runreport import WriteReport
+    from ViroConstrictor.update import update
+    from ViroConstrictor.workflow_executor import run_snakemake_workflow
+
     preset_fallback_warnings, preset_score_warnings = get_preset_warning_list(parsed_input.samples_df)
     if not parsed_input.flags.skip_updates:
         update(sys.argv, parsed_input.user_config)
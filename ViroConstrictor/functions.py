@@ -5,17 +5,49 @@ Basic functions for various uses throughout ViroConstrictor
 """
 
 import glob
+import importlib.util
 import os
 import re
 import readline
 import shutil
+import sys
 import textwrap
 from argparse import SUPPRESS, Action, ArgumentParser, HelpFormatter
+from types import ModuleType
 from typing import IO, Optional
 
 import rich
 
 
+def lazy_import(name: str) -> ModuleType:
+    """Returns a module that is only executed on its first attribute access.
+
+    Heavy dependencies (pandas, numpy) are imported this way by the modules that are loaded at startup, so the
+    `--help`, `--version` and argument validation paths do not pay their import time.
+
+    Parameters
+    ----------
+    name : str
+        The name of the module, e.g. "pandas".
+
+    Returns
+    -------
+    ModuleType
+        The module, or the already imported module when it is in `sys.modules`.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
 class FlexibleArgFormatter(HelpFormatter):
     """
     A subclass of ArgumentParser.HelpFormatter that fixes spacing in the help text and respects bullet points.
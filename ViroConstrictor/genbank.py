@@ -6,11 +6,15 @@ checking file extensions, parsing GenBank records, extracting target organisms,
 and splitting GenBank files into FASTA and GFF formats.
 """
 
+from __future__ import annotations
+
 import difflib
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from BCBio import GFF  # type: ignore
-from Bio import SeqIO  # type: ignore
+# Biopython and BCBio are imported when a GenBank file is opened, they are not needed to parse the arguments
+if TYPE_CHECKING:
+    from Bio.SeqRecord import SeqRecord  # type: ignore
 
 
 class GenBank:
@@ -37,17 +41,19 @@ class GenBank:
         return any(file_path.suffix == ext for ext in GenBank.EXTENSIONS)
 
     @staticmethod
-    def open_genbank(file_path: Path) -> list[SeqIO.SeqRecord]:
+    def open_genbank(file_path: Path) -> list[SeqRecord]:
         """Open a GenBank file and return its records."""
         if not GenBank.is_genbank(file_path):
             raise ValueError(f"File {file_path} is not a GenBank file.")
+        from Bio import SeqIO  # type: ignore
+
         try:
             return list(SeqIO.parse(file_path, "genbank"))
         except Exception as e:
             raise ValueError(f"Error opening GenBank file: {e}") from e
 
     @staticmethod
-    def _parse_target(records: list[SeqIO.SeqRecord]) -> str:
+    def _parse_target(records: list[SeqRecord]) -> str:
         """Parse the target organism from GenBank records."""
         organisms: list[str] = [record.annotations.get("organism", "") for record in records]
         organisms = [org.split("(", 1)[0].strip().replace(" ", "_") for org in organisms if org]
@@ -66,6 +72,8 @@ class GenBank:
     @staticmethod
     def split_genbank(file_path: Path, emit_target: bool = False) -> tuple[Path, Path, str]:
         """Splits a GenBank file into a reference fasta, a features file and possibly a target file."""
+        from BCBio import GFF  # type: ignore
+        from Bio import SeqIO  # type: ignore
 
         records = GenBank.open_genbank(file_path)
         with open(file_path.with_suffix(".fasta"), "w", encoding="utf-8") as fasta_file:
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import argparse
 import logging
 import multiprocessing
@@ -7,12 +9,10 @@ import re
 import sys
 from typing import Any, Hashable, List
 
-import numpy as np
-import pandas as pd
 import rich
 
 from ViroConstrictor import __prog__, __version__
-from ViroConstrictor.functions import FlexibleArgFormatter, RichParser
+from ViroConstrictor.functions import FlexibleArgFormatter, RichParser, lazy_import
 from ViroConstrictor.genbank import GenBank
 from ViroConstrictor.logging import log, setup_logger
 from ViroConstrictor.samplesheet import GetSamples
@@ -21,6 +21,9 @@ from ViroConstrictor.userprofile import ReadConfig
 from ViroConstrictor.validatefasta import CheckReferenceFile
 from ViroConstrictor.workflow.helpers.presets import match_preset_name
 
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
 
 class CLIparser:
     def __init__(self, input_args: list[str], settings_path: str) -> None:
@@ -1,8 +1,12 @@
 import configparser
+import json
 import os
+import re
 import sys
 from datetime import datetime
-from typing import Literal
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Literal
 
 from fpdf import FPDF, XPos, YPos
 from snakemake.api import OutputSettings, ResourceSettings
@@ -10,6 +14,15 @@ from snakemake.api import OutputSettings, ResourceSettings
 from ViroConstrictor import __version__
 from ViroConstrictor.logging import log
 from ViroConstrictor.parser import CLIparser
+from ViroConstrictor.workflow.helpers.directories import bench, logdir
+
+WORKFLOW_DIR = Path(__file__).parent / "workflow"
+STAGES = {"match_ref": "Match-reference", "main": "Main workflow"}
+PERFORMANCE_FILE = "performance.json"
+# the number of rules and samples listed in the performance section of the report
+TOP_ENTRIES = 10
+# margin (seconds) for the timestamps of a job and the job that preceded it on the critical path
+TIMESTAMP_MARGIN = 1.0
 
 
 class PDF(FPDF):
@@ -51,6 +64,246 @@ def analysis_details(pdf: PDF, header: str, text: str) -> PDF:
     return pdf
 
 
+@lru_cache(maxsize=1)
+def workflow_rules() -> dict[str, str]:
+    """
+    Returns the workflow stage ("match_ref" or "main") of every rule, as defined in the Snakefiles of the workflows.
+    """
+    rules = {}
+    for stage in STAGES:
+        for snakefile in sorted((WORKFLOW_DIR / stage).rglob("*.smk")):
+            for rule in re.findall(r"^\s*rule (\w+)\s*:", snakefile.read_text(), flags=re.MULTILINE):
+                rules.setdefault(rule, stage)
+    return rules
+
+
+def _measured(value: Any) -> float | None:
+    """Benchmark values that could not be measured are written as "NA" or 0."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number > 0 else None
+
+
+def read_job_benchmarks(benchmark_dir: Path | str) -> list[dict[str, Any]]:
+    """
+    Reads the measurements of the jobs from the benchmark files of a run (the extended JSON lines format of Snakemake).
+
+    The end time of a job is the modification time of its benchmark file, the start time is the end time minus its
+    wall time. Unreadable benchmark files are skipped.
+
+    Parameters
+    ----------
+    benchmark_dir : Path | str
+        The directory with the benchmark files, `logs/benchmark/` in the output directory.
+
+    Returns
+    -------
+    list[dict[str, Any]]
+        One entry per job with the rule, stage, sample (None for jobs without a sample wildcard), threads, wall time
+        and CPU time (s), max RSS (MB), I/O (MB) and start and end time (epoch seconds). Values that could not be
+        measured are None.
+    """
+    rules = workflow_rules()
+    jobs = []
+    for path in sorted(Path(benchmark_dir).glob("*.jsonl")):
+        try:
+            end = path.stat().st_mtime
+            with open(path) as benchmark_file:
+                records = [json.loads(line) for line in benchmark_file if line.strip()]
+            for record in records:
+                seconds = float(record["s"])
+                jobs.append(
+                    {
+                        "rule": record["rule_name"],
+                        "stage": rules.get(record["rule_name"], "main"),
+                        "sample": (record.get("wildcards") or {}).get("sample"),
+                        "threads": int(record.get("threads") or 1),
+                        "wall_s": seconds,
+                        "cpu_s": _measured(record.get("cpu_time")),
+                        "max_rss_mb": _measured(record.get("max_rss")),
+                        "io_in_mb": _measured(record.get("io_in")),
+                        "io_out_mb": _measured(record.get("io_out")),
+                        "start": end - seconds,
+                        "end": end,
+                    }
+                )
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            log.debug(f"Output handling :: Run report :: Performance :: skipping unreadable benchmark file {path}")
+    return jobs
+
+
+def critical_path(jobs: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Reconstructs the critical path of a run from the timestamps of its jobs.
+
+    Starting from the job that finished last, the path is followed back to the job that finished last before the
+    current job started: of the same sample, or of any sample for jobs without a sample wildcard (which aggregate the
+    results of all samples).
+
+    Returns
+    -------
+    list[dict[str, Any]]
+        The jobs on the critical path, in the order in which they ran.
+    """
+    path: list[dict[str, Any]] = []
+    job = max(jobs, key=lambda job: job["end"], default=None)
+    while job is not None:
+        path.append(job)
+        current = job
+        job = max(
+            (
+                candidate
+                for candidate in jobs
+                if candidate["end"] <= current["start"] + TIMESTAMP_MARGIN
+                and candidate["end"] < current["end"]
+                and (current["sample"] is None or candidate["sample"] in (None, current["sample"]))
+            ),
+            key=lambda job: job["end"],
+            default=None,
+        )
+    return path[::-1]
+
+
+def _total(jobs: list[dict[str, Any]], column: str) -> float | None:
+    values = [job[column] for job in jobs if job[column] is not None]
+    return round(sum(values), 2) if values else None
+
+
+def _core_hours(jobs: list[dict[str, Any]]) -> float:
+    return sum(job["wall_s"] * job["threads"] for job in jobs) / 3600
+
+
+def performance_summary(jobs: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Summarises the measurements of the jobs of a run per rule, stage and sample.
+
+    The cost of a job is expressed in core-hours: its wall time times the number of threads it was given.
+
+    Parameters
+    ----------
+    jobs : list[dict[str, Any]]
+        The measurements of the jobs, see `read_job_benchmarks`.
+
+    Returns
+    -------
+    dict[str, Any]
+        With the keys "rules" (all rules, slowest total wall time first), "stages" (totals per workflow stage),
+        "critical_path" (its length in seconds and its jobs) and "samples" (the `TOP_ENTRIES` samples with the highest
+        cost).
+    """
+    by_rule: dict[str, list[dict[str, Any]]] = {}
+    by_stage: dict[str, list[dict[str, Any]]] = {}
+    by_sample: dict[str, list[dict[str, Any]]] = {}
+    for job in jobs:
+        by_rule.setdefault(job["rule"], []).append(job)
+        by_stage.setdefault(job["stage"], []).append(job)
+        if job["sample"] is not None:
+            by_sample.setdefault(job["sample"], []).append(job)
+
+    rules = [
+        {
+            "rule": rule,
+            "stage": rule_jobs[0]["stage"],
+            "jobs": len(rule_jobs),
+            "wall_s": round(sum(job["wall_s"] for job in rule_jobs), 2),
+            "max_wall_s": round(max(job["wall_s"] for job in rule_jobs), 2),
+            "cpu_s": _total(rule_jobs, "cpu_s"),
+            "max_rss_mb": max((job["max_rss_mb"] for job in rule_jobs if job["max_rss_mb"] is not None), default=None),
+            "io_in_mb": _total(rule_jobs, "io_in_mb"),
+            "io_out_mb": _total(rule_jobs, "io_out_mb"),
+            "core_hours": round(_core_hours(rule_jobs), 4),
+        }
+        for rule, rule_jobs in by_rule.items()
+    ]
+    stages = {
+        stage: {
+            "jobs": len(stage_jobs),
+            "elapsed_s": round(max(job["end"] for job in stage_jobs) - min(job["start"] for job in stage_jobs), 2),
+            "wall_s": round(sum(job["wall_s"] for job in stage_jobs), 2),
+            "cpu_s": _total(stage_jobs, "cpu_s"),
+            "core_hours": round(_core_hours(stage_jobs), 4),
+        }
+        for stage in STAGES
+        if (stage_jobs := by_stage.get(stage))
+    }
+    samples = [
+        {"sample": sample, "jobs": len(sample_jobs), "core_hours": round(_core_hours(sample_jobs), 4)} for sample, sample_jobs in by_sample.items()
+    ]
+    path = critical_path(jobs)
+    return {
+        "rules": sorted(rules, key=lambda rule: rule["wall_s"], reverse=True),
+        "stages": stages,
+        "critical_path": {
+            "length_s": round(sum(job["wall_s"] for job in path), 2),
+            "jobs": [{"rule": job["rule"], "sample": job["sample"], "wall_s": round(job["wall_s"], 2)} for job in path],
+        },
+        "samples": sorted(samples, key=lambda sample: sample["core_hours"], reverse=True)[:TOP_ENTRIES],
+    }
+
+
+def _duration(seconds: float) -> str:
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def performance_table(pdf: PDF, columns: list[tuple[str, int]], rows: list[list[str]]) -> PDF:
+    pdf.set_font("Helvetica", size=9, style="B")
+    for header, width in columns:
+        pdf.cell(width, 6, header, align="L")
+    pdf.ln(6)
+    pdf.set_font("Helvetica", size=9)
+    for row in rows:
+        for text, (_, width) in zip(row, columns):
+            pdf.cell(width, 5, text, align="L")
+        pdf.ln(5)
+    return pdf
+
+
+def performance_section(pdf: PDF, summary: dict[str, Any]) -> PDF:
+    pdf.add_page()
+    pdf.set_font("Helvetica", size=14, style="B")
+    pdf.cell(0, 10, "Performance", align="L", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    for stage, totals in summary["stages"].items():
+        pdf = analysis_details(
+            pdf, f"{STAGES[stage]}:", f"{totals['jobs']} jobs, {_duration(totals['elapsed_s'])} elapsed, {totals['core_hours']:.2f} core-hours"
+        )
+    path = summary["critical_path"]
+    pdf = analysis_details(pdf, "Critical path:", f"{_duration(path['length_s'])} ({len(path['jobs'])} jobs)")
+
+    pdf.ln(5)
+    pdf = analysis_details(pdf, "Slowest rules:", "")
+    pdf = performance_table(
+        pdf,
+        [("Rule", 55), ("Jobs", 15), ("Wall time", 25), ("Longest job", 25), ("CPU time", 25), ("Max RSS (MB)", 25), ("I/O (MB)", 20)],
+        [
+            [
+                rule["rule"],
+                str(rule["jobs"]),
+                _duration(rule["wall_s"]),
+                _duration(rule["max_wall_s"]),
+                _duration(rule["cpu_s"]) if rule["cpu_s"] is not None else "NA",
+                f"{rule['max_rss_mb']:.0f}" if rule["max_rss_mb"] is not None else "NA",
+                f"{(rule['io_in_mb'] or 0) + (rule['io_out_mb'] or 0):.0f}",
+            ]
+            for rule in summary["rules"][:TOP_ENTRIES]
+        ],
+    )
+
+    if summary["samples"]:
+        pdf.ln(5)
+        pdf = analysis_details(pdf, "Most costly samples:", "")
+        pdf = performance_table(
+            pdf,
+            [("Sample", 95), ("Jobs", 15), ("Core-hours", 25)],
+            [[sample["sample"], str(sample["jobs"]), f"{sample['core_hours']:.2f}"] for sample in summary["samples"]],
+        )
+    return pdf
+
+
 def WriteReport(
     workingdir: str,
     inpath: str,
@@ -116,6 +369,12 @@ def WriteReport(
     command = str(sys.argv[0]).split("/")[-1], *sys.argv[1:]
     pdf.multi_cell(0, 5, f'{" ".join(command)}')
 
+    if snakemake_output_conf.dryrun is not True and (jobs := read_job_benchmarks(Path(workingdir, logdir, bench))):
+        summary = performance_summary(jobs)
+        pdf = performance_section(pdf, summary)
+        with open(PERFORMANCE_FILE, "w") as performance_file:
+            json.dump(summary, performance_file, indent=2)
+
     pdf.output(name="Runinfomation.pdf")
 
     log.debug("Output handling :: Run report :: Create run report :: run information report created successfully.")
@@ -6,9 +6,6 @@ Basic functions to see if a fasta is valid
 
 import re
 
-from Bio import SeqIO
-from biovalid import BioValidator
-
 from ViroConstrictor.logging import log
 
 
@@ -64,6 +61,9 @@ def IsValidRef(inputfile: str) -> bool:
         A boolean value.
 
     """
+    from Bio import SeqIO
+    from biovalid import BioValidator
+
     validator = BioValidator(inputfile, bool_mode=True, verbose=False)
     is_valid = validator.validate_files()
 
@@ -89,6 +89,8 @@ def IsValidFasta(inputfile: str) -> bool:
     """
     if inputfile == "NONE":
         return True
+    from Bio import SeqIO
+
     results = [ContainsSpecials(str(record.seq)) for record in SeqIO.parse(inputfile, "fasta")]
 
     return not any(results)
@@ -108,6 +110,8 @@ def CheckReferenceFile(referencefile: str, warnings_as_errors: bool = False) ->
     """
     errors: list[Exception] = []
     warnings: list[str] = []
+    from Bio import SeqIO
+
     for record in SeqIO.parse(referencefile, "fasta"):
         try:
             check_ref_header(record.id)
@@ -0,0 +1,219 @@
+"""
+Helpers for the combined results (`results.combined.smk`) of the main workflow.
+
+All combined results (by sample, by virus and for all samples) are written by a single `aggregate_results` job. The
+job is driven by an aggregation plan: a JSON file listing every per-sample/RefID result file with its sample, virus
+and reference ID, together with the paths of all combined outputs. The plan is built from the samples dataframe of the
+workflow with `build_aggregation_plan`, and the rule inputs and outputs are derived from the same plan so the workflow
+and the aggregation script always agree on the files involved.
+
+When columnar results are enabled, the plan also lists the columnar copies (see `helpers/columnar.py`) of the all
+samples mutations, coverage and amplicon coverage tables under "columnar".
+"""
+
+import json
+import os
+from typing import Any
+
+import pandas as pd
+
+from ViroConstrictor.workflow.helpers.columnar import columnar_path
+from ViroConstrictor.workflow.helpers.directories import (
+    aln,
+    all_samples,
+    amino,
+    boc,
+    by_sample,
+    combined,
+    cons,
+    datadir,
+    prim,
+    res,
+    seqs,
+    vf,
+)
+
+RESULT_TYPES = ("consensus", "mutations", "coverage", "amplicon_coverage")
+COLUMNAR_RESULT_TYPES = ("mutations", "coverage", "amplicon_coverage")
+
+_BY_SAMPLE_FILES = {
+    "consensus": "consensus.fasta",
+    "mutations": "mutations.tsv",
+    "coverage": "Width_of_coverage.tsv",
+    "amplicon_coverage": "Amplicon_coverage.csv",
+}
+_ALL_SAMPLES_FILES = {
+    "consensus": "all_consensus.fasta",
+    "mutations": "all_mutations.tsv",
+    "coverage": "all_width_of_coverage.tsv",
+    "amplicon_coverage": "all_amplicon_coverage.csv",
+}
+
+
+def _aminoacid_features(row: dict[str, Any]) -> list[str]:
+    features = row.get("AA_FEAT_NAMES")
+    return list(features) if isinstance(features, (list, tuple)) else []
+
+
+def build_aggregation_plan(samples_df: pd.DataFrame, columnar_format: str | None = None) -> dict[str, Any]:
+    """
+    Build the aggregation plan for the combined results of a run.
+
+    The rows of the samples dataframe are grouped by sample, in order of first appearance, so every sample's results
+    are contiguous in the by virus and all samples outputs.
+
+    Parameters
+    ----------
+    samples_df : pd.DataFrame
+        The samples dataframe of the workflow, with one row per sample and RefID and the columns "sample", "Virus",
+        "RefID" and "AA_FEAT_NAMES".
+    columnar_format : str | None, optional
+        The format of the columnar copies of the all samples tables, one of `helpers.columnar.COLUMNAR_FORMATS`
+        (default is None, no columnar copies).
+
+    Returns
+    -------
+    dict[str, Any]
+        The aggregation plan, with the per-sample/RefID result files under "rows" and the amino acid files under
+        "aminoacids", the combined outputs under "by_sample", "by_virus" and "all_samples" and the columnar copies
+        under "columnar" (with their format under "columnar_format").
+    """
+    records = samples_df[["sample", "Virus", "RefID", "AA_FEAT_NAMES"]].to_dict(orient="records")
+    sample_order = list(dict.fromkeys(record["sample"] for record in records))
+    sample_position = {sample: position for position, sample in enumerate(sample_order)}
+    records.sort(key=lambda record: sample_position[record["sample"]])
+
+    rows = []
+    aminoacid_inputs: dict[str, dict[str, Any]] = {}
+    sample_features: dict[str, dict[str, None]] = {}
+    virus_features: dict[str, dict[str, None]] = {}
+    for record in records:
+        sample, virus, refid = str(record["sample"]), str(record["Virus"]), str(record["RefID"])
+        folder = f"{datadir}Virus~{virus}/RefID~{refid}/"
+        rows.append(
+            {
+                "sample": sample,
+                "virus": virus,
+                "refid": refid,
+                "consensus": f"{folder}{cons}{seqs}{sample}.fa",
+                "mutations": f"{folder}{aln}{vf}{sample}.tsv",
+                "coverage": f"{folder}{boc}{sample}.tsv",
+                "amplicon_coverage": f"{folder}{prim}{sample}_ampliconcoverage.csv",
+            }
+        )
+        for feature in _aminoacid_features(record):
+            path = f"{res}Virus~{virus}/RefID~{refid}/{amino}{feature}.faa"
+            aminoacid_input = aminoacid_inputs.setdefault(path, {"path": path, "virus": virus, "feature": feature, "samples": []})
+            if sample not in aminoacid_input["samples"]:
+                aminoacid_input["samples"].append(sample)
+            sample_features.setdefault(sample, {})[feature] = None
+            virus_features.setdefault(virus, {})[feature] = None
+
+    viruses = list(dict.fromkeys(row["virus"] for row in rows))
+    all_features = list(dict.fromkeys(feature for features in sample_features.values() for feature in features))
+    all_samples_outputs = {result_type: f"{res}{combined}{all_samples}{filename}" for result_type, filename in _ALL_SAMPLES_FILES.items()}
+    columnar_outputs = {}
+    if columnar_format is not None:
+        columnar_outputs = {
+            result_type: str(columnar_path(all_samples_outputs[result_type], columnar_format)) for result_type in COLUMNAR_RESULT_TYPES
+        }
+    return {
+        "rows": rows,
+        "by_sample": {
+            sample: {result_type: f"{res}{combined}{by_sample}{sample}/{filename}" for result_type, filename in _BY_SAMPLE_FILES.items()}
+            for sample in map(str, sample_order)
+        },
+        "by_virus": {
+            virus: {result_type: f"{res}Virus~{virus}/{combined}{filename}" for result_type, filename in _BY_SAMPLE_FILES.items()}
+            for virus in viruses
+        },
+        "all_samples": all_samples_outputs,
+        "columnar_format": columnar_format,
+        "columnar": columnar_outputs,
+        "aminoacids": {
+            "inputs": list(aminoacid_inputs.values()),
+            "by_sample": {
+                sample: {feature: f"{res}{combined}{by_sample}{sample}/aminoacids/{feature}.faa" for feature in features}
+                for sample, features in sample_features.items()
+            },
+            "by_virus": {
+                virus: {feature: f"{res}Virus~{virus}/{combined}aminoacids/{feature}.faa" for feature in features}
+                for virus, features in virus_features.items()
+            },
+            "all_samples": {feature: f"{res}{combined}{all_samples}aminoacids/{feature}.faa" for feature in all_features},
+        },
+    }
+
+
+def aggregation_inputs(plan: dict[str, Any]) -> list[str]:
+    """
+    List all per-sample/RefID result files read by the aggregation, see `build_aggregation_plan`.
+
+    Parameters
+    ----------
+    plan : dict[str, Any]
+        The aggregation plan.
+
+    Returns
+    -------
+    list[str]
+        The paths of all input files, without duplicates.
+    """
+    inputs = [row[result_type] for row in plan["rows"] for result_type in RESULT_TYPES]
+    inputs.extend(aminoacid_input["path"] for aminoacid_input in plan["aminoacids"]["inputs"])
+    return list(dict.fromkeys(inputs))
+
+
+def aggregation_outputs(plan: dict[str, Any]) -> list[str]:
+    """
+    List all combined output files written by the aggregation, see `build_aggregation_plan`.
+
+    Parameters
+    ----------
+    plan : dict[str, Any]
+        The aggregation plan.
+
+    Returns
+    -------
+    list[str]
+        The paths of all output files.
+    """
+    outputs = [path for level in ("by_sample", "by_virus") for group in plan[level].values() for path in group.values()]
+    outputs.extend(plan["all_samples"].values())
+    aminoacids = plan["aminoacids"]
+    outputs.extend(path for level in ("by_sample", "by_virus") for group in aminoacids[level].values() for path in group.values())
+    outputs.extend(aminoacids["all_samples"].values())
+    return outputs
+
+
+def aggregation_columnar_outputs(plan: dict[str, Any]) -> list[str]:
+    """
+    List the columnar dataset directories written by the aggregation, see `build_aggregation_plan`.
+
+    Parameters
+    ----------
+    plan : dict[str, Any]
+        The aggregation plan.
+
+    Returns
+    -------
+    list[str]
+        The paths of the dataset directories, empty when columnar results are disabled.
+    """
+    return list(plan["columnar"].values())
+
+
+def write_aggregation_plan(plan: dict[str, Any], output: str) -> None:
+    """
+    Write the aggregation plan to a JSON file.
+
+    Parameters
+    ----------
+    plan : dict[str, Any]
+        The aggregation plan.
+    output : str
+        Path to the JSON file.
+    """
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as plan_file:
+        json.dump(plan, plan_file, indent=1)
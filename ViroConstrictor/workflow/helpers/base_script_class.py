@@ -1,5 +1,125 @@
-from argparse import ArgumentParser
+import cProfile
+import json
+import os
+import pstats
+import resource
+import sys
+import time
+import traceback
+import tracemalloc
+from argparse import SUPPRESS, ArgumentParser
+from collections.abc import Iterable, Mapping
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Any
+
+BATCH_EPILOG = (
+    "Batch mode: run the script for every argument set of a manifest in one interpreter with "
+    "--batch MANIFEST (JSON lines, '-' reads standard input) [--batch-workers N] [--batch-status FILE]."
+)
+
+PROFILE_VARIABLE = "VIROCONSTRICTOR_PROFILE"
+PROFILE_SUFFIX = ".profile.json"
+CPROFILE_SUFFIX = ".prof"
+TOP_ALLOCATIONS = 10
+TOP_FUNCTIONS = 20
+
+
+def profiling_mode(value: str | None) -> str | None:
+    """
+    Returns the profiling mode of a value of the `--profile` flag or the `VIROCONSTRICTOR_PROFILE` environment variable.
+
+    Returns
+    -------
+    str | None
+        "cprofile" (also dump a cProfile of the script), "basic" for any other value that is not empty, "0", "no", "off"
+        or "false", and None when profiling is disabled.
+    """
+    if value is None or value.strip().lower() in ("", "0", "no", "off", "false"):
+        return None
+    return "cprofile" if value.strip().lower() == "cprofile" else "basic"
+
+
+def profile_paths(output: Path | str) -> tuple[Path, Path]:
+    """
+    Returns the paths of the profile sidecar (JSON) and the cProfile dump of a script with the given output.
+    """
+    output = Path(output)
+    return output.with_name(output.name + PROFILE_SUFFIX), output.with_name(output.name + CPROFILE_SUFFIX)
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot) -> list[dict[str, Any]]:
+    """The source lines with the largest Python allocations that were alive at the end of a profiled run."""
+    return [
+        {
+            "location": f"{statistic.traceback[0].filename}:{statistic.traceback[0].lineno}",
+            "size_mb": round(statistic.size / 1024**2, 4),
+            "count": statistic.count,
+        }
+        for statistic in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+    ]
+
+
+def _top_functions(profiler: cProfile.Profile) -> list[dict[str, Any]]:
+    """The functions with the highest cumulative time of a cProfile."""
+    stats = pstats.Stats(profiler).stats  # type: ignore[attr-defined]
+    ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return [
+        {"function": f"{filename}:{line}({name})", "calls": calls, "tottime": round(tottime, 4), "cumtime": round(cumtime, 4)}
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in ranked
+    ]
+
+
+def manifest_arguments(item: Mapping[str, Any] | list[Any]) -> list[str]:
+    """
+    Converts an argument set of a batch manifest to command line arguments.
+
+    An argument set is either a list of command line arguments, or an object with the options of the script (with or
+    without leading dashes) as keys. Options with the value `true` are given as a flag, options with the value `false`
+    or `null` are left out and list values are given as one comma separated value (e.g. `--thresholds 1,5`).
+
+    Parameters
+    ----------
+    item : Mapping[str, Any] | list[Any]
+        The argument set.
+
+    Returns
+    -------
+    list[str]
+        The command line arguments.
+
+    Examples
+    --------
+    >>> manifest_arguments({"input": "a.tsv", "output": "b.tsv", "thresholds": [1, 5]})
+    ['--input', 'a.tsv', '--output', 'b.tsv', '--thresholds', '1,5']
+    """
+    if isinstance(item, list):
+        return [str(argument) for argument in item]
+    arguments = []
+    for key, value in item.items():
+        option = key if key.startswith("-") else f"--{key}"
+        if value is True:
+            arguments.append(option)
+        elif isinstance(value, list):
+            arguments.extend([option, ",".join(map(str, value))])
+        elif value is not None and value is not False:
+            arguments.extend([option, str(value)])
+    return arguments
+
+
+def manifest_line(arguments: Mapping[str, Any]) -> str:
+    """
+    Returns an argument set as a line of a batch manifest, paths and other values are written as strings.
+    """
+    return json.dumps(dict(arguments), default=str)
+
+
+def read_manifest(lines: Iterable[str]) -> list[list[str]]:
+    """
+    Reads the argument sets of a batch manifest (JSON lines), see `manifest_arguments`.
+    """
+    return [manifest_arguments(json.loads(line)) for line in lines if line.strip()]
 
 
 class BaseScript:
@@ -27,6 +147,8 @@ class BaseScript:
         Class method that adds arguments to the argument parser. Subclasses can override this to add custom arguments.
     main()
         Entry point for the script. Parses arguments, initializes the script, and calls the `run` method.
+    run_batch(items, workers)
+        Runs the script for many argument sets in one interpreter, optionally on a process pool.
 
     Notes
     -----
@@ -36,6 +158,20 @@ class BaseScript:
     3. Override the `add_arguments` class method if additional arguments are needed.
     4. Call `MyScript.main()` in the script's main block to execute it.
 
+    Every script also has a batch mode, which runs the script for every argument set of a manifest (JSON lines, see
+    `manifest_arguments`) in one interpreter, so the imports of the script are only paid once per batch::
+
+        python -m main.scripts.my_script --batch manifest.jsonl --batch-workers 4 --batch-status status.jsonl
+
+    The items of a batch are independent: a failing item is recorded in the status file (one JSON line per item, with
+    its arguments, status, error and wall time) and does not stop the other items, but the batch exits with status 1.
+
+    Every script (and every item of a batch) can be profiled without changing its code, with the hidden `--profile`
+    flag or the `VIROCONSTRICTOR_PROFILE` environment variable (see `profiling_mode`). The wall and CPU time, peak RSS
+    and largest Python allocations (`tracemalloc`) of `run` are then written to a JSON sidecar next to the output
+    (`<output>.profile.json`), and with `--profile cprofile` a cProfile dump is written to `<output>.prof`. The
+    sidecars of a run can be collected with `helpers/script_profiles.py`.
+
     Example
     -------
     Here's an example of how to create a subclass with additional arguments:
@@ -85,11 +221,143 @@ class BaseScript:
         )
 
     @classmethod
-    def main(cls) -> None:
-        parser = ArgumentParser(description=f"Run the {cls.__name__} script.")
+    def build_parser(cls) -> ArgumentParser:
+        parser = ArgumentParser(description=f"Run the {cls.__name__} script.", epilog=BATCH_EPILOG)
         cls.add_arguments(parser)
-        args = parser.parse_args()
+        return parser
+
+    @classmethod
+    def from_arguments(cls, arguments: list[str] | None = None) -> "BaseScript":
+        """
+        Initializes the script from command line arguments (default is `sys.argv`).
+        """
+        args = cls.build_parser().parse_args(arguments)
+        return cls(**vars(args))
+
+    def execute(self, profile: str | None = None) -> None:
+        """
+        Runs the script, profiled when a profiling mode ("basic" or "cprofile") is given.
+        """
+        if profile is None:
+            self.run()
+            return
+
+        sidecar, dump = profile_paths(self.output)
+        profiler = cProfile.Profile() if profile == "cprofile" else None
+        tracing = not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        status = "failed"
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            self.run()
+            status = "success"
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            snapshot = tracemalloc.take_snapshot()
+            python_peak = tracemalloc.get_traced_memory()[1]
+            if tracing:
+                tracemalloc.stop()
+            record = {
+                "script": type(self).__name__,
+                "input": str(self.input),
+                "output": str(self.output),
+                "status": status,
+                "wall_s": round(wall, 4),
+                "cpu_s": round(cpu, 4),
+                # ru_maxrss is in KiB on Linux, and is the peak of the process (including the imports)
+                "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+                "python_peak_mb": round(python_peak / 1024**2, 2),
+                "top_allocations": _top_allocations(snapshot),
+                "cprofile": None,
+                "top_functions": [],
+            }
+            if profiler is not None:
+                profiler.dump_stats(dump)
+                record["cprofile"] = str(dump)
+                record["top_functions"] = _top_functions(profiler)
+            with open(sidecar, "w") as sidecar_file:
+                json.dump(record, sidecar_file, indent=2)
+
+    @classmethod
+    def run_item(cls, arguments: list[str], profile: str | None = None) -> dict[str, Any]:
+        """
+        Runs the script for one argument set of a batch, the errors of the item are caught and returned.
+
+        Returns
+        -------
+        dict[str, Any]
+            The arguments, status ("success" or "failed"), error (None on success) and wall time (s) of the item.
+        """
+        start = time.perf_counter()
+        error = None
+        try:
+            cls.from_arguments(arguments).execute(profile)
+        except (Exception, SystemExit) as exception:  # argparse exits on invalid arguments
+            traceback.print_exc()
+            error = f"{type(exception).__name__}: {exception}"
+        return {
+            "arguments": arguments,
+            "status": "failed" if error else "success",
+            "error": error,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+    @classmethod
+    def run_batch(cls, items: list[list[str]], workers: int = 1, profile: str | None = None) -> list[dict[str, Any]]:
+        """
+        Runs the script for every argument set of a batch.
+
+        Parameters
+        ----------
+        items : list[list[str]]
+            The command line arguments of every item, see `read_manifest`.
+        workers : int, optional
+            The number of worker processes (default is 1, the items are run in this process).
+        profile : str | None, optional
+            The profiling mode of the items, see `execute` (default is None, the items are not profiled).
+
+        Returns
+        -------
+        list[dict[str, Any]]
+            The result of every item (see `run_item`), in the order of the items.
+        """
+        if workers > 1 and len(items) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(items))) as pool:
+                return list(pool.map(partial(cls.run_item, profile=profile), items))
+        return [cls.run_item(arguments, profile) for arguments in items]
+
+    @classmethod
+    def main(cls) -> None:
+        batch_parser = ArgumentParser(add_help=False)
+        batch_parser.add_argument("--batch", metavar="File", type=str, default=None)
+        batch_parser.add_argument("--batch-workers", metavar="Number", type=int, default=1)
+        batch_parser.add_argument("--batch-status", metavar="File", type=str, default=None)
+        batch_parser.add_argument("--profile", nargs="?", const="basic", default=None, help=SUPPRESS)
+        batch_args, arguments = batch_parser.parse_known_args()
+        profile = profiling_mode(batch_args.profile if batch_args.profile is not None else os.environ.get(PROFILE_VARIABLE))
+
+        if batch_args.batch is None:
+            # Pass parsed arguments to the script
+            script = cls.from_arguments(arguments)
+            script.execute(profile)
+            return
 
-        # Pass parsed arguments to the script
-        script = cls(**vars(args))
-        script.run()
+        if batch_args.batch == "-":
+            items = read_manifest(sys.stdin)
+        else:
+            with open(batch_args.batch) as manifest:
+                items = read_manifest(manifest)
+        results = cls.run_batch(items, batch_args.batch_workers, profile)
+        if batch_args.batch_status is not None:
+            with open(batch_args.batch_status, "w") as status_file:
+                status_file.writelines(json.dumps(result) + "\n" for result in results)
+        failed = sum(result["status"] == "failed" for result in results)
+        print(f"{cls.__name__} batch: {len(results) - failed} of {len(results)} items succeeded.", file=sys.stderr)
+        if failed:
+            sys.exit(1)
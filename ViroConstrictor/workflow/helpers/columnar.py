@@ -0,0 +1,166 @@
+"""
+Columnar (Parquet or Arrow IPC) copies of the combined result tables.
+
+The combined mutations, coverage and amplicon coverage tables are text files, which have to be parsed completely every
+time they are loaded. When the `columnar_results` setting in the `[WORKFLOW]` section of the user profile is set, a
+columnar copy of these tables is written next to them as a dataset directory that is partitioned by virus
+(``<table>.parquet/Virus=<virus>/part-0.parquet``). The columns are typed: sample names, viruses, reference IDs,
+bases and other text columns are categorical, positions and depths are integers and the other numeric columns (coverage
+widths, amplicon coverages) are floats. An unnamed column is called "Sample" in the columnar copy.
+
+The text tables remain the default output, pyarrow is only imported when a columnar copy is written or read.
+"""
+
+import csv
+import shutil
+from pathlib import Path
+from typing import Any
+
+COLUMNAR_FORMATS = ("parquet", "arrow")
+CATEGORICAL_COLUMNS = ("Sample", "Sample_name", "Virus", "Reference_ID", "Reference_Base", "Variant_Base")
+INTEGER_COLUMNS = ("Position", "Depth")
+PARTITION_COLUMN = "Virus"
+
+# the dataset format names of pyarrow for the supported columnar formats
+_DATASET_FORMATS = {"parquet": "parquet", "arrow": "ipc"}
+
+
+def columnar_path(table: Path | str, columnar_format: str) -> Path:
+    """
+    Returns the path of the columnar dataset directory of a combined result table.
+
+    Parameters
+    ----------
+    table : Path | str
+        Path to the combined result table.
+    columnar_format : str
+        The columnar format, one of `COLUMNAR_FORMATS`.
+
+    Returns
+    -------
+    Path
+        The table path with the format as suffix, e.g. ``all_mutations.parquet`` for ``all_mutations.tsv``.
+    """
+    if columnar_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unknown columnar format '{columnar_format}', choose one of {', '.join(COLUMNAR_FORMATS)}.")
+    return Path(table).with_suffix(f".{columnar_format}")
+
+
+def _import_pyarrow() -> Any:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.csv  # noqa: F401
+        import pyarrow.dataset  # noqa: F401
+        import pyarrow.fs  # noqa: F401
+    except ImportError as error:
+        raise ImportError("Columnar results require the 'pyarrow' package, install it or disable the columnar results.") from error
+    return pyarrow
+
+
+def write_columnar(table: Path | str, separator: str, columnar_format: str, output: Path | str | None = None) -> Path:
+    """
+    Writes the columnar copy of a combined result table, partitioned by virus.
+
+    An existing dataset directory is replaced. Tables without a header (e.g. the amplicon coverage of a run without
+    primers) result in an empty dataset directory.
+
+    Parameters
+    ----------
+    table : Path | str
+        Path to the combined result table.
+    separator : str
+        Field separator of the table.
+    columnar_format : str
+        The columnar format, one of `COLUMNAR_FORMATS`.
+    output : Path | str | None, optional
+        Path to the dataset directory (default is given by `columnar_path`).
+
+    Returns
+    -------
+    Path
+        The path to the dataset directory.
+
+    Raises
+    ------
+    ImportError
+        If pyarrow is not installed.
+    """
+    # the default path also validates the format
+    default_output = columnar_path(table, columnar_format)
+    output = Path(output) if output is not None else default_output
+    pa = _import_pyarrow()
+
+    shutil.rmtree(output, ignore_errors=True)
+    output.mkdir(parents=True)
+    with open(table, newline="") as handle:
+        header = next((row for row in csv.reader(handle, delimiter=separator) if row), None)
+    if header is None or PARTITION_COLUMN not in header:
+        return output
+
+    names = [name or "Sample" for name in header]
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    column_types = {name: dictionary for name in names if name in CATEGORICAL_COLUMNS}
+    column_types.update({name: pa.int64() for name in names if name in INTEGER_COLUMNS})
+    data = pa.csv.read_csv(
+        table,
+        read_options=pa.csv.ReadOptions(column_names=names, skip_rows=1),
+        parse_options=pa.csv.ParseOptions(delimiter=separator),
+        # "NA" is a valid reference ID, only empty fields are missing values
+        convert_options=pa.csv.ConvertOptions(
+            column_types=column_types,
+            null_values=[""],
+            strings_can_be_null=False,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+    # the types of the other columns are inferred: text columns (e.g. amplicon names) are categorical and numeric
+    # columns are floats, so the partitions of all viruses share the same schema
+    for index, field in enumerate(data.schema):
+        if field.name in column_types:
+            continue
+        if pa.types.is_string(field.type):
+            data = data.set_column(index, field.name, data.column(index).dictionary_encode())
+        elif not pa.types.is_floating(field.type):
+            data = data.set_column(index, field.name, data.column(index).cast(pa.float64()))
+    pa.dataset.write_dataset(
+        data,
+        output,
+        format=_DATASET_FORMATS[columnar_format],
+        partitioning=[PARTITION_COLUMN],
+        partitioning_flavor="hive",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return output
+
+
+def read_columnar(path: Path | str, columnar_format: str, viruses: list[str] | None = None, columns: list[str] | None = None) -> Any:
+    """
+    Reads (a slice of) the columnar copy of a combined result table.
+
+    Only the partitions of the requested viruses are read. Arrow IPC datasets are memory-mapped.
+
+    Parameters
+    ----------
+    path : Path | str
+        Path to the dataset directory.
+    columnar_format : str
+        The columnar format of the dataset, one of `COLUMNAR_FORMATS`.
+    viruses : list[str] | None, optional
+        The viruses to read (default is all viruses).
+    columns : list[str] | None, optional
+        The columns to read (default is all columns).
+
+    Returns
+    -------
+    pyarrow.Table
+        The table, with a categorical "Virus" column.
+    """
+    pa = _import_pyarrow()
+    dataset = pa.dataset.dataset(
+        path,
+        format=_DATASET_FORMATS[columnar_format],
+        partitioning=pa.dataset.HivePartitioning.discover(infer_dictionary=True),
+        filesystem=pa.fs.LocalFileSystem(use_mmap=True),
+    )
+    expression = pa.dataset.field(PARTITION_COLUMN).isin(viruses) if viruses is not None else None
+    return dataset.to_table(columns=columns, filter=expression)
@@ -0,0 +1,256 @@
+"""
+Per-position depth matrix of all samples of a reference.
+
+TrueConsense writes a per-position coverage file for every sample. The depth matrix packs the depths of all samples of
+a Virus/RefID into a single binary matrix of samples × positions, so cross-sample coverage analyses can slice the
+depths of any set of samples and any position range without opening and parsing every coverage file.
+
+The matrix is stored as a directory with an ``index.json`` file and the matrix itself, split along the positions into
+chunks of `DEFAULT_CHUNK_SIZE` positions that are each stored as a ``.npy`` file (``chunk_00000.npy``, ...). The chunks
+are memory-mapped when they are read, so only the chunks (and the pages within them) that are sliced are read from
+disk. The depths are stored as the smallest unsigned integer type that holds the maximal depth, positions that are not
+part of the coverage file of a sample have a depth of 0.
+
+Examples
+--------
+>>> write_depth_matrix("depth_matrix", [("sample1", "sample1_coverage.tsv"), ("sample2", "sample2_coverage.tsv")])
+>>> matrix = DepthMatrix("depth_matrix")
+>>> matrix.depths(samples=["sample2"], start=100, end=199)
+"""
+
+import json
+import shutil
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+DEPTH_MATRIX_VERSION = 1
+DEFAULT_CHUNK_SIZE = 16384
+INDEX_FILENAME = "index.json"
+
+
+def read_depths(coverage: Path | str) -> tuple[int, np.ndarray]:
+    """
+    Reads the depths of a per-position coverage file.
+
+    The coverage file has the position in the first and the depth in the second column. A header line is skipped when
+    present, positions that are missing from the file are given a depth of 0.
+
+    Parameters
+    ----------
+    coverage : Path | str
+        Path to the coverage TSV file.
+
+    Returns
+    -------
+    tuple[int, np.ndarray]
+        The first position of the coverage file and the depths of all positions from the first position onwards, an
+        empty array for files without positions.
+    """
+    with open(coverage) as coverage_file:
+        first_line = coverage_file.readline()
+    # a header line is the only line without a numerical position
+    header = not first_line.split("\t", 1)[0].strip().isdigit()
+    try:
+        table = pd.read_csv(coverage, sep="\t", header=None, usecols=[0, 1], skiprows=int(header))
+    except pd.errors.EmptyDataError:
+        return 0, np.zeros(0, dtype=np.int64)
+    if table.empty:
+        return 0, np.zeros(0, dtype=np.int64)
+    positions = table[0].to_numpy(dtype=np.int64)
+    values = table[1].to_numpy()
+
+    first = int(positions.min())
+    depths = np.zeros(int(positions.max()) - first + 1, dtype=values.dtype)
+    depths[positions - first] = values
+    return first, depths
+
+
+def _depth_dtype(vectors: list[np.ndarray]) -> np.dtype:
+    """
+    Returns the smallest unsigned integer type that holds all depths, floating point depths are kept as float64.
+    """
+    if any(not np.issubdtype(vector.dtype, np.integer) for vector in vectors):
+        return np.dtype(np.float64)
+    maximum = max((int(vector.max()) for vector in vectors if len(vector)), default=0)
+    for dtype in (np.uint16, np.uint32):
+        if maximum <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.uint64)
+
+
+def write_depth_matrix(output: Path | str, coverages: list[tuple[str, Path | str]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Path:
+    """
+    Writes the depth matrix of a set of samples, an existing matrix directory is replaced.
+
+    Parameters
+    ----------
+    output : Path | str
+        Path to the matrix directory.
+    coverages : list[tuple[str, Path | str]]
+        The sample names with the paths to their coverage files, in matrix row order.
+    chunk_size : int, optional
+        Number of positions per chunk (default is `DEFAULT_CHUNK_SIZE`).
+
+    Returns
+    -------
+    Path
+        The path to the matrix directory.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"The chunk size must be at least 1, not {chunk_size}.")
+    output = Path(output)
+    samples = [sample for sample, _ in coverages]
+    if len(set(samples)) != len(samples):
+        raise ValueError("The samples of a depth matrix must be unique.")
+
+    ranges = []
+    vectors = []
+    for _, coverage in coverages:
+        first, depths = read_depths(coverage)
+        vectors.append(depths)
+        ranges.append([first, first + len(depths) - 1] if len(depths) else None)
+    covered = [bounds for bounds in ranges if bounds is not None]
+    start = min((first for first, _ in covered), default=1)
+    end = max((last for _, last in covered), default=start - 1)
+    dtype = _depth_dtype(vectors)
+
+    shutil.rmtree(output, ignore_errors=True)
+    output.mkdir(parents=True)
+    chunks = []
+    for chunk_start in range(start, end + 1, chunk_size):
+        chunk_end = min(chunk_start + chunk_size - 1, end)
+        filename = f"chunk_{len(chunks):05d}.npy"
+        chunk = np.lib.format.open_memmap(output / filename, mode="w+", dtype=dtype, shape=(len(samples), chunk_end - chunk_start + 1))
+        for row, (bounds, depths) in enumerate(zip(ranges, vectors)):
+            if bounds is None or bounds[1] < chunk_start or bounds[0] > chunk_end:
+                continue
+            # the overlap of the sample's positions with the chunk, as offsets in the chunk and in the depth vector
+            overlap_start, overlap_end = max(bounds[0], chunk_start), min(bounds[1], chunk_end)
+            chunk[row, overlap_start - chunk_start : overlap_end - chunk_start + 1] = depths[overlap_start - bounds[0] : overlap_end - bounds[0] + 1]
+        chunk.flush()
+        del chunk
+        chunks.append(filename)
+
+    index = {
+        "version": DEPTH_MATRIX_VERSION,
+        "dtype": dtype.str,
+        "start": start,
+        "end": end,
+        "chunk_size": chunk_size,
+        "samples": samples,
+        "ranges": ranges,
+        "chunks": chunks,
+    }
+    with open(output / INDEX_FILENAME, "w") as index_file:
+        json.dump(index, index_file, indent=1)
+    return output
+
+
+class DepthMatrix:
+    """
+    Reads slices of a depth matrix written by `write_depth_matrix`, the chunks are memory-mapped on first use.
+
+    Positions are given as in the coverage files, position ranges include both the start and the end position.
+
+    Parameters
+    ----------
+    path : Path | str
+        Path to the matrix directory.
+
+    Attributes
+    ----------
+    samples : list[str]
+        The samples of the matrix, in row order.
+    start : int
+        The first position of the matrix.
+    end : int
+        The last position of the matrix.
+    ranges : dict[str, tuple[int, int] | None]
+        The first and last position of the coverage file of every sample, None for samples without coverage data.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        with open(self.path / INDEX_FILENAME) as index_file:
+            index: dict[str, Any] = json.load(index_file)
+        if index.get("version") != DEPTH_MATRIX_VERSION:
+            raise ValueError(f"Unsupported depth matrix version {index.get('version')} in {self.path}.")
+        self.samples: list[str] = index["samples"]
+        self.start: int = index["start"]
+        self.end: int = index["end"]
+        self.chunk_size: int = index["chunk_size"]
+        self.dtype = np.dtype(index["dtype"])
+        self.ranges = {sample: tuple(bounds) if bounds is not None else None for sample, bounds in zip(self.samples, index["ranges"])}
+        self._chunk_files: list[str] = index["chunks"]
+        self._chunks: dict[int, np.ndarray] = {}
+        self._rows = {sample: row for row, sample in enumerate(self.samples)}
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """
+        The number of samples and positions of the matrix.
+        """
+        return len(self.samples), self.end - self.start + 1
+
+    def depths(self, samples: list[str] | None = None, start: int | None = None, end: int | None = None) -> np.ndarray:
+        """
+        Returns the depths of a set of samples over a position range.
+
+        Parameters
+        ----------
+        samples : list[str] | None, optional
+            The samples to return the depths of, in the order of the returned rows (default is all samples).
+        start : int | None, optional
+            The first position of the range (default is the first position of the matrix).
+        end : int | None, optional
+            The last position of the range (default is the last position of the matrix).
+
+        Returns
+        -------
+        np.ndarray
+            The depths, with one row per sample and one column per position.
+        """
+        start = self.start if start is None else start
+        end = self.end if end is None else end
+        if start < self.start or end > self.end or start > end + 1:
+            raise IndexError(f"Position range {start}-{end} is outside of the matrix positions {self.start}-{self.end}.")
+        rows: slice | list[int] = slice(None) if samples is None else [self._row(sample) for sample in samples]
+        if start > end:
+            return np.zeros((len(self.samples) if samples is None else len(samples), 0), dtype=self.dtype)
+
+        parts = []
+        for chunk_number in range((start - self.start) // self.chunk_size, (end - self.start) // self.chunk_size + 1):
+            chunk_start = self.start + chunk_number * self.chunk_size
+            chunk_end = chunk_start + self.chunk_size - 1
+            parts.append(self._chunk(chunk_number)[rows, max(start, chunk_start) - chunk_start : min(end, chunk_end) - chunk_start + 1])
+        return np.concatenate(parts, axis=1)
+
+    def sample(self, sample: str) -> np.ndarray:
+        """
+        Returns the depths of a single sample over all positions of the matrix.
+
+        Parameters
+        ----------
+        sample : str
+            The sample name.
+
+        Returns
+        -------
+        np.ndarray
+            The depth of every position of the matrix.
+        """
+        return self.depths(samples=[sample])[0]
+
+    def _row(self, sample: str) -> int:
+        try:
+            return self._rows[sample]
+        except KeyError:
+            raise KeyError(f"Sample '{sample}' is not part of the depth matrix {self.path}.") from None
+
+    def _chunk(self, chunk_number: int) -> np.ndarray:
+        if chunk_number not in self._chunks:
+            self._chunks[chunk_number] = np.load(self.path / self._chunk_files[chunk_number], mmap_mode="r")
+        return self._chunks[chunk_number]
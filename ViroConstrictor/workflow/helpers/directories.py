@@ -20,6 +20,7 @@ qc_pre = "FastQC_pretrim/"
 qc_post = "FastQC_posttrim/"
 
 refdir = "reference/"
+shared = "shared/"
 prim = "primers/"
 aln = "alignment/"
 bf = "bam-files/"
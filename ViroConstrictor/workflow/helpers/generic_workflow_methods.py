@@ -4,30 +4,46 @@ import pandas as pd
 from Bio import SeqIO, SeqRecord
 
 from ViroConstrictor.workflow.helpers.directories import *
+from ViroConstrictor.workflow.helpers.introspection_cache import IntrospectionCache, default_cache
 from ViroConstrictor.workflow.helpers.presets import get_preset_parameter
 
 
-def get_reference_header(reffile):
+def get_reference_header(reffile, cache: IntrospectionCache | None = None):
     """
     #TODO: Docstring should be added to this function.
     #TODO: The docstrings in this file should also note where the function is used as they are explicit workflow helper functions.
+    The headers are cached by the content hash of the reference file, see `helpers.introspection_cache`.
     """
-    return [record.id for record in SeqIO.parse(reffile, "fasta")]
+    cache = cache or default_cache
+    return list(cache.get("reference_headers", [reffile], lambda: [record.id for record in SeqIO.parse(reffile, "fasta")]))
 
 
-def get_aminoacid_features(df):
+def _aminoacid_feature_names(features: str, reference: str, feature_types: list[str]) -> dict[str, list[str]]:
+    """
+    Reads the amino acid feature names per reference ID from a feature GFF and reference FASTA file.
+    """
+    AA_dict = AminoExtract.get_feature_name_attribute(input_gff=features, input_seq=reference, feature_types=feature_types)
+    return {str(k): list(v) for k, v in AA_dict.items()} if AA_dict else {}
+
+
+def get_aminoacid_features(df, cache: IntrospectionCache | None = None):
     """
     #TODO: Docstring should be added to this function.
     #TODO: The docstrings in this file should also note where the function is used as they are explicit workflow helper functions.
+    The feature names are cached by the content hash of the feature and reference files, see `helpers.introspection_cache`.
     """
+    cache = cache or default_cache
     records = df.to_dict(orient="records")
 
     for rec in records:
         if rec["FEATURES"] != "NONE":
-            AA_dict = AminoExtract.get_feature_name_attribute(
-                input_gff=str(rec["FEATURES"]),
-                input_seq=str(rec["REFERENCE"]),
-                feature_types=get_preset_parameter(rec["PRESET"], "AminoExtract_FeatureType", "GLOBAL"),
+            features, reference = str(rec["FEATURES"]), str(rec["REFERENCE"])
+            feature_types = get_preset_parameter(rec["PRESET"], "AminoExtract_FeatureType", "GLOBAL")
+            AA_dict = cache.get(
+                "aminoacid_features",
+                [features, reference],
+                lambda: _aminoacid_feature_names(features, reference, feature_types),
+                repr(feature_types),
             )
             if AA_dict:
                 for k, v in AA_dict.items():
@@ -75,7 +91,14 @@ def read_fasta(fasta_file: str) -> list[SeqRecord.SeqRecord]:
     return list(SeqIO.parse(fasta_file, "fasta"))
 
 
-def segmented_ref_groups(df: pd.DataFrame) -> pd.DataFrame:
+def _segment_groups(reference: str) -> list[str]:
+    """
+    Reads the segment groups (the first part of the second word of every record description) of a reference file.
+    """
+    return sorted({record.description.split(" ")[1].split("|")[0] for record in read_fasta(reference)})
+
+
+def segmented_ref_groups(df: pd.DataFrame, cache: IntrospectionCache | None = None) -> pd.DataFrame:
     """
     #TODO: this docstring should be cleaned up and made more informative.
     #TODO: The docstrings in this file should also note where the function is used as they are explicit workflow helper functions.
@@ -85,6 +108,8 @@ def segmented_ref_groups(df: pd.DataFrame) -> pd.DataFrame:
     ----------
     df : pd.DataFrame
         A pandas DataFrame containing the reference file information.
+    cache : IntrospectionCache | None, optional
+        The cache for the segment groups of the reference files (default is the in-process cache).
 
     Returns
     -------
@@ -92,14 +117,14 @@ def segmented_ref_groups(df: pd.DataFrame) -> pd.DataFrame:
         A pandas DataFrame containing the filtered reference file information.
 
     """
+    cache = cache or default_cache
     for index, row in df.iterrows():
         # if the value in the "SEGMENTED" column is False then place a None string in the segment column.
         # Ensure that the value is a string and not a NoneType.
         if not row["SEGMENTED"]:
             df.at[index, "segment"] = {"None"}
             continue
-        refs = read_fasta(row["REFERENCE"])
-        unique_groups = {x.description.split(" ")[1].split("|")[0] for x in refs}
+        unique_groups = set(cache.get("segment_groups", [row["REFERENCE"]], lambda: _segment_groups(row["REFERENCE"])))
         if len(unique_groups) < 2:
             df.drop(index, inplace=True)
             continue
@@ -109,86 +134,3 @@ def segmented_ref_groups(df: pd.DataFrame) -> pd.DataFrame:
     # TODO: Check this later to see if this can be done in the first pass (when the values are being set in the first place) instead of fixing afterwards.
     # TODO: Not entirely sure why the values are being generated as a list with a set inside one time and just as a normal set the other time.
     return df
-
-
-# TODO: all functions below this lack proper unit tests. This is acceptable (at time of writing) for the current release. However, proper unit tests should be added in the near future.
-def get_features_all_samples(samples_df: pd.DataFrame) -> list[str]:
-    """
-    Extracts and returns a list of unique amino acid feature names across all samples
-    in the provided DataFrame.
-
-    Parameters
-    ----------
-    samples_df : pd.DataFrame
-        A pandas DataFrame containing data for multiple samples. Each row may contain
-        a column "AA_FEAT_NAMES" with a list or tuple of amino acid feature names.
-
-    Returns
-    -------
-    list of str
-        A list of unique amino acid feature names found across all samples in
-        ``samples_df``.
-    """
-    all_features = []
-    for _, row in samples_df.iterrows():
-        aa_feat_names = row.get("AA_FEAT_NAMES")
-        if pd.notna(aa_feat_names) and isinstance(aa_feat_names, (list, tuple)):
-            all_features.extend(aa_feat_names)
-    return list(set(all_features))
-
-
-def get_features_per_sample(sample: str, samples_df: pd.DataFrame) -> list[str]:
-    """
-    Extracts and returns a list of unique amino acid feature names for a sample.
-
-    Parameters
-    ----------
-    sample : str
-        Sample identifier.
-    samples_df : pd.DataFrame
-        A pandas DataFrame containing sample data.
-
-    Returns
-    -------
-    list of str
-        A list of unique amino acid feature names for the sample.
-    """
-    sample_rows = samples_df[samples_df["sample"] == sample]
-    if sample_rows.empty:
-        return []
-    all_features = []
-    for _, row in sample_rows.iterrows():
-        aa_feat_names = row.get("AA_FEAT_NAMES")
-        if pd.notna(aa_feat_names) and isinstance(aa_feat_names, (list, tuple)):
-            all_features.extend(aa_feat_names)
-    return list(set(all_features))
-
-
-# Helper function to get all unique features for a virus
-def get_features_per_virus(virus: str, samples_df: pd.DataFrame) -> list[str]:
-    """
-    Retrieve a list of unique amino acid feature names for a given virus from a DataFrame.
-
-    Parameters
-    ----------
-    virus : str
-        The name or identifier of the virus to filter the DataFrame.
-    samples_df : pd.DataFrame
-        A pandas DataFrame containing at least the columns "Virus" and "AA_FEAT_NAMES".
-        The "AA_FEAT_NAMES" column should contain lists or tuples of feature names.
-
-    Returns
-    -------
-    list of str
-        A list of unique amino acid feature names associated with the specified virus.
-        Returns an empty list if the virus is not found or no features are present.
-    """
-    virus_rows = samples_df[samples_df["Virus"] == virus]
-    if virus_rows.empty:
-        return []
-    all_features = []
-    for _, row in virus_rows.iterrows():
-        aa_feat_names = row.get("AA_FEAT_NAMES")
-        if pd.notna(aa_feat_names) and isinstance(aa_feat_names, (list, tuple)):
-            all_features.extend(aa_feat_names)
-    return list(set(all_features))
@@ -0,0 +1,102 @@
+"""
+Helpers for the intermediate (per sample) FASTQ files written during the clean stage of the main workflow.
+
+The format of these intermediate files can be chosen with the `intermediate_format` setting in the `[WORKFLOW]` section
+of the user profile:
+
+- ``plain``: uncompressed FASTQ files, the files are copied when they have to be placed in another location.
+- ``compressed``: BGZF/gzip compressed FASTQ files (``.fastq.gz``).
+- ``pipe``: the adapter removal output is streamed to the QC filter through a named pipe and never written to disk.
+- ``link``: uncompressed FASTQ files that are hardlinked (or reflinked where hardlinks are not possible) instead of copied.
+"""
+
+import json
+import os
+from pathlib import Path
+
+INTERMEDIATE_FORMATS = ("plain", "compressed", "pipe", "link")
+
+
+def fastq_suffix(intermediate_format: str) -> str:
+    """
+    Get the file suffix of the intermediate FASTQ files for the given intermediate format.
+
+    Parameters
+    ----------
+    intermediate_format : str
+        The configured intermediate format, one of `INTERMEDIATE_FORMATS`.
+
+    Returns
+    -------
+    str
+        ``.fastq.gz`` for the compressed format, ``.fastq`` otherwise.
+
+    Raises
+    ------
+    ValueError
+        If the given intermediate format is not one of `INTERMEDIATE_FORMATS`.
+    """
+    if intermediate_format not in INTERMEDIATE_FORMATS:
+        raise ValueError(f"Unknown intermediate format '{intermediate_format}', choose one of {', '.join(INTERMEDIATE_FORMATS)}.")
+    return ".fastq.gz" if intermediate_format == "compressed" else ".fastq"
+
+
+def intermediate_bytes_written(datadir: str, clean_dir: str) -> dict[str, int]:
+    """
+    Calculate the number of bytes written to disk for the intermediate files of the clean stage.
+
+    Every file is counted once, so hardlinked files do not add to the total. Named pipes do not occupy disk space
+    and are not counted.
+
+    Parameters
+    ----------
+    datadir : str
+        The data directory of the workflow, containing the ``Virus~*/RefID~*/`` folders.
+    clean_dir : str
+        Name of the clean stage folder within every ``Virus~*/RefID~*/`` folder.
+
+    Returns
+    -------
+    dict[str, int]
+        The number of bytes written per clean stage step (subfolder of the clean stage folder), and the sum of all
+        steps under the ``total`` key.
+    """
+    seen_inodes: set[tuple[int, int]] = set()
+    written: dict[str, int] = {}
+    for clean_folder in Path(datadir).glob(f"*/*/{clean_dir.strip('/')}"):
+        for step_folder in sorted(path for path in clean_folder.iterdir() if path.is_dir()):
+            for file in step_folder.iterdir():
+                stat = file.lstat()
+                if not file.is_file() or (stat.st_dev, stat.st_ino) in seen_inodes:
+                    continue
+                seen_inodes.add((stat.st_dev, stat.st_ino))
+                written[step_folder.name] = written.get(step_folder.name, 0) + stat.st_size
+    written["total"] = sum(written.values())
+    return written
+
+
+def write_intermediate_report(datadir: str, clean_dir: str, intermediate_format: str, output: str) -> dict[str, int]:
+    """
+    Write a JSON report with the number of bytes written for the intermediate files of the clean stage.
+
+    Parameters
+    ----------
+    datadir : str
+        The data directory of the workflow.
+    clean_dir : str
+        Name of the clean stage folder within every ``Virus~*/RefID~*/`` folder.
+    intermediate_format : str
+        The intermediate format that was used for the run.
+    output : str
+        Path to the JSON report.
+
+    Returns
+    -------
+    dict[str, int]
+        The number of bytes written per clean stage step, see `intermediate_bytes_written`.
+    """
+    written = intermediate_bytes_written(datadir, clean_dir)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as report:
+        json.dump({"intermediate_format": intermediate_format, "bytes_written": written}, report, indent=4)
+    return written
@@ -0,0 +1,133 @@
+"""
+Content-hash keyed cache for the reference and feature introspection done while the workflows are evaluated.
+
+When a Snakefile is evaluated, the reference headers, the segment groups of segmented references and the amino acid
+feature names are read from the reference FASTA and feature GFF files of every sample. Most samples of a run share a
+few references, and the Snakefile is evaluated again by every job that runs in a separate Snakemake process. The
+results are therefore cached by the content hash (SHA-256) of the files involved: in process, so every distinct file is
+parsed once per evaluation, and optionally in a JSON file in the working directory, so every distinct file is parsed
+once across runs and jobs. Files are only hashed again when their size or modification time changed (see
+`FileDigests`, which can be shared with the other caches of the workflow).
+
+The on-disk cache is enabled with the `introspection_cache` setting in the `[WORKFLOW]` section of the user profile.
+
+Examples
+--------
+>>> cache = IntrospectionCache("data/introspection_cache.json")
+>>> headers = cache.get("reference_headers", ["reference.fasta"], lambda: parse_headers("reference.fasta"))
+>>> cache.save()
+"""
+
+import json
+import os
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from ViroConstrictor.workflow.helpers.manifest import FileDigests
+
+INTROSPECTION_CACHE_VERSION = 1
+
+
+class IntrospectionCache:
+    """
+    Caches introspection results by the content hash of the files they are read from.
+
+    Parameters
+    ----------
+    path : Path | str | None, optional
+        Path to the JSON file to persist the cache in (default is None, the cache is only kept in process).
+    digests : FileDigests | None, optional
+        The content hashes of the files (default is None, a new in-process `FileDigests`).
+
+    Attributes
+    ----------
+    stats : dict[str, int]
+        The number of cache "hits" and "misses" (results that were computed).
+    """
+
+    def __init__(self, path: Path | str | None = None, digests: FileDigests | None = None) -> None:
+        self.path = Path(path) if path is not None else None
+        self.digests = digests if digests is not None else FileDigests()
+        self.stats = {"hits": 0, "misses": 0}
+        self._entries: dict[str, Any] | None = None
+        self._dirty = False
+
+    def file_digest(self, path: Path | str) -> str:
+        """
+        Returns the content hash of a file, which is only computed again when its size or modification time changed.
+
+        Parameters
+        ----------
+        path : Path | str
+            Path to the file.
+
+        Returns
+        -------
+        str
+            The SHA-256 hex digest of the file content.
+        """
+        return self.digests.digest(path)
+
+    def get(self, kind: str, files: list[Path | str], compute: Callable[[], Any], *extra: str) -> Any:
+        """
+        Returns the cached result for a set of files, the result is computed and cached when it is not cached yet.
+
+        Parameters
+        ----------
+        kind : str
+            The kind of result, e.g. "reference_headers".
+        files : list[Path | str]
+            The files the result is read from, the result is cached by their content hash.
+        compute : Callable[[], Any]
+            Computes the result, which must be JSON serializable.
+        *extra : str
+            Other values that determine the result (e.g. the feature types to read).
+
+        Returns
+        -------
+        Any
+            The cached or computed result, shared between calls and should not be modified.
+        """
+        key = "\t".join([kind, *(self.file_digest(path) for path in files), *extra])
+        entries = self._load()
+        if key in entries:
+            self.stats["hits"] += 1
+            return entries[key]
+        self.stats["misses"] += 1
+        entries[key] = compute()
+        self._dirty = True
+        return entries[key]
+
+    def save(self) -> None:
+        """
+        Writes the cache to its JSON file when new results were added, the file is replaced atomically.
+        """
+        if self.path is None or not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(temporary, "w") as cache_file:
+            json.dump({"version": INTROSPECTION_CACHE_VERSION, "entries": self._load()}, cache_file)
+        os.replace(temporary, self.path)
+        self._dirty = False
+
+    def _load(self) -> dict[str, Any]:
+        """
+        Returns the cache entries, which are read from the JSON file on first use. An unreadable file is ignored.
+        """
+        if self._entries is None:
+            self._entries = {}
+            if self.path is not None:
+                try:
+                    with open(self.path) as cache_file:
+                        content = json.load(cache_file)
+                    if content["version"] == INTROSPECTION_CACHE_VERSION:
+                        self._entries = dict(content["entries"])
+                except (OSError, ValueError, KeyError, TypeError):
+                    pass
+        return self._entries
+
+
+# the in-process cache used by the workflow helpers when no cache is given
+default_cache = IntrospectionCache()
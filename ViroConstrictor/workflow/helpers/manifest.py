@@ -0,0 +1,308 @@
+"""
+Incremental writing of combined result files with a manifest sidecar.
+
+A combined result file consists of a header followed by one segment per input file (e.g. the rows of a per-sample
+table with the added metadata columns). The manifest sidecar (``<output>.manifest.json`` by default) records every
+input file with its size, modification time, content hash and the byte offset and length of its segment in the
+combined file. When the combined file is written again:
+
+- the segments of unchanged input files are copied from the existing combined file instead of being parsed again;
+- when the previous inputs are all unchanged and the new inputs are only appended, the existing combined file is kept
+  and only the segments of the new inputs are appended to it.
+
+The manifest is only trusted when the combined file still has the size and modification time recorded in it and was
+written with the same header, otherwise the combined file is rebuilt from all input files.
+
+Examples
+--------
+>>> with IncrementalOutput("combined.tsv", "Sample\\tValue\\n", [("s1.tsv", "VirusA"), ("s2.tsv", "VirusB")]) as output:
+...     for path, key in output.sources:
+...         output.write(path, key, lambda: convert(path, key))
+"""
+
+import hashlib
+import json
+import os
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, BinaryIO
+
+MANIFEST_VERSION = 1
+
+
+def file_signature(path: Path | str) -> dict[str, int | None]:
+    """
+    Returns the size and modification time (in nanoseconds) of a file, both are None for missing files.
+
+    Parameters
+    ----------
+    path : Path | str
+        Path to the file.
+
+    Returns
+    -------
+    dict[str, int | None]
+        The "size" and "mtime_ns" of the file.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {"size": None, "mtime_ns": None}
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def content_hash(path: Path | str) -> str:
+    """
+    Returns the SHA-256 hex digest of the content of a file, an empty string for missing files.
+
+    Parameters
+    ----------
+    path : Path | str
+        Path to the file.
+
+    Returns
+    -------
+    str
+        The hex digest of the file content.
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as handle:
+            for block in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(block)
+    except OSError:
+        return ""
+    return digest.hexdigest()
+
+
+class FileDigests:
+    """
+    The content hashes of files, which are only computed again when the size or modification time of a file changed.
+
+    Parameters
+    ----------
+    path : Path | str | None, optional
+        Path to the JSON file to persist the content hashes in (default is None, they are only kept in process).
+
+    Examples
+    --------
+    >>> digests = FileDigests("~/.viroconstrictor/result_cache/digests.json")
+    >>> digests.digest("reference.fasta")
+    '4f1c...'
+    >>> digests.save()
+    """
+
+    def __init__(self, path: Path | str | None = None) -> None:
+        self.path = Path(path).expanduser() if path is not None else None
+        self._digests: dict[str, list] | None = None
+        self._dirty = False
+
+    def digest(self, path: Path | str) -> str:
+        """
+        Returns the SHA-256 hex digest of the content of a file, see `content_hash`.
+        """
+        path = os.path.abspath(os.path.expanduser(path))
+        stat = os.stat(path)
+        digests = self._load()
+        cached = digests.get(path)
+        if cached is None or cached[:2] != [stat.st_size, stat.st_mtime_ns]:
+            cached = [stat.st_size, stat.st_mtime_ns, content_hash(path)]
+            digests[path] = cached
+            self._dirty = True
+        return cached[2]
+
+    def save(self) -> None:
+        """
+        Writes the content hashes to the JSON file when new files were hashed, the file is replaced atomically.
+        """
+        if self.path is None or not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(temporary, "w") as digests_file:
+            json.dump(self._load(), digests_file)
+        os.replace(temporary, self.path)
+        self._dirty = False
+
+    def _load(self) -> dict[str, list]:
+        """
+        Returns the content hashes, which are read from the JSON file on first use. An unreadable file is ignored.
+        """
+        if self._digests is None:
+            self._digests = {}
+            if self.path is not None:
+                try:
+                    with open(self.path) as digests_file:
+                        self._digests = dict(json.load(digests_file))
+                except (OSError, ValueError, TypeError):
+                    pass
+        return self._digests
+
+
+class IncrementalOutput:
+    """
+    A combined result file built from one segment per input file, reusing the segments of unchanged input files.
+
+    The segments must be written in the order of `sources`, with `write`. The combined file is only replaced (or
+    appended to) when the context exits without an exception, after which the manifest is updated.
+
+    Parameters
+    ----------
+    output : Path | str
+        Path to the combined output file.
+    header : str
+        Text written at the start of the combined file.
+    sources : list[tuple[str, str]]
+        The input files of the combined file in output order, each with a key that describes everything besides the
+        file content that determines its segment (e.g. the virus and reference ID added to its rows).
+    manifest : Path | str | None, optional
+        Path to the manifest file (default is ``<output>.manifest.json``).
+    """
+
+    def __init__(self, output: Path | str, header: str, sources: list[tuple[str, str]], manifest: Path | str | None = None) -> None:
+        self.output = Path(output)
+        self.header = header
+        self.sources = [(str(path), key) for path, key in sources]
+        self.manifest = Path(manifest) if manifest is not None else Path(f"{output}.manifest.json")
+        self.stats = {"copied": 0, "converted": 0, "appended": 0}
+
+        self._previous = self._read_manifest()
+        self._previous_by_path = {entry["path"]: entry for entry in self._previous}
+        self._unchanged: dict[tuple[str, str], bool] = {}
+        previous_sources = [(entry["path"], entry["key"]) for entry in self._previous]
+        self.appending = bool(self._previous) and self.sources[: len(previous_sources)] == previous_sources and all(
+            self._is_unchanged(path, key) for path, key in previous_sources
+        )
+        self._entries: list[dict[str, Any]] = []
+        self._position = 0
+        self._handle: BinaryIO | None = None
+        self._previous_output: BinaryIO | None = None
+        self._temporary = self.output.with_name(f"{self.output.name}.partial")
+
+    def __enter__(self) -> "IncrementalOutput":
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        if self.appending:
+            # the previous inputs are unchanged, their content hash may have been verified for a new modification time
+            self._entries = [{**entry, **file_signature(entry["path"])} for entry in self._previous]
+            self._handle = open(self.output, "ab")
+        else:
+            if self._previous:
+                self._previous_output = open(self.output, "rb")
+            self._handle = open(self._temporary, "wb")
+            self._handle.write(self.header.encode())
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        assert self._handle is not None
+        self._handle.close()
+        if self._previous_output is not None:
+            self._previous_output.close()
+        if exc_type is not None:
+            # an interrupted append leaves an output that no longer matches the manifest, the next run rebuilds it
+            self._temporary.unlink(missing_ok=True)
+            self.manifest.unlink(missing_ok=True)
+            return
+        if not self.appending:
+            os.replace(self._temporary, self.output)
+        self._write_manifest()
+
+    def write(self, path: str, key: str, convert: Callable[[], str]) -> None:
+        """
+        Writes the segment of the next input file, `convert` is only called when the segment can not be reused.
+
+        Parameters
+        ----------
+        path : str
+            Path to the input file, the next file of `sources`.
+        key : str
+            The key of the input file, see `sources`.
+        convert : Callable[[], str]
+            Returns the segment text of the input file.
+        """
+        assert self._handle is not None
+        path = str(path)
+        index = self._position
+        assert self.sources[index] == (path, key), f"Segments must be written in the order of the sources, expected {self.sources[index]}."
+        self._position += 1
+        if self.appending and index < len(self._previous):
+            # the segment is already part of the existing output
+            return
+
+        previous = self._previous_by_path.get(path)
+        offset = self._handle.tell()
+        if not self.appending and previous is not None and self._previous_output is not None and self._is_unchanged(path, key):
+            self._previous_output.seek(previous["offset"])
+            segment = self._previous_output.read(previous["length"])
+            entry = {**previous, **file_signature(path), "offset": offset}
+            self.stats["copied"] += 1
+        else:
+            segment = convert().encode()
+            entry = {"path": path, "key": key, **file_signature(path), "sha256": content_hash(path), "offset": offset, "length": len(segment)}
+            self.stats["appended" if self.appending else "converted"] += 1
+        self._handle.write(segment)
+        self._entries.append(entry)
+
+    @property
+    def segment_bytes(self) -> int:
+        """
+        The total length (in bytes) of the segments in the combined file, the header excluded.
+        """
+        return sum(entry["length"] for entry in self._entries)
+
+    def _is_unchanged(self, path: str, key: str) -> bool:
+        """
+        Checks whether an input file is unchanged since the previous manifest, the content hash is only compared when
+        the size is equal but the modification time differs.
+        """
+        if (path, key) not in self._unchanged:
+            previous = self._previous_by_path.get(path)
+            signature = file_signature(path)
+            self._unchanged[(path, key)] = (
+                previous is not None
+                and previous["key"] == key
+                and previous["size"] == signature["size"]
+                and (previous["mtime_ns"] == signature["mtime_ns"] or previous["sha256"] == content_hash(path))
+            )
+        return self._unchanged[(path, key)]
+
+    def _read_manifest(self) -> list[dict[str, Any]]:
+        """
+        Reads the entries of the previous manifest, which are only valid for the existing output with the same header.
+        """
+        try:
+            with open(self.manifest) as manifest:
+                content = json.load(manifest)
+            if content["version"] != MANIFEST_VERSION or content["header"] != self.header:
+                return []
+            if content["output"] != file_signature(self.output):
+                return []
+            return list(content["inputs"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return []
+
+    def _write_manifest(self) -> None:
+        content = {
+            "version": MANIFEST_VERSION,
+            "header": self.header,
+            "output": file_signature(self.output),
+            "inputs": self._entries,
+        }
+        temporary = self.manifest.with_name(f"{self.manifest.name}.partial")
+        self.manifest.parent.mkdir(parents=True, exist_ok=True)
+        with open(temporary, "w") as manifest:
+            json.dump(content, manifest)
+        os.replace(temporary, self.manifest)
+
+
+def discard_manifest(output: Path | str, manifest: Path | str | None = None) -> None:
+    """
+    Removes the manifest of a combined output that was written without `IncrementalOutput`.
+
+    Parameters
+    ----------
+    output : Path | str
+        Path to the combined output file.
+    manifest : Path | str | None, optional
+        Path to the manifest file (default is ``<output>.manifest.json``).
+    """
+    Path(manifest if manifest is not None else f"{output}.manifest.json").unlink(missing_ok=True)
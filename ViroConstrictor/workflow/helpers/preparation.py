@@ -0,0 +1,112 @@
+"""
+Content-hash keys of the reference, primer and feature preparation jobs of the main workflow.
+
+The prepared reference, primers and features of a Virus/RefID/sample combination only depend on the reference, primer
+and feature files of the sample and a few settings, not on its reads. Most samples of a run share the same files, so
+the preparation jobs (`prepare_refs`, `prepare_primers`, `filter_primer_bed`, `create_empty_primers`, `prepare_gffs`
+and `prodigal`) write shared outputs in `data/shared/` that are named by a key: the SHA-256 hash of the content of the
+files and the settings the output depends on. Every distinct output is therefore prepared once per run, and the
+per-sample paths are hardlinks to the shared outputs.
+
+Examples
+--------
+>>> plan = PreparationPlan([("SARS-CoV-2", "MN908947.3", "sample1")], SAMPLES, content_hash)
+>>> plan.samples[("SARS-CoV-2", "MN908947.3", "sample1")]["primers"]
+'4f1c...'
+>>> plan.primers["4f1c..."]["method"]
+'fasta'
+"""
+
+import hashlib
+import json
+from collections.abc import Callable, Iterable, Mapping
+from pathlib import Path
+from typing import Any
+
+
+def preparation_key(**parts: Any) -> str:
+    """
+    Returns the key of a shared preparation output: the SHA-256 hash of everything it depends on.
+    """
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def primers_method(primers: str) -> str:
+    """
+    Returns how the primers of a sample are prepared: "none" (an empty primer file), "bed" (the primers of the
+    reference are filtered from a BED file) or "fasta" (the primer sequences are searched in the reference).
+    """
+    if primers == "NONE":
+        return "none"
+    return "bed" if primers.endswith(".bed") else "fasta"
+
+
+def features_method(features: str | None) -> str:
+    """
+    Returns how the features of a sample are prepared: "gff" (the features of the reference are extracted from a GFF
+    file) or "prodigal" (the open reading frames of the reference are predicted).
+    """
+    return "prodigal" if not features or features == "NONE" else "gff"
+
+
+class PreparationPlan:
+    """
+    The shared preparation outputs of the Virus/RefID/sample combinations of a run, by key.
+
+    Parameters
+    ----------
+    rows : Iterable[tuple[str, str, str]]
+        The Virus, RefID and sample of every combination.
+    samples : Mapping[str, Mapping[str, Any]]
+        The settings of every sample, with the "REFERENCE", "PRIMERS", "FEATURES" and "PRIMER-MISMATCH-RATE".
+    digest : Callable[[Path | str], str]
+        Returns the content hash of a file.
+
+    Attributes
+    ----------
+    samples : dict[tuple[str, str, str], dict[str, str]]
+        The "reference", "primers" and "features" key of every combination.
+    references : dict[str, dict[str, Any]]
+        The reference "file" and "RefID" of every reference key.
+    primers : dict[str, dict[str, Any]]
+        The "method", primer "file", "RefID", "reference" key and "mismatch_rate" of every primers key.
+    features : dict[str, dict[str, Any]]
+        The "method", feature "file", "RefID" and "reference" key of every features key.
+    """
+
+    def __init__(self, rows: Iterable[tuple[str, str, str]], samples: Mapping[str, Mapping[str, Any]], digest: Callable[[Path | str], str]) -> None:
+        self.samples: dict[tuple[str, str, str], dict[str, str]] = {}
+        self.references: dict[str, dict[str, Any]] = {}
+        self.primers: dict[str, dict[str, Any]] = {}
+        self.features: dict[str, dict[str, Any]] = {}
+        for virus, refid, sample in rows:
+            settings = samples[sample]
+            reference = preparation_key(kind="reference", file=digest(settings["REFERENCE"]), RefID=refid)
+            self.references.setdefault(reference, {"file": settings["REFERENCE"], "RefID": refid})
+
+            method = primers_method(settings["PRIMERS"])
+            primer_parts: dict[str, Any] = {"kind": "primers", "method": method}
+            if method == "bed":
+                primer_parts |= {"file": digest(settings["PRIMERS"]), "RefID": refid}
+            elif method == "fasta":
+                primer_parts |= {"file": digest(settings["PRIMERS"]), "reference": reference, "mismatch_rate": settings["PRIMER-MISMATCH-RATE"]}
+            primers = preparation_key(**primer_parts)
+            self.primers.setdefault(
+                primers,
+                {
+                    "method": method,
+                    "file": settings["PRIMERS"],
+                    "RefID": refid,
+                    "reference": reference,
+                    "mismatch_rate": settings.get("PRIMER-MISMATCH-RATE"),
+                },
+            )
+
+            method = features_method(settings.get("FEATURES"))
+            feature_parts: dict[str, Any] = {"kind": "features", "method": method, "reference": reference}
+            if method == "gff":
+                feature_parts |= {"file": digest(settings["FEATURES"]), "RefID": refid}
+            features = preparation_key(**feature_parts)
+            self.features.setdefault(features, {"method": method, "file": settings.get("FEATURES"), "RefID": refid, "reference": reference})
+
+            self.samples[(virus, refid, sample)] = {"reference": reference, "primers": primers, "features": features}
@@ -1,9 +1,9 @@
 import difflib
-import inspect
 import json
 import os
 import re
-from collections import defaultdict
+import sys
+from functools import lru_cache
 from typing import Any, List, Tuple
 
 from rich import print
@@ -122,6 +122,83 @@ def collapse_preset_group(preset_name: str, stages: List[str], stage_identifier:
     return temp_dict
 
 
+@lru_cache(maxsize=None)
+def preset_table(preset_name: str, stage_identifier: str) -> dict[str, Any]:
+    """
+    Build the flattened parameter table of a preset for a stage, once per preset and stage.
+
+    The table holds the override values of the preset: the values of the "STAGE_MATCHREF" and "STAGE_GLOBAL" groups,
+    overridden by the values of the "STAGE_MAIN" and "STAGE_GLOBAL" groups. The keys have the stage identifier
+    prepended, see `collapse_preset_group`.
+
+    Parameters
+    ----------
+    preset_name : str
+        The name of the preset.
+    stage_identifier : str
+        The identifier of the stage, e.g. "MAIN" or "MATCHREF".
+
+    Returns
+    -------
+    dict[str, Any]
+        The override values of the preset, this table is shared between calls and should not be modified.
+    """
+    presets_main = collapse_preset_group(preset_name, ["STAGE_MAIN", "STAGE_GLOBAL"], stage_identifier)
+    presets_matchref = collapse_preset_group(preset_name, ["STAGE_MATCHREF", "STAGE_GLOBAL"], stage_identifier)
+    return presets_matchref | presets_main
+
+
+@lru_cache(maxsize=None)
+def _default_table(stage_identifier: str) -> dict[str, Any]:
+    """
+    Build the flattened parameter table of the "DEFAULT" preset for a stage, the fallback for missing parameters.
+    """
+    return collapse_preset_group("DEFAULT", ["STAGE_MAIN", "STAGE_GLOBAL"], stage_identifier)
+
+
+@lru_cache(maxsize=None)
+def _resolve_preset_parameter(preset_name: str, parameter_name: str, stage_identifier: str) -> Any:
+    """
+    Resolve a parameter of a preset for a stage, every combination is resolved (and logged) once.
+    """
+    key = f"{stage_identifier}_{parameter_name}"
+    # a missing parameter, or a parameter that is a group of values instead of a value, is inherited from the default preset
+    parameter = preset_table(preset_name, stage_identifier).get(key, {})
+    if isinstance(parameter, dict):
+        log.debug(
+            f"Parameter handling :: Preset :: {preset_name} specific parameter '[yellow]{key}[/yellow]' not found, inheriting parameter value from 'DEFAULT'."
+        )
+        return _default_table(stage_identifier)[key]
+
+    log.debug(f"Parameter handling :: Preset :: Using {preset_name} specific parameter '[yellow]{key}[/yellow]'")
+    return parameter
+
+
+def resolved_preset_parameters(preset_name: str, stage_identifier: str) -> dict[str, Any]:
+    """
+    Resolve all parameters of a preset for a stage, as they are used by the rules of the workflow.
+
+    Parameters
+    ----------
+    preset_name : str
+        The name of the preset.
+    stage_identifier : str
+        The identifier of the stage, e.g. "MAIN" or "MATCHREF".
+
+    Returns
+    -------
+    dict[str, Any]
+        The value of every parameter (without the stage identifier), see `get_preset_parameter`.
+    """
+    prefix = f"{stage_identifier}_"
+    keys = set(_default_table(stage_identifier)) | {
+        key for key, value in preset_table(preset_name, stage_identifier).items() if not isinstance(value, dict)
+    }
+    return {
+        key.removeprefix(prefix): _resolve_preset_parameter(preset_name, key.removeprefix(prefix), stage_identifier) for key in sorted(keys)
+    }
+
+
 def get_preset_parameter(preset_name: str, parameter_name: str, stage_identifier: str = "") -> Any:
     """
     Flexibly get predefined tool-parameters from one or more presets.
@@ -132,6 +209,9 @@ def get_preset_parameter(preset_name: str, parameter_name: str, stage_identifier
         The name of the preset.
     parameter_name : str
         The name of the parameter.
+    stage_identifier : str, optional
+        The identifier of the stage, e.g. "MAIN" or "MATCHREF". Defaults to the `VC_STAGE` global of the calling
+        module (the workflow in which the function is called).
 
     Returns
     -------
@@ -145,15 +225,13 @@ def get_preset_parameter(preset_name: str, parameter_name: str, stage_identifier
 
     Notes
     -----
-    This function retrieves the value of a parameter from a preset. The preset can have different values for different stages of execution. The stages are identified by a stage identifier, which is obtained dynamically using the `inspect` module. The stage identifier is stored in the global variable `VC_STAGE`.
-
-    The function first collapses the preset groups into dictionaries for the main and matchref stages. This results in dictionaries with only the override values for the specific stage that is being called.
+    This function retrieves the value of a parameter from a preset. The preset can have different values for different stages of execution. The stages are identified by a stage identifier, which is read from the global variable `VC_STAGE` of the calling module when it is not given.
 
-    The dictionaries for the main and matchref stages are then merged together, with the main stage taking precedence over the matchref stage. This results in one dictionary with the override values, where the stage identifier is prepended to the key.
+    The parameter is looked up in the flattened parameter table of the preset and stage (see `preset_table`). This table is built once per preset and stage from the main and matchref preset groups, with the main stage taking precedence over the matchref stage.
 
-    The function uses a `defaultdict` to allow for a default value of `None` if the key is not found in the dictionary. This indicates that there is no override value and the default value should be used.
+    If the parameter is not found in the table (or is a dictionary, meaning that the parameter is not found in the specific preset group), the parameter is fetched from the default preset.
 
-    If the parameter is a dictionary, it means that the parameter is not found in the specific preset group. In this case, the function fetches the parameter from the default preset. The default preset is obtained by collapsing the preset group for the "DEFAULT" stage.
+    The resolved value of every preset, parameter and stage combination is cached, so repeated calls (e.g. in the params of every rule, for every sample) are dictionary lookups.
 
     Examples
     --------
@@ -164,35 +242,8 @@ def get_preset_parameter(preset_name: str, parameter_name: str, stage_identifier
 
     """
 
-    # Using an inspect here to have a dynamic stage identifier that cannot be changed.
-    # Additionally, this allows for the function to be used in any stage without needing to pass the stage identifier at every function call.
+    # The stage identifier is read from the globals of the calling module (the workflow), so it does not have to be
+    # passed at every function call. Only the calling frame is looked up, which is much cheaper than inspecting the stack.
     if not stage_identifier:
-        _stage_identifier = inspect.stack()[1][0].f_globals["VC_STAGE"]
-    else:
-        _stage_identifier = stage_identifier
-
-    # collapse the preset groups into dictionaries for the main and matchref stages
-    # This results in the dictionaries with only the override values for the specific stage that is being called.
-    presets_main = collapse_preset_group(preset_name, ["STAGE_MAIN", "STAGE_GLOBAL"], _stage_identifier)
-    presets_matchref = collapse_preset_group(preset_name, ["STAGE_MATCHREF", "STAGE_GLOBAL"], _stage_identifier)
-
-    # merge the two dictionaries together, with the main stage taking precedence over the matchref stage
-    # this results in one dictionary with the override values with the stage prepended to the key
-    # We're using a defaultdict here to allow for the default value to be None if the key is not found, thus indicating that there is no override value and the default value should be used.
-    preset = defaultdict(dict[str, str], presets_matchref | presets_main, default=None)
-
-    # fetch the desired parameter, returns either the override value or None if the key does not exist.
-    parameter: Any = preset[f"{_stage_identifier}_{parameter_name}"]
-
-    # if the parameter is a dictionary, it means that the parameter is not found in the specific preset group
-    if isinstance(parameter, dict):
-        # fetch the parameter from the default preset
-        preset_params = collapse_preset_group("DEFAULT", ["STAGE_MAIN", "STAGE_GLOBAL"], _stage_identifier)
-        log.debug(
-            f"Parameter handling :: Preset :: {preset_name} specific parameter '[yellow]{_stage_identifier}_{parameter_name}[/yellow]' not found, inheriting parameter value from 'DEFAULT'."
-        )
-
-        return preset_params[f"{_stage_identifier}_{parameter_name}"]
-
-    log.debug(f"Parameter handling :: Preset :: Using {preset_name} specific parameter '[yellow]{_stage_identifier}_{parameter_name}[/yellow]'")
-    return parameter
+        stage_identifier = sys._getframe(1).f_globals["VC_STAGE"]
+    return _resolve_preset_parameter(preset_name, parameter_name, stage_identifier)
@@ -0,0 +1,232 @@
+"""
+History of the measured resource usage of the workflow jobs, and the resource model learned from it.
+
+The heavy rules of both workflows write a Snakemake benchmark file (`logs/benchmark/*.jsonl`, in the extended format
+with the rule name, wildcards and input sizes of the job). When the resource history is enabled with the
+`resource_history` setting in the `[WORKFLOW]` section of the user profile:
+
+* after every workflow stage, the measurements of the benchmark files (wall time, max RSS and total input size) are
+  added to the history file `RESOURCE_HISTORY_PATH`, keyed by rule, platform and preset. Every benchmark file is
+  recorded once, the recorded files are listed in `logs/benchmark/recorded.txt`.
+* at the start of every workflow stage, `ResourceModel` fits a linear regression of the max RSS and wall time on the
+  input size per rule, platform and preset. The resource functions of the Snakefiles use its predictions for the
+  `mem_mb` and `runtime` of a job and fall back to the coefficients of `helpers/resources.py` for the rules without
+  enough measurements.
+
+Examples
+--------
+>>> record_benchmarks(RESOURCE_HISTORY_PATH, "logs/benchmark/", "nanopore", {"sample1": "SARSCOV2"})
+>>> model = ResourceModel.load(RESOURCE_HISTORY_PATH, "nanopore")
+>>> memory_mb = model.predict_memory("ampligone", "SARSCOV2", input_mb=850.0)
+"""
+
+import json
+import math
+import os
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Any
+
+RESOURCE_HISTORY_PATH = Path.home() / ".viroconstrictor" / "resource_history.jsonl"
+RECORDED_LIST = "recorded.txt"
+# the number of most recent measurements that is kept per rule, platform and preset
+MAX_MEASUREMENTS = 200
+# the minimum number of measurements of a rule before its resources are predicted
+MIN_MEASUREMENTS = 5
+MEMORY_HEADROOM = 1.25
+RUNTIME_HEADROOM = 1.5
+MIN_MEMORY_MB = 100
+
+
+def read_benchmark(path: Path | str, platform: str, presets: Mapping[str, str]) -> list[dict[str, Any]]:
+    """
+    Reads the measurements of a benchmark file in the extended JSON lines format of Snakemake.
+
+    Parameters
+    ----------
+    path : Path | str
+        Path to the benchmark file.
+    platform : str
+        The sequencing platform of the run.
+    presets : Mapping[str, str]
+        The preset of every sample, rules without a sample wildcard are recorded without a preset ("").
+
+    Returns
+    -------
+    list[dict[str, Any]]
+        The measurements, with the rule, platform, preset, input size (MB), threads, wall time (s) and max RSS (MB,
+        None when it could not be measured).
+    """
+    measurements = []
+    with open(path) as benchmark_file:
+        for line in benchmark_file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            sample = (record.get("wildcards") or {}).get("sample")
+            max_rss = record.get("max_rss")
+            measurements.append(
+                {
+                    "rule": record["rule_name"],
+                    "platform": platform,
+                    "preset": presets.get(sample, "") if sample is not None else "",
+                    "input_mb": round(sum((record.get("input_size_mb") or {}).values()), 3),
+                    "threads": record.get("threads"),
+                    "seconds": float(record["s"]),
+                    "max_rss_mb": float(max_rss) if isinstance(max_rss, (int, float)) and max_rss > 0 else None,
+                    "time": int(os.path.getmtime(path)),
+                }
+            )
+    return measurements
+
+
+def read_history(history: Path | str) -> list[dict[str, Any]]:
+    """
+    Reads the measurements of a history file, an unreadable or missing file has no measurements.
+    """
+    try:
+        with open(history) as history_file:
+            return [json.loads(line) for line in history_file if line.strip()]
+    except (OSError, ValueError):
+        return []
+
+
+def record_benchmarks(history: Path | str, benchmark_dir: Path | str, platform: str, presets: Mapping[str, str]) -> int:
+    """
+    Adds the measurements of the benchmark files that were not recorded before to the history file.
+
+    Only the `MAX_MEASUREMENTS` most recent measurements are kept per rule, platform and preset. The history file is
+    replaced atomically.
+
+    Parameters
+    ----------
+    history : Path | str
+        Path to the history file (JSON lines).
+    benchmark_dir : Path | str
+        The directory with the benchmark files of a run.
+    platform : str
+        The sequencing platform of the run.
+    presets : Mapping[str, str]
+        The preset of every sample.
+
+    Returns
+    -------
+    int
+        The number of measurements that were added.
+    """
+    benchmark_dir = Path(benchmark_dir)
+    recorded_list = benchmark_dir / RECORDED_LIST
+    recorded = set(recorded_list.read_text().splitlines()) if recorded_list.exists() else set()
+
+    new_measurements, new_recorded = [], []
+    for path in sorted(benchmark_dir.glob("*.jsonl")):
+        key = f"{path.name}\t{path.stat().st_mtime_ns}"
+        if key in recorded:
+            continue
+        try:
+            new_measurements.extend(read_benchmark(path, platform, presets))
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+        new_recorded.append(key)
+    if not new_measurements:
+        return 0
+
+    measurements: dict[tuple[str, str, str], list[dict[str, Any]]] = {}
+    for measurement in read_history(history) + new_measurements:
+        measurements.setdefault((measurement["rule"], measurement["platform"], measurement["preset"]), []).append(measurement)
+
+    history = Path(history)
+    history.parent.mkdir(parents=True, exist_ok=True)
+    temporary = history.with_name(f"{history.name}.{os.getpid()}.tmp")
+    with open(temporary, "w") as history_file:
+        for group in measurements.values():
+            for measurement in group[-MAX_MEASUREMENTS:]:
+                history_file.write(json.dumps(measurement) + "\n")
+    os.replace(temporary, history)
+    with open(recorded_list, "a") as recorded_file:
+        recorded_file.writelines(f"{key}\n" for key in new_recorded)
+    return len(new_measurements)
+
+
+def fit_linear(x: list[float], y: list[float]) -> tuple[float, float]:
+    """
+    Least squares fit of `y = intercept + slope * x`, the slope is not negative.
+
+    Returns
+    -------
+    tuple[float, float]
+        The intercept and slope.
+    """
+    mean_x, mean_y = sum(x) / len(x), sum(y) / len(y)
+    variance = sum((value - mean_x) ** 2 for value in x)
+    slope = sum((a - mean_x) * (b - mean_y) for a, b in zip(x, y)) / variance if variance > 0 else 0.0
+    slope = max(slope, 0.0)
+    return mean_y - slope * mean_x, slope
+
+
+class ResourceModel:
+    """
+    Linear models of the memory and runtime of the rules on their input size, learned from the resource history.
+
+    A model is fitted per rule and preset with the measurements of the given platform, and per rule over all presets
+    as a fallback for presets without enough measurements. A prediction is the fitted value plus the largest residual of
+    the fit (so it covers every measurement), times a headroom of `MEMORY_HEADROOM` or `RUNTIME_HEADROOM`.
+
+    Parameters
+    ----------
+    measurements : Iterable[dict[str, Any]]
+        The measurements of the history, see `read_benchmark`.
+    platform : str
+        The sequencing platform of the run.
+    """
+
+    def __init__(self, measurements: Iterable[dict[str, Any]], platform: str) -> None:
+        groups: dict[tuple[str, str], list[dict[str, Any]]] = {}
+        for measurement in measurements:
+            if measurement.get("platform") != platform:
+                continue
+            rule = measurement["rule"].lower()
+            groups.setdefault((rule, measurement["preset"]), []).append(measurement)
+            groups.setdefault((rule, None), []).append(measurement)  # type: ignore[arg-type]
+        self._memory = {key: self._fit(group, "max_rss_mb") for key, group in groups.items()}
+        self._runtime = {key: self._fit(group, "seconds") for key, group in groups.items()}
+
+    @classmethod
+    def load(cls, history: Path | str, platform: str) -> "ResourceModel":
+        """
+        Learns the model from a history file.
+        """
+        return cls(read_history(history), platform)
+
+    @staticmethod
+    def _fit(group: list[dict[str, Any]], column: str) -> tuple[float, float, float] | None:
+        points = [(measurement["input_mb"], measurement[column]) for measurement in group if measurement.get(column) is not None]
+        if len(points) < MIN_MEASUREMENTS:
+            return None
+        x, y = [point[0] for point in points], [point[1] for point in points]
+        intercept, slope = fit_linear(x, y)
+        residual = max(b - (intercept + slope * a) for a, b in points)
+        return intercept, slope, max(residual, 0.0)
+
+    @staticmethod
+    def _predict(fits: dict, rule: str, preset: str, input_mb: float, headroom: float) -> float | None:
+        fit = fits.get((rule.lower(), preset)) or fits.get((rule.lower(), None))
+        if fit is None:
+            return None
+        intercept, slope, residual = fit
+        return (intercept + slope * input_mb + residual) * headroom
+
+    def predict_memory(self, rule: str, preset: str, input_mb: float) -> float | None:
+        """
+        Returns the predicted memory (MB) of a job, or None when the rule has not enough measurements.
+        """
+        memory = self._predict(self._memory, rule, preset, input_mb, MEMORY_HEADROOM)
+        return None if memory is None else max(memory, MIN_MEMORY_MB)
+
+    def predict_runtime(self, rule: str, preset: str, input_mb: float) -> float | None:
+        """
+        Returns the predicted runtime (minutes) of a job, or None when the rule has not enough measurements.
+        """
+        seconds = self._predict(self._runtime, rule, preset, input_mb, RUNTIME_HEADROOM)
+        return None if seconds is None else max(math.ceil(seconds / 60), 1)
+
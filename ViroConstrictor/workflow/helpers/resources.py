@@ -0,0 +1,226 @@
+"""
+Size-aware memory and runtime estimates for the jobs of the workflows.
+
+The memory (MB) and runtime (minutes) of a job are predicted from the size of its input files, with linear
+coefficients per resource class ("low", "medium" or "high", as used by the `*_memory_job` and `*_runtime_job`
+functions of the Snakefiles) that can be overridden per class or per rule in the `[RESOURCES]` section of the user
+profile::
+
+    memory  = (mem_base + mem_per_thread * threads + mem_per_gb * input_gb) * attempt
+    runtime = (runtime_base + runtime_per_gb * input_gb) * attempt
+
+The input size is the total size of the input files in GiB, compressed (gzip/BGZF) files are counted at
+`COMPRESSED_SIZE_FACTOR` times their size, as an estimate of their uncompressed size. Files that do not exist (yet)
+count as empty. The attempt number only scales the estimate linearly, as a safety net for jobs that are retried after
+they ran out of memory or time.
+
+When the resource history is enabled, the estimates of the rules with enough measurements are predicted by the
+resource model learned from earlier runs instead (see `helpers/resource_history.py`).
+
+Examples
+--------
+>>> # a single thread job with a 2 GiB input file
+>>> estimate_memory("low", "qc_raw", ["sample.fastq"], 1, 1, {"computing_execution": "grid", "max_local_mem": 4000})
+1500
+"""
+
+import math
+import os
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+RESOURCE_COEFFICIENTS = ("mem_base", "mem_per_thread", "mem_per_gb", "runtime_base", "runtime_per_gb")
+DEFAULT_COEFFICIENTS: dict[str, dict[str, float]] = {
+    "low": {"mem_base": 500, "mem_per_thread": 500, "mem_per_gb": 250, "runtime_base": 2, "runtime_per_gb": 2},
+    "medium": {"mem_base": 1000, "mem_per_thread": 1000, "mem_per_gb": 1000, "runtime_base": 10, "runtime_per_gb": 15},
+    "high": {"mem_base": 2000, "mem_per_thread": 2000, "mem_per_gb": 2000, "runtime_base": 20, "runtime_per_gb": 30},
+}
+COMPRESSED_SIZE_FACTOR = 4
+COMPRESSED_SUFFIXES = (".gz", ".bgz")
+
+
+def input_size_gb(files: Iterable[str]) -> float:
+    """
+    Returns the estimated uncompressed size of the input files of a job in GiB.
+
+    Parameters
+    ----------
+    files : Iterable[str]
+        Paths to the input files, missing files count as empty.
+
+    Returns
+    -------
+    float
+        The total size in GiB, with compressed files counted at `COMPRESSED_SIZE_FACTOR` times their size.
+    """
+    total = 0
+    for path in files:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            continue
+        total += size * COMPRESSED_SIZE_FACTOR if str(path).endswith(COMPRESSED_SUFFIXES) else size
+    return total / 1024**3
+
+
+def _input_size_mb(files: Iterable[str]) -> float:
+    """
+    Returns the total size of the input files in MiB, as measured in the benchmark files of the resource history.
+    """
+    total = 0
+    for path in files:
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            continue
+    return total / 1024**2
+
+
+def rule_coefficients(resource_class: str, rulename: str, overrides: Mapping[str, Mapping[str, float]] | None = None) -> dict[str, float]:
+    """
+    Returns the coefficients of a rule: the defaults of its resource class, updated with the overrides of the class
+    and then with the overrides of the rule.
+
+    Parameters
+    ----------
+    resource_class : str
+        The resource class of the rule, one of `DEFAULT_COEFFICIENTS`.
+    rulename : str
+        The name of the rule (case insensitive).
+    overrides : Mapping[str, Mapping[str, float]] | None, optional
+        Coefficients by resource class or (lowercase) rule name, as returned by `parse_resource_coefficients`.
+
+    Returns
+    -------
+    dict[str, float]
+        The value of every coefficient in `RESOURCE_COEFFICIENTS`.
+    """
+    overrides = overrides or {}
+    return DEFAULT_COEFFICIENTS[resource_class] | dict(overrides.get(resource_class, {})) | dict(overrides.get(rulename.lower(), {}))
+
+
+def estimate_memory(
+    resource_class: str,
+    rulename: str,
+    input: Iterable[str],
+    threads: int,
+    attempt: int,
+    config: Mapping,
+    model: Any = None,
+    preset: str = "",
+) -> int:
+    """
+    Returns the memory (MB) of a job, capped at `max_local_mem` when the workflow is executed locally.
+
+    Parameters
+    ----------
+    resource_class : str
+        The resource class of the rule, one of `DEFAULT_COEFFICIENTS`.
+    rulename : str
+        The name of the rule.
+    input : Iterable[str]
+        The input files of the job.
+    threads : int
+        The number of threads of the job.
+    attempt : int
+        The attempt number of the job, starting at 1.
+    config : Mapping
+        The workflow config, with "computing_execution", "max_local_mem" and (optionally) "resource_coefficients".
+    model : ResourceModel | None, optional
+        The resource model learned from the resource history (default is None, only the coefficients are used).
+    preset : str, optional
+        The preset of the job, for the predictions of the resource model.
+
+    Returns
+    -------
+    int
+        The memory of the job in MB.
+    """
+    input = list(input)
+    memory = model.predict_memory(rulename, preset, _input_size_mb(input)) if model is not None else None
+    if memory is None:
+        coefficients = rule_coefficients(resource_class, rulename, config.get("resource_coefficients"))
+        memory = coefficients["mem_base"] + coefficients["mem_per_thread"] * threads + coefficients["mem_per_gb"] * input_size_gb(input)
+    memory = math.ceil(memory * attempt)
+    if config["computing_execution"] == "local":
+        return min(memory, int(config["max_local_mem"]))
+    return memory
+
+
+def estimate_runtime(
+    resource_class: str,
+    rulename: str,
+    input: Iterable[str],
+    attempt: int,
+    config: Mapping,
+    model: Any = None,
+    preset: str = "",
+) -> int:
+    """
+    Returns the runtime (minutes) of a job.
+
+    Parameters
+    ----------
+    resource_class : str
+        The resource class of the rule, one of `DEFAULT_COEFFICIENTS`.
+    rulename : str
+        The name of the rule.
+    input : Iterable[str]
+        The input files of the job.
+    attempt : int
+        The attempt number of the job, starting at 1.
+    config : Mapping
+        The workflow config, with (optionally) "resource_coefficients".
+    model : ResourceModel | None, optional
+        The resource model learned from the resource history (default is None, only the coefficients are used).
+    preset : str, optional
+        The preset of the job, for the predictions of the resource model.
+
+    Returns
+    -------
+    int
+        The runtime of the job in minutes.
+    """
+    input = list(input)
+    runtime = model.predict_runtime(rulename, preset, _input_size_mb(input)) if model is not None else None
+    if runtime is None:
+        coefficients = rule_coefficients(resource_class, rulename, config.get("resource_coefficients"))
+        runtime = coefficients["runtime_base"] + coefficients["runtime_per_gb"] * input_size_gb(input)
+    return math.ceil(runtime * attempt)
+
+
+def parse_resource_coefficients(section: Mapping[str, str]) -> dict[str, dict[str, float]]:
+    """
+    Parses the coefficients of the `[RESOURCES]` section of the user profile.
+
+    Every key has the form `<resource class or rule name>.<coefficient>`, e.g. `high.mem_per_gb = 3000` or
+    `ampligone.runtime_base = 45`.
+
+    Parameters
+    ----------
+    section : Mapping[str, str]
+        The keys and values of the section.
+
+    Returns
+    -------
+    dict[str, dict[str, float]]
+        The coefficients by (lowercase) resource class or rule name.
+
+    Raises
+    ------
+    ValueError
+        If a key does not name a coefficient in `RESOURCE_COEFFICIENTS` or a value is not a non-negative number.
+    """
+    coefficients: dict[str, dict[str, float]] = {}
+    for key, value in section.items():
+        name, _, coefficient = key.strip().lower().rpartition(".")
+        if not name or coefficient not in RESOURCE_COEFFICIENTS:
+            raise ValueError(f"Resource coefficient '{key}' must be <class or rule>.<{'|'.join(RESOURCE_COEFFICIENTS)}>.")
+        try:
+            number = float(value)
+        except ValueError as error:
+            raise ValueError(f"Resource coefficient '{key}' must be a number, not '{value}'.") from error
+        if number < 0 or math.isnan(number):
+            raise ValueError(f"Resource coefficient '{key}' must not be negative, not '{value}'.")
+        coefficients.setdefault(name, {})[coefficient] = number
+    return coefficients
@@ -0,0 +1,255 @@
+"""
+Content-addressed cache of the per-sample results of the main workflow, shared between runs.
+
+When the result cache is enabled with the `result_cache` setting in the `[WORKFLOW]` section of the user profile, every
+sample/reference combination of a run gets a cache key: the SHA-256 hash of the content of its input files (reads,
+reference, primers and features), the settings of the sample, the resolved preset parameters, the hashes of the
+environments of the clean, alignment and consensus rules and the ViroConstrictor version (see `result_key`).
+
+* when the cache has an entry for the key, the results (`CACHED_RESULTS`: consensus, coverage, VCF, consensus
+  features, amino acid sequences and the QC reports of the cleaned reads used by MultiQC) are copied from the cache
+  instead of running the clean, alignment and consensus rules again.
+* after a successful run, the results of the keys that were not cached yet are added to the cache. The least recently
+  used entries are removed when the cache grows beyond its maximum size.
+
+The cache is a directory with one subdirectory per key in `entries/`. An entry is complete once its `entry.json` exists,
+the modification time of `entry.json` is the last time the entry was used. The content hashes of the input files are
+kept in `digests.json` (see `FileDigests`), so files are only hashed again when their size or modification time changed.
+
+Examples
+--------
+>>> cache = ResultCache("~/.viroconstrictor/result_cache", max_size_gb=50)
+>>> key = result_key({"reads": "sample1.fastq", "reference": "reference.fasta"}, {"sample": "sample1"}, cache.file_digest)
+>>> if cache.lookup(key):
+...     cache.restore(key, {"consensus": "data/.../sample1.fa"})
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections.abc import Callable, Mapping
+from pathlib import Path
+from typing import Any
+
+from ViroConstrictor.workflow.helpers.manifest import FileDigests, content_hash
+
+RESULT_CACHE_PATH = Path.home() / ".viroconstrictor" / "result_cache"
+RESULT_CACHE_VERSION = 1
+# the file name of every cached result in a cache entry
+CACHED_RESULTS = {
+    "consensus": "consensus.fa",
+    "coverage": "coverage.tsv",
+    "vcf": "variants.vcf",
+    "gff": "consensus.gff",
+    "fastqc": "fastqc.zip",
+    "fastp": "fastp.json",
+    "aminoacids": "aminoacids.faa",
+}
+ENTRY_FILE = "entry.json"
+DIGESTS_FILE = "digests.json"
+STATS_FILE = "stats.jsonl"
+
+
+def result_key(files: Mapping[str, Path | str | None], parameters: Mapping[str, Any], digest: Callable[[Path | str], str] = content_hash) -> str:
+    """
+    Returns the cache key of a result: the SHA-256 hash of the content of its input files and its parameters.
+
+    Parameters
+    ----------
+    files : Mapping[str, Path | str | None]
+        The input files by their role (e.g. "reference"), files that are not given (None or "NONE") are recorded as such.
+    parameters : Mapping[str, Any]
+        Everything else that determines the result, the values must be JSON serializable (or are converted to strings).
+    digest : Callable[[Path | str], str], optional
+        Returns the content hash of a file (default is `content_hash`).
+
+    Returns
+    -------
+    str
+        The hex digest of the key.
+    """
+    key = {
+        "version": RESULT_CACHE_VERSION,
+        "files": {role: None if path in (None, "NONE") else digest(path) for role, path in files.items()},
+        "parameters": dict(parameters),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _directory_size(path: Path) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+class ResultCache:
+    """
+    A directory with the per-sample results of earlier runs, by cache key.
+
+    Parameters
+    ----------
+    path : Path | str
+        The cache directory, created when results are stored.
+    max_size_gb : float, optional
+        The maximum size of the cache in GiB, the least recently used entries are removed beyond it (default is 0, no limit).
+    digests : FileDigests | None, optional
+        The content hashes of the input files (default is None, the `FileDigests` persisted in `digests.json` of the cache).
+
+    Attributes
+    ----------
+    stats : dict[str, int]
+        The number of "hits" and "misses" of `lookup`, the number of "stored" entries and "evicted" entries.
+    """
+
+    def __init__(self, path: Path | str, max_size_gb: float = 0, digests: FileDigests | None = None) -> None:
+        self.path = Path(path).expanduser()
+        self.max_size = int(max_size_gb * 1024**3)
+        self.digests = digests if digests is not None else FileDigests(self.path / DIGESTS_FILE)
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+    def entry(self, key: str) -> Path:
+        """
+        Returns the directory of a cache entry.
+        """
+        return self.path / "entries" / key
+
+    def entry_files(self, key: str, names: list[str]) -> list[str]:
+        """
+        Returns the paths of the cached results of an entry, which do not exist when the entry is not cached.
+        """
+        return [str(self.entry(key) / CACHED_RESULTS[name]) for name in names]
+
+    def file_digest(self, path: Path | str) -> str:
+        """
+        Returns the content hash of a file, which is only computed again when its size or modification time changed.
+        """
+        return self.digests.digest(path)
+
+    def save_digests(self) -> None:
+        """
+        Writes the content hashes to their JSON file when new files were hashed.
+        """
+        self.digests.save()
+
+    def lookup(self, key: str) -> bool:
+        """
+        Returns whether the cache has a complete entry for a key, and counts the hit or miss.
+        """
+        hit = (self.entry(key) / ENTRY_FILE).exists()
+        self.stats["hits" if hit else "misses"] += 1
+        return hit
+
+    def restore(self, key: str, outputs: Mapping[str, Path | str]) -> None:
+        """
+        Copies the cached results of an entry to their output paths, and marks the entry as used.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        outputs : Mapping[str, Path | str]
+            The output path of every result to restore, by its name in `CACHED_RESULTS`.
+        """
+        entry = self.entry(key)
+        for name, output in outputs.items():
+            Path(output).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(entry / CACHED_RESULTS[name], output)
+        os.utime(entry / ENTRY_FILE)
+
+    def store(self, key: str, results: Mapping[str, Path | str], metadata: Mapping[str, Any] | None = None) -> bool:
+        """
+        Adds the results of a key to the cache, an existing entry is kept.
+
+        The entry is written in a temporary directory that is renamed when it is complete, so other runs never see a
+        partial entry.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        results : Mapping[str, Path | str]
+            The path of every result to cache, by its name in `CACHED_RESULTS`.
+        metadata : Mapping[str, Any] | None, optional
+            Information about the result (e.g. the sample name) that is written to `entry.json`.
+
+        Returns
+        -------
+        bool
+            Whether a new entry was added.
+        """
+        entry = self.entry(key)
+        if entry.exists():
+            return False
+        temporary = entry.with_name(f".{key}.{os.getpid()}.tmp")
+        shutil.rmtree(temporary, ignore_errors=True)
+        temporary.mkdir(parents=True)
+        for name, path in results.items():
+            shutil.copyfile(path, temporary / CACHED_RESULTS[name])
+        with open(temporary / ENTRY_FILE, "w") as entry_file:
+            json.dump({"key": key, "created": time.time(), "results": sorted(results), **(metadata or {})}, entry_file)
+        try:
+            os.rename(temporary, entry)
+        except OSError:
+            # another run stored the same entry in the meantime
+            shutil.rmtree(temporary, ignore_errors=True)
+            return False
+        self.stats["stored"] += 1
+        return True
+
+    def evict(self) -> int:
+        """
+        Removes the least recently used entries until the cache is not larger than its maximum size.
+
+        Returns
+        -------
+        int
+            The number of removed entries.
+        """
+        entries_dir = self.path / "entries"
+        if self.max_size <= 0 or not entries_dir.exists():
+            return 0
+        entries = []
+        for entry in entries_dir.iterdir():
+            try:
+                entries.append(((entry / ENTRY_FILE).stat().st_mtime, _directory_size(entry), entry))
+            except OSError:
+                continue
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            evicted += 1
+        self.stats["evicted"] += evicted
+        return evicted
+
+    def size(self) -> int:
+        """
+        Returns the total size of the cache entries in bytes.
+        """
+        entries_dir = self.path / "entries"
+        if not entries_dir.exists():
+            return 0
+        return sum(_directory_size(entry) for entry in entries_dir.iterdir() if entry.is_dir())
+
+    def write_stats(self, **extra: Any) -> dict[str, Any]:
+        """
+        Appends the statistics of this run to `stats.jsonl` in the cache directory.
+
+        Parameters
+        ----------
+        **extra : Any
+            Other values to record, e.g. the working directory of the run.
+
+        Returns
+        -------
+        dict[str, Any]
+            The recorded statistics, with the time and the size of the cache (MB).
+        """
+        record = {"time": time.time(), **self.stats, "size_mb": round(self.size() / 1024**2, 3), **extra}
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.path / STATS_FILE, "a") as stats_file:
+            stats_file.write(json.dumps(record) + "\n")
+        return record
@@ -0,0 +1,123 @@
+"""
+Dictionary based lookups of the samples dataframe for the input functions and `all` targets of the workflows.
+
+The input functions of the rules are evaluated for every job while the DAG is built. Filtering the complete samples
+dataframe in every call (e.g. `samples_df[samples_df["sample"] == wildcards.sample]`) makes building the DAG
+quadratic in the number of samples. `SampleIndex` groups the rows of the dataframe once, after the dataframe is
+created, so every lookup is a dictionary access.
+
+All lookups keep the order in which the rows, samples, viruses and references appear in the samples dataframe.
+
+Examples
+--------
+>>> sample_index = SampleIndex(samples_df)
+>>> sample_index.samples_of("SARS-CoV-2", "MN908947.3")
+['sample1', 'sample2']
+"""
+
+from typing import Any
+
+import pandas as pd
+
+
+def _features(row: dict[str, Any]) -> list[str] | None:
+    features = row.get("AA_FEAT_NAMES")
+    return list(features) if isinstance(features, (list, tuple)) else None
+
+
+class SampleIndex:
+    """
+    Index of the rows of a samples dataframe by sample, virus and reference.
+
+    Parameters
+    ----------
+    samples_df : pd.DataFrame
+        The samples dataframe of the workflow, with one row per sample and reference and at least the columns
+        "sample" and "Virus".
+    reference_column : str, optional
+        The column that identifies the reference of a row (default is "RefID", the match_ref workflow uses "segment").
+    """
+
+    def __init__(self, samples_df: pd.DataFrame, reference_column: str = "RefID") -> None:
+        self.reference_column = reference_column
+        self._rows: dict[str, list[dict[str, Any]]] = {}
+        self._samples_by_virus: dict[str, dict[str, None]] = {}
+        self._samples_by_reference: dict[tuple[str, str], list[str]] = {}
+        self._references: dict[tuple[str, str], dict[str, None]] = {}
+        self._features_by_sample: dict[str, dict[str, None]] = {}
+        self._features_by_virus: dict[str, dict[str, None]] = {}
+        self._viruses_with_features: dict[str, None] = {}
+
+        for row in samples_df.to_dict(orient="records"):
+            sample, virus = row["sample"], row["Virus"]
+            self._rows.setdefault(sample, []).append(row)
+            self._samples_by_virus.setdefault(virus, {})[sample] = None
+            if reference_column in row:
+                reference = row[reference_column]
+                self._samples_by_reference.setdefault((virus, reference), []).append(sample)
+                self._references.setdefault((virus, sample), {})[reference] = None
+            features = _features(row)
+            if features is not None:
+                self._viruses_with_features[virus] = None
+            self._features_by_sample.setdefault(sample, {}).update(dict.fromkeys(features or []))
+            self._features_by_virus.setdefault(virus, {}).update(dict.fromkeys(features or []))
+
+    @property
+    def samples(self) -> list[str]:
+        """The unique samples."""
+        return list(self._rows)
+
+    @property
+    def viruses(self) -> list[str]:
+        """The unique viruses."""
+        return list(self._samples_by_virus)
+
+    def rows(self, sample: str) -> list[dict[str, Any]]:
+        """
+        Returns the rows of a sample, one per reference, or an empty list for an unknown sample.
+        """
+        return self._rows.get(sample, [])
+
+    def values(self, sample: str, column: str) -> list[Any]:
+        """
+        Returns the values of a column in the rows of a sample.
+        """
+        return [row[column] for row in self.rows(sample)]
+
+    def samples_of(self, virus: str, reference: str | None = None) -> list[str]:
+        """
+        Returns the unique samples of a virus, or the samples with a row for a reference of a virus.
+        """
+        if reference is None:
+            return list(self._samples_by_virus.get(virus, {}))
+        return list(self._samples_by_reference.get((virus, reference), []))
+
+    def references(self, virus: str, sample: str) -> list[str]:
+        """
+        Returns the unique references of a sample for a virus.
+        """
+        return list(self._references.get((virus, sample), {}))
+
+    def features(self, sample: str | None = None, virus: str | None = None) -> list[str]:
+        """
+        Returns the unique amino acid feature names of a sample, of a virus or, when neither is given, of all samples.
+        """
+        if sample is not None:
+            return list(self._features_by_sample.get(sample, {}))
+        if virus is not None:
+            return list(self._features_by_virus.get(virus, {}))
+        return list(dict.fromkeys(feature for features in self._features_by_virus.values() for feature in features))
+
+    def viruses_with_features(self) -> list[str]:
+        """
+        Returns the viruses with amino acid feature names for at least one of their rows.
+        """
+        return list(self._viruses_with_features)
+
+    def batches(self, size: int) -> list[list[dict[str, Any]]]:
+        """
+        Returns the rows of all samples in batches of at most `size` rows, for the rules that run a script for a batch
+        of samples in one job.
+        """
+        rows = [row for sample_rows in self._rows.values() for row in sample_rows]
+        return [rows[start : start + size] for start in range(0, len(rows), size)]
@@ -0,0 +1,126 @@
+"""
+Collects the profile sidecars of the workflow scripts in a working directory into one hot-path table.
+
+The scripts that inherit from `BaseScript` write a profile sidecar (`<output>.profile.json`) when they are run with the
+`VIROCONSTRICTOR_PROFILE` environment variable or the `--profile` flag (see `helpers/base_script_class.py`). This
+module summarises the sidecars per script (runs, total, mean and maximum wall time, CPU time and peak memory) and
+ranks the functions of the cProfile dumps by their cumulative time over all runs.
+
+Examples
+--------
+Print the hot-path table of a run, and write it as JSON::
+
+    python -m ViroConstrictor.workflow.helpers.script_profiles <output directory> --json hot_paths.json
+"""
+
+import json
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Any
+
+from ViroConstrictor.workflow.helpers.base_script_class import PROFILE_SUFFIX, TOP_FUNCTIONS
+
+
+def collect_profiles(workdir: Path | str) -> list[dict[str, Any]]:
+    """
+    Reads all profile sidecars below a directory, unreadable sidecars are skipped.
+    """
+    profiles = []
+    for path in sorted(Path(workdir).rglob(f"*{PROFILE_SUFFIX}")):
+        try:
+            with open(path) as profile_file:
+                profiles.append(json.load(profile_file))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def hot_paths(profiles: list[dict[str, Any]]) -> dict[str, list[dict[str, Any]]]:
+    """
+    Summarises the profiles per script and per profiled function.
+
+    Parameters
+    ----------
+    profiles : list[dict[str, Any]]
+        The contents of the profile sidecars, see `collect_profiles`.
+
+    Returns
+    -------
+    dict[str, list[dict[str, Any]]]
+        "scripts": per script the number of (failed) runs, total, mean and maximum wall time (s), total CPU time (s)
+        and the maximum peak RSS and Python peak memory (MB), with the highest total wall time first.
+        "functions": the `TOP_FUNCTIONS` functions with the highest cumulative time (s) over all cProfile dumps, with
+        the scripts they were called from.
+    """
+    by_script: dict[str, list[dict[str, Any]]] = {}
+    functions: dict[str, dict[str, Any]] = {}
+    for profile in profiles:
+        by_script.setdefault(profile["script"], []).append(profile)
+        for function in profile.get("top_functions", []):
+            total = functions.setdefault(
+                function["function"], {"function": function["function"], "calls": 0, "tottime": 0.0, "cumtime": 0.0, "scripts": []}
+            )
+            total["calls"] += function["calls"]
+            total["tottime"] += function["tottime"]
+            total["cumtime"] += function["cumtime"]
+            if profile["script"] not in total["scripts"]:
+                total["scripts"].append(profile["script"])
+
+    scripts = []
+    for script, runs in by_script.items():
+        wall = [run["wall_s"] for run in runs]
+        scripts.append(
+            {
+                "script": script,
+                "runs": len(runs),
+                "failed": sum(run.get("status") == "failed" for run in runs),
+                "wall_s": round(sum(wall), 4),
+                "mean_wall_s": round(sum(wall) / len(wall), 4),
+                "max_wall_s": round(max(wall), 4),
+                "cpu_s": round(sum(run["cpu_s"] for run in runs), 4),
+                "peak_rss_mb": max(run["peak_rss_mb"] for run in runs),
+                "python_peak_mb": max(run["python_peak_mb"] for run in runs),
+                "slowest_output": max(runs, key=lambda run: run["wall_s"])["output"],
+            }
+        )
+    ranked = sorted(functions.values(), key=lambda function: function["cumtime"], reverse=True)[:TOP_FUNCTIONS]
+    return {
+        "scripts": sorted(scripts, key=lambda script: script["wall_s"], reverse=True),
+        "functions": [function | {"tottime": round(function["tottime"], 4), "cumtime": round(function["cumtime"], 4)} for function in ranked],
+    }
+
+
+def format_table(summary: dict[str, list[dict[str, Any]]]) -> str:
+    """
+    Formats the summary of `hot_paths` as a plain text table.
+    """
+    lines = [f"{'Script':<30} {'Runs':>6} {'Failed':>6} {'Wall (s)':>10} {'Mean (s)':>10} {'Max (s)':>10} {'CPU (s)':>10} {'RSS (MB)':>10}"]
+    lines.extend(
+        f"{script['script']:<30} {script['runs']:>6} {script['failed']:>6} {script['wall_s']:>10.2f} {script['mean_wall_s']:>10.2f} "
+        f"{script['max_wall_s']:>10.2f} {script['cpu_s']:>10.2f} {script['peak_rss_mb']:>10.1f}"
+        for script in summary["scripts"]
+    )
+    if summary["functions"]:
+        lines.extend(["", f"{'Cumulative (s)':>14} {'Own (s)':>10} {'Calls':>10}  Function"])
+        lines.extend(
+            f"{function['cumtime']:>14.2f} {function['tottime']:>10.2f} {function['calls']:>10}  {function['function']}"
+            for function in summary["functions"]
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Collect the profile sidecars of the workflow scripts into one hot-path table.")
+    parser.add_argument("workdir", metavar="Directory", type=str, help="The (output) directory to search for profile sidecars.")
+    parser.add_argument("--json", metavar="File", type=str, default=None, help="Also write the summary as JSON to this file.")
+    args = parser.parse_args()
+
+    summary = hot_paths(collect_profiles(args.workdir))
+    print(format_table(summary))
+    if args.json is not None:
+        with open(args.json, "w") as json_file:
+            json.dump(summary, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Helpers to stream the delimited (TSV/CSV) result files of the workflow row by row.
+
+The rows are read and written with the `csv` module using the same dialect as `pandas.read_csv` and
+`pandas.DataFrame.to_csv`, so files can be combined with a constant memory footprint while the written files are
+identical to the files pandas would write for the same data.
+"""
+
+import csv
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, TextIO
+
+
+def read_rows(path: Path | str, separator: str) -> Iterator[list[str]]:
+    """
+    Read the rows of a delimited file one by one, blank lines are skipped.
+
+    Parameters
+    ----------
+    path : Path | str
+        Path to the delimited file.
+    separator : str
+        Field separator of the file.
+
+    Yields
+    ------
+    list[str]
+        The fields of every non-blank row, as text.
+    """
+    with open(path, newline="") as handle:
+        for row in csv.reader(handle, delimiter=separator):
+            if row:
+                yield row
+
+
+def read_header(path: Path | str, separator: str) -> tuple[list[str] | None, bool]:
+    """
+    Read the first row of a delimited file and check whether any rows follow it.
+
+    Parameters
+    ----------
+    path : Path | str
+        Path to the delimited file.
+    separator : str
+        Field separator of the file.
+
+    Returns
+    -------
+    tuple[list[str] | None, bool]
+        The first row (None for files without rows) and whether the file contains rows after the first row.
+    """
+    rows = read_rows(path, separator)
+    try:
+        header = next(rows, None)
+        return header, next(rows, None) is not None
+    finally:
+        rows.close()
+
+
+def row_writer(handle: TextIO, separator: str) -> Any:
+    """
+    Create a writer for rows of a delimited file, with the quoting rules and line terminator used by pandas.
+
+    Parameters
+    ----------
+    handle : TextIO
+        The opened output file, opened with ``newline=""``.
+    separator : str
+        Field separator of the output file.
+
+    Returns
+    -------
+    Any
+        A csv writer that writes rows to the given file.
+    """
+    return csv.writer(handle, delimiter=separator, lineterminator="\n", quoting=csv.QUOTE_MINIMAL)
+
+
+def fit_row(row: list[str], length: int) -> list[str]:
+    """
+    Pad a row with empty fields, or truncate it, so it has exactly the given number of fields.
+
+    Parameters
+    ----------
+    row : list[str]
+        The fields of a row.
+    length : int
+        The number of fields the row should have.
+
+    Returns
+    -------
+    list[str]
+        The row with exactly `length` fields.
+    """
+    return row[:length] + [""] * (length - len(row))
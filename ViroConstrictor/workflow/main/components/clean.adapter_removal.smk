@@ -1,3 +1,8 @@
+# The adapter removal output is the only intermediate FASTQ with a single consumer (qc_filter), so it can be streamed.
+noad_fastq = f"{datadir}{wc_folder}{cln}{noad}" "{sample}" f"{fq_suffix}"
+noad_output = pipe(noad_fastq) if config["intermediate_format"] == "pipe" else noad_fastq
+
+
 if config["platform"] in ["nanopore", "iontorrent"] or (
     config["platform"] == "illumina" and config["unidirectional"] is True
 ):
@@ -7,7 +12,7 @@ if config["platform"] in ["nanopore", "iontorrent"] or (
 
     rule remove_adapters_p1:
         input:
-            ref=rules.prepare_refs.output,
+            ref=rules.link_prepared_reference.output,
             fq=lambda wc: SAMPLES[wc.sample]["INPUTFILE"],
         output:
             bam=f"{datadir}{wc_folder}{cln}{raln}" "{sample}.bam",
@@ -16,6 +21,8 @@ if config["platform"] in ["nanopore", "iontorrent"] or (
             workflow_environment_path("Alignment.yaml")
         container:
             f"{container_base_path}/viroconstrictor_alignment_{get_hash('Alignment')}.sif"
+        benchmark:
+            f"{logdir}{bench}" "remove_adapters_p1_{Virus}.{RefID}.{sample}.jsonl",
         log:
             f"{logdir}RemoveAdapters_p1_" "{Virus}.{RefID}.{sample}.log",
         threads: config["threads"]["Alignments"]
@@ -59,7 +66,7 @@ if config["platform"] == "illumina" and config["unidirectional"] is False:
 
     rule remove_adapters_p1:
         input:
-            ref=rules.prepare_refs.output,
+            ref=rules.link_prepared_reference.output,
             fq1=lambda wildcards: SAMPLES[wildcards.sample]["R1"],
             fq2=lambda wildcards: SAMPLES[wildcards.sample]["R2"],
         output:
@@ -69,6 +76,8 @@ if config["platform"] == "illumina" and config["unidirectional"] is False:
             workflow_environment_path("Alignment.yaml")
         container:
             f"{container_base_path}/viroconstrictor_alignment_{get_hash('Alignment')}.sif"
+        benchmark:
+            f"{logdir}{bench}" "remove_adapters_p1_{Virus}.{RefID}.{sample}.jsonl",
         log:
             f"{logdir}" "RemoveAdapters_p1_{Virus}.{RefID}.{sample}.log",
         threads: config["threads"]["Alignments"]
@@ -107,34 +116,111 @@ if config["platform"] == "illumina" and config["unidirectional"] is False:
             """
 
 
-rule remove_adapters_p2:
-    input:
-        rules.remove_adapters_p1.output.bam,
-    output:
-        f"{datadir}{wc_folder}{cln}{noad}" "{sample}.fastq",
-    conda:
-        workflow_environment_path("core_scripts.yaml")
-    container:
-        f"{container_base_path}/viroconstrictor_core_scripts_{get_hash('core_scripts')}.sif"
-    log:
-        f"{logdir}RemoveAdapters_p2_" "{Virus}.{RefID}.{sample}.log",
-    threads: config["threads"]["AdapterRemoval"]
-    resources:
-        mem_mb=low_memory_job,
-        runtime=medium_runtime_job,
-    params:
-        script="-m main.scripts.clipper",
-        pythonpath = f'{Path(workflow.basedir).parent}',
-        clipper_filterparams=lambda wc: get_preset_parameter(
-            preset_name=SAMPLES[wc.sample]["PRESET"],
-            parameter_name=f"Clipper_FilterParams_{config['platform']}",
-        ),
-    shell:
-        """
-        PYTHONPATH={params.pythonpath} \
-        python {params.script} \
-        --input {input} \
-        --output {output} \
-        {params.clipper_filterparams} \
-        --threads {threads} >> {log} 2>&1
-        """
+if config["fused_adapter_removal"] is True:
+
+    rule remove_adapters_fused:
+        input:
+            ref=rules.link_prepared_reference.output,
+            fq=lambda wc: (
+                [SAMPLES[wc.sample]["R1"], SAMPLES[wc.sample]["R2"]]
+                if config["platform"] == "illumina" and config["unidirectional"] is False
+                else SAMPLES[wc.sample]["INPUTFILE"]
+            ),
+        output:
+            fq=noad_output,
+            **(
+                {"scratch_bam": f"{datadir}{wc_folder}{cln}{raln}" "{sample}.unsorted.bam"}
+                if config["debug"] is True
+                else {}
+            ),
+        conda:
+            workflow_environment_path("Alignment.yaml")
+        container:
+            f"{container_base_path}/viroconstrictor_alignment_{get_hash('Alignment')}.sif"
+        benchmark:
+            f"{logdir}{bench}" "remove_adapters_fused_{Virus}.{RefID}.{sample}.jsonl",
+        log:
+            f"{logdir}RemoveAdapters_fused_" "{Virus}.{RefID}.{sample}.log",
+        threads: config["threads"]["Alignments"]
+        resources:
+            mem_mb=medium_memory_job,
+            runtime=medium_runtime_job,
+        params:
+            mapthreads=config["threads"]["Alignments"] - 1,
+            mm2_alignment_preset=base_mm2_preset,
+            minimap2_base_setting=lambda wc: get_preset_parameter(
+                preset_name=SAMPLES[wc.sample]["PRESET"],
+                parameter_name="Minimap2_Settings_Base",
+            ),
+            minimap2_extra_setting=lambda wc: get_preset_parameter(
+                preset_name=SAMPLES[wc.sample]["PRESET"],
+                parameter_name="Minimap2_Settings",
+            ),
+            minimap2_alignmentparams=lambda wc: get_preset_parameter(
+                preset_name=SAMPLES[wc.sample]["PRESET"],
+                parameter_name=f"Minimap2_RawAlignParams_{config['platform']}",
+            ),
+            samtools_standard_filters=lambda wc: get_preset_parameter(
+                preset_name=SAMPLES[wc.sample]["PRESET"],
+                parameter_name="Samtools_Filters_Base",
+            ),
+            samtools_extra_filters=lambda wc: get_preset_parameter(
+                preset_name=SAMPLES[wc.sample]["PRESET"],
+                parameter_name=f"Samtools_Filters_{config['platform']}",
+            ),
+            # the unsorted alignments are only kept on disk when debugging, otherwise they're streamed straight into Clipper
+            scratch_bam=lambda wc, output: f"| tee {output.scratch_bam}" if config["debug"] is True else "",
+            script="-m main.scripts.clipper",
+            pythonpath=f"{Path(workflow.basedir).parent}",
+            clipper_filterparams=lambda wc: get_preset_parameter(
+                preset_name=SAMPLES[wc.sample]["PRESET"],
+                parameter_name=f"Clipper_FilterParams_{config['platform']}",
+            ),
+        shell:
+            """
+            minimap2 --cs {params.mm2_alignment_preset} {params.minimap2_base_setting} {params.minimap2_extra_setting} {params.minimap2_alignmentparams} -t {params.mapthreads} {input.ref} {input.fq} 2>> {log} |\
+            samtools view {params.samtools_standard_filters} {params.samtools_extra_filters} -uS 2>> {log} {params.scratch_bam} |\
+            PYTHONPATH={params.pythonpath} \
+            python {params.script} \
+            --input - \
+            --output {output.fq} \
+            {params.clipper_filterparams} >> {log} 2>&1
+            """
+
+else:
+
+    rule remove_adapters_p2:
+        input:
+            bam=rules.remove_adapters_p1.output.bam,
+            index=rules.remove_adapters_p1.output.index,
+        output:
+            noad_output,
+        conda:
+            workflow_environment_path("core_scripts.yaml")
+        container:
+            f"{container_base_path}/viroconstrictor_core_scripts_{get_hash('core_scripts')}.sif"
+        benchmark:
+            f"{logdir}{bench}" "remove_adapters_p2_{Virus}.{RefID}.{sample}.jsonl",
+        log:
+            f"{logdir}RemoveAdapters_p2_" "{Virus}.{RefID}.{sample}.log",
+        threads: config["threads"]["AdapterRemoval"]
+        resources:
+            mem_mb=low_memory_job,
+            runtime=medium_runtime_job,
+        params:
+            script="-m main.scripts.clipper",
+            pythonpath = f'{Path(workflow.basedir).parent}',
+            clipper_filterparams=lambda wc: get_preset_parameter(
+                preset_name=SAMPLES[wc.sample]["PRESET"],
+                parameter_name=f"Clipper_FilterParams_{config['platform']}",
+            ),
+        shell:
+            """
+            PYTHONPATH={params.pythonpath} \
+            python {params.script} \
+            --input {input.bam} \
+            --output {output} \
+            {params.clipper_filterparams} \
+            --threads {threads} \
+            --workers {threads} >> {log} 2>&1
+            """
@@ -1,15 +1,21 @@
 
 rule qc_filter:
     input:
-        rules.remove_adapters_p2.output,
+        (
+            rules.remove_adapters_fused.output.fq
+            if config["fused_adapter_removal"] is True
+            else rules.remove_adapters_p2.output
+        ),
     output:
-        fq=f"{datadir}{wc_folder}{cln}{qcfilt}" "{sample}.fastq",
+        fq=f"{datadir}{wc_folder}{cln}{qcfilt}" "{sample}" f"{fq_suffix}",
         html=f"{datadir}{wc_folder}{cln}{qcfilt}{html}" "{sample}_fastp.html",
         json=f"{datadir}{wc_folder}{cln}{qcfilt}{json}" "{sample}_fastp.json",
     conda:
         workflow_environment_path("Clean.yaml")
     container:
         f"{container_base_path}/viroconstrictor_clean_{get_hash('Clean')}.sif"
+    benchmark:
+        f"{logdir}{bench}" "qc_filter_{Virus}.{RefID}.{sample}.jsonl",
     log:
         f"{logdir}QC_filter_" "{Virus}.{RefID}.{sample}.log",
     threads: config["threads"]["QC"]
@@ -17,6 +23,8 @@ rule qc_filter:
         mem_mb=low_memory_job,
         runtime=low_runtime_job,
     params:
+        # fastp reads its input twice when given a file, a named pipe can only be read once so it's passed through stdin
+        input_arg="--stdin <" if config["intermediate_format"] == "pipe" else "-i",
         adapter_removal_settings=lambda wc: get_preset_parameter(
             preset_name=SAMPLES[wc.sample]["PRESET"],
             parameter_name=f"FastP_AdapterRemoval_Settings_{config['platform']}",
@@ -39,7 +47,7 @@ rule qc_filter:
         ),
     shell:
         """
-        fastp --thread {threads} -i {input} \
+        fastp --thread {threads} {params.input_arg} {input} \
             {params.adapter_removal_settings} \
             {params.per_read_qc_settings} \
             {params.slidingwindow_qc_settings} \
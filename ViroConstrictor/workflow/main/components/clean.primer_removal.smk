@@ -2,24 +2,23 @@ def get_primers_output(wildcards):
     sample_primers = SAMPLES[wildcards.sample]["PRIMERS"]
     if sample_primers == "NONE":
         return ""
-    elif sample_primers.endswith(".bed"):
-        return rules.filter_primer_bed.output.bed
-    else:
-        return rules.prepare_primers.output.bed
+    return rules.link_prepared_primers.output.bed
 
 
 rule ampligone:
     input:
         fq=rules.qc_filter.output.fq,
         pr=lambda wc: get_primers_output(wc),
-        ref=rules.prepare_refs.output,
+        ref=rules.link_prepared_reference.output,
     output:
-        fq=f"{datadir}{wc_folder}{cln}{prdir}" "{sample}.fastq",
+        fq=f"{datadir}{wc_folder}{cln}{prdir}" "{sample}" f"{fq_suffix}",
         ep=f"{datadir}{wc_folder}{prim}" "{sample}_removedprimers.bed",
     conda:
         workflow_environment_path("Clean.yaml")
     container:
         f"{container_base_path}/viroconstrictor_clean_{get_hash('Clean')}.sif"
+    benchmark:
+        f"{logdir}{bench}" "ampligone_{Virus}.{RefID}.{sample}.jsonl",
     log:
         f"{logdir}" "AmpliGone_{Virus}.{RefID}.{sample}.log",
     threads: config["threads"]["PrimerRemoval"]
@@ -67,12 +66,18 @@ rule move_fastq:
     input:
         rules.qc_filter.output.fq,
     output:
-        fq=f"{datadir}{wc_folder}{cln}{prdir}" "{sample}.fastq",
+        fq=f"{datadir}{wc_folder}{cln}{prdir}" "{sample}" f"{fq_suffix}",
         ep=touch(f"{datadir}{wc_folder}{prim}" "{sample}_removedprimers.bed"),
     resources:
         mem_mb=low_memory_job,
         runtime=low_runtime_job,
+    params:
+        link=config["intermediate_format"] == "link",
     shell:
         """
-        cp {input} {output.fq}
+        if [ "{params.link}" = "True" ]; then
+            ln -f {input} {output.fq} 2> /dev/null || cp --reflink=auto {input} {output.fq}
+        else
+            cp {input} {output.fq}
+        fi
         """
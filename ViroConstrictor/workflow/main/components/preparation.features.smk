@@ -1,12 +1,17 @@
-
 rule prepare_gffs:
     input:
-        feats=lambda wc: file if (file := SAMPLES[wc.sample]["FEATURES"]) else "",
-        ref=rules.prepare_refs.output,
+        feats=lambda wc: (
+            preparation_plan.features[wc.key]["file"]
+            if preparation_plan.features[wc.key]["method"] == "gff"
+            else ""
+        ),
+        ref=lambda wc: expand(rules.prepare_refs.output[0], key=preparation_plan.features[wc.key]["reference"]),
     output:
-        gff=f"{datadir}{wc_folder}{features}" "{sample}_features.gff",
+        gff=f"{datadir}{shared}{features}" "{key}.gff",
+    benchmark:
+        f"{logdir}{bench}" "prepare_gffs_{key}.jsonl",
     log:
-        f"{logdir}prepare_gffs_" "{Virus}.{RefID}.{sample}.log",
+        f"{logdir}prepare_gffs_" "{key}.log",
     conda:
         workflow_environment_path("core_scripts.yaml")
     container:
@@ -16,14 +21,15 @@ rule prepare_gffs:
         runtime=low_runtime_job,
     params:
         pythonpath = f'{Path(workflow.basedir).parent}',
-        script="-m main.scripts.extract_gff"
+        script="-m main.scripts.extract_gff",
+        reference_id=lambda wc: preparation_plan.features[wc.key]["RefID"],
     shell:
         """
         PYTHONPATH={params.pythonpath} \
         python {params.script} \
         --input {input.feats} \
         --output {output.gff} \
-        --ref_id {wildcards.RefID}
+        --ref_id {params.reference_id}
         """
 
 
@@ -32,13 +38,15 @@ ruleorder: prepare_gffs > prodigal
 
 rule prodigal:
     input:
-        ref=rules.prepare_refs.output,
+        ref=lambda wc: expand(rules.prepare_refs.output[0], key=preparation_plan.features[wc.key]["reference"]),
     output:
-        gff=f"{datadir}{wc_folder}{features}" "{sample}_features.gff",
-        aa=f"{datadir}{wc_folder}{features}" "{sample}_features.aa.fasta",
-        nt=f"{datadir}{wc_folder}{features}" "{sample}_features.nt.fasta",
+        gff=f"{datadir}{shared}{features}" "{key}.gff",
+        aa=f"{datadir}{shared}{features}" "{key}.aa.fasta",
+        nt=f"{datadir}{shared}{features}" "{key}.nt.fasta",
+    benchmark:
+        f"{logdir}{bench}" "prodigal_{key}.jsonl",
     log:
-        f"{logdir}prepare_gffs_" "{Virus}.{RefID}.{sample}.log",
+        f"{logdir}prepare_gffs_" "{key}.log",
     threads: config["threads"]["Index"]
     conda:
         workflow_environment_path("ORF_analysis.yaml")
@@ -59,3 +67,18 @@ rule prodigal:
             -p {params.prodigal_method} \
             -f {params.prodigal_outformat} > {log} 2>&1
         """
+
+
+rule link_prepared_features:
+    input:
+        shared_preparation("features", rules.prepare_gffs.output.gff),
+    output:
+        gff=f"{datadir}{wc_folder}{features}" "{sample}_features.gff",
+    resources:
+        mem_mb=low_memory_job,
+        runtime=low_runtime_job,
+    threads: 1
+    shell:
+        """
+        ln -f {input} {output.gff} 2> /dev/null || cp --reflink=auto {input} {output.gff}
+        """
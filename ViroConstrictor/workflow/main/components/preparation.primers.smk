@@ -1,21 +1,22 @@
-
 rule prepare_primers:
     input:
         prm=lambda wc: (
-            ""
-            if SAMPLES[wc.sample]["PRIMERS"].endswith(".bed")
-            else SAMPLES[wc.sample]["PRIMERS"]
+            preparation_plan.primers[wc.key]["file"]
+            if preparation_plan.primers[wc.key]["method"] == "fasta"
+            else ""
         ),
-        ref=rules.prepare_refs.output,
+        ref=lambda wc: expand(rules.prepare_refs.output[0], key=preparation_plan.primers[wc.key]["reference"]),
     output:
-        bed=f"{datadir}{wc_folder}{prim}" "{sample}_primers.bed",
+        bed=f"{datadir}{shared}{prim}" "{key}.bed",
     resources:
         mem_mb=low_memory_job,
         runtime=low_runtime_job,
+    benchmark:
+        f"{logdir}{bench}" "prepare_primers_{key}.jsonl",
     log:
-        f"{logdir}prepare_primers_" "{Virus}.{RefID}.{sample}.log",
+        f"{logdir}prepare_primers_" "{key}.log",
     params:
-        pr_mm_rate=lambda wc: SAMPLES[wc.sample]["PRIMER-MISMATCH-RATE"],
+        pr_mm_rate=lambda wc: preparation_plan.primers[wc.key]["mismatch_rate"],
     conda:
         workflow_environment_path("Clean.yaml")
     container:
@@ -36,14 +37,16 @@ ruleorder: prepare_primers > filter_primer_bed > create_empty_primers
 
 rule filter_primer_bed:
     input:
-        prm=lambda wc: SAMPLES[wc.sample]["PRIMERS"],
+        prm=lambda wc: preparation_plan.primers[wc.key]["file"],
     output:
-        bed=f"{datadir}{wc_folder}{prim}" "{sample}_primers.bed",
+        bed=f"{datadir}{shared}{prim}" "{key}.bed",
     resources:
         mem_mb=low_memory_job,
         runtime=low_runtime_job,
+    benchmark:
+        f"{logdir}{bench}" "filter_primer_bed_{key}.jsonl",
     log:
-        f"{logdir}prepare_primers_" "{Virus}.{RefID}.{sample}.log",
+        f"{logdir}prepare_primers_" "{key}.log",
     conda:
         workflow_environment_path("core_scripts.yaml")
     container:
@@ -51,25 +54,41 @@ rule filter_primer_bed:
     params:
         pythonpath = f'{Path(workflow.basedir).parent}',
         script="-m main.scripts.filter_bed_input",
+        reference_id=lambda wc: preparation_plan.primers[wc.key]["RefID"],
     shell:
         """
         PYTHONPATH={params.pythonpath} \
         python {params.script} \
         --input {input.prm} \
         --output {output.bed} \
-        --reference_id {wildcards.RefID}
+        --reference_id {params.reference_id}
         """
 
 
 rule create_empty_primers:
     output:
-        bed=touch(f"{datadir}{wc_folder}{prim}" "{sample}_primers.bed"),
+        bed=touch(f"{datadir}{shared}{prim}" "{key}.bed"),
     resources:
         mem_mb=low_memory_job,
         runtime=low_runtime_job,
     log:
-        f"{logdir}prepare_primers_" "{Virus}.{RefID}.{sample}.log",
+        f"{logdir}prepare_primers_" "{key}.log",
     shell:
         """
         echo "Created empty primer bed file for NONE primers" > {log}
         """
+
+
+rule link_prepared_primers:
+    input:
+        shared_preparation("primers", rules.prepare_primers.output.bed),
+    output:
+        bed=f"{datadir}{wc_folder}{prim}" "{sample}_primers.bed",
+    resources:
+        mem_mb=low_memory_job,
+        runtime=low_runtime_job,
+    threads: 1
+    shell:
+        """
+        ln -f {input} {output.bed} 2> /dev/null || cp --reflink=auto {input} {output.bed}
+        """
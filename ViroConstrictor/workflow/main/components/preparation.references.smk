@@ -1,28 +1,50 @@
+# The preparation outputs only depend on the reference, primer and feature files of a sample, they are written once
+# per distinct content-hash key in data/shared/ and hardlinked to the per-sample paths (see helpers/preparation.py).
+def shared_preparation(kind, pattern):
+    return lambda wc: expand(pattern, key=preparation_plan.samples[(wc.Virus, wc.RefID, wc.sample)][kind])
 
 
 rule prepare_refs:
     input:
-        lambda wc: SAMPLES[wc.sample]["REFERENCE"],
+        lambda wc: preparation_plan.references[wc.key]["file"],
     output:
-        f"{datadir}{wc_folder}" "{sample}_reference.fasta",
+        f"{datadir}{shared}{refdir}" "{key}.fasta",
     resources:
         mem_mb=low_memory_job,
         runtime=low_runtime_job,
     threads: 1
+    benchmark:
+        f"{logdir}{bench}" "prepare_refs_{key}.jsonl",
     log:
-        f"{logdir}prepare_refs_" "{Virus}.{RefID}.{sample}.log",
+        f"{logdir}prepare_refs_" "{key}.log",
     conda:
         workflow_environment_path("core_scripts.yaml")
     container:
         f"{container_base_path}/viroconstrictor_core_scripts_{get_hash('core_scripts')}.sif"
     params:
         script="-m main.scripts.prepare_refs",
-        pythonpath=f'{Path(workflow.basedir).parent}'
+        pythonpath=f'{Path(workflow.basedir).parent}',
+        reference_id=lambda wc: preparation_plan.references[wc.key]["RefID"],
     shell:
         """
         PYTHONPATH={params.pythonpath} \
         python {params.script} \
         --input {input} \
         --output {output} \
-        --reference_id {wildcards.RefID} > {log}
-        """
\ No newline at end of file
+        --reference_id {params.reference_id} > {log}
+        """
+
+
+rule link_prepared_reference:
+    input:
+        shared_preparation("reference", rules.prepare_refs.output[0]),
+    output:
+        f"{datadir}{wc_folder}" "{sample}_reference.fasta",
+    resources:
+        mem_mb=low_memory_job,
+        runtime=low_runtime_job,
+    threads: 1
+    shell:
+        """
+        ln -f {input} {output} 2> /dev/null || cp --reflink=auto {input} {output}
+        """
@@ -0,0 +1,104 @@
+# Cross-run cache of the per-sample results, enabled with the `result_cache` setting (see helpers/result_cache.py).
+# Every Virus/RefID/sample combination gets a cache key from the content of its input files, the settings of the
+# sample, the resolved preset parameters, the environment hashes of the rules that compute the results and the version.
+# For the keys with a cache entry, the restore rules below take precedence (ruleorder) over the rules that compute the
+# results, so the clean, alignment and consensus rules are not run for these samples. For the other keys the inputs
+# of the restore rules do not exist, and Snakemake falls back to the rules that compute the results.
+# The results of the keys without a cache entry are added to the cache when the workflow finished successfully.
+if config["result_cache"]:
+    result_cache = ResultCache(config["result_cache"], config["result_cache_size"], digests=file_digests)
+    result_cache_environments = {name: get_hash(name) for name in ("Clean", "Alignment", "Consensus", "ORF_analysis", "core_scripts")}
+    result_cache_outputs = {
+        "consensus": rules.trueconsense.output.cons,
+        "coverage": rules.trueconsense.output.cov,
+        "vcf": rules.trueconsense.output.vcf,
+        "gff": rules.trueconsense.output.gff,
+        "fastqc": rules.qc_clean.output.zip,
+        "fastp": rules.qc_filter.output.json,
+    }
+    result_cache_aminoacids = rules.Translate_AminoAcids.output[0]
+
+
+    def result_cache_key(virus, refid, sample):
+        settings = SAMPLES[sample]
+        files = {name: settings[name] for name in ("INPUTFILE", "R1", "R2", "REFERENCE", "PRIMERS", "FEATURES") if name in settings}
+        parameters = {
+            "Virus": virus,
+            "RefID": refid,
+            "sample": sample,
+            "settings": {name: value for name, value in settings.items() if name not in files},
+            "preset": resolved_preset_parameters(settings["PRESET"], VC_STAGE),
+            "workflow": {name: config[name] for name in ("platform", "unidirectional", "amplicon_type")},
+            "environments": result_cache_environments,
+            "version": ViroConstrictor.__version__,
+        }
+        return result_key(files, parameters, result_cache.file_digest)
+
+
+    result_cache_keys = {
+        (row.Virus, row.RefID, row.sample): result_cache_key(row.Virus, row.RefID, row.sample)
+        for row in p_space.dataframe.itertuples()
+    }
+    result_cache_hits = {ids for ids, key in result_cache_keys.items() if result_cache.lookup(key)}
+    result_cache.save_digests()
+
+
+    def cached_results(names):
+        return lambda wc: result_cache.entry_files(result_cache_keys[(wc.Virus, wc.RefID, wc.sample)], names)
+
+
+    def store_result_cache():
+        for (virus, refid, sample), key in result_cache_keys.items():
+            if (virus, refid, sample) in result_cache_hits:
+                continue
+            paths = result_cache_outputs | {"aminoacids": result_cache_aminoacids}
+            paths = {name: expand(path, Virus=virus, RefID=refid, sample=sample)[0] for name, path in paths.items()}
+            results = {name: path for name, path in paths.items() if os.path.exists(path)}
+            if not set(result_cache_outputs) <= set(results):
+                continue
+            result_cache.store(key, results, {"Virus": virus, "RefID": refid, "sample": sample})
+        result_cache.evict()
+        stats = result_cache.stats
+        if config["result_cache_stats"]:
+            stats = result_cache.write_stats(workdir=os.getcwd())
+        logging.info(
+            f"Result cache ({config['result_cache']}): {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['stored']} results stored, {stats['evicted']} results evicted."
+        )
+
+
+    localrules:
+        restore_cached_results,
+        restore_cached_aminoacids,
+
+
+    rule restore_cached_results:
+        input:
+            cached_results(list(result_cache_outputs)),
+        output:
+            **result_cache_outputs,
+        resources:
+            mem_mb=low_memory_job,
+            runtime=low_runtime_job,
+        threads: 1
+        run:
+            result_cache.restore(result_cache_keys[(wildcards.Virus, wildcards.RefID, wildcards.sample)], dict(output.items()))
+
+
+    rule restore_cached_aminoacids:
+        input:
+            cached_results(["aminoacids"]),
+        output:
+            result_cache_aminoacids,
+        resources:
+            mem_mb=low_memory_job,
+            runtime=low_runtime_job,
+        threads: 1
+        run:
+            result_cache.restore(result_cache_keys[(wildcards.Virus, wildcards.RefID, wildcards.sample)], {"aminoacids": output[0]})
+
+
+    ruleorder: restore_cached_results > trueconsense
+    ruleorder: restore_cached_results > qc_clean
+    ruleorder: restore_cached_results > qc_filter
+    ruleorder: restore_cached_aminoacids > Translate_AminoAcids
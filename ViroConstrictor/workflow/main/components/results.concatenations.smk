@@ -3,9 +3,7 @@ rule concat_sequences:
     input:  # we don't use group_items here as mincov is in the filename
         lambda wc: (
             f"{datadir}{wc_folder}{cons}{seqs}{sample}.fa"
-            for sample in p_space.dataframe.loc[
-                (p_space.Virus == wc.Virus) & (p_space.RefID == wc.RefID)
-            ]["sample"]
+            for sample in sample_index.samples_of(wc.Virus, wc.RefID)
         ),
     output:
         f"{res}{wc_folder}consensus.fasta",
@@ -17,33 +15,11 @@ rule concat_sequences:
 
 
 def group_aminoacids_inputs(wildcards):
-    filtered_df = samples_df.loc[samples_df["AA_FEAT_NAMES"].notnull()]
-    filtered_vir_list = list(filtered_df["Virus"].unique())
-
-    struct = {}
-    for i in filtered_vir_list:
-        select_samples = list(
-            samples_df.loc[samples_df["Virus"] == i]["sample"].unique()
-        )
-        # for x in select_samples:
-        #     y = samples_df.loc[(samples_df["Virus"] == i) & (samples_df["sample"] == x)]["RefID"].unique()
-        #     print(y)
-        # select_refIDs = list(samples_df.loc[samples_df["Virus"] == i]["RefID"].unique())
-        # print(select_refIDs)
-
-        # create a dictionary of dictionaries for each virus, with 'i' as the primary key and sample as the secondary key having a list of refIDs as the value
-        struct[i] = {
-            sample: list(
-                samples_df.loc[
-                    (samples_df["Virus"] == i) & (samples_df["sample"] == sample)
-                ]["RefID"].unique()
-            )
-            for sample in select_samples
-        }
+    # every sample and RefID of the viruses with aminoacid feature names
     file_list = []
-    for virus, sample in struct.items():
-        for sample, refid in sample.items():
-            for ref in refid:
+    for virus in sample_index.viruses_with_features():
+        for sample in sample_index.samples_of(virus):
+            for ref in sample_index.references(virus, sample):
                 file_list.append(
                     f"{datadir}Virus~{virus}/RefID~{ref}/{amino}{sample}/aa.faa"
                 )
@@ -72,6 +48,8 @@ rule concat_aminoacids:
         sampleinfo=rules.make_pickle.output,
     output:
         list_aminoacid_result_outputs(samples_df),
+    benchmark:
+        f"{logdir}{bench}concat_aminoacids.jsonl",
     log:
         f"{logdir}concat_aminoacids.log",
     resources:
@@ -94,12 +72,12 @@ rule concat_aminoacids:
         --space {input.sampleinfo} > {log} 2>&1
         """
 
+def group_samples(wildcards):
+    return sample_index.samples_of(wildcards.Virus, wildcards.RefID)
+
+
 def group_items(wildcards, folder, filename):
-    filtered_virus = p_space.dataframe.loc[
-        p_space.dataframe["Virus"] == wildcards.Virus
-    ]
-    filtered_refid = filtered_virus.loc[filtered_virus["RefID"] == wildcards.RefID]
-    return [f"{folder}{item}{filename}" for item in list(filtered_refid["sample"])]
+    return [f"{folder}{item}{filename}" for item in group_samples(wildcards)]
 
 
 rule concat_tsv_coverages:
@@ -152,6 +130,8 @@ rule concat_amplicon_cov:
         workflow_environment_path("core_scripts.yaml")
     container:
         f"{container_base_path}/viroconstrictor_core_scripts_{get_hash('core_scripts')}.sif"
+    benchmark:
+        f"{logdir}{bench}" "concat_amplicon_cov_{Virus}.{RefID}.jsonl",
     log:
         f"{logdir}concat_amplicon_cov_" "{Virus}.{RefID}.log",
     threads: 1
@@ -166,3 +146,38 @@ rule concat_amplicon_cov:
         --input_coverages {input.pr} \
         --output {output}
         """
+
+
+# the per-position depths of all samples of a reference in a single memory-mappable matrix, see helpers/depth_matrix.py
+rule depth_matrix:
+    input:
+        lambda wildcards: group_items(
+            wildcards, folder=f"{datadir}{wc_folder}{cons}{covs}", filename="_coverage.tsv"
+        ),
+    output:
+        directory(f"{res}{wc_folder}depth_matrix"),
+    resources:
+        mem_mb=low_memory_job,
+        runtime=low_runtime_job,
+    conda:
+        workflow_environment_path("core_scripts.yaml")
+    container:
+        f"{container_base_path}/viroconstrictor_core_scripts_{get_hash('core_scripts')}.sif"
+    benchmark:
+        f"{logdir}{bench}" "depth_matrix_{Virus}.{RefID}.jsonl",
+    log:
+        f"{logdir}depth_matrix_" "{Virus}.{RefID}.log",
+    threads: 1
+    params:
+        script="-m main.scripts.build_depth_matrix",
+        pythonpath=f'{Path(workflow.basedir).parent}',
+        samples=group_samples,
+    shell:
+        """
+        PYTHONPATH={params.pythonpath} \
+        python {params.script} \
+        --input "empty" \
+        --coverages {input} \
+        --samples {params.samples} \
+        --output {output} > {log} 2>&1
+        """
@@ -1,85 +1,118 @@
+# With a script batch size, the reporting metrics of the samples are calculated in batches: one job runs the script for
+# every sample of a batch in a single interpreter, with a worker process per thread.
+if config["script_batch_size"] > 0:
 
-rule vcf_to_tsv:
-    input:
-        vcf=rules.trueconsense.output.vcf,
-    output:
-        tsv=temp(f"{datadir}{wc_folder}{aln}{vf}" "{sample}.tsv"),
-    conda:
-        workflow_environment_path("core_scripts.yaml")
-    container:
-        f"{container_base_path}/viroconstrictor_core_scripts_{get_hash('core_scripts')}.sif"
-    threads: config["threads"]["Index"]
-    resources:
-        mem_mb=low_memory_job,
-        runtime=low_runtime_job,
-    log:
-        f"{logdir}" "vcf_to_tsv_{Virus}.{RefID}.{sample}.log",
-    params:
-        script="-m main.scripts.vcf_to_tsv",
-        pythonpath = f'{Path(workflow.basedir).parent}',
-    shell:
-        """
-        PYTHONPATH={params.pythonpath} \
-        python {params.script} \
-        --input {input.vcf} \
-        --output {output.tsv} \
-        --sample {wildcards.sample} >> {log} 2>&1
-        """
+    reporting_metrics_files = {
+        "reference": f"{datadir}{wc_folder}" "{sample}_reference.fasta",
+        "vcf": f"{datadir}{wc_folder}{aln}{vf}" "{sample}.vcf",
+        "cov": f"{datadir}{wc_folder}{cons}{covs}" "{sample}_coverage.tsv",
+        "pr": f"{datadir}{wc_folder}{prim}" "{sample}_primers.bed",
+        "mutations": f"{datadir}{wc_folder}{aln}{vf}" "{sample}.tsv",
+        "boc": f"{datadir}{wc_folder}{boc}" "{sample}.tsv",
+        "amplicon_cov": f"{datadir}{wc_folder}{prim}" "{sample}_ampliconcoverage.csv",
+    }
 
+    def reporting_metrics_paths(batch, file):
+        return [reporting_metrics_files[file].format(**row) for row in batch]
 
-rule get_breadth_of_coverage:
-    input:
-        reference=rules.prepare_refs.output,
-        coverage=rules.trueconsense.output.cov,
-    output:
-        temp(f"{datadir}{wc_folder}{boc}" "{sample}.tsv"),
-    resources:
-        mem_mb=low_memory_job,
-        runtime=low_runtime_job,
-    conda:
-        workflow_environment_path("core_scripts.yaml")
-    container:
-        f"{container_base_path}/viroconstrictor_core_scripts_{get_hash('core_scripts')}.sif"
-    log:
-        f"{logdir}get_breadth_of_coverage_" "{Virus}.{RefID}.{sample}.log",
-    params:
-        script="-m main.scripts.boc",
-        pythonpath = f'{Path(workflow.basedir).parent}',
-    shell:
-        """
-        PYTHONPATH={params.pythonpath} \
-        python {params.script} \
-        --input {input.reference} \
-        --sample {wildcards.sample} \
-        --coverage {input.coverage} \
-        --output {output}
-        """
+    def reporting_metrics_manifest(batch, scheme_cache):
+        return [
+            manifest_line(
+                {
+                    "input": reporting_metrics_files["cov"].format(**row),
+                    "output": reporting_metrics_files["boc"].format(**row),
+                    "samplename": row["sample"],
+                    "reference": reporting_metrics_files["reference"].format(**row),
+                    "vcf": reporting_metrics_files["vcf"].format(**row),
+                    "primers": reporting_metrics_files["pr"].format(**row),
+                    "mutations-output": reporting_metrics_files["mutations"].format(**row),
+                    "amplicon-output": reporting_metrics_files["amplicon_cov"].format(**row),
+                    "scheme-cache": scheme_cache,
+                }
+            )
+            for row in batch
+        ]
 
+    for batch_number, batch in enumerate(sample_index.batches(config["script_batch_size"])):
 
-rule calculate_amplicon_cov:
-    input:
-        pr=f"{datadir}{wc_folder}{prim}" "{sample}_primers.bed",
-        cov=rules.trueconsense.output.cov,
-    output:
-        f"{datadir}{wc_folder}{prim}" "{sample}_ampliconcoverage.csv",
-    log:
-        f"{logdir}" "calculate_amplicon_cov_{Virus}.{RefID}.{sample}.log",
-    resources:
-        mem_mb=low_memory_job,
-        runtime=medium_runtime_job,
-    conda:
-        workflow_environment_path("core_scripts.yaml")
-    container:
-        f"{container_base_path}/viroconstrictor_core_scripts_{get_hash('core_scripts')}.sif"
-    params:
-        script="-m main.scripts.amplicon_covs",
-        pythonpath = f'{Path(workflow.basedir).parent}',
-    shell:
-        """
-        PYTHONPATH={params.pythonpath} \
-        python {params.script} \
-        --input {input.pr} \
-        --coverages {input.cov} \
-        --key {wildcards.sample} \
-        --output {output} > {log} 2>&1
-        """
+        rule:
+            name:
+                f"reporting_metrics_batch_{batch_number}"
+            input:
+                reference=reporting_metrics_paths(batch, "reference"),
+                vcf=reporting_metrics_paths(batch, "vcf"),
+                cov=reporting_metrics_paths(batch, "cov"),
+                pr=reporting_metrics_paths(batch, "pr"),
+            output:
+                mutations=temp(reporting_metrics_paths(batch, "mutations")),
+                boc=temp(reporting_metrics_paths(batch, "boc")),
+                amplicon_cov=reporting_metrics_paths(batch, "amplicon_cov"),
+            conda:
+                workflow_environment_path("core_scripts.yaml")
+            container:
+                f"{container_base_path}/viroconstrictor_core_scripts_{get_hash('core_scripts')}.sif"
+            threads: min(len(batch), config["threads"]["Alignments"])
+            resources:
+                mem_mb=low_memory_job,
+                runtime=medium_runtime_job,
+            benchmark:
+                f"{logdir}{bench}reporting_metrics_batch_{batch_number}.jsonl"
+            log:
+                out=f"{logdir}reporting_metrics_batch_{batch_number}.log",
+                status=f"{logdir}reporting_metrics_batch_{batch_number}.status.jsonl",
+            params:
+                script="-m main.scripts.reporting_metrics",
+                pythonpath=f'{Path(workflow.basedir).parent}',
+                manifest=reporting_metrics_manifest(batch, f"{datadir}{prim}scheme_index/"),
+            shell:
+                """
+                printf '%s\\n' {params.manifest:q} | \
+                PYTHONPATH={params.pythonpath} \
+                python {params.script} \
+                --batch - \
+                --batch-workers {threads} \
+                --batch-status {log.status} > {log.out} 2>&1
+                """
+
+else:
+
+    rule reporting_metrics:
+        input:
+            reference=rules.link_prepared_reference.output,
+            vcf=rules.trueconsense.output.vcf,
+            cov=rules.trueconsense.output.cov,
+            pr=f"{datadir}{wc_folder}{prim}" "{sample}_primers.bed",
+        output:
+            mutations=temp(f"{datadir}{wc_folder}{aln}{vf}" "{sample}.tsv"),
+            boc=temp(f"{datadir}{wc_folder}{boc}" "{sample}.tsv"),
+            amplicon_cov=f"{datadir}{wc_folder}{prim}" "{sample}_ampliconcoverage.csv",
+        conda:
+            workflow_environment_path("core_scripts.yaml")
+        container:
+            f"{container_base_path}/viroconstrictor_core_scripts_{get_hash('core_scripts')}.sif"
+        threads: config["threads"]["Index"]
+        resources:
+            mem_mb=low_memory_job,
+            runtime=medium_runtime_job,
+        benchmark:
+            f"{logdir}{bench}" "reporting_metrics_{Virus}.{RefID}.{sample}.jsonl",
+        log:
+            f"{logdir}" "reporting_metrics_{Virus}.{RefID}.{sample}.log",
+        params:
+            script="-m main.scripts.reporting_metrics",
+            pythonpath = f'{Path(workflow.basedir).parent}',
+            scheme_cache=f"{datadir}{prim}scheme_index/",
+        shell:
+            """
+            PYTHONPATH={params.pythonpath} \
+            python {params.script} \
+            --input {input.cov} \
+            --output {output.boc} \
+            --samplename {wildcards.sample} \
+            --reference {input.reference} \
+            --vcf {input.vcf} \
+            --primers {input.pr} \
+            --mutations-output {output.mutations} \
+            --amplicon-output {output.amplicon_cov} \
+            --scheme-cache {params.scheme_cache} > {log} 2>&1
+            """
@@ -9,8 +9,8 @@ def get_alignment_flags(_wildcards):
 
 rule align_before_trueconsense:
     input:
-        fq=f"{datadir}{wc_folder}{cln}{prdir}" "{sample}.fastq",  #rules.ampligone.output.fq,
-        ref=rules.prepare_refs.output,
+        fq=f"{datadir}{wc_folder}{cln}{prdir}" "{sample}" f"{fq_suffix}",  #rules.ampligone.output.fq,
+        ref=rules.link_prepared_reference.output,
     output:
         bam=f"{datadir}{wc_folder}{aln}{bf}" "{sample}.bam",
         index=f"{datadir}{wc_folder}{aln}{bf}" "{sample}.bam.bai",
@@ -18,6 +18,8 @@ rule align_before_trueconsense:
         workflow_environment_path("Alignment.yaml")
     container:
         f"{container_base_path}/viroconstrictor_alignment_{get_hash('Alignment')}.sif"
+    benchmark:
+        f"{logdir}{bench}" "align_before_trueconsense_{Virus}.{RefID}.{sample}.jsonl",
     log:
         f"{logdir}Alignment_" "{Virus}.{RefID}.{sample}.log",
     threads: config["threads"]["Alignments"]
@@ -60,7 +62,7 @@ rule trueconsense:
     input:
         bam=rules.align_before_trueconsense.output.bam,
         gff=f"{datadir}{wc_folder}{features}" "{sample}_features.gff",
-        ref=rules.prepare_refs.output,
+        ref=rules.link_prepared_reference.output,
     output:
         cons=f"{datadir}{wc_folder}{cons}{seqs}" "{sample}.fa",
         cov=f"{datadir}{wc_folder}{cons}{covs}" "{sample}_coverage.tsv",
@@ -72,6 +74,8 @@ rule trueconsense:
         workflow_environment_path("Consensus.yaml")
     container:
         f"{container_base_path}/viroconstrictor_consensus_{get_hash('Consensus')}.sif"
+    benchmark:
+        f"{logdir}{bench}" "trueconsense_{Virus}.{RefID}.{sample}.jsonl",
     log:
         f"{logdir}Consensus_" "{Virus}.{RefID}.{sample}.log",
     threads: config["threads"]["Consensus"]
@@ -105,6 +109,8 @@ rule Translate_AminoAcids:
     resources:
         mem_mb=low_memory_job,
         runtime=low_runtime_job,
+    benchmark:
+        f"{logdir}{bench}" "Translate_AminoAcids_{Virus}.{RefID}.{sample}.jsonl",
     log:
         f"{logdir}Translate_AA_" "{Virus}.{RefID}.{sample}.log",
     params:
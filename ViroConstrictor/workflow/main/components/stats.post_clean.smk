@@ -9,6 +9,8 @@ rule qc_clean:
         workflow_environment_path("core_scripts.yaml")
     container:
         f"{container_base_path}/viroconstrictor_core_scripts_{get_hash('core_scripts')}.sif"
+    benchmark:
+        f"{logdir}{bench}" "qc_clean_{Virus}.{RefID}.{sample}.jsonl",
     log:
         f"{logdir}QC_clean_" "{Virus}.{RefID}.{sample}.log",
     threads: config["threads"]["QC"]
@@ -75,6 +77,8 @@ rule multiqc_report:
         workflow_environment_path("Clean.yaml")
     container:
         f"{container_base_path}/viroconstrictor_clean_{get_hash('Clean')}.sif"
+    benchmark:
+        f"{logdir}{bench}multiqc_report.jsonl",
     log:
         f"{logdir}MultiQC_report.log",
     resources:
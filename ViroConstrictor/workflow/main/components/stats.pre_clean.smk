@@ -15,6 +15,8 @@ if config["platform"] in ["nanopore", "iontorrent"] or (
             workflow_environment_path("core_scripts.yaml")
         container:
             f"{container_base_path}/viroconstrictor_core_scripts_{get_hash('core_scripts')}.sif"
+        benchmark:
+            f"{logdir}{bench}" "qc_raw_{sample}.jsonl",
         log:
             f"{logdir}QC_raw_data_" "{sample}.log",
         threads: config["threads"]["QC"]
@@ -43,6 +45,8 @@ if config["platform"] == "illumina" and config["unidirectional"] is False:
             workflow_environment_path("core_scripts.yaml")
         container:
             f"{container_base_path}/viroconstrictor_core_scripts_{get_hash('core_scripts')}.sif"
+        benchmark:
+            f"{logdir}{bench}" "qc_raw_{sample}_{read}.jsonl",
         log:
             f"{logdir}" "QC_raw_data_{sample}_{read}.log",
         threads: config["threads"]["QC"]
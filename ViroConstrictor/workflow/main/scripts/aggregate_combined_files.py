@@ -1,9 +1,13 @@
+import io
 import os
 from argparse import ArgumentParser
 from pathlib import Path
 
 import pandas as pd
 from helpers.base_script_class import BaseScript
+from helpers.columnar import COLUMNAR_FORMATS, write_columnar
+from helpers.manifest import IncrementalOutput, discard_manifest
+from helpers.tabular import fit_row, read_header, read_rows, row_writer
 
 
 class AggregateCombinedFiles(BaseScript):
@@ -12,7 +16,8 @@ class AggregateCombinedFiles(BaseScript):
 
     This script concatenates files that have already been processed by earlier
     combination rules (e.g., combine_*_by_sample), which means headers and
-    metadata columns are already present.
+    metadata columns are already present. With `columnar`, a columnar copy of the
+    aggregated table is written next to it, partitioned by virus (see `helpers.columnar`).
     """
 
     def __init__(
@@ -22,11 +27,13 @@ class AggregateCombinedFiles(BaseScript):
         input_files: list[Path | str],
         file_type: str,
         separator: str = "\t",
+        columnar: str | None = None,
     ) -> None:
         super().__init__(input, output)
         self.input_files = input_files
         self.file_type = file_type
         self.separator = separator
+        self.columnar = columnar
 
     @classmethod
     def add_arguments(cls, parser: ArgumentParser) -> None:
@@ -51,13 +58,21 @@ class AggregateCombinedFiles(BaseScript):
             type=str,
             default="\t",
         )
+        parser.add_argument(
+            "--columnar",
+            choices=COLUMNAR_FORMATS,
+            help="Also write a columnar copy of the aggregated table, partitioned by virus (default: none).",
+            type=str,
+            default=None,
+        )
 
     def run(self) -> None:
         """
         Run the aggregation process for combined result files.
 
         Calls the internal _aggregate_files() method to collect, merge and write
-        combined result files into the configured output location.
+        combined result files into the configured output location, and writes the
+        columnar copy of the aggregated table when requested.
 
         Returns
         -------
@@ -69,6 +84,8 @@ class AggregateCombinedFiles(BaseScript):
         This is a thin public wrapper around the private _aggregate_files implementation.
         """
         self._aggregate_files()
+        if self.columnar is not None:
+            write_columnar(self.output, "," if self.file_type == "amplicon_coverage" else self.separator, self.columnar)
 
     def _read_files(self, infile_paths: list[Path | str]) -> list[pd.DataFrame]:
         """
@@ -121,6 +138,10 @@ class AggregateCombinedFiles(BaseScript):
         it writes an empty file with the appropriate header. The output file format and separator
         depend on the file type.
 
+        Input files that share the same columns are streamed row by row. Only when the columns differ between the
+        input files (e.g. amplicon coverage of schemes with a different number of amplicons) the files are read and
+        aligned with pandas.
+
         Parameters
         ----------
         None
@@ -131,19 +152,68 @@ class AggregateCombinedFiles(BaseScript):
 
         Notes
         -----
-        - For files of type "amplicon_coverage", the output is written as a CSV with default separator.
+        - For files of type "amplicon_coverage", the input and output are CSV files with the default separator.
         - For other file types, the output is written using the specified separator.
         - If no input files are present, an empty file with the correct header is created.
         """
-        if dfs := self._read_files(self.input_files):
-            combined_df = pd.concat(dfs, ignore_index=True)
-            if self.file_type == "amplicon_coverage":
-                combined_df.to_csv(self.output, index=False)
-            else:
-                combined_df.to_csv(self.output, sep=self.separator, index=False)
-        else:
+        separator = "," if self.file_type == "amplicon_coverage" else self.separator
+        headers = []
+        for infile in self.input_files:
+            if os.path.exists(infile) and os.path.getsize(infile) > 0:
+                header, has_rows = read_header(infile, separator)
+                if header is not None and has_rows:
+                    headers.append((infile, header))
+
+        if not headers:
             # Write empty file with appropriate header
             self._write_empty_file()
+            discard_manifest(self.output)
+        elif len({tuple(header) for _, header in headers}) > 1:
+            # files with differing columns (amplicon coverage of different schemes) are aligned on their column names
+            combined_df = pd.concat(self._read_files([infile for infile, _ in headers]), ignore_index=True)
+            combined_df.to_csv(self.output, sep=separator, index=False)
+            discard_manifest(self.output)
+        else:
+            self._stream_files(headers, separator)
+
+    def _stream_files(self, headers: list[tuple[Path | str, list[str]]], separator: str) -> None:
+        """
+        Stream the rows of input files that all share the same columns to the output file.
+
+        The header is written once, after which the data rows of every input file are copied row by row, so the
+        memory use does not grow with the number or size of the input files. The output is written incrementally with a
+        manifest sidecar (see `helpers.manifest`): the rows of input files that did not change since the previous run
+        are copied from the existing output, and when input files were only added, only their rows are appended.
+
+        Parameters
+        ----------
+        headers : list[tuple[Path | str, list[str]]]
+            Every input file that contains data rows, with its header.
+        separator : str
+            Field separator of the input and output files.
+
+        Returns
+        -------
+        None
+        """
+        columns = headers[0][1]
+        header = io.StringIO()
+        row_writer(header, separator).writerow(columns)
+        sources = [(str(infile), f"{self.file_type}\t{separator}") for infile, _ in headers]
+        with IncrementalOutput(self.output, header.getvalue(), sources) as output:
+            for (infile, _), (path, key) in zip(headers, sources):
+                output.write(path, key, lambda: self._format_data_rows(infile, separator, len(columns)))
+
+    @staticmethod
+    def _format_data_rows(infile: Path | str, separator: str, length: int) -> str:
+        """
+        Formats the data rows of an input file (all rows after its header) as they are written to the output file.
+        """
+        text = io.StringIO()
+        rows = read_rows(infile, separator)
+        next(rows)
+        row_writer(text, separator).writerows(fit_row(row, length) for row in rows)
+        return text.getvalue()
 
     def _write_empty_file(self) -> None:
         """
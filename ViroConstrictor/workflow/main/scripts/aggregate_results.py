@@ -0,0 +1,314 @@
+"""
+Writes all combined results (by sample, by virus and for all samples) of a run in a single pass.
+
+The aggregation is driven by an aggregation plan (see `helpers/aggregation.py`), a JSON file that lists every
+per-sample/RefID result file with its sample, virus and reference ID, together with the paths of all combined outputs.
+Every per-sample/RefID result file is read once, converted once, and the converted text is written to the by sample,
+by virus and all samples outputs it belongs to. The outputs are identical to the outputs of the individual
+`combine_fasta`, `combine_tabular`, `extract_sample_from_fasta` and `aggregate_combined_files` scripts.
+
+The combined consensus, mutations and coverage outputs are written incrementally (see `helpers.manifest`): when samples
+are added to an existing run, only the results of the new and changed samples are converted.
+
+When the plan lists columnar outputs, the all samples mutations, coverage and amplicon coverage tables are also written
+as columnar datasets partitioned by virus (see `helpers.columnar`).
+
+Examples
+--------
+>>> aggregation = AggregateResults(input="aggregation_plan.json", output="aggregation_summary.json")
+>>> aggregation.run()
+"""
+
+import csv
+import io
+import json
+import os
+from argparse import ArgumentParser
+from contextlib import ExitStack
+from functools import cache, partial
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Callable, TextIO
+
+import pandas as pd
+from Bio import SeqIO
+from helpers.base_script_class import BaseScript  # type: ignore[import]  # noqa: F401,E402
+from helpers.columnar import write_columnar  # type: ignore[import]  # noqa: E402
+from helpers.manifest import IncrementalOutput  # type: ignore[import]  # noqa: E402
+from helpers.tabular import fit_row, row_writer  # type: ignore[import]  # noqa: E402
+from main.scripts.combine_fasta import CombineFasta  # type: ignore[import]  # noqa: E402
+from main.scripts.combine_tabular import CombineTabular  # type: ignore[import]  # noqa: E402
+
+
+class AggregateResults(BaseScript):
+    """
+    Writes all combined results of a run from an aggregation plan.
+
+    Parameters
+    ----------
+    input : Path | str
+        Path to the aggregation plan JSON file.
+    output : Path | str
+        Path to the output JSON file, a summary with the number of input files read, output files written and the
+        number of reused (copied and kept) and converted input segments.
+    manifest_dir : Path | str | None, optional
+        Directory to store the manifests of the combined consensus, mutations and coverage outputs in, mirroring the
+        output paths (default is a ``.manifest.json`` sidecar next to every output).
+    """
+
+    def __init__(self, input: Path | str, output: Path | str, manifest_dir: Path | str | None = None) -> None:
+        super().__init__(input, output)
+        self.manifest_dir = manifest_dir
+        self.files_read = 0
+        self.files_written = 0
+        self.segments = {"copied": 0, "converted": 0, "appended": 0}
+
+    @classmethod
+    def add_arguments(cls, parser: ArgumentParser) -> None:
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--manifest-dir",
+            metavar="Dir",
+            type=str,
+            help="Directory to store the manifests of the incrementally written combined outputs.",
+            required=False,
+        )
+
+    def run(self) -> None:
+        with open(self.input) as plan_file:
+            plan = json.load(plan_file)
+
+        self._fan_out(plan, "consensus", "", self._consensus_text)
+        for file_type in ("mutations", "coverage"):
+            header = "\t".join(CombineTabular.COLUMNS[file_type][1]) + "\n"
+            self._fan_out(plan, file_type, header, lambda row, file_type=file_type: self._tabular_text(row, file_type))
+        self._aggregate_amplicon_coverage(plan)
+        self._aggregate_aminoacids(plan["aminoacids"])
+        for result_type, path in plan["columnar"].items():
+            separator = "," if result_type == "amplicon_coverage" else "\t"
+            write_columnar(plan["all_samples"][result_type], separator, plan["columnar_format"], path)
+            self.files_written += 1
+
+        with open(self.output, "w") as summary:
+            json.dump({"files_read": self.files_read, "files_written": self.files_written, "segments": self.segments}, summary, indent=4)
+
+    def _open_output(self, path: str) -> TextIO:
+        """
+        Opens an output file for writing, its parent directories are created when needed.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.files_written += 1
+        return open(path, "w", newline="")
+
+    def _read_input(self, path: str) -> bool:
+        """
+        Checks whether an input file exists and is not empty, missing and empty input files are skipped.
+        """
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return False
+        self.files_read += 1
+        return True
+
+    def _read_text(self, path: str) -> str:
+        """
+        Reads the text of an input file, missing and empty files are read as empty text.
+        """
+        return Path(path).read_text() if self._read_input(path) else ""
+
+    def _incremental_output(self, output: str, header: str, sources: list[tuple[str, str]]) -> IncrementalOutput:
+        """
+        Opens a combined output that reuses the segments of unchanged inputs, see `helpers.manifest`.
+        """
+        manifest = None
+        if self.manifest_dir is not None:
+            manifest = Path(self.manifest_dir) / Path(f"{output}.manifest.json").relative_to(Path(output).anchor)
+        self.files_written += 1
+        return IncrementalOutput(output, header, sources, manifest)
+
+    def _fan_out(self, plan: dict[str, Any], result_type: str, header: str, convert: Callable[[dict[str, str]], str]) -> None:
+        """
+        Writes the by sample, by virus and all samples outputs of a result type.
+
+        The rows of the plan are grouped by sample, so the by sample outputs are written one after the other while the
+        by virus and all samples outputs are kept open. Every input file is converted at most once and the converted
+        text is written to the three outputs it belongs to. Outputs that already contain the unchanged segment of an
+        input copy (or keep) that segment instead, so only new and changed inputs are converted. Every output starts
+        with the given header.
+        """
+
+        def sources(rows: list[dict[str, str]]) -> list[tuple[str, str]]:
+            return [(row[result_type], f"{row['virus']}\t{row['refid']}") for row in rows]
+
+        virus_rows: dict[str, list[dict[str, str]]] = {}
+        for row in plan["rows"]:
+            virus_rows.setdefault(row["virus"], []).append(row)
+
+        with ExitStack() as stack:
+            outputs = [stack.enter_context(self._incremental_output(plan["all_samples"][result_type], header, sources(plan["rows"])))]
+            by_virus = {
+                virus: stack.enter_context(self._incremental_output(paths[result_type], header, sources(virus_rows[virus])))
+                for virus, paths in plan["by_virus"].items()
+            }
+            outputs.extend(by_virus.values())
+
+            for sample, group in groupby(plan["rows"], key=itemgetter("sample")):
+                rows = list(group)
+                with self._incremental_output(plan["by_sample"][sample][result_type], header, sources(rows)) as by_sample:
+                    outputs.append(by_sample)
+                    for row, (path, key) in zip(rows, sources(rows)):
+                        segment = cache(partial(convert, row))
+                        for output in (by_sample, by_virus[row["virus"]], outputs[0]):
+                            output.write(path, key, segment)
+
+        for output in outputs:
+            for name, count in output.stats.items():
+                self.segments[name] += count
+
+    def _consensus_text(self, row: dict[str, str]) -> str:
+        """
+        Converts a consensus FASTA file to combined FASTA records, see `CombineFasta`.
+        """
+        if not self._read_input(row["consensus"]):
+            return ""
+        records = CombineFasta._rewrite_records(row["consensus"], row["virus"], row["refid"])
+        return "".join(record.format("fasta") for record in records)
+
+    def _tabular_text(self, row: dict[str, str], file_type: str) -> str:
+        """
+        Converts a headerless mutations or coverage file to combined rows, see `CombineTabular`.
+        """
+        if not self._read_input(row[file_type]):
+            return ""
+        column_names, output_columns = CombineTabular.COLUMNS[file_type]
+        converted = io.StringIO()
+        rows = CombineTabular._rows_with_metadata(row[file_type], row["virus"], row["refid"], column_names, output_columns, "\t")
+        row_writer(converted, "\t").writerows(rows)
+        return converted.getvalue()
+
+    def _aggregate_amplicon_coverage(self, plan: dict[str, Any]) -> None:
+        """
+        Writes the by sample, by virus and all samples amplicon coverage outputs.
+
+        The amplicon coverage files are small (one row per sample and reference) but may have different columns, so
+        every file is read once into memory after which the outputs are combined like `CombineTabular` (by sample and
+        by virus) and `AggregateCombinedFiles` (all samples, from the by sample outputs) do.
+        """
+        sources = [(self._read_text(row["amplicon_coverage"]), row["virus"], row["refid"]) for row in plan["rows"]]
+
+        sample_tables = []
+        for sample, group in groupby(zip(plan["rows"], sources), key=lambda pair: pair[0]["sample"]):
+            table = self._combine_amplicon_tables([source for _, source in group])
+            sample_tables.append(table)
+            with self._open_output(plan["by_sample"][sample]["amplicon_coverage"]) as by_sample:
+                by_sample.write(table)
+
+        for virus, outputs in plan["by_virus"].items():
+            with self._open_output(outputs["amplicon_coverage"]) as by_virus:
+                by_virus.write(self._combine_amplicon_tables([source for row, source in zip(plan["rows"], sources) if row["virus"] == virus]))
+
+        with self._open_output(plan["all_samples"]["amplicon_coverage"]) as all_samples:
+            all_samples.write(self._concatenate_amplicon_tables(sample_tables))
+
+    @staticmethod
+    def _combine_amplicon_tables(sources: list[tuple[str, str, str]]) -> str:
+        """
+        Combines amplicon coverage tables with Virus and Reference_ID metadata columns in front, see `CombineTabular`.
+        Tables with differing columns are combined with pandas, which writes the union of all columns.
+        """
+        tables = [(text, virus, refid, rows) for text, virus, refid in sources if len(rows := _read_text_rows(text, ",")) > 1]
+        if not tables:
+            return pd.DataFrame().to_csv(index=False)
+
+        if len({tuple(rows[0]) for *_, rows in tables}) > 1:
+            dfs = []
+            for text, virus, refid, _ in tables:
+                df = pd.read_csv(io.StringIO(text), keep_default_na=False, na_filter=False)
+                df["Virus"] = virus
+                df["Reference_ID"] = str(refid)
+                dfs.append(df)
+            combined_df = pd.concat(dfs, ignore_index=True)
+            combined_df["Reference_ID"] = combined_df["Reference_ID"].astype(str)
+            columns = combined_df.columns.tolist()
+            columns = ["Virus", "Reference_ID"] + [column for column in columns if column not in ("Virus", "Reference_ID")]
+            return combined_df[columns].to_csv(index=False)
+
+        columns = tables[0][3][0]
+        output_columns = ["Virus", "Reference_ID"] + [column for column in columns if column not in ("Virus", "Reference_ID")]
+        combined = io.StringIO()
+        writer = row_writer(combined, ",")
+        writer.writerow(output_columns)
+        for _, virus, refid, rows in tables:
+            for row in rows[1:]:
+                values = dict(zip(columns, fit_row(row, len(columns))), Virus=virus, Reference_ID=str(refid))
+                writer.writerow([values[column] for column in output_columns])
+        return combined.getvalue()
+
+    @staticmethod
+    def _concatenate_amplicon_tables(texts: list[str]) -> str:
+        """
+        Concatenates combined amplicon coverage tables, see `AggregateCombinedFiles`.
+        Tables with differing columns are aligned on their column names with pandas.
+        """
+        tables = [(text, rows) for text in texts if len(rows := _read_text_rows(text, ",")) > 1]
+        if not tables:
+            return ""
+
+        if len({tuple(rows[0]) for _, rows in tables}) > 1:
+            dfs = [pd.read_csv(io.StringIO(text), keep_default_na=False, na_filter=False) for text, _ in tables]
+            return pd.concat(dfs, ignore_index=True).to_csv(sep=",", index=False)
+
+        columns = tables[0][1][0]
+        concatenated = io.StringIO()
+        writer = row_writer(concatenated, ",")
+        writer.writerow(columns)
+        for _, rows in tables:
+            writer.writerows(fit_row(row, len(columns)) for row in rows[1:])
+        return concatenated.getvalue()
+
+    def _aggregate_aminoacids(self, aminoacids: dict[str, Any]) -> None:
+        """
+        Writes the by sample, by virus and all samples amino acid outputs, one file per feature.
+
+        Every per-reference amino acid file is read once. The by virus outputs are the concatenation of the files of the
+        virus. The records of a file are dispatched to the by sample outputs of the samples listed for the file, a
+        record belongs to a sample when its id is the sample name or starts with the sample name followed by a '.'.
+        The all samples outputs are the concatenation of the by sample outputs in sample order.
+        """
+        by_virus: dict[str, list[str]] = {path: [] for outputs in aminoacids["by_virus"].values() for path in outputs.values()}
+        by_sample: dict[str, list[str]] = {path: [] for outputs in aminoacids["by_sample"].values() for path in outputs.values()}
+
+        for aminoacid_input in aminoacids["inputs"]:
+            text = self._read_text(aminoacid_input["path"])
+            by_virus[aminoacids["by_virus"][aminoacid_input["virus"]][aminoacid_input["feature"]]].append(text)
+
+            samples = set(aminoacid_input["samples"])
+            for record in SeqIO.parse(io.StringIO(text), "fasta"):
+                id_parts = record.id.split(".")
+                prefixes = {".".join(id_parts[:length]) for length in range(1, len(id_parts) + 1)}
+                matches = samples.intersection(prefixes)
+                if matches:
+                    formatted = record.format("fasta")
+                    for sample in matches:
+                        by_sample[aminoacids["by_sample"][sample][aminoacid_input["feature"]]].append(formatted)
+
+        for path, chunks in (*by_virus.items(), *by_sample.items()):
+            with self._open_output(path) as output:
+                output.write("".join(chunks))
+
+        for feature, path in aminoacids["all_samples"].items():
+            with self._open_output(path) as output:
+                for outputs in aminoacids["by_sample"].values():
+                    if feature in outputs:
+                        output.write("".join(by_sample[outputs[feature]]))
+
+
+def _read_text_rows(text: str, separator: str) -> list[list[str]]:
+    """
+    Reads the non-blank rows of delimited text, like `helpers.tabular.read_rows` does for files.
+    """
+    return [row for row in csv.reader(io.StringIO(text, newline=""), delimiter=separator) if row]
+
+
+if __name__ == "__main__":
+    AggregateResults.main()
@@ -54,15 +54,23 @@ Valid direction indicators:
 
 """
 
+import hashlib
+import json
+import os
 import re
+import tempfile
 from argparse import ArgumentParser
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 from helpers.base_script_class import BaseScript  # type: ignore[import]  # noqa: F401,E402
 
+# Version of the scheme index layout, part of the index file name so indexes written by other versions are ignored
+SCHEME_INDEX_VERSION = 1
+
 
 class AltName(Enum):
     """Enum to represent alternative primers."""
@@ -118,8 +126,8 @@ class PrimerNameParser:
     """Class to parse and validate primer names."""
 
     def __init__(self):
-        # Regex patterns for different primer name formats
-        self.patterns = [
+        # Regex patterns for different primer name formats, compiled once per parser
+        patterns = [
             # Pattern 1: name_number_direction (e.g., "ncov-2019_1_LEFT")
             r"^([^_]+)_(\d+)_([^_]+)$",
             # Pattern 2: name_number_alt_direction (e.g., "ncov-2019_1_alt_LEFT")
@@ -141,17 +149,26 @@ class PrimerNameParser:
             # Pattern 9: schemeName_insertSize_ampliconNumber_direction_primerNumber (e.g., "SARS-CoV-2_400_1_LEFT_1")
             r"^([^_]+)_(\d+)_(\d+)_([^_]+)_(?:\d+)$",
         ]
+        self.patterns = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+        # Parsed primer names, primers of a scheme share their name so most lookups are cache hits
+        self._parsed: dict[str, PrimerInfo] = {}
 
     def parse(self, primer_name: str) -> PrimerInfo:
-        """Parses the primer name and returns a PrimerInfo dataclass."""
+        """Parses the primer name and returns a PrimerInfo dataclass. Results are memoized per primer name."""
+        if primer_name in self._parsed:
+            return self._parsed[primer_name]
         cleaned_name = primer_name.lstrip(">")  # Remove leading '>' if present
         for pattern in self.patterns:
-            match = re.match(pattern, cleaned_name, re.IGNORECASE)
+            match = pattern.match(cleaned_name)
 
             if match:
-                return self._extract_info(match, cleaned_name)
+                primer_info = self._extract_info(match, cleaned_name)
+                break
+        else:
+            primer_info = self._fallback_parse(cleaned_name)
 
-        return self._fallback_parse(cleaned_name)
+        self._parsed[primer_name] = primer_info
+        return primer_info
 
     def _extract_info(self, match: re.Match[str], original_string: str) -> PrimerInfo:
         groups: tuple[str, ...] = match.groups()
@@ -252,6 +269,10 @@ class AmpliconCovs(BaseScript):
         Sample ID.
     output : str
         Path to the output CSV file.
+    scheme_cache : str | None, optional
+        Directory holding the parsed primer scheme indexes. When given, the parsed scheme (amplicon numbers, names,
+        primer directions and non-overlapping amplicon intervals) is stored there, keyed by the SHA-256 hash of the
+        primer BED file, and reused by every later run with the same primer BED file.
 
     Methods
     -------
@@ -259,10 +280,18 @@ class AmpliconCovs(BaseScript):
         Executes the amplicon coverage calculation.
     """
 
-    def __init__(self, input: Path | str, coverages: Path | str, key: str, output: Path | str) -> None:
+    def __init__(
+        self,
+        input: Path | str,
+        coverages: Path | str,
+        key: str,
+        output: Path | str,
+        scheme_cache: Path | str | None = None,
+    ) -> None:
         super().__init__(input, output)
         self.coverages = coverages
         self.key = key
+        self.scheme_cache = scheme_cache
         self.parser = PrimerNameParser()  # Initialize the parser
 
     @classmethod
@@ -282,25 +311,42 @@ class AmpliconCovs(BaseScript):
             help="Sample ID.",
             required=True,
         )
+        parser.add_argument(
+            "--scheme-cache",
+            metavar="Dir",
+            type=str,
+            help="Directory to store and reuse the parsed primer scheme index.",
+            required=False,
+        )
 
     def run(self) -> None:
         self._calculate_amplicon_coverage()
 
-    def _calculate_amplicon_coverage(self) -> None:
+    def _calculate_amplicon_coverage(self, coverages: pd.DataFrame | None = None) -> None:
         """
         Calculates amplicon coverage and writes the results to the output file.
+        An already loaded coverage table (see `_open_tsv_file`) can be given, otherwise it is read from `self.coverages`.
         """
-        primers = self._open_tsv_file(self.input)  # _open_tsv_file handles empty files, will return empty df
-        if primers.empty:
-            final_df = pd.DataFrame(columns=[], index=[self.key])
-            self._write_output(final_df, self.output)
-            return
-        primers = self._split_primer_names(primers)
-        amplicon_sizes = self._calculate_amplicon_start_end(primers)
-
-        coverages = self._open_tsv_file(self.coverages, index_col=0)
-        amplicon_sizes["coverage"] = amplicon_sizes.apply(lambda x: self._calculate_mean_coverage(x, coverages), axis=1)
-        amplicon_sizes["amplicon_names"] = self._create_amplicon_names_list(primers)
+        index_path = self._scheme_index_path(self.scheme_cache, self.input) if self.scheme_cache else None
+        amplicon_sizes = self._read_scheme_index(index_path) if index_path else None
+        if amplicon_sizes is None:
+            primers = self._open_tsv_file(self.input)  # _open_tsv_file handles empty files, will return empty df
+            if primers.empty:
+                final_df = pd.DataFrame(columns=[], index=[self.key])
+                self._write_output(final_df, self.output)
+                return
+            primers = self._split_primer_names(primers)
+            amplicon_sizes = self._calculate_amplicon_start_end(primers)
+            amplicon_sizes["amplicon_names"] = self._create_amplicon_names_list(primers)
+            if index_path:
+                self._write_scheme_index(index_path, amplicon_sizes, primers)
+
+        if coverages is None:
+            coverages = self._open_tsv_file(self.coverages, index_col=0)
+        prefix_sum = self._coverage_prefix_sum(coverages)
+        amplicon_sizes["coverage"] = [
+            self._calculate_mean_coverage(int(start), int(end), prefix_sum) for start, end in zip(amplicon_sizes["start"], amplicon_sizes["end"])
+        ]
 
         final_df = pd.DataFrame(
             [amplicon_sizes["coverage"].values],
@@ -310,6 +356,59 @@ class AmpliconCovs(BaseScript):
 
         self._write_output(final_df, self.output)
 
+    @staticmethod
+    def _scheme_index_path(scheme_cache: Path | str, primers_file: Path | str) -> Path:
+        """
+        Returns the path of the scheme index for the given primer BED file, named after the SHA-256 hash of its content.
+        """
+        digest = hashlib.sha256(Path(primers_file).read_bytes()).hexdigest()
+        return Path(scheme_cache) / f"{digest}.v{SCHEME_INDEX_VERSION}.json"
+
+    @staticmethod
+    def _read_scheme_index(index_path: Path) -> pd.DataFrame | None:
+        """
+        Reads the amplicon names and intervals from a scheme index.
+        Returns None if the index does not exist or can not be read, so the scheme is parsed again.
+        """
+        try:
+            with open(index_path) as index_file:
+                amplicons = json.load(index_file)["amplicons"]
+        except (OSError, ValueError, KeyError):
+            return None
+        return pd.DataFrame(
+            {
+                "amplicon_number": [amplicon["number"] for amplicon in amplicons],
+                "start": np.array([amplicon["start"] for amplicon in amplicons], dtype=float),
+                "end": np.array([amplicon["end"] for amplicon in amplicons], dtype=float),
+                "amplicon_names": [amplicon["name"] for amplicon in amplicons],
+            }
+        )
+
+    @staticmethod
+    def _write_scheme_index(index_path: Path, amplicon_sizes: pd.DataFrame, primers: pd.DataFrame) -> None:
+        """
+        Writes the parsed primer scheme to a scheme index.
+        The index is written to a temporary file first and then moved in place, so concurrent jobs for the same scheme
+        never read a partially written index.
+        """
+        directions = primers.groupby("count")["direction"].agg(lambda values: sorted({direction.name for direction in values})).to_dict()
+        amplicons = [
+            {
+                "number": int(number),
+                "name": name,
+                "directions": directions[number],
+                "start": float(start),
+                "end": float(end),
+            }
+            for number, name, start, end in zip(
+                amplicon_sizes["amplicon_number"], amplicon_sizes["amplicon_names"], amplicon_sizes["start"], amplicon_sizes["end"]
+            )
+        ]
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=index_path.parent, suffix=".tmp", delete=False) as index_file:
+            json.dump({"version": SCHEME_INDEX_VERSION, "amplicons": amplicons}, index_file)
+        os.replace(index_file.name, index_path)
+
     @staticmethod
     def _open_tsv_file(filename: Path | str, index_col: int | None = None) -> pd.DataFrame:
         """
@@ -327,27 +426,18 @@ class AmpliconCovs(BaseScript):
     def _split_primer_names(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Splits the primer names in the DataFrame into separate columns using the parser.
-        """
 
-        def _process_primer_row(row: pd.Series) -> pd.Series:
-            primer_name = row[3]  # Get the primer name from column 3
-
-            # Use the parser to parse the primer name
-            parser_primer_name = self.parser.parse(primer_name)
-
-            # Set the parsed values using attribute access
-            row["name"] = parser_primer_name.name
-            row["count"] = int(parser_primer_name.count)
-            row["alt"] = parser_primer_name.alt
-            row["direction"] = parser_primer_name.direction
-
-            return row
+        The primer names (column 3) are parsed once each and the parsed values are added as whole columns.
+        """
+        parsed_primer_names = [self.parser.parse(primer_name) for primer_name in df[3]]
 
-        # Apply the parsing function to each row
-        df = df.apply(_process_primer_row, axis=1)
+        df = df.copy()
+        df["name"] = [primer.name for primer in parsed_primer_names]
+        df["count"] = [int(primer.count) for primer in parsed_primer_names]
+        df["alt"] = [primer.alt for primer in parsed_primer_names]
+        df["direction"] = [primer.direction for primer in parsed_primer_names]
         return df
 
-    # TODO: reduce complexity of this function
     @staticmethod
     def _calculate_amplicon_start_end(primers: pd.DataFrame) -> pd.DataFrame:
         """
@@ -360,54 +450,34 @@ class AmpliconCovs(BaseScript):
             (or current RIGHT primer's start for last amplicon)
 
         This ensures true non-overlapping amplicon regions for accurate coverage calculation.
+        The primer positions of all amplicons are aggregated with a single groupby per primer direction, after which
+        every amplicon only needs constant time lookups of its own and its neighbouring amplicons' positions.
         """
         amplicon_numbers = sorted(primers["count"].unique())
-        df = pd.DataFrame(amplicon_numbers, columns=["amplicon_number"])
 
-        for idx, amplicon_number in enumerate(amplicon_numbers):
-            amplicon_group = primers[primers["count"] == amplicon_number]
+        grouped = primers.groupby("count")
+        forward = primers[primers["direction"] == ReadDirection.FORWARD].groupby("count")
+        reverse = primers[primers["direction"] == ReadDirection.REVERSE].groupby("count")
+        primer_start_min, primer_end_max = grouped[1].min().to_dict(), grouped[2].max().to_dict()
+        forward_start_min, forward_end_max = forward[1].min().to_dict(), forward[2].max().to_dict()
+        reverse_start_min, reverse_end_max = reverse[1].min().to_dict(), reverse[2].max().to_dict()
 
-            # Get forward (LEFT) and reverse (RIGHT) primers for this amplicon
-            forward_primers = amplicon_group[amplicon_group["direction"] == ReadDirection.FORWARD]
-            reverse_primers = amplicon_group[amplicon_group["direction"] == ReadDirection.REVERSE]
+        starts, ends = [], []
+        for idx, amplicon_number in enumerate(amplicon_numbers):
+            # Fallbacks: end of own LEFT primer for the start, start of own RIGHT primer for the end, or the outer
+            # primer coordinates of the amplicon if the primer in that direction is missing.
+            own_start = forward_end_max.get(amplicon_number, primer_start_min[amplicon_number])
+            own_end = reverse_start_min.get(amplicon_number, primer_end_max[amplicon_number])
 
-            # Determine start position
             if idx == 0:
-                # First amplicon: start at end of own LEFT primer
-                if not forward_primers.empty:
-                    amplicon_start = forward_primers[2].max()  # Column 2 is the end position
-                else:
-                    amplicon_start = amplicon_group[1].min()
+                amplicon_start = own_start
             else:
-                # Subsequent amplicons: start at end of previous amplicon's RIGHT primer
-                prev_amplicon_number = amplicon_numbers[idx - 1]
-                prev_amplicon_group = primers[primers["count"] == prev_amplicon_number]
-                prev_reverse_primers = prev_amplicon_group[prev_amplicon_group["direction"] == ReadDirection.REVERSE]
-
-                if not prev_reverse_primers.empty:
-                    amplicon_start = prev_reverse_primers[2].max()  # Column 2 is the end position
-                else:
-                    # Fallback to own LEFT primer end
-                    amplicon_start = forward_primers[2].max() if not forward_primers.empty else amplicon_group[1].min()
-
-            # Determine end position
+                amplicon_start = reverse_end_max.get(amplicon_numbers[idx - 1], own_start)
+
             if idx == len(amplicon_numbers) - 1:
-                # Last amplicon: end at start of own RIGHT primer
-                if not reverse_primers.empty:
-                    amplicon_end = reverse_primers[1].min()  # Column 1 is the start position
-                else:
-                    amplicon_end = amplicon_group[2].max()
+                amplicon_end = own_end
             else:
-                # Non-last amplicons: end at start of next amplicon's LEFT primer
-                next_amplicon_number = amplicon_numbers[idx + 1]
-                next_amplicon_group = primers[primers["count"] == next_amplicon_number]
-                next_forward_primers = next_amplicon_group[next_amplicon_group["direction"] == ReadDirection.FORWARD]
-
-                if not next_forward_primers.empty:
-                    amplicon_end = next_forward_primers[1].min()  # Column 1 is the start position
-                else:
-                    # Fallback to own RIGHT primer start
-                    amplicon_end = reverse_primers[1].min() if not reverse_primers.empty else amplicon_group[2].max()
+                amplicon_end = forward_start_min.get(amplicon_numbers[idx + 1], own_end)
 
             # Validate that start < end
             if amplicon_start >= amplicon_end:
@@ -416,18 +486,43 @@ class AmpliconCovs(BaseScript):
                     f"is greater than or equal to end position ({amplicon_end}). "
                     f"This may indicate malformed primer data."
                 )
+            starts.append(amplicon_start)
+            ends.append(amplicon_end)
+
+        return pd.DataFrame(
+            {
+                "amplicon_number": amplicon_numbers,
+                "start": np.array(starts, dtype=float),
+                "end": np.array(ends, dtype=float),
+            }
+        )
 
-            df.loc[df["amplicon_number"] == amplicon_number, "start"] = amplicon_start
-            df.loc[df["amplicon_number"] == amplicon_number, "end"] = amplicon_end
+    @staticmethod
+    def _coverage_prefix_sum(coverages: pd.DataFrame) -> np.ndarray:
+        """
+        Creates the prefix sum of the per-position coverages, with a leading 0.
 
-        return df
+        Integer coverages are summed as 64-bit integers, so every window sum taken from the prefix sum is exact and the
+        resulting means are identical to taking the mean of the coverage window directly.
+        """
+        values = coverages.iloc[:, 0].to_numpy()
+        dtype = np.int64 if np.issubdtype(values.dtype, np.integer) else np.float64
+        prefix_sum = np.zeros(len(values) + 1, dtype=dtype)
+        np.cumsum(values, dtype=dtype, out=prefix_sum[1:])
+        return prefix_sum
 
     @staticmethod
-    def _calculate_mean_coverage(input_array: pd.Series, coverages: pd.DataFrame) -> float:
+    def _calculate_mean_coverage(start: int, end: int, prefix_sum: np.ndarray) -> float:
         """
-        Calculates the mean coverage for a given amplicon.
+        Calculates the mean coverage for a given amplicon from the coverage prefix sum.
+
+        The amplicon covers the 1-based positions ``start`` up to and including ``end``. Positions outside of the
+        coverage data are ignored, an amplicon without any coverage data has a mean coverage of NaN.
         """
-        return round(float(coverages.iloc[int(input_array["start"]) - 1 : int(input_array["end"])].mean().values[0]), 2)
+        window_start, window_end, _ = slice(start - 1, end).indices(len(prefix_sum) - 1)
+        if window_end <= window_start:
+            return float("nan")
+        return round(float((prefix_sum[window_end] - prefix_sum[window_start]) / (window_end - window_start)), 2)
 
     @staticmethod
     def _create_amplicon_names_list(primers: pd.DataFrame) -> list[str]:
@@ -1,22 +1,45 @@
 from argparse import ArgumentParser
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
-from Bio import SeqIO
 from helpers.base_script_class import BaseScript  # type: ignore[import]  # noqa: F401,E402
 
+DEFAULT_THRESHOLDS = (1, 5, 10, 50, 100)
+# bytes that are not part of a sequence line in a FASTA file, identical to what Bio.SeqIO strips from sequence lines
+FASTA_WHITESPACE = b" \t\r\n"
+
 
 class Boc(BaseScript):
+    """
+    Calculates the breadth of coverage of a sample at a set of minimal depths.
+
+    Parameters
+    ----------
+    input : Path | str
+        Path to the reference FASTA file, the length of the last record is used as the genome length.
+    output : Path | str
+        Path to the output TSV file, a single line with the sample name and the breadth (%) for every threshold.
+    samplename : str
+        Name of the sample.
+    coverage : Path | str
+        Path to the per-position coverage TSV file, the first line is skipped as header.
+    thresholds : list[int] | None, optional
+        Minimal depths to calculate the breadth of coverage at (default is 1, 5, 10, 50 and 100).
+    """
+
     def __init__(
         self,
         input: Path | str,
         output: Path | str,
         samplename: str,
         coverage: Path | str,
+        thresholds: list[int] | None = None,
     ) -> None:
         super().__init__(input, output)
         self.samplename = samplename
         self.coverages = coverage
+        self.thresholds = list(thresholds) if thresholds else list(DEFAULT_THRESHOLDS)
 
     @classmethod
     def add_arguments(cls, parser: ArgumentParser) -> None:
@@ -35,6 +58,13 @@ class Boc(BaseScript):
             type=str,
             required=True,
         )
+        parser.add_argument(
+            "--thresholds",
+            metavar="Int,Int,...",
+            help="Comma separated minimal depths to calculate the breadth of coverage at.",
+            type=lambda value: [int(threshold) for threshold in value.split(",")],
+            default=list(DEFAULT_THRESHOLDS),
+        )
 
     def run(self) -> None:
         self._boc()
@@ -43,15 +73,61 @@ class Boc(BaseScript):
         assert isinstance(self.input, (Path, str)), "Input should be a string path to the GFF file."
         assert isinstance(self.output, (Path, str)), "Output should be a string path for the extracted GFF record."
 
-        df = pd.read_csv(self.coverages, sep="\t", index_col=0)
+        depths = self._read_depths(self.coverages)
+        genome_length = self._reference_length(self.input)
+        breadths = self._breadth_of_coverage(depths, genome_length, self.thresholds)
+        self._write_output(self.output, self.samplename, breadths)
+
+    @staticmethod
+    def _write_output(output: Path | str, samplename: str, breadths: list[float]) -> None:
+        """
+        Writes the sample name and the breadth of coverage at every threshold as a single tab separated line.
+        """
+        with open(output, "w") as f:
+            f.write("\t".join([samplename, *map(str, breadths)]) + "\n")
+
+    @staticmethod
+    def _read_depths(coverages: Path | str) -> np.ndarray:
+        """
+        Reads the depth column (the first column after the position index) of a coverage file into an array.
+        """
+        return pd.read_csv(coverages, sep="\t", usecols=[1]).iloc[:, 0].to_numpy()
+
+    @staticmethod
+    def _reference_length(fasta: Path | str) -> int:
+        """
+        Returns the sequence length of the last record in a FASTA file.
+
+        The length is taken from the ``.fai`` index when one exists that is at least as recent as the FASTA file,
+        otherwise the sequence lines of the FASTA file are streamed and counted without building the sequences.
+        """
+        fai = Path(f"{fasta}.fai")
+        if fai.exists() and fai.stat().st_mtime >= Path(fasta).stat().st_mtime:
+            with open(fai) as index:
+                records = [line.split("\t") for line in index if line.strip()]
+            if records:
+                return int(records[-1][1])
+
+        length = 0
+        with open(fasta, "rb") as fasta_file:
+            for line in fasta_file:
+                if line.startswith(b">"):
+                    length = 0
+                else:
+                    length += len(line.translate(None, FASTA_WHITESPACE))
+        return length
 
-        for record in SeqIO.parse(self.input, "fasta"):
-            a = len(record.seq)
+    @staticmethod
+    def _breadth_of_coverage(depths: np.ndarray, genome_length: int, thresholds: list[int]) -> list[float]:
+        """
+        Calculates the breadth of coverage (%) of the genome at every threshold.
 
-        with open(self.output, "w") as f:
-            f.write(
-                f"{self.samplename}\t{100-(int(df[df < 1].count().iloc[0])/a)*100}\t{100-(int(df[df < 5].count().iloc[0])/a)*100}\t{100-(int(df[df < 10].count().iloc[0])/a)*100}\t{100-(int(df[df < 50].count().iloc[0])/a)*100}\t{100-(int(df[df < 100].count().iloc[0])/a)*100}\n"
-            )
+        The depths are sorted once, after which the number of positions below every threshold is found with a single
+        binary search per threshold. Missing depths (NaN) are sorted to the end and never count as below a threshold.
+        """
+        sorted_depths = np.sort(depths)
+        below = np.searchsorted(sorted_depths, thresholds, side="left")
+        return [100 - (int(count) / genome_length) * 100 for count in below]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,90 @@
+"""
+Packs the per-position coverage files of all samples of a reference into a single depth matrix.
+
+The depth matrix (see `helpers/depth_matrix.py`) is a directory with one memory-mappable matrix of samples × positions,
+split into chunks of positions, and an index with the sample names. Cross-sample coverage analyses read slices of the
+matrix with `helpers.depth_matrix.DepthMatrix` instead of parsing the coverage file of every sample.
+
+Examples
+--------
+>>> BuildDepthMatrix(
+...     input="empty",
+...     output="depth_matrix",
+...     coverages=["sample1_coverage.tsv", "sample2_coverage.tsv"],
+...     samples=["sample1", "sample2"],
+... ).run()
+"""
+
+from argparse import ArgumentParser
+from pathlib import Path
+
+from helpers.base_script_class import BaseScript  # type: ignore[import]  # noqa: F401,E402
+from helpers.depth_matrix import DEFAULT_CHUNK_SIZE, write_depth_matrix  # type: ignore[import]  # noqa: E402
+
+
+class BuildDepthMatrix(BaseScript):
+    """
+    Writes the depth matrix of the samples of a reference.
+
+    Parameters
+    ----------
+    input : Path | str
+        Not used, the coverage files are given with `coverages`.
+    output : Path | str
+        Path to the depth matrix directory.
+    coverages : list[Path | str]
+        Paths to the per-position coverage TSV files, one per sample.
+    samples : list[str]
+        Names of the samples, in the order of `coverages`.
+    chunk_size : int, optional
+        Number of positions per chunk of the matrix (default is `DEFAULT_CHUNK_SIZE`).
+    """
+
+    def __init__(
+        self,
+        input: Path | str,
+        output: Path | str,
+        coverages: list[Path | str],
+        samples: list[str],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        super().__init__(input, output)
+        if len(coverages) != len(samples):
+            raise ValueError(f"Got {len(coverages)} coverage files for {len(samples)} samples.")
+        self.coverages = coverages
+        self.samples = samples
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def add_arguments(cls, parser: ArgumentParser) -> None:
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--coverages",
+            nargs="+",
+            metavar="File",
+            help="Per-position coverage files, one per sample.",
+            type=str,
+            required=True,
+        )
+        parser.add_argument(
+            "--samples",
+            nargs="+",
+            metavar="String",
+            help="Names of the samples, in the order of the coverage files.",
+            type=str,
+            required=True,
+        )
+        parser.add_argument(
+            "--chunk-size",
+            metavar="Int",
+            help="Number of positions per chunk of the matrix.",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+        )
+
+    def run(self) -> None:
+        write_depth_matrix(self.output, list(zip(self.samples, self.coverages)), self.chunk_size)
+
+
+if __name__ == "__main__":
+    BuildDepthMatrix.main()
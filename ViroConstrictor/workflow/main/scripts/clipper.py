@@ -1,9 +1,31 @@
+import os
+import shutil
+import sys
 from argparse import ArgumentParser
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import BinaryIO
 
 import pysam
 from helpers.base_script_class import BaseScript  # type: ignore[import]  # noqa: F401,E402
 
+# IUPAC complement of every nucleotide code emitted by the aligner, used to reverse complement reads on the reverse strand.
+COMPLEMENT_TABLE = bytes.maketrans(b"ACGTRYKMSWBVDHN", b"TGCAYRMKSWVBHDN")
+
+# Translates raw phred scores to their phred+33 ASCII representation as written to FASTQ.
+PHRED_OFFSET_TABLE = bytes((score + 33) % 256 for score in range(256))
+
+# pysam cigar operation code for a skipped region of the reference (``N``), i.e. a splice junction.
+CIGAR_REF_SKIP = 3
+
+# Number of FASTQ records that are collected in memory before they are written to the output file in one call.
+WRITE_BATCH_SIZE = 4096
+
+# Number of coordinate shards created per worker process. Using more shards than workers evens out the load when
+# read depth is unevenly distributed over the reference, as is typical for amplicon data.
+SHARDS_PER_WORKER = 4
+
 
 class Clipper(BaseScript):
     """
@@ -14,7 +36,7 @@ class Clipper(BaseScript):
     input : str
         Path to the input BAM file.
     output : str
-        Path to the output file where cleaned FASTQ reads will be saved.
+        Path to the output file where cleaned FASTQ reads will be saved, BGZF compressed if the path ends with ``.gz``.
     exclude_spliced : bool, optional
         Whether to exclude spliced reads from the output.
     spliced_length_threshold : int, optional
@@ -27,6 +49,9 @@ class Clipper(BaseScript):
         Region to include reads where the aligned section starts and ends within the specified region.
     threads : int, optional
         Number of threads for decompressing/compressing the BAM file.
+    workers : int, optional
+        Number of worker processes. When larger than 1 and the BAM file is indexed, the reference is split into
+        coordinate shards that are filtered in parallel and merged in shard order afterwards.
 
     Methods
     -------
@@ -44,6 +69,7 @@ class Clipper(BaseScript):
         max_aligned_length: float = 0,
         only_include_region: str | None = None,
         threads: int = 1,
+        workers: int = 1,
     ) -> None:
         super().__init__(input, output)
         self.exclude_spliced = exclude_spliced
@@ -52,6 +78,7 @@ class Clipper(BaseScript):
         self.max_aligned_length = max_aligned_length
         self.only_include_region = only_include_region
         self.threads = threads
+        self.workers = workers
 
     @classmethod
     def add_arguments(cls, parser: ArgumentParser) -> None:
@@ -97,139 +124,235 @@ class Clipper(BaseScript):
             default=1,
             help="Number of threads for decompressing/compressing the BAM file.",
         )
+        parser.add_argument(
+            "--workers",
+            metavar="Number",
+            type=int,
+            default=1,
+            help="Number of worker processes that filter coordinate shards of the (indexed) BAM file in parallel.",
+        )
 
     def run(self) -> None:
+        if self.workers > 1 and self._index_exists():
+            self._process_shards()
+            return
+        if self.workers > 1:
+            print(f"No index found for {self.input}, processing reads with a single worker.", file=sys.stderr)
         self._process_reads()
 
+    def _index_exists(self) -> bool:
+        """
+        Check whether a ``.bai`` or ``.csi`` index exists next to the input BAM file.
+
+        Returns
+        -------
+        bool
+            True if an index file exists, False otherwise.
+        """
+        return any(os.path.exists(f"{self.input}{suffix}") for suffix in (".bai", ".csi"))
+
     def _process_reads(self) -> None:
         """
-        Processes reads from the BAM file based on the provided criteria and writes them to the output file.
+        Processes all reads from the BAM file serially and writes them to the output file.
         """
-        bamfile = pysam.AlignmentFile(self.input, "rb", threads=self.threads)
-        reflength = bamfile.lengths[0]
-        minimal_read_length = int(reflength * self.min_aligned_length)
-        maximum_read_length = int(reflength if self.max_aligned_length == 0 else self.max_aligned_length)
+        with pysam.AlignmentFile(self.input, "rb", threads=self.threads) as bamfile, self._open_output(self.output) as fileout:
+            self._filter_reads(bamfile, bamfile.lengths[0], fileout)
 
-        include_region_start = int(self.only_include_region.split(":")[0]) if self.only_include_region else None
-        include_region_end = int(self.only_include_region.split(":")[1]) if self.only_include_region else None
-
-        with open(self.output, "w") as fileout:
-            for read in bamfile:
-                read_start = read.query_alignment_start
-                read_end = read.query_alignment_end
-                ref_start = read.reference_start
-                ref_end = read.reference_end
-                trimmed_seq = read.query_alignment_sequence
-                trimmed_qual = read.qual[read_start:read_end]
-
-                if read.is_reverse:
-                    complement = {
-                        "A": "T",
-                        "C": "G",
-                        "G": "C",
-                        "T": "A",
-                        "R": "Y",
-                        "Y": "R",
-                        "K": "M",
-                        "M": "K",
-                        "S": "S",
-                        "W": "W",
-                        "B": "V",
-                        "V": "B",
-                        "D": "H",
-                        "H": "D",
-                        "N": "N",
-                    }
-                    bases = [complement[base] for base in trimmed_seq]
-                    trimmed_seq = "".join(bases[::-1])
-                    trimmed_qual = trimmed_qual[::-1]
-
-                if len(trimmed_seq) == 0:
-                    continue
+    def _open_output(self, path: Path | str) -> BinaryIO:
+        """
+        Open an output file for writing FASTQ records, BGZF compressed when the output file ends with ``.gz``.
 
-                if self.exclude_spliced:
-                    cigartuples = self._split_cigar(read.cigarstring)
-                    if self._is_spliced(cigartuples) and (self._get_largest_spliced_len(cigartuples) > self.spliced_length_threshold):
-                        continue
+        Parameters
+        ----------
+        path : Path | str
+            Path to the file to open.
 
-                if read.query_alignment_length <= minimal_read_length:
-                    continue
+        Returns
+        -------
+        BinaryIO
+            The opened file object.
+        """
+        if str(self.output).endswith(".gz"):
+            return pysam.BGZFile(str(path), "wb")
+        return open(path, "wb")
 
-                if read.query_alignment_length >= maximum_read_length:
-                    continue
+    def _process_shards(self) -> None:
+        """
+        Processes the reads of the indexed BAM file in coordinate shards using a pool of worker processes.
+
+        Every read is assigned to the shard that contains its reference start position, so each read is processed
+        exactly once. Shard outputs are merged in shard order, which follows the coordinate order of the BAM file,
+        resulting in the same output as when the reads are processed serially. Compressed shard outputs are separate
+        BGZF streams that can be concatenated as is.
+        """
+        with pysam.AlignmentFile(self.input, "rb") as bamfile:
+            shards = self._make_shards(bamfile.references, bamfile.lengths, self.workers * SHARDS_PER_WORKER)
+            reflength = bamfile.lengths[0]
 
-                if include_region_start is not None and include_region_end is not None:
-                    if ref_start < include_region_start or ref_end > include_region_end:
-                        continue
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            shard_outputs = list(executor.map(self._process_shard, shards, [reflength] * len(shards)))
 
-                fileout.write(f"@{read.query_name}\n{trimmed_seq}\n+\n{trimmed_qual}\n")
+        with open(self.output, "wb") as fileout:
+            for shard_output in shard_outputs:
+                with open(shard_output, "rb") as shard_file:
+                    shutil.copyfileobj(shard_file, fileout)
+                os.remove(shard_output)
 
     @staticmethod
-    def _split_cigar(cigar: str) -> list[tuple[int, str]]:
+    def _make_shards(references: Iterable[str], lengths: Iterable[int], shards_per_reference: int) -> list[tuple[int, str, int, int]]:
         """
-        Split a CIGAR string into a list of tuples.
+        Split every reference into consecutive, non-overlapping coordinate shards of (nearly) equal size.
 
         Parameters
         ----------
-        cigar : str
-            The CIGAR string to be split.
+        references : Iterable[str]
+            Names of the references in the BAM header.
+        lengths : Iterable[int]
+            Lengths of the references in the BAM header.
+        shards_per_reference : int
+            Number of shards each reference is split into, references shorter than this are split per position.
 
         Returns
         -------
-        list
-            A list of tuples, where each tuple contains two elements:
-            - The number of consecutive characters.
-            - The character itself.
-        """
-        cigar_tuples = []
-        current_number = ""
-        for char in cigar:
-            if char.isdigit():
-                current_number += char
-            else:
-                cigar_tuples.append((int(current_number), char))
-                current_number = ""
-        return cigar_tuples
+        list[tuple[int, str, int, int]]
+            A list of ``(shard_number, reference, start, end)`` tuples in coordinate order, with 0-based half-open
+            coordinates.
+        """
+        shards = []
+        for reference, length in zip(references, lengths):
+            step = max(1, -(-length // shards_per_reference))
+            for start in range(0, length, step):
+                shards.append((len(shards), reference, start, min(start + step, length)))
+        return shards
+
+    def _process_shard(self, shard: tuple[int, str, int, int], reflength: int) -> str:
+        """
+        Filter the reads that start within a single coordinate shard and write them to a temporary shard output.
+
+        Parameters
+        ----------
+        shard : tuple[int, str, int, int]
+            The ``(shard_number, reference, start, end)`` tuple describing the shard.
+        reflength : int
+            Length of the first reference, used to calculate the aligned length filters.
+
+        Returns
+        -------
+        str
+            Path to the FASTQ file containing the filtered reads of this shard.
+        """
+        shard_number, reference, start, end = shard
+        shard_output = f"{self.output}.shard{shard_number}"
+        threads = max(1, self.threads // self.workers)
+        with pysam.AlignmentFile(self.input, "rb", threads=threads) as bamfile, self._open_output(shard_output) as fileout:
+            # fetch also returns reads that start in a previous shard but overlap with this one
+            reads = (read for read in bamfile.fetch(reference, start, end) if read.reference_start >= start)
+            self._filter_reads(reads, reflength, fileout)
+        return shard_output
+
+    def _filter_reads(self, reads: Iterable[pysam.AlignedSegment], reflength: int, fileout: BinaryIO) -> None:
+        """
+        Filters reads based on the provided criteria and writes the remaining reads to the output file as FASTQ.
+
+        Reads are checked against the cheap length, region and splice filters before any sequence work is done.
+        Sequences and qualities are handled as bytes and converted with precomputed translation tables, and
+        FASTQ records are written to the output in batches of ``WRITE_BATCH_SIZE`` records.
+
+        Parameters
+        ----------
+        reads : Iterable[pysam.AlignedSegment]
+            The reads to filter.
+        reflength : int
+            Length of the reference, used to calculate the aligned length filters.
+        fileout : BinaryIO
+            The opened output file the FASTQ records are written to.
+        """
+        minimal_read_length = int(reflength * self.min_aligned_length)
+        maximum_read_length = int(reflength if self.max_aligned_length == 0 else self.max_aligned_length)
+
+        include_region = bool(self.only_include_region)
+        include_region_start = int(self.only_include_region.split(":")[0]) if include_region else 0  # type: ignore[union-attr]
+        include_region_end = int(self.only_include_region.split(":")[1]) if include_region else 0  # type: ignore[union-attr]
+
+        exclude_spliced = self.exclude_spliced
+        spliced_length_threshold = self.spliced_length_threshold
+        complement_table = COMPLEMENT_TABLE
+        phred_table = PHRED_OFFSET_TABLE
+        batch: list[bytes] = []
+
+        for read in reads:
+            aligned_length = read.query_alignment_length
+            if aligned_length == 0 or aligned_length <= minimal_read_length or aligned_length >= maximum_read_length:
+                continue
+
+            if include_region and (read.reference_start < include_region_start or read.reference_end > include_region_end):
+                continue
+
+            if exclude_spliced:
+                cigar_tuples = read.cigartuples
+                if self._is_spliced(cigar_tuples) and self._get_largest_spliced_len(cigar_tuples) > spliced_length_threshold:
+                    continue
+
+            read_start = read.query_alignment_start
+            read_end = read.query_alignment_end
+            trimmed_seq = read.query_sequence[read_start:read_end].encode("ascii")
+            trimmed_qual = bytes(read.query_qualities[read_start:read_end]).translate(phred_table)
+
+            if read.is_reverse:
+                trimmed_seq = trimmed_seq.translate(complement_table)[::-1]
+                trimmed_qual = trimmed_qual[::-1]
+
+            batch.append(b"@%s\n%s\n+\n%s\n" % (read.query_name.encode("ascii"), trimmed_seq, trimmed_qual))
+            if len(batch) >= WRITE_BATCH_SIZE:
+                fileout.write(b"".join(batch))
+                batch.clear()
+
+        if batch:
+            fileout.write(b"".join(batch))
 
     @staticmethod
-    def _is_spliced(cigar_tuples: list[tuple[int, str]]) -> bool:
+    def _is_spliced(cigar_tuples: list[tuple[int, int]]) -> bool:
         """
         Check if the given list of cigar tuples contains any spliced regions.
 
         Parameters
         ----------
         cigar_tuples : list
-            A list of cigar tuples representing the alignment.
+            A list of ``(operation, length)`` cigar tuples as given by ``pysam.AlignedSegment.cigartuples``.
 
         Returns
         -------
         bool
             True if there are spliced regions, False otherwise.
         """
-        return any(cigar_tuple[1] == "N" for cigar_tuple in cigar_tuples)
+        return any(operation == CIGAR_REF_SKIP for operation, _length in cigar_tuples)
 
     @staticmethod
-    def _get_largest_spliced_len(cigar_tuples: list[tuple[int, str]]) -> int:
+    def _get_largest_spliced_len(cigar_tuples: list[tuple[int, int]]) -> int:
         """
         Calculate the largest spliced length from a list of cigar tuples.
 
+        Consecutive reference skip (``N``) operations are summed. A run of skips is only counted once it is closed by
+        another operation, a trailing run at the end of the cigar is not taken into account.
+
         Parameters
         ----------
         cigar_tuples : list
-            A list of cigar tuples representing the cigar string.
+            A list of ``(operation, length)`` cigar tuples as given by ``pysam.AlignedSegment.cigartuples``.
 
         Returns
         -------
         int
-            The largest spliced length found in the cigar tuples.
+            The largest spliced length found in the cigar tuples, 0 if the read is not spliced.
         """
         largest_spliced_len = 0
         current_spliced_len = 0
-        for cigar_tuple in cigar_tuples:
-            if cigar_tuple[1] == "N":
-                current_spliced_len += cigar_tuple[0]
+        for operation, length in cigar_tuples:
+            if operation == CIGAR_REF_SKIP:
+                current_spliced_len += length
             else:
-                largest_spliced_len = max(largest_spliced_len, current_spliced_len)
+                if current_spliced_len > largest_spliced_len:
+                    largest_spliced_len = current_spliced_len
                 current_spliced_len = 0
         return largest_spliced_len
 
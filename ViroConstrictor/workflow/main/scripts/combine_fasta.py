@@ -1,8 +1,10 @@
 import os
 from argparse import ArgumentParser
 from pathlib import Path
+from typing import Generator
 
 from Bio import SeqIO
+from Bio.SeqRecord import SeqRecord
 from helpers.base_script_class import BaseScript
 
 
@@ -92,26 +94,46 @@ class CombineFasta(BaseScript):
                     continue
 
                 virus, refid = file_map[infile]
-
-                for record in SeqIO.parse(infile, "fasta"):
-                    # Original header format: >sampleID mincov=X
-                    # New format: >sampleID Virus RefID mincov=X
-                    header_parts = record.description.split()
-                    sample_id = header_parts[0] if header_parts else record.id
-                    extra_parts = header_parts[1:] if len(header_parts) > 1 else []
-                    if extra_parts and "mincov=" in extra_parts[-1]:
-                        mincov_part = extra_parts[-1]
-                        # description body should not repeat the sample_id because SeqIO writes ">id description"
-                        description_body = f"{virus} {refid} {mincov_part}"
-                    elif extra_parts:
-                        extra = " ".join(extra_parts)
-                        description_body = f"{extra} {virus} {refid}"
-                    else:
-                        description_body = f"{virus} {refid}"
-                    record.id = sample_id
-                    record.description = description_body
+                for record in self._rewrite_records(infile, virus, refid):
                     SeqIO.write(record, out_handle, "fasta")
 
+    @staticmethod
+    def _rewrite_records(infile: Path | str, virus: str, refid: str) -> Generator[SeqRecord, None, None]:
+        """
+        Yield the records of a FASTA file with the virus and reference ID added to their headers.
+
+        Parameters
+        ----------
+        infile : Path | str
+            Path to the input FASTA file.
+        virus : str
+            The virus name of the input file.
+        refid : str
+            The reference ID of the input file.
+
+        Yields
+        ------
+        SeqRecord
+            The records of the input file, with the header format '>sampleID Virus RefID mincov=X'.
+        """
+        for record in SeqIO.parse(infile, "fasta"):
+            # Original header format: >sampleID mincov=X
+            # New format: >sampleID Virus RefID mincov=X
+            header_parts = record.description.split()
+            sample_id = header_parts[0] if header_parts else record.id
+            extra_parts = header_parts[1:] if len(header_parts) > 1 else []
+            if extra_parts and "mincov=" in extra_parts[-1]:
+                mincov_part = extra_parts[-1]
+                # description body should not repeat the sample_id because SeqIO writes ">id description"
+                description_body = f"{virus} {refid} {mincov_part}"
+            elif extra_parts:
+                extra = " ".join(extra_parts)
+                description_body = f"{extra} {virus} {refid}"
+            else:
+                description_body = f"{virus} {refid}"
+            record.id = sample_id
+            record.description = description_body
+            yield record
 
 if __name__ == "__main__":
     CombineFasta.main()
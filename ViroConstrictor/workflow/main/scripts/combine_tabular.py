@@ -1,14 +1,44 @@
+import io
 import os
 from argparse import ArgumentParser
 from pathlib import Path
-from typing import Generator, Literal
+from typing import Generator, Iterable, Literal
 
 import pandas as pd
 from helpers.base_script_class import BaseScript
+from helpers.columnar import COLUMNAR_FORMATS, write_columnar
+from helpers.manifest import IncrementalOutput, discard_manifest
+from helpers.tabular import fit_row, read_header, read_rows, row_writer
 
 
 class CombineTabular(BaseScript):
-    """Combine TSV/CSV files and add Virus and RefID metadata columns."""
+    """
+    Combine TSV/CSV files and add Virus and RefID metadata columns.
+
+    With `columnar`, a columnar copy of the combined table is written next to it, partitioned by virus (see
+    `helpers.columnar`).
+    """
+
+    # the columns of the headerless per-sample input files and of the combined output, per file type
+    COLUMNS = {
+        "coverage": (
+            ["Sample_name", "Width_at_mincov_1", "Width_at_mincov_5", "Width_at_mincov_10", "Width_at_mincov_50", "Width_at_mincov_100"],
+            [
+                "Sample_name",
+                "Virus",
+                "Reference_ID",
+                "Width_at_mincov_1",
+                "Width_at_mincov_5",
+                "Width_at_mincov_10",
+                "Width_at_mincov_50",
+                "Width_at_mincov_100",
+            ],
+        ),
+        "mutations": (
+            ["Sample", "Reference_ID", "Position", "Reference_Base", "Variant_Base", "Depth"],
+            ["Sample", "Virus", "Reference_ID", "Position", "Reference_Base", "Variant_Base", "Depth"],
+        ),
+    }
 
     def __init__(
         self,
@@ -19,6 +49,7 @@ class CombineTabular(BaseScript):
         refid_list: list[str],
         file_type: Literal["mutations", "coverage", "amplicon_coverage"],
         separator: str = "\t",
+        columnar: str | None = None,
     ) -> None:
         super().__init__(input, output)
         self.input_files = input_files
@@ -26,6 +57,7 @@ class CombineTabular(BaseScript):
         self.refid_list = refid_list
         self.file_type = file_type
         self.separator = separator
+        self.columnar = columnar
 
     @classmethod
     def add_arguments(cls, parser: ArgumentParser) -> None:
@@ -64,12 +96,20 @@ class CombineTabular(BaseScript):
             type=str,
             default="\t",
         )
+        parser.add_argument(
+            "--columnar",
+            choices=COLUMNAR_FORMATS,
+            help="Also write a columnar copy of the combined table, partitioned by virus (default: none).",
+            type=str,
+            default=None,
+        )
 
     def run(self) -> None:
         """
         Executes the tabular combination process.
 
-        This method calls the internal `_combine_tabular` function to combine tabular data as part of the workflow.
+        This method calls the internal `_combine_tabular` function to combine tabular data as part of the workflow, and
+        writes the columnar copy of the combined table when requested.
 
         Returns
         -------
@@ -77,6 +117,9 @@ class CombineTabular(BaseScript):
             This method does not return any value.
         """
         self._combine_tabular()
+        if self.columnar is not None:
+            # the combined amplicon coverage table is always written as CSV
+            write_columnar(self.output, "," if self.file_type == "amplicon_coverage" else self.separator, self.columnar)
 
     def _read_tabular_file(
         self,
@@ -203,22 +246,113 @@ class CombineTabular(BaseScript):
             if os.path.exists(infile) and os.path.getsize(infile) > 0:
                 yield infile
 
+    def _stream_with_metadata(
+        self,
+        file_map: dict[str | Path, tuple[str, str]],
+        column_names: list[str],
+        output_columns: list[str],
+    ) -> int:
+        """
+        Stream the rows of headerless per-sample files to the output, with Virus and Reference_ID metadata columns.
+
+        Every input file is read row by row, see `_rows_with_metadata`. The output is written incrementally with a
+        manifest sidecar (see `helpers.manifest`), the rows of input files that did not change since the previous run
+        are copied from the existing output instead of being parsed again.
+
+        Parameters
+        ----------
+        file_map : dict[str | Path, tuple[str, str]]
+            A mapping from input file paths to a tuple containing the virus name and reference ID.
+        column_names : list[str]
+            The columns of the input files.
+        output_columns : list[str]
+            The columns of the output file, the input columns plus "Virus" and "Reference_ID".
+
+        Returns
+        -------
+        int
+            The number of bytes written after the header line.
+        """
+        header = io.StringIO()
+        row_writer(header, self.separator).writerow(output_columns)
+        infiles = list(self._iter_nonempty_files())
+        sources = [(str(infile), self._source_key(file_map, infile)) for infile in infiles]
+        with IncrementalOutput(self.output, header.getvalue(), sources) as output:
+            for infile, (path, key) in zip(infiles, sources):
+                virus, refid = file_map.get(infile, ("Unknown", "Unknown"))
+                output.write(
+                    path,
+                    key,
+                    lambda: self._format_rows(
+                        self._rows_with_metadata(infile, virus, refid, column_names, output_columns, self.separator), self.separator
+                    ),
+                )
+        return output.segment_bytes
+
+    def _source_key(self, file_map: dict[str | Path, tuple[str, str]], infile: Path | str, *extra: str) -> str:
+        """
+        Returns the manifest key of an input file: everything besides the file content that determines its rows.
+        """
+        virus, refid = file_map.get(infile, ("Unknown", "Unknown"))
+        return "\t".join([self.file_type, self.separator, virus, str(refid), *extra])
+
+    @staticmethod
+    def _format_rows(rows: Iterable[list[str]], separator: str) -> str:
+        """
+        Formats rows as delimited text, like they are written to the output file.
+        """
+        text = io.StringIO()
+        row_writer(text, separator).writerows(rows)
+        return text.getvalue()
+
     @staticmethod
-    def _drop_header_row_if_present(df: pd.DataFrame, expected_header: list[str]) -> pd.DataFrame:
-        if df.empty:
-            return df
-        first_row = df.iloc[0].astype(str).tolist()
-        if first_row[: len(expected_header)] == expected_header:
-            return df.iloc[1:].reset_index(drop=True)
-        return df
+    def _rows_with_metadata(
+        infile: Path | str,
+        virus: str,
+        refid: str,
+        column_names: list[str],
+        output_columns: list[str],
+        separator: str,
+    ) -> Generator[list[str], None, None]:
+        """
+        Yield the rows of a headerless per-sample file with Virus and Reference_ID metadata columns.
+
+        A first row that equals `column_names` is a header row and is skipped. A Reference_ID column in the input is
+        replaced by the given reference ID so "NA" reference IDs are preserved.
+
+        Parameters
+        ----------
+        infile : Path | str
+            Path to the input file.
+        virus : str
+            The virus name of the input file.
+        refid : str
+            The reference ID of the input file.
+        column_names : list[str]
+            The columns of the input file.
+        output_columns : list[str]
+            The columns of the output rows, the input columns plus "Virus" and "Reference_ID".
+        separator : str
+            Field separator of the input file.
+
+        Yields
+        ------
+        list[str]
+            The fields of every data row, in the order of `output_columns`.
+        """
+        for line_number, row in enumerate(read_rows(infile, separator)):
+            row = fit_row(row, len(column_names))
+            if line_number == 0 and row == column_names:
+                continue
+            values = dict(zip(column_names, row), Virus=virus, Reference_ID=str(refid))
+            yield [values[column] for column in output_columns]
 
     def _combine_coverage(self, file_map: dict[str | Path, tuple[str, str]]) -> None:
         """
-        Combine coverage tabular files into a single DataFrame and write to output.
+        Combine coverage tabular files into a single table and write to output.
 
-        Reads multiple tabular coverage files, adds virus and reference ID metadata from the provided file map,
-        concatenates them into a single DataFrame, and writes the combined result to the specified output file.
-        If no non-empty files are found, writes an empty coverage table.
+        Streams the rows of multiple tabular coverage files to the specified output file, adding virus and reference ID
+        metadata from the provided file map. If no rows are found, writes an empty coverage table.
 
         Parameters
         ----------
@@ -228,55 +362,20 @@ class CombineTabular(BaseScript):
         Returns
         -------
         None
-            This method writes the combined DataFrame to an output file and does not return a value.
-        """
-        column_names = [
-            "Sample_name",
-            "Width_at_mincov_1",
-            "Width_at_mincov_5",
-            "Width_at_mincov_10",
-            "Width_at_mincov_50",
-            "Width_at_mincov_100",
-        ]
-        dfs = []
-        for infile in self._iter_nonempty_files():
-            df = self._read_tabular_file(infile, header=None, names=column_names)
-            if df is not None:
-                df = self._drop_header_row_if_present(df, column_names)
-                if df.empty:
-                    continue
-                virus, refid = file_map.get(infile, ("Unknown", "Unknown"))
-                df["Virus"] = virus
-                df["Reference_ID"] = str(refid)  # Convert to string to preserve "NA"
-                dfs.append(df)
-
-        if dfs:
-            combined_df = pd.concat(dfs, ignore_index=True)
-            combined_df["Reference_ID"] = combined_df["Reference_ID"].astype(str)
-            combined_df = combined_df[
-                [
-                    "Sample_name",
-                    "Virus",
-                    "Reference_ID",
-                    "Width_at_mincov_1",
-                    "Width_at_mincov_5",
-                    "Width_at_mincov_10",
-                    "Width_at_mincov_50",
-                    "Width_at_mincov_100",
-                ]
-            ]
-            combined_df.to_csv(self.output, sep=self.separator, index=False)
-        else:
+            This method writes the combined table to an output file and does not return a value.
+        """
+        column_names, output_columns = self.COLUMNS["coverage"]
+        if not self._stream_with_metadata(file_map, column_names, output_columns):
             self._write_empty_tabular("coverage")
+            discard_manifest(self.output)
 
     def _combine_mutations(self, file_map: dict[str | Path, tuple[str, str]]) -> None:
         """
-        Combine mutation data from multiple tabular files into a single DataFrame and write to output.
+        Combine mutation data from multiple tabular files into a single table and write to output.
 
-        This method iterates over a set of non-empty mutation files, reads each file into a DataFrame,
-        annotates each row with the corresponding virus name from the provided file map, and concatenates
-        all DataFrames into a single DataFrame. The combined DataFrame is then reordered and written to
-        the specified output file. If no non-empty files are found, an empty mutations file is written.
+        This method streams the rows of a set of non-empty mutation files to the specified output file, annotating
+        each row with the corresponding virus name and reference ID from the provided file map. If no rows are found,
+        an empty mutations file is written.
 
         Parameters
         ----------
@@ -288,61 +387,93 @@ class CombineTabular(BaseScript):
         None
             This method does not return a value. The combined mutations data is written to the output file.
         """
-        column_names = [
-            "Sample",
-            "Reference_ID",
-            "Position",
-            "Reference_Base",
-            "Variant_Base",
-            "Depth",
-        ]
-        dfs = []
+        column_names, output_columns = self.COLUMNS["mutations"]
+        if not self._stream_with_metadata(file_map, column_names, output_columns):
+            self._write_empty_tabular("mutations")
+            discard_manifest(self.output)
+
+    def _combine_amplicon_coverage(self, file_map: dict[str | Path, tuple[str, str]]) -> None:
+        """
+        Combine amplicon coverage tabular files into a single table with metadata columns.
+
+        Iterates over non-empty amplicon coverage files and adds virus and reference ID metadata columns based on the
+        provided file_map, with the metadata columns moved to the front. When all files share the same columns the rows
+        are streamed to the output file. Files with differing columns (e.g. schemes with a different number of
+        amplicons) are combined with pandas, which writes the union of all columns. If no valid files are found,
+        an empty CSV is written.
+
+        Parameters
+        ----------
+        file_map : dict[str | Path, tuple[str, str]]
+            A mapping from input file paths to a tuple containing the virus name and reference ID.
+
+        Returns
+        -------
+        None
+            This method writes the combined DataFrame to the output file specified by `self.output`.
+        """
+        headers = []
         for infile in self._iter_nonempty_files():
-            df = self._read_tabular_file(infile, header=None, names=column_names)
-            if df is not None:
-                # Convert Reference_ID to string BEFORE checking for header row
-                df["Reference_ID"] = df["Reference_ID"].astype(str)
-                df = self._drop_header_row_if_present(df, column_names)
-                if df.empty:
-                    continue
-                virus, refid = file_map.get(infile, ("Unknown", "Unknown"))
-                df["Virus"] = virus
-                # Overwrite Reference_ID with the known value from file_map to preserve "NA" RefIDs
-                df["Reference_ID"] = str(refid)
-                dfs.append(df)
+            header, has_rows = read_header(infile, self.separator)
+            if header is not None and has_rows:
+                headers.append((infile, header))
 
-        if dfs:
-            combined_df = pd.concat(dfs, ignore_index=True)
-            # Ensure Reference_ID remains string after concatenation
-            combined_df["Reference_ID"] = combined_df["Reference_ID"].astype(str)
-            combined_df = combined_df[
-                [
-                    "Sample",
-                    "Virus",
-                    "Reference_ID",
-                    "Position",
-                    "Reference_Base",
-                    "Variant_Base",
-                    "Depth",
-                ]
-            ]
-            combined_df.to_csv(self.output, sep=self.separator, index=False)
+        if not headers:
+            pd.DataFrame().to_csv(self.output, index=False)
+            discard_manifest(self.output)
+        elif len({tuple(header) for _, header in headers}) > 1:
+            self._combine_amplicon_coverage_dataframes(file_map, [infile for infile, _ in headers])
+            discard_manifest(self.output)
         else:
-            self._write_empty_tabular("mutations")
+            self._stream_amplicon_coverage(file_map, headers)
 
-    def _combine_amplicon_coverage(self, file_map: dict[str | Path, tuple[str, str]]) -> None:
+    def _stream_amplicon_coverage(self, file_map: dict[str | Path, tuple[str, str]], headers: list[tuple[str | Path, list[str]]]) -> None:
         """
-        Combine amplicon coverage tabular files into a single DataFrame with metadata columns.
+        Stream amplicon coverage files that all share the same columns to the output, with the metadata columns first.
+        The output is written incrementally with a manifest sidecar, like `_stream_with_metadata`.
 
-        Iterates over non-empty amplicon coverage files, reads each as a DataFrame, and appends
-        virus and reference ID metadata columns based on the provided file_map. The resulting
-        DataFrames are concatenated, metadata columns are moved to the front, and the combined
-        DataFrame is written to the output file. If no valid files are found, an empty CSV is written.
+        Parameters
+        ----------
+        file_map : dict[str | Path, tuple[str, str]]
+            A mapping from input file paths to a tuple containing the virus name and reference ID.
+        headers : list[tuple[str | Path, list[str]]]
+            Every input file that contains data rows, with its header.
+
+        Returns
+        -------
+        None
+            This method writes the combined table to the output file specified by `self.output`.
+        """
+        columns = headers[0][1]
+        output_columns = ["Virus", "Reference_ID"] + [column for column in columns if column not in ("Virus", "Reference_ID")]
+        sources = [(str(infile), self._source_key(file_map, infile)) for infile, _ in headers]
+        with IncrementalOutput(self.output, self._format_rows([output_columns], ","), sources) as output:
+            for (infile, _), (path, key) in zip(headers, sources):
+                virus, refid = file_map.get(infile, ("Unknown", "Unknown"))
+                output.write(path, key, lambda: self._format_rows(self._amplicon_rows(infile, virus, refid, columns, output_columns), ","))
+
+    def _amplicon_rows(
+        self, infile: Path | str, virus: str, refid: str, columns: list[str], output_columns: list[str]
+    ) -> Generator[list[str], None, None]:
+        """
+        Yield the data rows of an amplicon coverage file with the Virus and Reference_ID metadata columns in front.
+        """
+        rows = read_rows(infile, self.separator)
+        next(rows)
+        for row in rows:
+            values = dict(zip(columns, fit_row(row, len(columns))), Virus=virus, Reference_ID=str(refid))
+            yield [values[column] for column in output_columns]
+
+    def _combine_amplicon_coverage_dataframes(self, file_map: dict[str | Path, tuple[str, str]], infiles: list[str | Path]) -> None:
+        """
+        Combine amplicon coverage files with differing columns, the union of all columns is written.
 
         Parameters
         ----------
         file_map : dict[str | Path, tuple[str, str]]
             A mapping from input file paths to a tuple containing the virus name and reference ID.
+        infiles : list[str | Path]
+            The input files that contain data rows.
 
         Returns
         -------
@@ -350,7 +481,7 @@ class CombineTabular(BaseScript):
             This method writes the combined DataFrame to the output file specified by `self.output`.
         """
         dfs = []
-        for infile in self._iter_nonempty_files():
+        for infile in infiles:
             df = self._read_tabular_file(infile)
             if df is not None:
                 virus, refid = file_map.get(infile, ("Unknown", "Unknown"))
@@ -358,13 +489,10 @@ class CombineTabular(BaseScript):
                 df["Reference_ID"] = str(refid)  # Convert to string to preserve "NA"
                 dfs.append(df)
 
-        if dfs:
-            combined_df = pd.concat(dfs, ignore_index=True)
-            combined_df["Reference_ID"] = combined_df["Reference_ID"].astype(str)
-            combined_df = self._reorder_amplicon_columns(combined_df)
-            combined_df.to_csv(self.output, index=False)
-        else:
-            pd.DataFrame().to_csv(self.output, index=False)
+        combined_df = pd.concat(dfs, ignore_index=True)
+        combined_df["Reference_ID"] = combined_df["Reference_ID"].astype(str)
+        combined_df = self._reorder_amplicon_columns(combined_df)
+        combined_df.to_csv(self.output, index=False)
 
     def _build_file_map(self) -> dict[str | Path, tuple[str, str]]:
         """
@@ -10,7 +10,6 @@ import re
 from argparse import ArgumentParser
 from pathlib import Path
 
-import numpy as np
 import pandas as pd
 from Bio import SeqIO
 from helpers.base_script_class import BaseScript  # type: ignore[import]  # noqa: F401,E402
@@ -41,6 +40,8 @@ class GroupAminoAcids(BaseScript):
         Executes the grouping of amino acid sequences.
     _group_amino_acids()
         Internal method to perform the grouping and writing of sequences.
+    _index_samples(space_data: pd.DataFrame)
+        Internal method to index the viruses, references and feature names of every sample.
     """
 
     def __init__(self, input: str, output: str, space: str) -> None:
@@ -65,74 +66,60 @@ class GroupAminoAcids(BaseScript):
         """
         Groups amino acid sequences from input files based on sample and feature information
         and writes them to output files in a structured directory format.
+
+        The input files are processed in a single streaming pass. Every record is matched against the features of its
+        sample through an index that is built once, and appended to the bucket of every output file it belongs to.
+        Each output file is written once, after all records are bucketed.
         """
         # Validate input and output arguments
         assert isinstance(self.input, str), "Input should be a space-separated string of file paths."
         assert isinstance(self.output, str), "Output should be a space-separated string of file paths."
 
         input_files = self.input.split()
-        output_files = self.output.split()
-        space_data: pd.DataFrame = pd.read_pickle(self.space)
+        output_files = set(self.output.split())
+        sample_index = self._index_samples(pd.read_pickle(self.space))
+        feature_patterns: dict[str, re.Pattern[str]] = {}
 
         def feature_in_id(feature: str, record_id: str) -> bool:
-            pattern = rf"(?:^|[.\-_ ]){re.escape(feature)}(?:$|[.\-_ ])"
-            return re.search(pattern, record_id, re.IGNORECASE) is not None
-
-        def process_record(record: SeqIO.SeqRecord, space_data: pd.DataFrame) -> pd.DataFrame:
-            sample = record.id.split(".")[0]
-            sample_data = space_data.loc[space_data["sample"] == sample]
-            sample_data = sample_data.explode("AA_FEAT_NAMES").reset_index(drop=True)
-            sample_data = sample_data[["sample", "Virus", "RefID", "AA_FEAT_NAMES"]]
-
-            # this filter is wrong because there are many ORF's which are features that are not in the seq_record id.
-            all_unique_features = list(sample_data["AA_FEAT_NAMES"].unique())
-
-            for feature in all_unique_features:
-                if feature_in_id(feature, record.id):
-                    return sample_data.loc[sample_data["AA_FEAT_NAMES"] == feature].assign(AA_SEQ=str(record.seq))
-
-            aa_feature = ".".join(record.id.split(".")[1:])
-            return sample_data.loc[sample_data["AA_FEAT_NAMES"] == aa_feature].assign(AA_SEQ=str(record.seq))
-
-        def write_sequences(
-            virus: str,
-            ref_id: str,
-            feature_name: str,
-            output_files: list[str],
-            seq_records_df: pd.DataFrame,
-        ) -> None:
-            output_path = f"results/Virus~{virus}/RefID~{ref_id}/aminoacids/{feature_name}.faa"
+            if feature not in feature_patterns:
+                feature_patterns[feature] = re.compile(rf"(?:^|[.\-_ ]){re.escape(feature)}(?:$|[.\-_ ])", re.IGNORECASE)
+            return feature_patterns[feature].search(record_id) is not None
+
+        buckets: dict[tuple[str, str, str], list[str]] = {}
+        for input_file in input_files:
+            for record in SeqIO.parse(input_file, "fasta"):
+                sample = record.id.split(".")[0]
+                sample_features = sample_index.get(sample, [])
+
+                # the first feature of the sample that occurs in the record id, otherwise the remainder of the record id
+                matched_feature = next(
+                    (feature for feature in dict.fromkeys(row[2] for row in sample_features) if feature_in_id(feature, record.id)),
+                    ".".join(record.id.split(".")[1:]),
+                )
+                for virus, ref_id, feature in sample_features:
+                    if feature == matched_feature:
+                        buckets.setdefault((virus, ref_id, feature), []).append(f">{sample}.{feature}\n{record.seq}\n")
+
+        for (virus, ref_id, feature), sequences in buckets.items():
+            output_path = f"results/Virus~{virus}/RefID~{ref_id}/aminoacids/{feature}.faa"
             if output_path in output_files:
-                filtered_data = seq_records_df.loc[
-                    (seq_records_df["Virus"] == virus) & (seq_records_df["RefID"] == ref_id) & (seq_records_df["AA_FEAT_NAMES"] == feature_name)
-                ]
                 file_path = Path(output_path)
                 file_path.parent.mkdir(parents=True, exist_ok=True)
                 with open(file_path, "w", encoding="utf-8") as file:
-                    for _, row in filtered_data.iterrows():
-                        file.write(f">{row['sample']}.{row['AA_FEAT_NAMES']}\n{row['AA_SEQ']}\n")
+                    file.write("".join(sequences))
 
-        seq_records_df = pd.DataFrame()
-        for input_file in input_files:
-            records: list[SeqIO.SeqRecord] = list(SeqIO.parse(input_file, "fasta"))
-            for record in records:
-                processed_data = process_record(record, space_data)
-                seq_records_df = pd.concat([seq_records_df, processed_data], ignore_index=True)
-
-        unique_viruses = np.array(seq_records_df["Virus"].unique(), dtype=np.str_)
-        for virus in unique_viruses:
-            unique_ref_ids = np.array(
-                seq_records_df.loc[seq_records_df["Virus"] == virus]["RefID"].unique(),
-                dtype=np.str_,
-            )
-            for ref_id in unique_ref_ids:
-                unique_feature_names = np.array(
-                    seq_records_df.loc[(seq_records_df["Virus"] == virus) & (seq_records_df["RefID"] == ref_id)]["AA_FEAT_NAMES"].unique(),
-                    dtype=np.str_,
-                )
-                for feature_name in unique_feature_names:
-
-                    write_sequences(virus, ref_id, feature_name, output_files, seq_records_df)
+    @staticmethod
+    def _index_samples(space_data: pd.DataFrame) -> dict[str, list[tuple[str, str, str]]]:
+        """
+        Indexes the (Virus, RefID, amino acid feature name) combinations of every sample, in the order of the space file.
+        Every feature name is listed as often as it occurs for the sample, rows without feature names are skipped.
+        """
+        exploded = space_data[["sample", "Virus", "RefID", "AA_FEAT_NAMES"]].explode("AA_FEAT_NAMES")
+        sample_index: dict[str, list[tuple[str, str, str]]] = {}
+        for sample, virus, ref_id, feature in exploded.itertuples(index=False, name=None):
+            if isinstance(feature, str):
+                sample_index.setdefault(sample, []).append((virus, ref_id, feature))
+        return sample_index
 
 
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+"""
+Calculates all per-sample reporting metrics in a single process.
+
+The mutation table (`vcf_to_tsv`), the breadth of coverage (`boc`) and the amplicon coverage (`amplicon_covs`) of a
+sample are written by one job instead of three. The per-position coverage table is read once and shared between the
+breadth of coverage and the amplicon coverage calculations. The individual scripts remain available and produce
+identical outputs.
+
+Examples
+--------
+>>> metrics = ReportingMetrics(
+...     input="sample_coverage.tsv",
+...     output="sample_boc.tsv",
+...     samplename="sample",
+...     reference="reference.fasta",
+...     vcf="sample.vcf",
+...     primers="sample_primers.bed",
+...     mutations_output="sample_mutations.tsv",
+...     amplicon_output="sample_ampliconcoverage.csv",
+... )
+>>> metrics.run()
+"""
+
+from argparse import ArgumentParser
+from pathlib import Path
+
+import numpy as np
+from helpers.base_script_class import BaseScript  # type: ignore[import]  # noqa: F401,E402
+from main.scripts.amplicon_covs import AmpliconCovs  # type: ignore[import]  # noqa: E402
+from main.scripts.boc import DEFAULT_THRESHOLDS, Boc  # type: ignore[import]  # noqa: E402
+from main.scripts.vcf_to_tsv import VcfToTsv  # type: ignore[import]  # noqa: E402
+
+
+class ReportingMetrics(BaseScript):
+    """
+    Writes the mutation table, breadth of coverage and amplicon coverage of a sample.
+
+    Parameters
+    ----------
+    input : Path | str
+        Path to the per-position coverage TSV file of the sample.
+    output : Path | str
+        Path to the breadth of coverage output TSV file.
+    samplename : str
+        Name of the sample.
+    reference : Path | str
+        Path to the reference FASTA file.
+    vcf : Path | str
+        Path to the VCF file with the sample's mutations.
+    primers : Path | str
+        Path to the primer BED file of the sample, may be empty.
+    mutations_output : Path | str
+        Path to the mutation table output TSV file.
+    amplicon_output : Path | str
+        Path to the amplicon coverage output CSV file.
+    thresholds : list[int] | None, optional
+        Minimal depths to calculate the breadth of coverage at (default is 1, 5, 10, 50 and 100).
+    scheme_cache : Path | str | None, optional
+        Directory holding the parsed primer scheme indexes, see `AmpliconCovs`.
+    """
+
+    def __init__(
+        self,
+        input: Path | str,
+        output: Path | str,
+        samplename: str,
+        reference: Path | str,
+        vcf: Path | str,
+        primers: Path | str,
+        mutations_output: Path | str,
+        amplicon_output: Path | str,
+        thresholds: list[int] | None = None,
+        scheme_cache: Path | str | None = None,
+    ) -> None:
+        super().__init__(input, output)
+        self.samplename = samplename
+        self.reference = reference
+        self.vcf = vcf
+        self.primers = primers
+        self.mutations_output = mutations_output
+        self.amplicon_output = amplicon_output
+        self.thresholds = list(thresholds) if thresholds else list(DEFAULT_THRESHOLDS)
+        self.scheme_cache = scheme_cache
+
+    @classmethod
+    def add_arguments(cls, parser: ArgumentParser) -> None:
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--samplename",
+            metavar="String",
+            help="Name of the sample.",
+            type=str,
+            required=True,
+        )
+        parser.add_argument(
+            "--reference",
+            metavar="File",
+            help="Reference FASTA file.",
+            type=str,
+            required=True,
+        )
+        parser.add_argument(
+            "--vcf",
+            metavar="File",
+            help="VCF file with the mutations of the sample.",
+            type=str,
+            required=True,
+        )
+        parser.add_argument(
+            "--primers",
+            metavar="File",
+            help="Primer BED file of the sample.",
+            type=str,
+            required=True,
+        )
+        parser.add_argument(
+            "--mutations-output",
+            metavar="File",
+            help="Output TSV file for the mutation table.",
+            type=str,
+            required=True,
+        )
+        parser.add_argument(
+            "--amplicon-output",
+            metavar="File",
+            help="Output CSV file for the amplicon coverage.",
+            type=str,
+            required=True,
+        )
+        parser.add_argument(
+            "--thresholds",
+            metavar="Int,Int,...",
+            help="Comma separated minimal depths to calculate the breadth of coverage at.",
+            type=lambda value: [int(threshold) for threshold in value.split(",")],
+            default=list(DEFAULT_THRESHOLDS),
+        )
+        parser.add_argument(
+            "--scheme-cache",
+            metavar="Dir",
+            type=str,
+            help="Directory to store and reuse the parsed primer scheme index.",
+            required=False,
+        )
+
+    def run(self) -> None:
+        VcfToTsv(input=self.vcf, output=self.mutations_output, samplename=self.samplename).run()
+
+        coverages = AmpliconCovs._open_tsv_file(self.input, index_col=0)
+        # the breadth of coverage calculation has always treated the first line of the coverage file as a header
+        depths = coverages.iloc[1:, 0].to_numpy() if not coverages.empty else np.array([])
+        breadths = Boc._breadth_of_coverage(depths, Boc._reference_length(self.reference), self.thresholds)
+        Boc._write_output(self.output, self.samplename, breadths)
+
+        AmpliconCovs(
+            input=self.primers,
+            coverages=self.input,
+            key=self.samplename,
+            output=self.amplicon_output,
+            scheme_cache=self.scheme_cache,
+        )._calculate_amplicon_coverage(coverages)
+
+
+if __name__ == "__main__":
+    ReportingMetrics.main()
@@ -13,17 +13,34 @@ from snakemake.utils import Paramspace, min_version
 from snakemake_interface_executor_plugins.settings import DeploymentMethod
 
 import ViroConstrictor
+from ViroConstrictor.workflow.helpers.aggregation import (
+    aggregation_columnar_outputs, # used in results.combined.smk
+    aggregation_inputs, # used in results.combined.smk
+    aggregation_outputs, # used in results.combined.smk
+    build_aggregation_plan, # used in results.combined.smk
+    write_aggregation_plan, # used in results.combined.smk
+)
+from ViroConstrictor.workflow.helpers.base_script_class import manifest_line # used in results.reporting_metrics.smk
 from ViroConstrictor.workflow.helpers.containers import get_hash
 from ViroConstrictor.workflow.helpers.directories import *
 from ViroConstrictor.workflow.helpers.generic_workflow_methods import (
     get_aminoacid_features, # used in construction of samples_df
     get_reference_header, # used in construction of samples_df
     list_aminoacid_result_outputs, # used in construct_all_rule & results.concatenations.smk
-    get_features_all_samples, # used in construct_all_rule & results.combined.smk
-    get_features_per_virus, # used in construct_all_rule & results.combined.smk
 
 )
-from ViroConstrictor.workflow.helpers.presets import get_preset_parameter
+from ViroConstrictor.workflow.helpers.introspection_cache import IntrospectionCache # used in construction of samples_df
+from ViroConstrictor.workflow.helpers.intermediates import (
+    fastq_suffix,
+    write_intermediate_report,
+)
+from ViroConstrictor.workflow.helpers.manifest import FileDigests # shared by the introspection and result caches
+from ViroConstrictor.workflow.helpers.preparation import PreparationPlan # used in the preparation components
+from ViroConstrictor.workflow.helpers.presets import get_preset_parameter, resolved_preset_parameters
+from ViroConstrictor.workflow.helpers.resource_history import ResourceModel
+from ViroConstrictor.workflow.helpers.resources import estimate_memory, estimate_runtime
+from ViroConstrictor.workflow.helpers.result_cache import DIGESTS_FILE, ResultCache, result_key # used in results.cache.smk
+from ViroConstrictor.workflow.helpers.sample_index import SampleIndex # used in construct_all_rule & input functions of the components
 
 min_version("9.5")
 # Elevate the log level of all output generated by the snakemake.logging module to CRITICAL in order to suppress it when snakemake is calling itself in a downstream process.
@@ -39,42 +56,50 @@ with open(config["sample_sheet"]) as sample_sheet_file:
 
 container_base_path = workflow.deployment_settings.apptainer_prefix if not None else ""
 
+# every file is hashed once per evaluation, the hashes are kept in the result cache (when enabled) for the next runs
+file_digests = FileDigests(os.path.join(os.path.expanduser(config["result_cache"]), DIGESTS_FILE) if config["result_cache"] else None)
+# reference headers and feature names are cached by file content, and in the working directory when enabled
+introspection_cache = IntrospectionCache(f"{datadir}introspection_cache.json" if config["introspection_cache"] else None, digests=file_digests)
 samples_df = pd.DataFrame(SAMPLES).transpose().reset_index().rename(columns=dict(index="sample", VIRUS="Virus"))
-samples_df["RefID"] = samples_df["REFERENCE"].apply(get_reference_header)
-samples_df = get_aminoacid_features(samples_df.explode("RefID"))
+samples_df["RefID"] = samples_df["REFERENCE"].apply(get_reference_header, cache=introspection_cache)
+samples_df = get_aminoacid_features(samples_df.explode("RefID"), cache=introspection_cache)
+introspection_cache.save()
 # samples_df = get_aminoacid_features(samples_df)
 p_space = Paramspace(samples_df[["Virus", "RefID", "sample"]], filename_params=["sample"])
+sample_index = SampleIndex(samples_df)
+# the reference, primer and feature preparation jobs are keyed by the content hash of their inputs, see helpers/preparation.py
+preparation_plan = PreparationPlan(p_space.dataframe[["Virus", "RefID", "sample"]].itertuples(index=False), SAMPLES, file_digests.digest)
 wc_folder = "/".join(p_space.wildcard_pattern.split("/")[:-1]) + "/"
+fq_suffix = fastq_suffix(config["intermediate_format"])
+
+# Memory and runtime are estimated from the input file sizes with per-rule coefficients, see helpers/resources.py.
+# When the resource history is enabled, the rules with enough measurements of earlier runs use the predictions of the
+# resource model instead, see helpers/resource_history.py.
+# These functions depend on the job input, so Snakemake evaluates them once the input files of a job exist.
+# The estimates scale linearly with the attempt number as a safety net for jobs that are retried.
+# These functions are tested through the helper functions in tests/unit/test_resources.py.
+resource_model = ResourceModel.load(config["resource_history"], config["platform"]) if config["resource_history"] else None
+
+def job_preset(wildcards):
+    return SAMPLES[wildcards.sample].get("PRESET", "") if "sample" in wildcards.keys() else ""
 
-# These memory functions are tested in tests/unit/test_dynamic_memory.py
-# However, because this is a snakefile instead of a python file, they cannot be imported
-# So when these functions are changed, please make sure to also change them in the tests.
-def low_memory_job(wildcards, threads, attempt): 
-    if config["computing_execution"] == "local":
-        return min(attempt * threads * 1 * 1000, config["max_local_mem"])
-    return attempt * threads * 1 * 1000
+def low_memory_job(wildcards, input, threads, attempt, rulename):
+    return estimate_memory("low", rulename, input, threads, attempt, config, resource_model, job_preset(wildcards))
 
-def medium_memory_job(wildcards, threads, attempt):
-    if config["computing_execution"] == "local":
-        return min(attempt * threads * 2 * 1000, config["max_local_mem"])
-    return attempt * threads * 2 * 1000
+def medium_memory_job(wildcards, input, threads, attempt, rulename):
+    return estimate_memory("medium", rulename, input, threads, attempt, config, resource_model, job_preset(wildcards))
 
-def high_memory_job(wildcards, threads, attempt):
-    if config["computing_execution"] == "local":
-        return min(attempt * threads * 4 * 1000, config["max_local_mem"])
-    return attempt * threads * 4 * 1000
+def high_memory_job(wildcards, input, threads, attempt, rulename):
+    return estimate_memory("high", rulename, input, threads, attempt, config, resource_model, job_preset(wildcards))
 
-# time allocation functions. These are quadratic in the attempt number to compensate for O(n^2) algorithms in some steps.
-# most steps will not need more than a couple of minutes for the average dataset.
-# However, to accommodate the occasional very large sample, we scale up the time allocation quickly with each attempt.
-def low_runtime_job(wildcards, attempt):
-    return attempt * attempt * 2
+def low_runtime_job(wildcards, input, attempt, rulename):
+    return estimate_runtime("low", rulename, input, attempt, config, resource_model, job_preset(wildcards))
 
-def medium_runtime_job(wildcards, attempt):
-    return attempt * attempt * 15
+def medium_runtime_job(wildcards, input, attempt, rulename):
+    return estimate_runtime("medium", rulename, input, attempt, config, resource_model, job_preset(wildcards))
 
-def high_runtime_job(wildcards, attempt):
-    return attempt * attempt * 30
+def high_runtime_job(wildcards, input, attempt, rulename):
+    return estimate_runtime("high", rulename, input, attempt, config, resource_model, job_preset(wildcards))
 
 
 def workflow_script_path(relative_path):
@@ -106,6 +131,7 @@ def construct_all_rule(p_space):
             "mutations.tsv",
             "Width_of_coverage.tsv",
             "Amplicon_coverage.csv",
+            "depth_matrix",
         ],
     )
     
@@ -113,7 +139,7 @@ def construct_all_rule(p_space):
     # Note: combined is a Python variable from directories.py, not a Snakemake wildcard
     combined_by_virus = expand(
         f"{res}Virus~{{Virus}}/{combined}{{file}}",
-        Virus=samples_df["Virus"].unique(),
+        Virus=sample_index.viruses,
         file=[
             "consensus.fasta",
             "mutations.tsv",
@@ -133,32 +159,24 @@ def construct_all_rule(p_space):
     # Add combined aminoacid results by sample
     # Create outputs only for sample-feature combinations that actually exist
     combined_aa_by_sample = []
-    for sample in samples_df["sample"].unique():
-        sample_rows = samples_df[samples_df["sample"] == sample]
-        sample_features = set()
-        for _, row in sample_rows.iterrows():
-            aa_feat_names = row.get("AA_FEAT_NAMES")
-            if pd.notna(aa_feat_names) and isinstance(aa_feat_names, (list, tuple)):
-                sample_features.update(aa_feat_names)
+    for sample in sample_index.samples:
         combined_aa_by_sample.extend([
             f"{res}{combined}{by_sample}{sample}/aminoacids/{feature}.faa"
-            for feature in sample_features
+            for feature in sample_index.features(sample=sample)
         ])
 
     # Add combined aminoacid results by virus
     combined_aa_by_virus = []
-    for virus in samples_df["Virus"].unique():
-        virus_features = get_features_per_virus(virus, samples_df)
+    for virus in sample_index.viruses:
         combined_aa_by_virus.extend([
             f"{res}Virus~{virus}/{combined}aminoacids/{feature}.faa"
-            for feature in virus_features
+            for feature in sample_index.features(virus=virus)
         ])
 
     # Add combined aminoacid results for all samples
-    all_features = get_features_all_samples(samples_df)
     combined_aa_all_samples = [
         f"{res}{combined}{all_samples}aminoacids/{feature}.faa"
-        for feature in all_features
+        for feature in sample_index.features()
     ]
 
     return [multiqc] + base_results_files + aa_feat_files + combined_by_virus + combined_all_samples + combined_aa_by_sample + combined_aa_by_virus + combined_aa_all_samples
@@ -170,11 +188,17 @@ wildcard_constraints:
     Virus=r"[\w\-\.\d]+",
     # regular expression to match only alphanumeric characters, underscores, dashes. exclude '/' and only match the first part of the string.
     sample=r"[\w\-\.\d]+",
+    # the content-hash key of the shared preparation outputs
+    key=r"[0-9a-f]{64}",
 
 
 localrules:
     all,
     make_pickle,
+    make_aggregation_plan,
+    link_prepared_reference,
+    link_prepared_primers,
+    link_prepared_features,
 
 
 rule all:
@@ -191,6 +215,7 @@ include: workflow.source_path("components/clean.data_filter.smk")
 include: workflow.source_path("components/clean.primer_removal.smk")
 include: workflow.source_path("components/stats.post_clean.smk")
 include: workflow.source_path("components/results.sequences.smk")
+include: workflow.source_path("components/results.cache.smk")
 include: workflow.source_path("components/results.reporting_metrics.smk")
 include: workflow.source_path("components/results.concatenations.smk")
 include: workflow.source_path("components/results.combined.smk")
@@ -198,6 +223,10 @@ include: workflow.source_path("components/results.combined.smk")
 
 onsuccess:
     logging.info("[bold green]ViroConstrictor is finished with processing all the files in the given input directory.[/bold green]")
+    bytes_written = write_intermediate_report(datadir, cln, config["intermediate_format"], f"{logdir}intermediate_files.json")
+    logging.info(f"Intermediate files of the clean stage ({config['intermediate_format']}): {bytes_written['total'] / 1024**2:.1f} MiB written to disk.")
+    if config["result_cache"]:
+        store_result_cache()
     logging.info("[bold green]Generating reports and shutting down...[/bold green]")
     return True
 
@@ -10,6 +10,8 @@ rule filter_gff:
     resources:
         mem_mb=low_memory_job,
         runtime=low_runtime_job,
+    benchmark:
+        f"{logdir}{bench}" "filter_gff_{sample}.jsonl",
     log:
         f"{logdir}FilterGFF_" "{sample}.log",
     conda:
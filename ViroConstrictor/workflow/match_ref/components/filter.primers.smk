@@ -19,6 +19,8 @@ rule filter_fasta2bed:
     resources:
         mem_mb=low_memory_job,
         runtime=low_runtime_job,
+    benchmark:
+        f"{logdir}{bench}" "filter_fasta2bed_{sample}.jsonl",
     log:
         f"{logdir}Fasta2Bed_" "{sample}.log",
     params:
@@ -48,6 +50,8 @@ rule filter_bed:
     resources:
         mem_mb=low_memory_job,
         runtime=low_runtime_job,
+    benchmark:
+        f"{logdir}{bench}" "filter_bed_{sample}.jsonl",
     log:
         f"{logdir}FilterBed_" "{sample}.log",
     conda:
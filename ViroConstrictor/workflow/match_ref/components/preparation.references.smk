@@ -8,6 +8,8 @@ rule filter_references:
         mem_mb=low_memory_job,
         runtime=low_runtime_job,
     threads: 1
+    benchmark:
+        f"{logdir}{bench}" "filter_references_{Virus}.{segment}.{sample}.jsonl",
     log:
         f"{logdir}prepare_refs" "{Virus}.{segment}.{sample}.log",
     conda:
@@ -16,6 +16,8 @@ if config["platform"] in ["nanopore", "iontorrent"] or (
             workflow_environment_path("Alignment.yaml")
         container:
             f"{container_base_path}/viroconstrictor_alignment_{get_hash('Alignment')}.sif"
+        benchmark:
+            f"{logdir}{bench}" "align_to_refs_{Virus}.{segment}.{sample}.jsonl",
         log:
             f"{logdir}AlignMR_" "{Virus}.{segment}.{sample}.log",
         threads: config["threads"]["Alignments"]
@@ -69,6 +71,8 @@ if config["platform"] == "illumina" and config["unidirectional"] is False:
             workflow_environment_path("Alignment.yaml")
         container:
             f"{container_base_path}/viroconstrictor_alignment_{get_hash('Alignment')}.sif"
+        benchmark:
+            f"{logdir}{bench}" "align_to_refs_{Virus}.{segment}.{sample}.jsonl",
         log:
             f"{logdir}" "AlignMR_{Virus}.{segment}.{sample}.log",
         threads: config["threads"]["Alignments"]
@@ -121,6 +125,8 @@ rule count_mapped_reads:
     resources:
         mem_mb=low_memory_job,
         runtime=low_runtime_job,
+    benchmark:
+        f"{logdir}{bench}" "count_mapped_reads_{Virus}.{segment}.{sample}.jsonl",
     log:
         f"{logdir}CountMR_" "{Virus}.{segment}.{sample}.log",
     params:
@@ -14,6 +14,8 @@ rule filter_best_matching_ref:
     resources:
         mem_mb=low_memory_job,
         runtime=low_runtime_job,
+    benchmark:
+        f"{logdir}{bench}" "filter_best_matching_ref_{Virus}.{segment}.{sample}.jsonl",
     log:
         f"{logdir}FilterBR_" "{Virus}.{segment}.{sample}.log",
     params:
@@ -35,23 +37,15 @@ rule group_and_rename_refs:
         ref=lambda wildcards: expand(
             f"{datadir}{matchref}{wc_folder}" "{sample}_best_ref.fasta",
             zip,
-            Virus=p_space.dataframe.loc[
-                p_space.dataframe["sample"] == wildcards.sample, "Virus"
-            ],
-            segment=p_space.dataframe.loc[
-                p_space.dataframe["sample"] == wildcards.sample, "segment"
-            ],
+            Virus=sample_index.values(wildcards.sample, "Virus"),
+            segment=sample_index.values(wildcards.sample, "segment"),
             allow_missing=True,
         ),
         stats=lambda wildcards: expand(
             f"{datadir}{matchref}{wc_folder}" "{sample}_best_ref.csv",
             zip,
-            Virus=p_space.dataframe.loc[
-                p_space.dataframe["sample"] == wildcards.sample, "Virus"
-            ],
-            segment=p_space.dataframe.loc[
-                p_space.dataframe["sample"] == wildcards.sample, "segment"
-            ],
+            Virus=sample_index.values(wildcards.sample, "Virus"),
+            segment=sample_index.values(wildcards.sample, "segment"),
             allow_missing=True,
         ),
     output:
@@ -65,6 +59,8 @@ rule group_and_rename_refs:
     resources:
         mem_mb=low_memory_job,
         runtime=low_runtime_job,
+    benchmark:
+        f"{logdir}{bench}" "group_and_rename_refs_{sample}.jsonl",
     log:
         f"{logdir}GroupRefs_" "{sample}.log",
     params:
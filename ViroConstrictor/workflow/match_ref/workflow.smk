@@ -19,7 +19,11 @@ from ViroConstrictor.workflow.helpers.generic_workflow_methods import (
     read_fasta,
     segmented_ref_groups,
 )
+from ViroConstrictor.workflow.helpers.introspection_cache import IntrospectionCache
 from ViroConstrictor.workflow.helpers.presets import get_preset_parameter
+from ViroConstrictor.workflow.helpers.resource_history import ResourceModel
+from ViroConstrictor.workflow.helpers.resources import estimate_memory, estimate_runtime
+from ViroConstrictor.workflow.helpers.sample_index import SampleIndex
 
 min_version("9.5")
 # Elevate the log level of all output generated by the snakemake.logging module to CRITICAL in order to suppress it when snakemake is calling itself in a downstream process.
@@ -33,43 +37,44 @@ with open(config["sample_sheet"]) as sample_sheet_file:
 
 container_base_path = workflow.deployment_settings.apptainer_prefix if not None else ""
 
+# segment groups are cached by reference content, and in the working directory when enabled
+introspection_cache = IntrospectionCache(f"{datadir}introspection_cache.json" if config["introspection_cache"] else None)
 samples_df = pd.DataFrame(SAMPLES).transpose().reset_index().rename(columns=dict(index="sample", VIRUS="Virus"))
-samples_df = segmented_ref_groups(samples_df)
+samples_df = segmented_ref_groups(samples_df, cache=introspection_cache)
+introspection_cache.save()
 samples_df = samples_df.explode("segment")
 p_space = Paramspace(samples_df[["Virus", "segment", "sample"]], filename_params=["sample"])
+sample_index = SampleIndex(samples_df, reference_column="segment")
 wc_folder = "/".join(p_space.wildcard_pattern.split("/")[:-1]) + "/"
 
-# These memory functions are tested in tests/unit/test_dynamic_memory.py
-# However, because this is a snakefile instead of a python file, they cannot be imported
-# So when these functions are changed, please make sure to also change them in the tests.
-def low_memory_job(wildcards, threads, attempt):
-    if config["computing_execution"] == "local":
-        return min(attempt * threads * 1 * 1000, config["max_local_mem"])
-    return attempt * threads * 1 * 1000
+# Memory and runtime are estimated from the input file sizes with per-rule coefficients, see helpers/resources.py.
+# When the resource history is enabled, the rules with enough measurements of earlier runs use the predictions of the
+# resource model instead, see helpers/resource_history.py.
+# These functions depend on the job input, so Snakemake evaluates them once the input files of a job exist.
+# The estimates scale linearly with the attempt number as a safety net for jobs that are retried.
+# These functions are tested through the helper functions in tests/unit/test_resources.py.
+resource_model = ResourceModel.load(config["resource_history"], config["platform"]) if config["resource_history"] else None
 
+def job_preset(wildcards):
+    return SAMPLES[wildcards.sample].get("PRESET", "") if "sample" in wildcards.keys() else ""
 
-def medium_memory_job(wildcards, threads, attempt):
-    if config["computing_execution"] == "local":
-        return min(attempt * threads * 2 * 1000, config["max_local_mem"])
-    return attempt * threads * 2 * 1000
+def low_memory_job(wildcards, input, threads, attempt, rulename):
+    return estimate_memory("low", rulename, input, threads, attempt, config, resource_model, job_preset(wildcards))
 
+def medium_memory_job(wildcards, input, threads, attempt, rulename):
+    return estimate_memory("medium", rulename, input, threads, attempt, config, resource_model, job_preset(wildcards))
 
-def high_memory_job(wildcards, threads, attempt):
-    if config["computing_execution"] == "local":
-        return min(attempt * threads * 4 * 1000, config["max_local_mem"])
-    return attempt * threads * 4 * 1000
+def high_memory_job(wildcards, input, threads, attempt, rulename):
+    return estimate_memory("high", rulename, input, threads, attempt, config, resource_model, job_preset(wildcards))
 
-# time allocation functions. These are quadratic in the attempt number to compensate for O(n^2) algorithms in some steps.
-# most steps will not need more than a couple of minutes for the average dataset.
-# However, to accommodate the occasional very large sample, we scale up the time allocation quickly with each attempt.
-def low_runtime_job(wildcards, attempt):
-    return attempt * attempt * 2
+def low_runtime_job(wildcards, input, attempt, rulename):
+    return estimate_runtime("low", rulename, input, attempt, config, resource_model, job_preset(wildcards))
 
-def medium_runtime_job(wildcards, attempt):
-    return attempt * attempt * 15
+def medium_runtime_job(wildcards, input, attempt, rulename):
+    return estimate_runtime("medium", rulename, input, attempt, config, resource_model, job_preset(wildcards))
 
-def high_runtime_job(wildcards, attempt):
-    return attempt * attempt * 30
+def high_runtime_job(wildcards, input, attempt, rulename):
+    return estimate_runtime("high", rulename, input, attempt, config, resource_model, job_preset(wildcards))
 
 def workflow_script_path(relative_path):
     basepath = workflow.basedir
@@ -29,10 +29,16 @@ from ViroConstrictor import __prog__
 from ViroConstrictor.logging import log
 from ViroConstrictor.parser import CLIparser
 from ViroConstrictor.scheduler import Scheduler
+from ViroConstrictor.workflow.helpers.base_script_class import PROFILE_VARIABLE
 from ViroConstrictor.workflow.helpers.containers import (
     construct_container_bind_args,
     download_containers,
 )
+from ViroConstrictor.workflow.helpers.columnar import COLUMNAR_FORMATS
+from ViroConstrictor.workflow.helpers.intermediates import INTERMEDIATE_FORMATS
+from ViroConstrictor.workflow.helpers.resource_history import RESOURCE_HISTORY_PATH
+from ViroConstrictor.workflow.helpers.resources import parse_resource_coefficients
+from ViroConstrictor.workflow.helpers.result_cache import RESULT_CACHE_PATH
 
 
 def correct_unidirectional_flag(samples_dict: dict[Hashable, Any], flags: Namespace) -> bool:
@@ -188,7 +194,7 @@ class WorkflowConfig:
             log_handler_settings={"viroconstrictor": LogHandlerSettingsBase()},
             keep_logger=False,
             stdout=False,
-            benchmark_extended=False,
+            benchmark_extended=True,  # the resource history needs the rule name, wildcards and input sizes of every job
             quiet={Quietness.ALL},  # needed for dryrun to actually work properly.
         )
 
@@ -245,14 +251,25 @@ class WorkflowConfig:
             "logfile": self.inputs.logfile,
             "computing_execution": self.configuration["COMPUTING"]["compmode"],
             "max_local_mem": self._get_max_local_mem(),
+            "resource_coefficients": self._get_resource_coefficients(),
+            "resource_history": self._get_resource_history(),
             "platform": self.inputs.flags.platform,
             "unidirectional": unidirectional,
             "amplicon_type": self.inputs.flags.amplicon_type,
             "outdirOverride": self.outdir_override,
+            "debug": self.inputs.flags.verbose,
+            "fused_adapter_removal": self.configuration.getboolean("WORKFLOW", "fused_adapter_removal", fallback=False),
+            "intermediate_format": self._get_intermediate_format(),
+            "columnar_results": self._get_columnar_results(),
+            "introspection_cache": self.configuration.getboolean("WORKFLOW", "introspection_cache", fallback=True),
+            "script_batch_size": self._get_script_batch_size(),
+            "result_cache": self._get_result_cache(),
+            "result_cache_size": self._get_result_cache_size(),
+            "result_cache_stats": self.configuration.getboolean("WORKFLOW", "result_cache_stats", fallback=True),
             "threads": {
                 "Alignments": assign_threads.highcpu,
                 "QC": assign_threads.midcpu,
-                "AdapterRemoval": assign_threads.lowcpu,
+                "AdapterRemoval": assign_threads.midcpu,
                 "PrimerRemoval": assign_threads.highcpu,
                 "Consensus": assign_threads.midcpu,
                 "Index": assign_threads.lowcpu,
@@ -267,7 +284,8 @@ class WorkflowConfig:
         self.remote_execution_settings = RemoteExecutionSettings(
             jobname="ViroConstrictor_{name}.jobid{jobid}",
             immediate_submit=False,
-            envvars=[],
+            # the profiling switch of the workflow scripts is passed on to the jobs on the grid
+            envvars=[PROFILE_VARIABLE] if PROFILE_VARIABLE in os.environ else [],
             max_status_checks_per_second=1.0,
         )
 
@@ -288,6 +306,119 @@ class WorkflowConfig:
                 )
                 sys.exit(1)
 
+    def _get_intermediate_format(self) -> str:
+        """Get the format of the intermediate FASTQ files from the optional `[WORKFLOW]` section of the user profile.
+
+        Returns
+        -------
+        str
+            The intermediate format, one of `INTERMEDIATE_FORMATS`. Defaults to "plain".
+
+        Raises
+        ------
+        ValueError
+            If the configured intermediate format is not one of `INTERMEDIATE_FORMATS`.
+        """
+        intermediate_format = self.configuration.get("WORKFLOW", "intermediate_format", fallback="plain").strip().lower()
+        if intermediate_format not in INTERMEDIATE_FORMATS:
+            raise ValueError(f"intermediate_format must be one of {', '.join(INTERMEDIATE_FORMATS)}, not '{intermediate_format}'.")
+        return intermediate_format
+
+    def _get_columnar_results(self) -> str:
+        """Get the format of the columnar copies of the combined result tables from the optional `[WORKFLOW]` section of
+        the user profile.
+
+        Returns
+        -------
+        str
+            The columnar format, one of `COLUMNAR_FORMATS`, or "none" when no columnar copies are written (default).
+
+        Raises
+        ------
+        ValueError
+            If the configured columnar format is not "none" or one of `COLUMNAR_FORMATS`.
+        """
+        columnar_results = self.configuration.get("WORKFLOW", "columnar_results", fallback="none").strip().lower()
+        if columnar_results not in ("none", *COLUMNAR_FORMATS):
+            raise ValueError(f"columnar_results must be one of none, {', '.join(COLUMNAR_FORMATS)}, not '{columnar_results}'.")
+        return columnar_results
+
+    def _get_script_batch_size(self) -> int:
+        """Get the number of samples per batch of the script rules that can run in batches from the optional `[WORKFLOW]`
+        section of the user profile.
+
+        Returns
+        -------
+        int
+            The batch size, 0 when every sample is run in a job of its own (default).
+
+        Raises
+        ------
+        ValueError
+            If the configured batch size is not a non-negative integer.
+        """
+        script_batch_size = self.configuration.getint("WORKFLOW", "script_batch_size", fallback=0)
+        if script_batch_size < 0:
+            raise ValueError(f"script_batch_size must not be negative, not '{script_batch_size}'.")
+        return script_batch_size
+
+    def _get_resource_coefficients(self) -> dict[str, dict[str, float]]:
+        """Get the coefficients of the memory and runtime estimates of the jobs from the optional `[RESOURCES]` section of
+        the user profile.
+
+        Returns
+        -------
+        dict[str, dict[str, float]]
+            The coefficients by resource class or rule name, see `helpers.resources`. Empty when the section is not given.
+        """
+        if not self.configuration.has_section("RESOURCES"):
+            return {}
+        return parse_resource_coefficients(dict(self.configuration.items("RESOURCES", raw=True)))
+
+    def _get_resource_history(self) -> str:
+        """Get the path to the resource history when it is enabled in the optional `[WORKFLOW]` section of the user
+        profile.
+
+        Returns
+        -------
+        str
+            The path to the resource history file, see `helpers.resource_history`. Empty when it is not enabled (default).
+        """
+        if not self.configuration.getboolean("WORKFLOW", "resource_history", fallback=False):
+            return ""
+        return str(RESOURCE_HISTORY_PATH)
+
+    def _get_result_cache(self) -> str:
+        """Get the directory of the result cache when it is enabled in the optional `[WORKFLOW]` section of the user
+        profile.
+
+        Returns
+        -------
+        str
+            The path to the result cache directory, see `helpers.result_cache`. Empty when it is not enabled (default).
+        """
+        if not self.configuration.getboolean("WORKFLOW", "result_cache", fallback=False):
+            return ""
+        return str(Path(self.configuration.get("WORKFLOW", "result_cache_dir", fallback=str(RESULT_CACHE_PATH))).expanduser().resolve())
+
+    def _get_result_cache_size(self) -> float:
+        """Get the maximum size of the result cache in GiB from the optional `[WORKFLOW]` section of the user profile.
+
+        Returns
+        -------
+        float
+            The maximum size, 0 when the size of the cache is not limited. Defaults to 50.
+
+        Raises
+        ------
+        ValueError
+            If the configured size is not a non-negative number.
+        """
+        result_cache_size = self.configuration.getfloat("WORKFLOW", "result_cache_size", fallback=50.0)
+        if result_cache_size < 0:
+            raise ValueError(f"result_cache_size must not be negative, not '{result_cache_size}'.")
+        return result_cache_size
+
     def _set_cores(self, cores: int) -> int:
         available: int = multiprocessing.cpu_count()
         if cores == available:
@@ -9,6 +9,8 @@ from snakemake_interface_common.exceptions import WorkflowError
 from ViroConstrictor.logging import log
 from ViroConstrictor.parser import CLIparser
 from ViroConstrictor.scheduler import Scheduler
+from ViroConstrictor.workflow.helpers.directories import bench, logdir
+from ViroConstrictor.workflow.helpers.resource_history import record_benchmarks
 from ViroConstrictor.workflow_config import WorkflowConfig
 
 
@@ -60,10 +62,35 @@ def run_snakemake_workflow(inputs_obj: CLIparser, stage: str, scheduler: Schedul
         )
     except WorkflowError as e:
         log.error(f"Workflow execution failed with error: {e}\nPlease check the logs and your settings for more information and try again later.")
+        _record_resource_history(inputs_obj, workflow_configuration)
         return False, workflow_configuration
+    _record_resource_history(inputs_obj, workflow_configuration)
     return True, workflow_configuration
 
 
+def _record_resource_history(inputs_obj: CLIparser, workflow_configuration: WorkflowConfig) -> None:
+    """
+    Add the benchmark measurements of the finished jobs to the resource history, when it is enabled.
+
+    Parameters
+    ----------
+    inputs_obj : CLIparser
+        The parsed command line arguments.
+    workflow_configuration : WorkflowConfig
+        The configuration of the workflow stage that was executed.
+    """
+    history = workflow_configuration.snakemake_base_params["resource_history"]
+    if not history or workflow_configuration.output_settings.dryrun:
+        return
+    presets = {str(sample): str(values.get("PRESET", "")) for sample, values in inputs_obj.samples_dict.items()}
+    try:
+        recorded = record_benchmarks(history, Path(inputs_obj.workdir, logdir, bench), inputs_obj.flags.platform, presets)
+    except OSError as e:
+        log.warning(f"Unable to update the resource history ({history}): {e}")
+        return
+    log.debug(f"Added {recorded} job measurements to the resource history ({history}).")
+
+
 class WorkflowExecutor:
     """
     Executes a Snakemake workflow based on the provided configuration.
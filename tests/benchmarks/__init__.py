@@ -0,0 +1,6 @@
+"""
+Throughput benchmarks for the ViroConstrictor workflow scripts.
+
+The benchmarks are not collected by pytest, run them as a module from the repository root, e.g.
+``python -m tests.benchmarks.benchmark_clipper``.
+"""
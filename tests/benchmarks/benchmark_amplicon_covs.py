@@ -0,0 +1,93 @@
+"""Benchmark the amplicon coverage calculation for a 1,000-amplicon tiling scheme over a 30 kb genome."""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(project_root.joinpath("ViroConstrictor/workflow")))
+from ViroConstrictor.workflow.main.scripts.amplicon_covs import AmpliconCovs  # isort:skip
+
+
+def write_tiling_scheme(path: Path, amplicons: int, genome_length: int, primer_length: int = 22) -> None:
+    """
+    Write a primer BED file with evenly spaced, overlapping amplicons covering the genome.
+
+    The amplicons are slightly shorter than two tiling steps, so the RIGHT primer of every amplicon ends before the
+    LEFT primer of the amplicon after the next one starts, as in a regular tiling scheme.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the BED file.
+    amplicons : int
+        Number of amplicons in the scheme.
+    genome_length : int
+        Length of the genome covered by the scheme.
+    primer_length : int, optional
+        Length of every primer (default is 22).
+    """
+    step = (genome_length - 2 * primer_length) // amplicons
+    amplicon_length = 2 * step - max(1, step // 4)
+    with open(path, "w") as bed:
+        for number in range(1, amplicons + 1):
+            left = (number - 1) * step
+            right = left + amplicon_length - primer_length
+            bed.write(f"MN908947.3\t{left}\t{left + primer_length}\tscheme_{number}_LEFT\t1\t+\n")
+            bed.write(f"MN908947.3\t{right}\t{right + primer_length}\tscheme_{number}_RIGHT\t2\t-\n")
+
+
+def write_coverages(path: Path, genome_length: int, seed: int = 1) -> None:
+    """
+    Write a coverage TSV file with random per-position depths.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the coverage TSV file.
+    genome_length : int
+        Number of positions in the coverage file.
+    seed : int, optional
+        Seed for the random number generator (default is 1).
+    """
+    depths = np.random.default_rng(seed).integers(0, 10000, genome_length)
+    np.savetxt(path, np.column_stack((np.arange(1, genome_length + 1), depths)), fmt="%d", delimiter="\t")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--amplicons", type=int, default=1000, help="Number of amplicons in the tiling scheme.")
+    parser.add_argument("--genome-length", type=int, default=30000, help="Length of the genome in bp.")
+    parser.add_argument("--repeats", type=int, default=5, help="Number of repeated runs, the fastest run is reported.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        primers = Path(tmpdir) / "primers.bed"
+        coverages = Path(tmpdir) / "coverages.tsv"
+        write_tiling_scheme(primers, args.amplicons, args.genome_length)
+        write_coverages(coverages, args.genome_length)
+
+        # the first run with the scheme cache writes the scheme index, every later run reuses it
+        scheme_cache = Path(tmpdir) / "scheme_index"
+        AmpliconCovs(input=primers, coverages=coverages, key="sample", output=Path(tmpdir) / "warmup.csv", scheme_cache=scheme_cache).run()
+
+        for label, cache in (("parsed", None), ("scheme index", scheme_cache)):
+            timings = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                AmpliconCovs(
+                    input=primers, coverages=coverages, key="sample", output=Path(tmpdir) / "amplicon_coverage.csv", scheme_cache=cache
+                ).run()
+                timings.append(time.perf_counter() - start)
+            print(
+                f"{args.amplicons:,} amplicons over {args.genome_length:,} bp ({label}): "
+                f"{min(timings) * 1000:.1f} ms (best of {args.repeats})"
+            )
+
+
+if __name__ == "__main__":
+    main()
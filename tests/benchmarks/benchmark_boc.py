@@ -0,0 +1,67 @@
+"""Benchmark the breadth of coverage calculation on a multi-megabase reference."""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(project_root.joinpath("ViroConstrictor/workflow")))
+from ViroConstrictor.workflow.main.scripts.boc import DEFAULT_THRESHOLDS, Boc  # isort:skip
+
+
+def write_reference(path: Path, genome_length: int, line_length: int = 80) -> None:
+    """Write a single record FASTA file with a random sequence of the given length."""
+    rng = np.random.default_rng(1)
+    sequence = rng.choice(np.frombuffer(b"ACGT", dtype=np.uint8), genome_length).tobytes()
+    with open(path, "wb") as fasta:
+        fasta.write(b">reference\n")
+        for start in range(0, genome_length, line_length):
+            fasta.write(sequence[start : start + line_length] + b"\n")
+
+
+def write_coverages(path: Path, genome_length: int) -> None:
+    """Write a coverage file with a header line and a log-normally distributed depth for every position."""
+    rng = np.random.default_rng(2)
+    depths = rng.lognormal(mean=3, sigma=1.5, size=genome_length).astype(np.int64)
+    positions = np.arange(1, genome_length + 1)
+    np.savetxt(path, np.column_stack([positions, depths]), fmt="%d", delimiter="\t", header="position\tdepth", comments="")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--genome-length", type=int, default=5_000_000, help="Length of the reference in bp.")
+    parser.add_argument(
+        "--thresholds",
+        type=lambda value: [int(threshold) for threshold in value.split(",")],
+        default=list(DEFAULT_THRESHOLDS),
+        help="Comma separated minimal depths.",
+    )
+    parser.add_argument("--repeats", type=int, default=3, help="Number of repeated runs, the fastest run is reported.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        reference = Path(tmpdir) / "reference.fasta"
+        coverages = Path(tmpdir) / "coverages.tsv"
+        output = Path(tmpdir) / "boc.tsv"
+        write_reference(reference, args.genome_length)
+        write_coverages(coverages, args.genome_length)
+
+        timings = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            Boc(input=reference, output=output, samplename="sample", coverage=coverages, thresholds=args.thresholds).run()
+            timings.append(time.perf_counter() - start)
+        breadths = output.read_text().rstrip("\n").split("\t")[1:]
+
+    best = min(timings)
+    print(f"{args.genome_length:,} bp: {best:.2f} s (best of {args.repeats}), {args.genome_length / best / 1e6:.1f} Mbp/s")
+    for threshold, breadth in zip(args.thresholds, breadths):
+        print(f"  breadth at depth >= {threshold}: {float(breadth):.2f}%")
+
+
+if __name__ == "__main__":
+    main()
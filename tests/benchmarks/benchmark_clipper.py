@@ -0,0 +1,73 @@
+"""Benchmark the read throughput of the Clipper script in reads per second."""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pysam
+
+project_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(project_root.joinpath("ViroConstrictor/workflow")))
+from ViroConstrictor.workflow.main.scripts.clipper import Clipper  # isort:skip
+from tests.utils.bam_generator import generate_bam_file  # isort:skip
+
+
+def benchmark_clipper(bam_path: Path, output_path: Path, repeats: int, clipper_args: dict) -> float:
+    """
+    Run Clipper on a BAM file and return the best observed throughput.
+
+    Parameters
+    ----------
+    bam_path : Path
+        Path to the (indexed) input BAM file.
+    output_path : Path
+        Path to the FASTQ file Clipper writes to, overwritten on every repeat.
+    repeats : int
+        Number of times the Clipper run is repeated, the fastest run is reported.
+    clipper_args : dict
+        Additional keyword arguments passed to the Clipper class.
+
+    Returns
+    -------
+    float
+        The highest throughput in reads per second over all repeats.
+    """
+    with pysam.AlignmentFile(str(bam_path), "rb") as bamfile:
+        total_reads = bamfile.mapped
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        Clipper(input=bam_path, output=output_path, **clipper_args).run()
+        timings.append(time.perf_counter() - start)
+    return total_reads / min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reads", type=int, default=100000, help="Number of reads in the generated BAM file.")
+    parser.add_argument("--reference-length", type=int, default=30000, help="Length of the generated reference.")
+    parser.add_argument("--read-length", type=int, default=1000, help="Maximum aligned length of the generated reads.")
+    parser.add_argument("--workers", type=int, default=4, help="Number of worker processes for the sharded scenario.")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of repeated runs, the fastest run is reported.")
+    args = parser.parse_args()
+
+    scenarios = {
+        "no filters": {},
+        "exclude spliced": {"exclude_spliced": True},
+        "length + region filters": {"min_aligned_length": 0.01, "only_include_region": f"0:{args.reference_length // 2}"},
+        f"{args.workers} workers": {"workers": args.workers},
+    }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        bam_path = Path(tmpdir) / "reads.bam"
+        generate_bam_file(bam_path, number_of_reads=args.reads, reference_length=args.reference_length, max_aligned_length=args.read_length)
+        print(f"{args.reads:,} reads, reference length {args.reference_length:,}, aligned length up to {args.read_length:,}")
+        for name, clipper_args in scenarios.items():
+            reads_per_second = benchmark_clipper(bam_path, Path(tmpdir) / "reads.fastq", args.repeats, clipper_args)
+            print(f"{name:<25} {reads_per_second:>12,.0f} reads/s")
+
+
+if __name__ == "__main__":
+    main()
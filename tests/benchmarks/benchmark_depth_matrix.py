@@ -0,0 +1,65 @@
+"""Benchmark a cross-sample coverage query on the depth matrix against parsing the coverage file of every sample."""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(project_root.joinpath("ViroConstrictor/workflow")))
+from ViroConstrictor.workflow.helpers.depth_matrix import DepthMatrix, read_depths  # isort:skip
+from ViroConstrictor.workflow.main.scripts.build_depth_matrix import BuildDepthMatrix  # isort:skip
+
+
+def write_coverages(path: Path, genome_length: int, seed: int) -> None:
+    """Write a coverage file with a header line and a log-normally distributed depth for every position."""
+    rng = np.random.default_rng(seed)
+    depths = rng.lognormal(mean=3, sigma=1.5, size=genome_length).astype(np.int64)
+    positions = np.arange(1, genome_length + 1)
+    np.savetxt(path, np.column_stack([positions, depths]), fmt="%d", delimiter="\t", header="position\tdepth", comments="")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=500, help="Number of samples of the reference.")
+    parser.add_argument("--genome-length", type=int, default=30_000, help="Length of the reference in bp.")
+    parser.add_argument("--region", type=int, default=1_000, help="Length of the queried region in bp.")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of repeated runs, the fastest run is reported.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        samples = [f"sample{number}" for number in range(args.samples)]
+        coverages = [Path(tmpdir) / f"{sample}_coverage.tsv" for sample in samples]
+        for seed, coverage in enumerate(coverages):
+            write_coverages(coverage, args.genome_length, seed)
+        matrix_path = Path(tmpdir) / "depth_matrix"
+
+        start = time.perf_counter()
+        BuildDepthMatrix(input="empty", output=matrix_path, coverages=list(coverages), samples=samples).run()
+        build = time.perf_counter() - start
+
+        # mean depth of every sample over a region in the middle of the genome
+        region_start = (args.genome_length - args.region) // 2
+        region_end = region_start + args.region - 1
+        parse_timings, matrix_timings = [], []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            parsed = [read_depths(coverage)[1][region_start - 1 : region_end].mean() for coverage in coverages]
+            parse_timings.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            sliced = DepthMatrix(matrix_path).depths(start=region_start, end=region_end).mean(axis=1)
+            matrix_timings.append(time.perf_counter() - start)
+        assert np.allclose(parsed, sliced)
+
+    print(f"{args.samples} samples of {args.genome_length:,} bp, mean depth over {args.region:,} bp")
+    print(f"  building the depth matrix: {build:.2f} s")
+    print(f"  parsing the coverage files: {min(parse_timings):.3f} s (best of {args.repeats})")
+    print(f"  slicing the depth matrix: {min(matrix_timings):.4f} s (best of {args.repeats})")
+
+
+if __name__ == "__main__":
+    main()
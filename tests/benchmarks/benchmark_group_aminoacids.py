@@ -0,0 +1,42 @@
+"""Benchmark grouping the amino acid sequences of 5,000 samples with 12 features each."""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(project_root.joinpath("ViroConstrictor/workflow")))
+from ViroConstrictor.workflow.main.scripts.group_aminoacids import GroupAminoAcids  # isort:skip
+from tests.utils.aminoacid_generator import generate_aminoacid_inputs  # isort:skip
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=5000, help="Number of samples.")
+    parser.add_argument("--features", type=int, default=12, help="Number of amino acid features per reference (max 12).")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of repeated runs, the fastest run is reported.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_files, output_files, space = generate_aminoacid_inputs(Path(tmpdir) / "data", args.samples, args.features)
+        # the script writes to results/ relative to the working directory, like it does in the workflow
+        os.chdir(tmpdir)
+
+        timings = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            GroupAminoAcids(input=" ".join(input_files), output=" ".join(output_files), space=str(space)).run()
+            timings.append(time.perf_counter() - start)
+        os.chdir(project_root)
+
+    print(
+        f"{args.samples:,} samples x {args.features} features ({len(input_files):,} input files, {len(output_files)} output files): "
+        f"{min(timings):.2f} s (best of {args.repeats})"
+    )
+
+
+if __name__ == "__main__":
+    main()
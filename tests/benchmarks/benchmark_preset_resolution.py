@@ -0,0 +1,85 @@
+"""
+Benchmark the preset parameter lookups made while the DAG of the main workflow is built, before and after the
+precompiled preset table.
+
+Every rule param that calls `get_preset_parameter` is evaluated once per sample. The lookups are made from a lambda
+defined in a module with a `VC_STAGE` global, below a stack of nested frames that stands in for the Snakemake call
+stack, as the former implementation inspected the complete stack on every call.
+"""
+
+import argparse
+import inspect
+import re
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable
+
+from ViroConstrictor.workflow.helpers import presets as presets_module
+from ViroConstrictor.workflow.helpers.presets import collapse_preset_group, get_preset_parameter
+
+project_root = Path(__file__).resolve().parents[2]
+
+VC_STAGE = "MAIN"
+
+
+def legacy_get_preset_parameter(preset_name: str, parameter_name: str, stage_identifier: str = "") -> Any:
+    """Copy of the former implementation: inspects the stack and collapses the preset groups on every call."""
+    if not stage_identifier:
+        stage_identifier = inspect.stack()[1][0].f_globals["VC_STAGE"]
+    presets_main = collapse_preset_group(preset_name, ["STAGE_MAIN", "STAGE_GLOBAL"], stage_identifier)
+    presets_matchref = collapse_preset_group(preset_name, ["STAGE_MATCHREF", "STAGE_GLOBAL"], stage_identifier)
+    preset = defaultdict(dict[str, str], presets_matchref | presets_main, default=None)
+    parameter: Any = preset[f"{stage_identifier}_{parameter_name}"]
+    if isinstance(parameter, dict):
+        preset_params = collapse_preset_group("DEFAULT", ["STAGE_MAIN", "STAGE_GLOBAL"], stage_identifier)
+        presets_module.log.debug(f"Parameter handling :: Preset :: {preset_name} inheriting '{parameter_name}' from 'DEFAULT'.")
+        return preset_params[f"{stage_identifier}_{parameter_name}"]
+    presets_module.log.debug(f"Parameter handling :: Preset :: Using {preset_name} specific parameter '{parameter_name}'")
+    return parameter
+
+
+def workflow_parameters() -> list[str]:
+    """The parameter names looked up by the rules of the main workflow, for the nanopore platform."""
+    components = project_root / "ViroConstrictor/workflow/main/components"
+    names = []
+    for snakefile in sorted(components.glob("*.smk")):
+        for match in re.finditer(r'parameter_name=f?"([^"]+)"', snakefile.read_text()):
+            names.append(match.group(1).replace("{config['platform']}", "nanopore"))
+    return names
+
+
+def at_depth(depth: int, function: Callable[[], float]) -> float:
+    """Call the function below `depth` nested frames."""
+    return function() if depth == 0 else at_depth(depth - 1, function)
+
+
+def build(lookup: Callable[..., Any], samples: list[tuple[str, str]], parameters: list[str]) -> float:
+    start = time.perf_counter()
+    for _, preset in samples:
+        for parameter in parameters:
+            (lambda wc=None: lookup(preset, parameter))()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=5_000, help="Number of samples.")
+    parser.add_argument("--stack-depth", type=int, default=60, help="Number of frames below the lookups.")
+    args = parser.parse_args()
+
+    preset_names = list(presets_module.presets)
+    samples = [(f"sample{number}", preset_names[number % len(preset_names)]) for number in range(args.samples)]
+    parameters = workflow_parameters()
+
+    before = at_depth(args.stack_depth, lambda: build(legacy_get_preset_parameter, samples, parameters))
+    after = at_depth(args.stack_depth, lambda: build(get_preset_parameter, samples, parameters))
+
+    lookups = len(samples) * len(parameters)
+    print(f"{args.samples:,} samples, {len(parameters)} preset parameters per sample: {lookups:,} lookups")
+    print(f"  before (stack inspection, collapsed per call): {before:.2f} s ({before / lookups * 1e6:.1f} µs per lookup)")
+    print(f"  after (precompiled preset table): {after:.3f} s ({after / lookups * 1e6:.2f} µs per lookup)")
+
+
+if __name__ == "__main__":
+    main()
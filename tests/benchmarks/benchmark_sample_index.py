@@ -0,0 +1,85 @@
+"""
+Benchmark the sample lookups made by the input functions and the `all` rule while the DAG is built, with dataframe
+filters (before) and with the sample index (after).
+
+Per run the lookups of `construct_all_rule` and `group_aminoacids_inputs` are made once, the lookups of
+`group_and_rename_refs` (match_ref workflow) once per sample and the lookups of the concatenation rules
+(`concat_sequences` and `group_samples`) once per rule and virus/RefID combination.
+"""
+
+import argparse
+import time
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from ViroConstrictor.workflow.helpers.sample_index import SampleIndex
+
+CONCATENATION_RULES = 5
+
+
+def samples_dataframe(samples: int) -> pd.DataFrame:
+    """One SARS-CoV-2 row for two thirds of the samples and eight influenza segments for the other samples."""
+    rows = []
+    for number in range(samples):
+        if number % 3:
+            rows.append((f"sample{number}", "SARS-CoV-2", "MN908947.3", tuple(f"ORF{orf}" for orf in range(10))))
+        else:
+            rows.extend((f"sample{number}", "Influenza", f"segment{segment}", (f"feature{segment}",)) for segment in range(8))
+    return pd.DataFrame(rows, columns=["sample", "Virus", "RefID", "AA_FEAT_NAMES"])
+
+
+def legacy_lookups(samples_df: pd.DataFrame) -> list[Any]:
+    """The former dataframe filters of the input functions and `construct_all_rule`."""
+    results: list[Any] = []
+    for sample in samples_df["sample"].unique():
+        rows = samples_df[samples_df["sample"] == sample]
+        results.append({feature for features in rows["AA_FEAT_NAMES"] if isinstance(features, tuple) for feature in features})
+        results.append(list(samples_df.loc[samples_df["sample"] == sample, "Virus"]))
+        results.append(list(samples_df.loc[samples_df["sample"] == sample, "RefID"]))
+    for virus in samples_df.loc[samples_df["AA_FEAT_NAMES"].notnull(), "Virus"].unique():
+        for sample in samples_df.loc[samples_df["Virus"] == virus, "sample"].unique():
+            results.append(list(samples_df.loc[(samples_df["Virus"] == virus) & (samples_df["sample"] == sample), "RefID"].unique()))
+    for virus, refid in samples_df[["Virus", "RefID"]].drop_duplicates().itertuples(index=False):
+        for _ in range(CONCATENATION_RULES):
+            results.append(list(samples_df.loc[(samples_df["Virus"] == virus) & (samples_df["RefID"] == refid), "sample"]))
+    return results
+
+
+def index_lookups(samples_df: pd.DataFrame) -> list[Any]:
+    """The same lookups with the sample index, including building the index."""
+    index = SampleIndex(samples_df)
+    results: list[Any] = []
+    for sample in index.samples:
+        results.append(set(index.features(sample=sample)))
+        results.append(index.values(sample, "Virus"))
+        results.append(index.values(sample, "RefID"))
+    for virus in index.viruses_with_features():
+        for sample in index.samples_of(virus):
+            results.append(index.references(virus, sample))
+    for virus, refid in samples_df[["Virus", "RefID"]].drop_duplicates().itertuples(index=False):
+        for _ in range(CONCATENATION_RULES):
+            results.append(index.samples_of(virus, refid))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, nargs="+", default=[100, 1_000, 10_000], help="Numbers of samples.")
+    args = parser.parse_args()
+
+    for samples in args.samples:
+        samples_df = samples_dataframe(samples)
+        start = time.perf_counter()
+        before = legacy_lookups(samples_df)
+        legacy = time.perf_counter() - start
+        start = time.perf_counter()
+        after = index_lookups(samples_df)
+        indexed = time.perf_counter() - start
+        assert before == after
+        print(f"{samples:>6,} samples ({len(samples_df):,} rows): dataframe filters {legacy:8.3f} s, sample index {indexed:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
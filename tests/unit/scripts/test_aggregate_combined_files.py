@@ -2,6 +2,7 @@ import sys
 from pathlib import Path
 
 import pandas as pd
+import pytest
 
 PROJECT_ROOT = Path(__file__).resolve().parents[3]
 sys.path.insert(0, str(PROJECT_ROOT.joinpath("ViroConstrictor/workflow")))
@@ -121,3 +122,75 @@ def test_aggregate_mixed_empty_and_data(tmp_path: Path) -> None:
     assert output.exists()
     df = pd.read_csv(output, sep="\t")
     assert len(df) == 1
+
+
+def test_aggregate_streaming_identical_to_pandas(tmp_path: Path) -> None:
+    """Test that streamed aggregation is identical to concatenating the files with pandas."""
+    mutations, amplicons = [], []
+    for num in range(4):
+        mutations.append(tmp_path / f"mutations{num}.tsv")
+        mutations[-1].write_text(
+            "Sample\tVirus\tReference_ID\tPosition\tReference_Base\tVariant_Base\tDepth\n"
+            + "".join(f"sample{num}\tVirusA\tNA\t{pos}\tA\tT\t{pos * 7}\n" for pos in range(1, 3 + num))
+        )
+        amplicons.append(tmp_path / f"amplicons{num}.csv")
+        amplicons[-1].write_text(f"Virus,Reference_ID,amplicon_names,scheme_001\nVirusA,Ref{num},\"sample,{num}\",{num}.5\n")
+    (tmp_path / "header_only.tsv").write_text("Sample\tVirus\tReference_ID\tPosition\tReference_Base\tVariant_Base\tDepth\n")
+    mutations.insert(1, tmp_path / "header_only.tsv")
+    other_scheme = tmp_path / "other_scheme.csv"
+    other_scheme.write_text("Virus,Reference_ID,amplicon_names,other_001,other_002\nVirusB,RefB,sample9,1.0,2.0\n")
+
+    for file_type, files, separator in (
+        ("mutations", mutations, "\t"),
+        ("amplicon_coverage", amplicons, ","),
+        ("amplicon_coverage", amplicons + [other_scheme], ","),
+    ):
+        output = tmp_path / f"aggregated_{file_type}_{len(files)}.txt"
+        AggregateCombinedFiles(input="", output=output, input_files=files, file_type=file_type, separator=separator).run()
+
+        dfs = [pd.read_csv(infile, sep=separator, keep_default_na=False, na_filter=False) for infile in files]
+        expected = pd.concat([df for df in dfs if not df.empty], ignore_index=True).to_csv(sep=separator, index=False)
+        assert output.read_text() == expected
+
+
+def test_aggregate_incremental(tmp_path: Path) -> None:
+    """Added input files are appended to the existing output, the result equals a complete rebuild."""
+    header = "Sample_name\tVirus\tReference_ID\tWidth_at_mincov_1\n"
+    inputs = []
+    for number in range(3):
+        path = tmp_path / f"coverage{number}.tsv"
+        path.write_text(f"{header}sample{number}\tVirusA\tRef{number}\t9{number}.5\n")
+        inputs.append(path)
+    output = tmp_path / "all_coverage.tsv"
+    AggregateCombinedFiles(input="", output=output, input_files=inputs[:2], file_type="coverage").run()
+    first_build = output.stat().st_ino
+
+    AggregateCombinedFiles(input="", output=output, input_files=inputs, file_type="coverage").run()
+
+    assert output.stat().st_ino == first_build
+    assert output.read_text() == header + "".join(f"sample{number}\tVirusA\tRef{number}\t9{number}.5\n" for number in range(3))
+    # an output without data rows has no manifest
+    AggregateCombinedFiles(input="", output=output, input_files=[tmp_path / "missing.tsv"], file_type="coverage").run()
+    assert not (tmp_path / "all_coverage.tsv.manifest.json").exists()
+
+
+def test_aggregate_columnar(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """The columnar copy of the aggregated table is requested on the command line."""
+    pytest.importorskip("pyarrow")
+    from ViroConstrictor.workflow.helpers.columnar import read_columnar
+
+    header = "Sample\tVirus\tReference_ID\tPosition\tReference_Base\tVariant_Base\tDepth\n"
+    inputs = []
+    for number, virus in enumerate(["VirusA", "VirusB"]):
+        inputs.append(tmp_path / f"mutations{number}.tsv")
+        inputs[-1].write_text(f"{header}sample{number}\t{virus}\tRef{number}\t{number + 100}\tA\tT\t5{number}\n")
+    output = tmp_path / "all_mutations.tsv"
+    arguments = ["--input", "", "--output", str(output), "--input_files", *map(str, inputs), "--file_type", "mutations"]
+    monkeypatch.setattr(sys, "argv", ["aggregate_combined_files", *arguments, "--columnar", "parquet"])
+
+    AggregateCombinedFiles.main()
+
+    data = read_columnar(tmp_path / "all_mutations.parquet", "parquet").to_pandas().sort_values("Position")
+    assert data["Position"].tolist() == [100, 101]
+    assert data["Virus"].astype(str).tolist() == ["VirusA", "VirusB"]
+    assert output.read_text().count("\n") == 3
@@ -0,0 +1,220 @@
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+project_root = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(project_root.joinpath("ViroConstrictor/workflow")))
+from ViroConstrictor.workflow.helpers.aggregation import aggregation_outputs, build_aggregation_plan, write_aggregation_plan  # isort:skip
+from ViroConstrictor.workflow.main.scripts.aggregate_combined_files import AggregateCombinedFiles  # isort:skip
+from ViroConstrictor.workflow.main.scripts.aggregate_results import AggregateResults  # isort:skip
+from ViroConstrictor.workflow.main.scripts.combine_fasta import CombineFasta  # isort:skip
+from ViroConstrictor.workflow.main.scripts.combine_tabular import CombineTabular  # isort:skip
+from ViroConstrictor.workflow.main.scripts.extract_sample_from_fasta import ExtractSampleFromFasta  # isort:skip
+
+SAMPLES = [
+    # sample, virus, refid, amino acid features
+    ("s1", "VirusA", "r1", ["F1", "F2"]),
+    ("s1", "VirusA", "r2", ["F1"]),
+    ("s1.1", "VirusA", "r1", ["F1"]),
+    ("s2", "VirusB", "NA", None),
+    ("s3", "VirusB", "NA", ["F3"]),
+]
+
+
+def write_results(samples_df: pd.DataFrame, amplicon_columns: dict[tuple[str, str], list[str]]) -> None:
+    """Write the per-sample/RefID results of the samples dataframe, relative to the working directory."""
+    plan = build_aggregation_plan(samples_df)
+    long_sequence = "ACGT" * 40
+    for number, row in enumerate(plan["rows"]):
+        sample, virus, refid = row["sample"], row["virus"], row["refid"]
+        for result_type in ("consensus", "mutations", "coverage", "amplicon_coverage"):
+            Path(row[result_type]).parent.mkdir(parents=True, exist_ok=True)
+        if sample == "s2":
+            # a sample without consensus and mutations
+            Path(row["consensus"]).write_text("")
+            Path(row["mutations"]).write_text("")
+        else:
+            Path(row["consensus"]).write_text(f">{sample} mincov={number}\n{long_sequence}\n")
+            Path(row["mutations"]).write_text(f"{sample}\t{refid}\t{number + 10}\tA\tG\t30\n{sample}\t{refid}\t{number + 20}\tC\tT\t8\n")
+        Path(row["coverage"]).write_text(f"{sample}\t99.58193979933111\t98.0\t97.5\t{number}.25\t0.0\n")
+        columns = amplicon_columns[(sample, refid)]
+        Path(row["amplicon_coverage"]).write_text(",".join(["", *columns]) + "\n" + ",".join([sample, *map(str, range(len(columns)))]) + "\n")
+
+    for aminoacid_input in plan["aminoacids"]["inputs"]:
+        path = Path(aminoacid_input["path"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        feature = aminoacid_input["feature"]
+        # every sample with the feature, plus a sample that does not belong to any row of the samples dataframe
+        records = [f">{sample}.{feature}\n{'MKV' * 30}{index}\n" for index, sample in enumerate(aminoacid_input["samples"] + ["other"])]
+        path.write_text("".join(records))
+
+
+def legacy_aggregation(samples_df: pd.DataFrame, prefix: Path) -> None:
+    """Reference copy of the former per-level rules of results.combined.smk, writing every output below `prefix`."""
+    plan = build_aggregation_plan(samples_df)
+
+    def out(path: str) -> Path:
+        (prefix / path).parent.mkdir(parents=True, exist_ok=True)
+        return prefix / path
+
+    def combine(rows: list[dict], output: str, result_type: str) -> None:
+        arguments = {
+            "input": "empty",
+            "output": out(output),
+            "input_files": [row[result_type] for row in rows],
+            "virus_list": [row["virus"] for row in rows],
+            "refid_list": [row["refid"] for row in rows],
+        }
+        if result_type == "consensus":
+            CombineFasta(**arguments).run()
+        else:
+            separator = "," if result_type == "amplicon_coverage" else "\t"
+            CombineTabular(**arguments, file_type=result_type, separator=separator).run()
+
+    groups = {"by_sample": "sample", "by_virus": "virus"}
+    for level, key in groups.items():
+        for name, outputs in plan[level].items():
+            rows = [row for row in plan["rows"] if row[key] == name]
+            for result_type, output in outputs.items():
+                combine(rows, output, result_type)
+
+    by_sample_outputs = plan["by_sample"].values()
+    out(plan["all_samples"]["consensus"]).write_text("".join((prefix / outputs["consensus"]).read_text() for outputs in by_sample_outputs))
+    for result_type in ("mutations", "coverage", "amplicon_coverage"):
+        AggregateCombinedFiles(
+            input="empty",
+            output=out(plan["all_samples"][result_type]),
+            input_files=[prefix / outputs[result_type] for outputs in by_sample_outputs],
+            file_type=result_type,
+            separator="," if result_type == "amplicon_coverage" else "\t",
+        ).run()
+
+    aminoacids = plan["aminoacids"]
+    for sample, outputs in aminoacids["by_sample"].items():
+        for feature, output in outputs.items():
+            input_files = [aa["path"] for aa in aminoacids["inputs"] if aa["feature"] == feature and sample in aa["samples"]]
+            ExtractSampleFromFasta(input="empty", output=out(output), input_files=input_files, sample_name=sample).run()
+    for virus, outputs in aminoacids["by_virus"].items():
+        for feature, output in outputs.items():
+            input_files = [aa["path"] for aa in aminoacids["inputs"] if aa["feature"] == feature and aa["virus"] == virus]
+            out(output).write_text("".join(Path(path).read_text() for path in input_files))
+    for feature, output in aminoacids["all_samples"].items():
+        by_sample = [prefix / outputs[feature] for outputs in aminoacids["by_sample"].values() if feature in outputs]
+        out(output).write_text("".join(path.read_text() for path in by_sample))
+
+
+def samples_dataframe() -> pd.DataFrame:
+    return pd.DataFrame(SAMPLES, columns=["sample", "Virus", "RefID", "AA_FEAT_NAMES"])
+
+
+@pytest.mark.parametrize("differing_amplicon_columns", [False, True])
+def test_aggregate_results_identical_to_legacy(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, differing_amplicon_columns: bool) -> None:
+    monkeypatch.chdir(tmp_path)
+    samples_df = samples_dataframe()
+    amplicon_columns = {(sample, refid): ["amplicon_1", "amplicon_2"] for sample, _, refid, _ in SAMPLES}
+    if differing_amplicon_columns:
+        amplicon_columns[("s1", "r2")] = ["amplicon_1", "amplicon_2", "amplicon_3"]
+        amplicon_columns[("s3", "NA")] = ["amplicon_A"]
+    write_results(samples_df, amplicon_columns)
+    plan = build_aggregation_plan(samples_df)
+    write_aggregation_plan(plan, "data/aggregation_plan.json")
+
+    legacy_aggregation(samples_df, tmp_path / "legacy")
+    AggregateResults(input="data/aggregation_plan.json", output="data/aggregation_summary.json").run()
+
+    for output in aggregation_outputs(plan):
+        assert Path(output).read_bytes() == (tmp_path / "legacy" / output).read_bytes(), output
+    assert Path("results/combined/all_samples/all_mutations.tsv").read_text().count("\n") == 9
+    assert "\tNA\t" in Path("results/combined/all_samples/all_width_of_coverage.tsv").read_text()
+    summary = json.loads(Path("data/aggregation_summary.json").read_text())
+    assert summary["files_written"] == len(aggregation_outputs(plan))
+
+
+def test_aggregate_results_aminoacid_samples(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    samples_df = samples_dataframe()
+    write_results(samples_df, {(sample, refid): ["amplicon_1"] for sample, _, refid, _ in SAMPLES})
+    write_aggregation_plan(build_aggregation_plan(samples_df), "plan.json")
+
+    AggregateResults(input="plan.json", output="summary.json").run()
+
+    # "s1.1.F1" belongs to both "s1" and "s1.1", "other.F1" belongs to none of the samples
+    s1 = Path("results/combined/by_sample/s1/aminoacids/F1.faa").read_text()
+    assert [line for line in s1.splitlines() if line.startswith(">")] == [">s1.F1", ">s1.1.F1", ">s1.F1"]
+    assert Path("results/combined/by_sample/s1.1/aminoacids/F1.faa").read_text().count(">") == 1
+    assert Path("results/combined/by_sample/s3/aminoacids/F3.faa").read_text().startswith(">s3.F3\n")
+    assert not Path("results/combined/by_sample/s2/aminoacids").exists()
+    assert Path("results/Virus~VirusA/combined/aminoacids/F1.faa").read_text().count(">other.F1") == 2
+
+
+def test_aggregate_results_missing_inputs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    samples_df = pd.DataFrame([("s1", "VirusA", "r1", None)], columns=["sample", "Virus", "RefID", "AA_FEAT_NAMES"])
+    plan = build_aggregation_plan(samples_df)
+    write_aggregation_plan(plan, "plan.json")
+
+    AggregateResults(input="plan.json", output="summary.json").run()
+
+    assert Path(plan["by_sample"]["s1"]["consensus"]).read_text() == ""
+    assert Path(plan["by_virus"]["VirusA"]["mutations"]).read_text() == "\t".join(CombineTabular.COLUMNS["mutations"][1]) + "\n"
+    assert Path(plan["by_sample"]["s1"]["amplicon_coverage"]).read_text() == "\n"
+    assert Path(plan["all_samples"]["amplicon_coverage"]).read_text() == ""
+    assert json.loads(Path("summary.json").read_text()) == {
+        "files_read": 0,
+        "files_written": 12,
+        "segments": {"copied": 0, "converted": 9, "appended": 0},
+    }
+
+
+def test_aggregate_results_incremental(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    amplicon_columns = {(sample, refid): ["amplicon_1"] for sample, _, refid, _ in SAMPLES}
+    first_df = samples_dataframe().iloc[:3]
+    write_results(first_df, amplicon_columns)
+    write_aggregation_plan(build_aggregation_plan(first_df), "plan.json")
+    AggregateResults(input="plan.json", output="summary.json", manifest_dir="manifests").run()
+
+    # late samples are added to the run and the results of an existing sample change
+    samples_df = samples_dataframe()
+    write_results(samples_df.iloc[3:], amplicon_columns)
+    Path("data/Virus~VirusA/RefID~r2/BoC/s1.tsv").write_text("s1\t50.0\t40.0\t30.0\t20.0\t10.0\n")
+    plan = build_aggregation_plan(samples_df)
+    write_aggregation_plan(plan, "plan.json")
+    AggregateResults(input="plan.json", output="summary.json", manifest_dir="manifests").run()
+
+    legacy_aggregation(samples_df, tmp_path / "legacy")
+    for output in aggregation_outputs(plan):
+        assert Path(output).read_bytes() == (tmp_path / "legacy" / output).read_bytes(), output
+    assert Path("manifests/results/combined/all_samples/all_mutations.tsv.manifest.json").exists()
+    assert not list(Path("results").rglob("*.manifest.json"))
+    # consensus and mutations: 1 new input (the results of s2 are empty), coverage: 2 new inputs and 1 changed input
+    summary = json.loads(Path("summary.json").read_text())
+    assert summary["files_read"] == 1 + 1 + 3 + len(SAMPLES) + len(plan["aminoacids"]["inputs"])
+    # the all samples and VirusA outputs are appended to for consensus and mutations, and rebuilt for coverage
+    assert summary["segments"] == {"copied": 5, "converted": 17, "appended": 4}
+
+
+def test_aggregate_results_columnar(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    pytest.importorskip("pyarrow")
+    from ViroConstrictor.workflow.helpers.columnar import read_columnar
+
+    monkeypatch.chdir(tmp_path)
+    samples_df = samples_dataframe()
+    write_results(samples_df, {(sample, refid): ["amplicon_1"] for sample, _, refid, _ in SAMPLES})
+    plan = build_aggregation_plan(samples_df, "parquet")
+    write_aggregation_plan(plan, "plan.json")
+
+    AggregateResults(input="plan.json", output="summary.json").run()
+
+    assert plan["columnar"]["mutations"] == "results/combined/all_samples/all_mutations.parquet"
+    mutations = read_columnar(plan["columnar"]["mutations"], "parquet", viruses=["VirusB"]).to_pandas()
+    assert mutations["Sample"].tolist() == ["s3", "s3"]
+    assert mutations["Reference_ID"].tolist() == ["NA", "NA"]
+    coverage = read_columnar(plan["columnar"]["coverage"], "parquet").num_rows
+    assert coverage == len(pd.read_csv(plan["all_samples"]["coverage"], sep="\t"))
+    assert read_columnar(plan["columnar"]["amplicon_coverage"], "parquet").column_names[-1] == "Virus"
+    summary = json.loads(Path("summary.json").read_text())
+    assert summary["files_written"] == len(aggregation_outputs(plan)) + 3
@@ -1,8 +1,10 @@
+import json
 import sys
 from contextlib import contextmanager
 from pathlib import Path
 from typing import Iterator
 
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -301,10 +303,13 @@ def test_calculate_mean_coverage() -> None:
         Path(__file__).resolve().parents[3] / "tests" / "unit" / "data" / "ESIB_EQA_2024_SARS1_01_coverage.tsv",
         index_col=0,
     )
-    input_array = pd.Series({"start": 2, "end": 4})
-    mean_cov = AmpliconCovs._calculate_mean_coverage(input_array, coverages)
+    prefix_sum = AmpliconCovs._coverage_prefix_sum(coverages)
 
-    assert mean_cov == round(float(coverages.iloc[1:4].mean().values[0]), 2)
+    for start, end in [(2, 4), (1, 1), (100, 2500), (29000, 40000)]:
+        mean_cov = AmpliconCovs._calculate_mean_coverage(start, end, prefix_sum)
+        assert mean_cov == round(float(coverages.iloc[start - 1 : end].mean().values[0]), 2)
+
+    assert np.isnan(AmpliconCovs._calculate_mean_coverage(50000, 50100, prefix_sum))
 
 
 def test_create_amplicon_names_list(tmp_path: Path) -> None:
@@ -395,3 +400,162 @@ def test_read_direction_from_string() -> None:
 
     with pytest.raises(ValueError, match="Unrecognized read direction"):
         ReadDirection.from_string("sideways")
+
+
+def _legacy_amplicon_start_end(primers: pd.DataFrame) -> list[tuple[int, int]]:
+    """Reference copy of the original per-amplicon start/end partitioning, used to verify the grouped implementation."""
+    amplicon_numbers = sorted(primers["count"].unique())
+    result = []
+    for idx, amplicon_number in enumerate(amplicon_numbers):
+        group = primers[primers["count"] == amplicon_number]
+        forward = group[group["direction"] == ReadDirection.FORWARD]
+        reverse = group[group["direction"] == ReadDirection.REVERSE]
+        own_start = forward[2].max() if not forward.empty else group[1].min()
+        own_end = reverse[1].min() if not reverse.empty else group[2].max()
+        if idx == 0:
+            start = own_start
+        else:
+            previous = primers[primers["count"] == amplicon_numbers[idx - 1]]
+            previous_reverse = previous[previous["direction"] == ReadDirection.REVERSE]
+            start = previous_reverse[2].max() if not previous_reverse.empty else own_start
+        if idx == len(amplicon_numbers) - 1:
+            end = own_end
+        else:
+            following = primers[primers["count"] == amplicon_numbers[idx + 1]]
+            following_forward = following[following["direction"] == ReadDirection.FORWARD]
+            end = following_forward[1].min() if not following_forward.empty else own_end
+        result.append((start, end))
+    return result
+
+
+def test_amplicon_covs_matches_legacy_calculation(tmp_path: Path) -> None:
+    """
+    Compare the grouped start/end partitioning and prefix-sum means with the original per-amplicon calculation.
+
+    The generated tiling scheme contains alternative primers and amplicons without a LEFT or RIGHT primer.
+
+    Parameters
+    ----------
+    tmp_path : Path
+        Temporary directory fixture for the generated BED and coverage files.
+
+    Returns
+    -------
+    None
+    """
+    rng = np.random.default_rng(5)
+    bed_lines = []
+    for number in range(1, 61):
+        left = number * 400
+        if number % 10 != 7:
+            bed_lines.append(f"ref\t{left}\t{left + 22}\tscheme_{number}_LEFT\t1\t+\n")
+        if number % 5 == 0:
+            bed_lines.append(f"ref\t{left + 3}\t{left + 26}\tscheme_{number}_LEFT_alt1\t1\t+\n")
+        if number % 10 != 3:
+            bed_lines.append(f"ref\t{left + 480}\t{left + 502}\tscheme_{number}_RIGHT\t2\t-\n")
+    bed_path = _write_bed(tmp_path, bed_lines)
+    coverages_path = tmp_path / "coverage.tsv"
+    coverages_path.write_text("".join(f"{pos}\t{depth}\n" for pos, depth in enumerate(rng.integers(0, 5000, 25000), start=1)))
+
+    covs = AmpliconCovs(input=bed_path, coverages=coverages_path, key="sample", output=tmp_path / "out.csv")
+    primers = covs._split_primer_names(AmpliconCovs._open_tsv_file(bed_path))
+    coverages = AmpliconCovs._open_tsv_file(coverages_path, index_col=0)
+    prefix_sum = AmpliconCovs._coverage_prefix_sum(coverages)
+
+    amplicon_sizes = covs._calculate_amplicon_start_end(primers)
+
+    assert list(zip(amplicon_sizes["start"], amplicon_sizes["end"])) == _legacy_amplicon_start_end(primers)
+    for start, end in zip(amplicon_sizes["start"].astype(int), amplicon_sizes["end"].astype(int)):
+        expected = round(float(coverages.iloc[start - 1 : end].mean().values[0]), 2)
+        assert AmpliconCovs._calculate_mean_coverage(start, end, prefix_sum) == expected
+
+
+def test_primer_name_parser_memoizes_results() -> None:
+    """
+    Ensure parsed primer names are memoized per primer name.
+
+    Returns
+    -------
+    None
+    """
+    parser = PrimerNameParser()
+
+    first = parser.parse(">ncov-2019_1_LEFT")
+    second = parser.parse(">ncov-2019_1_LEFT")
+
+    assert first is second
+    assert first.original_string == "ncov-2019_1_LEFT"
+    assert parser.parse("ncov-2019_1_RIGHT").direction == ReadDirection.REVERSE
+
+
+def test_amplicon_covs_scheme_index(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """
+    Ensure the scheme index is written on the first run and reused on later runs with identical output.
+
+    Parameters
+    ----------
+    monkeypatch : pytest.MonkeyPatch
+        Fixture used to make primer parsing fail once the scheme index exists.
+    tmp_path : Path
+        Temporary directory fixture for the input, output and scheme index files.
+
+    Returns
+    -------
+    None
+    """
+    input_file = PROJECT_ROOT / "tests" / "unit" / "data" / "ESIB_EQA_2024_SARS1_01_primers.bed"
+    coverages_file = PROJECT_ROOT / "tests" / "unit" / "data" / "ESIB_EQA_2024_SARS1_01_coverage.tsv"
+    scheme_cache = tmp_path / "scheme_index"
+    uncached, first, second = tmp_path / "uncached.csv", tmp_path / "first.csv", tmp_path / "second.csv"
+
+    AmpliconCovs(input=input_file, coverages=coverages_file, key="sample", output=uncached).run()
+    AmpliconCovs(input=input_file, coverages=coverages_file, key="sample", output=first, scheme_cache=scheme_cache).run()
+
+    index_files = list(scheme_cache.glob("*.json"))
+    assert len(index_files) == 1
+    amplicons = json.loads(index_files[0].read_text())["amplicons"]
+    assert amplicons[0]["directions"] == ["FORWARD", "REVERSE"]
+    assert amplicons[0]["start"] < amplicons[0]["end"] <= amplicons[1]["start"]
+
+    def fail_parse(self: PrimerNameParser, primer_name: str) -> None:
+        raise AssertionError("primer names should not be parsed when the scheme index exists")
+
+    monkeypatch.setattr(PrimerNameParser, "parse", fail_parse)
+    AmpliconCovs(input=input_file, coverages=coverages_file, key="sample", output=second, scheme_cache=scheme_cache).run()
+
+    assert first.read_bytes() == uncached.read_bytes()
+    assert second.read_bytes() == uncached.read_bytes()
+    assert list(scheme_cache.glob("*.tmp")) == []
+
+
+def test_amplicon_covs_scheme_index_follows_content(tmp_path: Path) -> None:
+    """
+    Ensure a changed primer BED file gets its own scheme index and an unreadable index is rebuilt.
+
+    Parameters
+    ----------
+    tmp_path : Path
+        Temporary directory fixture for the input, output and scheme index files.
+
+    Returns
+    -------
+    None
+    """
+    scheme_cache = tmp_path / "scheme_index"
+    coverages_path = _write_coverage(tmp_path, [10] * 200)
+    bed_path = _write_bed(
+        tmp_path,
+        ["ref\t10\t20\tvirus_1_LEFT\t1\t+\n", "ref\t80\t90\tvirus_1_RIGHT\t1\t-\n"],
+    )
+    AmpliconCovs(input=bed_path, coverages=coverages_path, key="s", output=tmp_path / "a.csv", scheme_cache=scheme_cache).run()
+    (index_file,) = scheme_cache.glob("*.json")
+    index_file.write_text("{")
+
+    AmpliconCovs(input=bed_path, coverages=coverages_path, key="s", output=tmp_path / "b.csv", scheme_cache=scheme_cache).run()
+    assert json.loads(index_file.read_text())["amplicons"][0]["name"] == "virus_001"
+
+    bed_path.write_text("ref\t10\t20\tother_1_LEFT\t1\t+\nref\t80\t90\tother_1_RIGHT\t1\t-\n")
+    AmpliconCovs(input=bed_path, coverages=coverages_path, key="s", output=tmp_path / "c.csv", scheme_cache=scheme_cache).run()
+
+    assert len(list(scheme_cache.glob("*.json"))) == 2
+    assert (tmp_path / "c.csv").read_text().splitlines()[0] == "amplicon_names,other_001"
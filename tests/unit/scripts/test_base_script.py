@@ -0,0 +1,119 @@
+import json
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(PROJECT_ROOT.joinpath("ViroConstrictor/workflow")))
+from helpers.base_script_class import BaseScript, manifest_arguments, manifest_line, profiling_mode, read_manifest  # isort:skip
+
+
+class Upper(BaseScript):
+    """Writes the input file in upper case, or fails for inputs containing 'fail'."""
+
+    def __init__(self, input: Path | str, output: Path | str, repeat: int) -> None:
+        super().__init__(input, output)
+        self.repeat = repeat
+
+    @classmethod
+    def add_arguments(cls, parser: ArgumentParser) -> None:
+        super().add_arguments(parser)
+        parser.add_argument("--repeat", type=int, default=1)
+
+    def run(self) -> None:
+        text = Path(self.input).read_text()
+        if "fail" in text:
+            raise ValueError("cannot process this input")
+        Path(self.output).write_text(text.upper() * self.repeat)
+
+
+def test_manifest_arguments() -> None:
+    assert manifest_arguments({"input": "a", "--output": "b", "flag": True, "unset": None, "off": False, "values": [1, 2]}) == [
+        "--input",
+        "a",
+        "--output",
+        "b",
+        "--flag",
+        "--values",
+        "1,2",
+    ]
+    assert manifest_arguments(["--input", "a", "--repeat", 2]) == ["--input", "a", "--repeat", "2"]
+    assert read_manifest([manifest_line({"input": "a"}), "\n", '["--input", "b"]']) == [["--input", "a"], ["--input", "b"]]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_batch(tmp_path: Path, workers: int) -> None:
+    items = []
+    for number, text in enumerate(["abc", "fail", "def"]):
+        (tmp_path / f"{number}.txt").write_text(text)
+        items.append(manifest_arguments({"input": tmp_path / f"{number}.txt", "output": tmp_path / f"{number}.out", "repeat": 2}))
+    items.append(["--input", str(tmp_path / "0.txt")])  # missing the required output
+
+    results = Upper.run_batch(items, workers=workers)
+
+    assert [result["status"] for result in results] == ["success", "failed", "success", "failed"]
+    assert results[1]["error"] == "ValueError: cannot process this input"
+    assert results[3]["error"].startswith("SystemExit")
+    assert (tmp_path / "0.out").read_text() == "ABCABC"
+    assert (tmp_path / "2.out").read_text() == "DEFDEF"
+    assert not (tmp_path / "1.out").exists()
+
+
+def test_main_batch(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (tmp_path / "in.txt").write_text("abc")
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text(manifest_line({"input": tmp_path / "in.txt", "output": tmp_path / "out.txt"}) + "\n")
+    status = tmp_path / "status.jsonl"
+
+    monkeypatch.setattr(sys, "argv", ["upper", "--batch", str(manifest), "--batch-status", str(status)])
+    Upper.main()
+    assert (tmp_path / "out.txt").read_text() == "ABC"
+    assert json.loads(status.read_text())["status"] == "success"
+
+    # a batch with a failed item exits with status 1
+    (tmp_path / "in.txt").write_text("fail")
+    with pytest.raises(SystemExit) as exit_info:
+        Upper.main()
+    assert exit_info.value.code == 1
+
+    # without a manifest, the script runs for its command line arguments
+    monkeypatch.setattr(sys, "argv", ["upper", "--input", str(tmp_path / "out.txt"), "--output", str(tmp_path / "single.txt"), "--repeat", "3"])
+    Upper.main()
+    assert (tmp_path / "single.txt").read_text() == "ABCABCABC"
+
+
+def test_profiling_mode() -> None:
+    assert [profiling_mode(value) for value in (None, "", "0", "no", "False")] == [None] * 5
+    assert [profiling_mode(value) for value in ("1", "yes", "basic", "cprofile", "CProfile")] == ["basic"] * 3 + ["cprofile"] * 2
+
+
+def test_profiled_run(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (tmp_path / "in.txt").write_text("abc")
+
+    Upper(tmp_path / "in.txt", tmp_path / "out.txt", 2).execute("basic")
+    profile = json.loads((tmp_path / "out.txt.profile.json").read_text())
+    assert profile["script"] == "Upper"
+    assert profile["status"] == "success"
+    assert profile["output"] == str(tmp_path / "out.txt")
+    assert profile["wall_s"] >= 0 and profile["cpu_s"] >= 0 and profile["peak_rss_mb"] > 0
+    assert profile["cprofile"] is None
+    assert not (tmp_path / "out.txt.prof").exists()
+
+    # the environment variable enables profiling of every script, also in batch mode
+    monkeypatch.setenv("VIROCONSTRICTOR_PROFILE", "cprofile")
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text(manifest_line({"input": tmp_path / "in.txt", "output": tmp_path / "batch.txt"}) + "\n")
+    monkeypatch.setattr(sys, "argv", ["upper", "--batch", str(manifest)])
+    Upper.main()
+    profile = json.loads((tmp_path / "batch.txt.profile.json").read_text())
+    assert profile["cprofile"] == str(tmp_path / "batch.txt.prof")
+    assert any("run" in function["function"] for function in profile["top_functions"])
+    assert (tmp_path / "batch.txt.prof").exists()
+
+    # failed runs are profiled as well
+    (tmp_path / "in.txt").write_text("fail")
+    with pytest.raises(ValueError):
+        Upper(tmp_path / "in.txt", tmp_path / "failed.txt", 1).execute("basic")
+    assert json.loads((tmp_path / "failed.txt.profile.json").read_text())["status"] == "failed"
@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from Bio import SeqIO
+
+project_root = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(project_root.joinpath("ViroConstrictor/workflow")))
+from ViroConstrictor.workflow.main.scripts.boc import Boc  # isort:skip
+
+
+def legacy_boc(reference: Path, coverage: Path, samplename: str) -> str:
+    """Reference copy of the original masked-DataFrame calculation, used to verify the output of the current engine."""
+    df = pd.read_csv(coverage, sep="\t", index_col=0)
+    for record in SeqIO.parse(reference, "fasta"):
+        a = len(record.seq)
+    return (
+        f"{samplename}\t{100-(int(df[df < 1].count().iloc[0])/a)*100}\t{100-(int(df[df < 5].count().iloc[0])/a)*100}"
+        f"\t{100-(int(df[df < 10].count().iloc[0])/a)*100}\t{100-(int(df[df < 50].count().iloc[0])/a)*100}"
+        f"\t{100-(int(df[df < 100].count().iloc[0])/a)*100}\n"
+    )
+
+
+def _write_inputs(tmp_path: Path, genome_length: int, seed: int = 1) -> tuple[Path, Path]:
+    rng = np.random.default_rng(seed)
+    reference = tmp_path / "reference.fasta"
+    sequence = "".join(rng.choice(list("ACGTN"), genome_length))
+    lines = [sequence[i : i + 60] for i in range(0, genome_length, 60)]
+    reference.write_text(">first\nACGTACGT\n>second record\n" + " \n".join(lines) + "\r\n")
+    coverage = tmp_path / "coverage.tsv"
+    depths = rng.integers(0, 150, genome_length - 25)
+    coverage.write_text("".join(f"{pos}\t{depth}\n" for pos, depth in enumerate(depths, start=1)))
+    return reference, coverage
+
+
+@pytest.mark.parametrize("genome_length", [30, 999, 5000])
+def test_boc_output_identical_to_legacy(tmp_path: Path, genome_length: int) -> None:
+    reference, coverage = _write_inputs(tmp_path, genome_length)
+    output = tmp_path / "boc.tsv"
+
+    Boc(input=reference, output=output, samplename="sample", coverage=coverage).run()
+
+    assert output.read_text() == legacy_boc(reference, coverage, "sample")
+
+
+def test_boc_custom_thresholds(tmp_path: Path) -> None:
+    reference = tmp_path / "reference.fasta"
+    reference.write_text(">ref\nACGTACGTAC\n")
+    coverage = tmp_path / "coverage.tsv"
+    coverage.write_text("".join(f"{pos}\t{depth}\n" for pos, depth in enumerate([0, 0, 2, 3, 8, 8, 20, 20, 200, 0, 0], start=0)))
+    output = tmp_path / "boc.tsv"
+
+    Boc(input=reference, output=output, samplename="s", coverage=coverage, thresholds=[3, 1, 1000]).run()
+
+    assert output.read_text() == "s\t60.0\t70.0\t0.0\n"
+
+
+def test_reference_length_from_fai(tmp_path: Path) -> None:
+    reference = tmp_path / "reference.fasta"
+    reference.write_text(">a\nACGT\n>b\nACGTAC\nGT\n")
+    assert Boc._reference_length(reference) == 8
+
+    Path(f"{reference}.fai").write_text("a\t4\t3\t4\t5\nb\t12\t11\t6\t7\n")
+    assert Boc._reference_length(reference) == 12
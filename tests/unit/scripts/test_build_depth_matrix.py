@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+project_root = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(project_root.joinpath("ViroConstrictor/workflow")))
+from ViroConstrictor.workflow.helpers.depth_matrix import DepthMatrix  # isort:skip
+from ViroConstrictor.workflow.main.scripts.amplicon_covs import AmpliconCovs  # isort:skip
+from ViroConstrictor.workflow.main.scripts.build_depth_matrix import BuildDepthMatrix  # isort:skip
+
+
+def test_build_depth_matrix_matches_coverage_files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    rng = np.random.default_rng(3)
+    coverages = []
+    for number in range(4):
+        coverage = tmp_path / f"sample{number}_coverage.tsv"
+        depths = rng.lognormal(mean=3, sigma=1.5, size=1000 - number).astype(np.int64)
+        coverage.write_text("".join(f"{position}\t{depth}\n" for position, depth in enumerate(depths, start=1)))
+        coverages.append(str(coverage))
+    samples = [f"sample{number}" for number in range(4)]
+    arguments = ["--input", "empty", "--output", str(tmp_path / "depth_matrix"), "--coverages", *coverages, "--samples", *samples]
+    monkeypatch.setattr(sys, "argv", ["build_depth_matrix", *arguments, "--chunk-size", "256"])
+
+    BuildDepthMatrix.main()
+
+    matrix = DepthMatrix(tmp_path / "depth_matrix")
+    assert matrix.samples == samples
+    assert len(list((tmp_path / "depth_matrix").glob("chunk_*.npy"))) == 4
+    for sample, coverage in zip(samples, coverages):
+        expected = AmpliconCovs._open_tsv_file(coverage, index_col=0).iloc[:, 0].to_numpy()
+        assert np.array_equal(matrix.sample(sample)[: len(expected)], expected)
+
+
+def test_build_depth_matrix_arguments(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        BuildDepthMatrix(input="empty", output=tmp_path / "depth_matrix", coverages=["a.tsv"], samples=["a", "b"])
@@ -0,0 +1,225 @@
+import gzip
+import subprocess
+import sys
+from pathlib import Path
+
+import pysam
+import pytest
+
+project_root = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(project_root.joinpath("ViroConstrictor/workflow")))
+from ViroConstrictor.workflow.main.scripts.clipper import Clipper  # isort:skip
+from tests.utils.bam_generator import generate_bam_file  # isort:skip
+
+
+def legacy_clipper(
+    input: Path,
+    output: Path,
+    exclude_spliced: bool = False,
+    spliced_length_threshold: int = 0,
+    min_aligned_length: float = 0,
+    max_aligned_length: float = 0,
+    only_include_region: str | None = None,
+) -> None:
+    """Reference copy of the original per-read Clipper loop, used to verify the output of the current engine."""
+
+    def split_cigar(cigar: str) -> list[tuple[int, str]]:
+        cigar_tuples = []
+        current_number = ""
+        for char in cigar:
+            if char.isdigit():
+                current_number += char
+            else:
+                cigar_tuples.append((int(current_number), char))
+                current_number = ""
+        return cigar_tuples
+
+    def get_largest_spliced_len(cigar_tuples: list[tuple[int, str]]) -> int:
+        largest_spliced_len = 0
+        current_spliced_len = 0
+        for cigar_tuple in cigar_tuples:
+            if cigar_tuple[1] == "N":
+                current_spliced_len += cigar_tuple[0]
+            else:
+                largest_spliced_len = max(largest_spliced_len, current_spliced_len)
+                current_spliced_len = 0
+        return largest_spliced_len
+
+    complement = {
+        "A": "T",
+        "C": "G",
+        "G": "C",
+        "T": "A",
+        "R": "Y",
+        "Y": "R",
+        "K": "M",
+        "M": "K",
+        "S": "S",
+        "W": "W",
+        "B": "V",
+        "V": "B",
+        "D": "H",
+        "H": "D",
+        "N": "N",
+    }
+    bamfile = pysam.AlignmentFile(str(input), "rb")
+    reflength = bamfile.lengths[0]
+    minimal_read_length = int(reflength * min_aligned_length)
+    maximum_read_length = int(reflength if max_aligned_length == 0 else max_aligned_length)
+    include_region_start = int(only_include_region.split(":")[0]) if only_include_region else None
+    include_region_end = int(only_include_region.split(":")[1]) if only_include_region else None
+
+    with open(output, "w") as fileout:
+        for read in bamfile:
+            trimmed_seq = read.query_alignment_sequence
+            trimmed_qual = read.qual[read.query_alignment_start : read.query_alignment_end]
+            if read.is_reverse:
+                trimmed_seq = "".join([complement[base] for base in trimmed_seq][::-1])
+                trimmed_qual = trimmed_qual[::-1]
+            if len(trimmed_seq) == 0:
+                continue
+            if exclude_spliced:
+                cigar_tuples = split_cigar(read.cigarstring)
+                if any(t[1] == "N" for t in cigar_tuples) and get_largest_spliced_len(cigar_tuples) > spliced_length_threshold:
+                    continue
+            if read.query_alignment_length <= minimal_read_length:
+                continue
+            if read.query_alignment_length >= maximum_read_length:
+                continue
+            if include_region_start is not None and include_region_end is not None:
+                if read.reference_start < include_region_start or read.reference_end > include_region_end:
+                    continue
+            fileout.write(f"@{read.query_name}\n{trimmed_seq}\n+\n{trimmed_qual}\n")
+
+
+@pytest.fixture(scope="module")
+def bam_file(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    path = tmp_path_factory.mktemp("clipper") / "reads.bam"
+    generate_bam_file(path, number_of_reads=2000, reference_length=1000)
+    return path
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"exclude_spliced": True},
+        {"exclude_spliced": True, "spliced_length_threshold": 100},
+        {"min_aligned_length": 0.1},
+        {"min_aligned_length": 0.05, "max_aligned_length": 300},
+        {"only_include_region": "100:800"},
+        {"exclude_spliced": True, "spliced_length_threshold": 50, "min_aligned_length": 0.02, "only_include_region": "0:900"},
+    ],
+)
+def test_clipper_output_identical_to_legacy(bam_file: Path, tmp_path: Path, params: dict) -> None:
+    expected = tmp_path / "expected.fastq"
+    result = tmp_path / "result.fastq"
+
+    legacy_clipper(bam_file, expected, **params)
+    Clipper(input=bam_file, output=result, **params).run()
+
+    assert result.read_bytes() == expected.read_bytes()
+    assert result.stat().st_size > 0
+
+
+def test_clipper_reverse_complement(tmp_path: Path) -> None:
+    bam_path = tmp_path / "reverse.bam"
+    header = pysam.AlignmentHeader.from_dict({"HD": {"VN": "1.6"}, "SQ": [{"SN": "ref", "LN": 100}]})
+    segment = pysam.AlignedSegment(header)
+    segment.query_name = "rev"
+    segment.query_sequence = "TTACGRN"
+    segment.flag = 16
+    segment.reference_id = 0
+    segment.reference_start = 10
+    segment.cigartuples = [(4, 1), (0, 6)]
+    segment.query_qualities = pysam.qualitystring_to_array("!ABCDEF")
+    with pysam.AlignmentFile(str(bam_path), "wb", header=header) as bamfile:
+        bamfile.write(segment)
+
+    output_path = tmp_path / "reverse.fastq"
+    Clipper(input=bam_path, output=output_path).run()
+
+    assert output_path.read_text() == "@rev\nNYCGTA\n+\nFEDCBA\n"
+
+
+def test_get_largest_spliced_len() -> None:
+    assert Clipper._get_largest_spliced_len([(0, 10), (3, 5), (3, 7), (0, 10), (3, 4), (0, 2)]) == 12
+    assert Clipper._get_largest_spliced_len([(0, 10), (3, 50)]) == 0
+    assert not Clipper._is_spliced([(4, 2), (0, 10), (2, 1), (0, 4)])
+    assert Clipper._is_spliced([(0, 10), (3, 5), (0, 10)])
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+@pytest.mark.parametrize("params", [{}, {"exclude_spliced": True, "min_aligned_length": 0.05, "only_include_region": "100:900"}])
+def test_clipper_workers_identical_to_serial(bam_file: Path, tmp_path: Path, workers: int, params: dict) -> None:
+    serial = tmp_path / "serial.fastq"
+    sharded = tmp_path / "sharded.fastq"
+
+    Clipper(input=bam_file, output=serial, **params).run()
+    Clipper(input=bam_file, output=sharded, workers=workers, **params).run()
+
+    assert sharded.read_bytes() == serial.read_bytes()
+    assert list(tmp_path.glob("*.shard*")) == []
+
+
+def test_clipper_workers_without_index(tmp_path: Path) -> None:
+    bam_path = tmp_path / "unindexed.bam"
+    generate_bam_file(bam_path, number_of_reads=200, reference_length=500, index=False)
+    serial = tmp_path / "serial.fastq"
+    sharded = tmp_path / "sharded.fastq"
+
+    Clipper(input=bam_path, output=serial).run()
+    Clipper(input=bam_path, output=sharded, workers=4).run()
+
+    assert sharded.read_bytes() == serial.read_bytes()
+
+
+def test_make_shards() -> None:
+    shards = Clipper._make_shards(["ref1", "ref2"], [10, 3], 4)
+    assert shards == [
+        (0, "ref1", 0, 3),
+        (1, "ref1", 3, 6),
+        (2, "ref1", 6, 9),
+        (3, "ref1", 9, 10),
+        (4, "ref2", 0, 1),
+        (5, "ref2", 1, 2),
+        (6, "ref2", 2, 3),
+    ]
+
+
+def test_clipper_reads_unsorted_stream_from_stdin(bam_file: Path, tmp_path: Path) -> None:
+    # emulate the fused adapter removal stage: an unsorted, uncompressed BAM stream on stdin
+    unsorted_bam = tmp_path / "unsorted.bam"
+    with pysam.AlignmentFile(str(bam_file), "rb") as bamfile:
+        reads = list(bamfile)
+        with pysam.AlignmentFile(str(unsorted_bam), "wbu", template=bamfile) as unsorted:
+            for read in sorted(reads, key=lambda read: read.query_name):
+                unsorted.write(read)
+    expected = tmp_path / "expected.fastq"
+    result = tmp_path / "result.fastq"
+    params = ["--exclude-spliced", "--spliced-length-threshold", "50", "--min-aligned-length", "0.05"]
+
+    Clipper(input=unsorted_bam, output=expected, exclude_spliced=True, spliced_length_threshold=50, min_aligned_length=0.05).run()
+    with open(unsorted_bam, "rb") as stdin:
+        subprocess.run(
+            [sys.executable, "-m", "main.scripts.clipper", "--input", "-", "--output", str(result), *params],
+            stdin=stdin,
+            cwd=project_root.joinpath("ViroConstrictor/workflow"),
+            check=True,
+        )
+
+    assert result.read_bytes() == expected.read_bytes()
+    assert result.stat().st_size > 0
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_clipper_compressed_output(bam_file: Path, tmp_path: Path, workers: int) -> None:
+    plain = tmp_path / "reads.fastq"
+    compressed = tmp_path / "reads.fastq.gz"
+
+    Clipper(input=bam_file, output=plain).run()
+    Clipper(input=bam_file, output=compressed, workers=workers).run()
+
+    assert compressed.read_bytes()[:2] == b"\x1f\x8b"
+    with gzip.open(compressed, "rb") as decompressed:
+        assert decompressed.read() == plain.read_bytes()
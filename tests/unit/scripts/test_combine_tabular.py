@@ -2,6 +2,7 @@ import sys
 from pathlib import Path
 
 import pandas as pd
+import pytest
 
 PROJECT_ROOT = Path(__file__).resolve().parents[3]
 sys.path.insert(0, str(PROJECT_ROOT.joinpath("ViroConstrictor/workflow")))
@@ -115,3 +116,149 @@ def test_combine_tabular_empty_files(tmp_path: Path) -> None:
     combiner.run()
 
     assert output.exists()
+
+
+def _legacy_combine(input_files: list[Path], file_map: dict, file_type: str, separator: str) -> str:
+    """
+    Reference copy of the original pandas implementation, used to verify the streamed output.
+
+    Floats are parsed with round-trip precision here, the original implementation could change the last digit of
+    floats such as 99.58193979933111 where the streamed output copies the values verbatim.
+    """
+    names = {
+        "coverage": ["Sample_name", "Width_at_mincov_1", "Width_at_mincov_5", "Width_at_mincov_10", "Width_at_mincov_50", "Width_at_mincov_100"],
+        "mutations": ["Sample", "Reference_ID", "Position", "Reference_Base", "Variant_Base", "Depth"],
+    }
+    dfs = []
+    for infile in input_files:
+        if file_type == "amplicon_coverage":
+            df = pd.read_csv(infile, sep=separator, keep_default_na=False, na_filter=False, float_precision="round_trip")
+        else:
+            df = pd.read_csv(
+                infile,
+                sep=separator,
+                header=None,
+                names=names[file_type],
+                keep_default_na=False,
+                na_filter=False,
+                float_precision="round_trip",
+            )
+            if df.iloc[0].astype(str).tolist() == names[file_type]:
+                df = df.iloc[1:].reset_index(drop=True)
+        if df.empty:
+            continue
+        df["Virus"], df["Reference_ID"] = file_map[infile][0], str(file_map[infile][1])
+        dfs.append(df)
+    combined = pd.concat(dfs, ignore_index=True)
+    if file_type == "amplicon_coverage":
+        columns = ["Virus", "Reference_ID"] + [column for column in combined.columns if column not in ("Virus", "Reference_ID")]
+        return combined[columns].to_csv(index=False)
+    first = names[file_type][0]
+    columns = [first, "Virus", "Reference_ID"] + [column for column in names[file_type][1:] if column != "Reference_ID"]
+    return combined[columns].to_csv(sep=separator, index=False)
+
+
+def test_combine_tabular_streaming_identical_to_pandas(tmp_path: Path) -> None:
+    """Test that the streamed output is identical to the previous pandas implementation."""
+    coverage, mutations, amplicons, mixed_amplicons = [], [], [], []
+    for num in range(6):
+        coverage.append(tmp_path / f"boc{num}.tsv")
+        coverage[-1].write_text(f"sample {num}\t99.58193979933111\t97.5\t{num * 10.0}\t0.0\t100.0\n")
+        mutations.append(tmp_path / f"mutations{num}.tsv")
+        mutations[-1].write_text("".join(f"sample{num}\tNC_0{num}\t{pos}\tA\tT\t{pos * 3}\n" for pos in range(1, 4 + num)))
+        amplicons.append(tmp_path / f"amplicons{num}.csv")
+        amplicons[-1].write_text(f"amplicon_names,scheme_001,scheme_002\nsample{num},{num}.25,\n")
+    mutations[2].write_text("Sample\tReference_ID\tPosition\tReference_Base\tVariant_Base\tDepth\nsample,2\tNA\t5\tC\t\"G\"\t7\n")
+    mixed_amplicons = amplicons[:3] + [tmp_path / "other_scheme.csv"]
+    mixed_amplicons[-1].write_text("amplicon_names,other_001\nsample9,7.0\n")
+
+    for file_type, files, separator in (
+        ("coverage", coverage, "\t"),
+        ("mutations", mutations, "\t"),
+        ("amplicon_coverage", amplicons, ","),
+        ("amplicon_coverage", mixed_amplicons, ","),
+    ):
+        viruses = [f"Virus{num % 2}" for num in range(len(files))]
+        refids = ["NA" if num == 1 else f"Ref{num}" for num in range(len(files))]
+        output = tmp_path / f"combined_{file_type}_{len(files)}.txt"
+        CombineTabular(
+            input="",
+            output=output,
+            input_files=files,
+            virus_list=viruses,
+            refid_list=refids,
+            file_type=file_type,
+            separator=separator,
+        ).run()
+
+        expected = _legacy_combine(files, dict(zip(files, zip(viruses, refids))), file_type, separator)
+        assert output.read_text() == expected
+
+
+def test_combine_tabular_incremental(tmp_path: Path, monkeypatch) -> None:
+    """Rows of unchanged inputs are copied from the previous output, only new and changed inputs are parsed."""
+    inputs = []
+    for number in range(4):
+        path = tmp_path / f"mutations{number}.tsv"
+        path.write_text(f"sample{number}\tRef{number}\t{number}00\tA\tT\t5{number}\n")
+        inputs.append(path)
+
+    def combine(input_files: list[Path], output: Path) -> None:
+        CombineTabular(
+            input="",
+            output=output,
+            input_files=input_files,
+            virus_list=[f"Virus{number}" for number in range(len(input_files))],
+            refid_list=[f"Ref{number}" for number in range(len(input_files))],
+            file_type="mutations",
+        ).run()
+
+    output = tmp_path / "combined.tsv"
+    combine(inputs[:2], output)
+    parsed = []
+    original_rows = CombineTabular._rows_with_metadata
+
+    def counting_rows(infile, *args):
+        parsed.append(Path(infile).name)
+        return original_rows(infile, *args)
+
+    monkeypatch.setattr(CombineTabular, "_rows_with_metadata", staticmethod(counting_rows))
+    combine(inputs, output)
+    assert parsed == ["mutations2.tsv", "mutations3.tsv"]
+
+    inputs[0].write_text("sample0\tRef0\t999\tG\tC\t10\n")
+    combine(inputs, output)
+    assert parsed[2:] == ["mutations0.tsv"]
+
+    expected = tmp_path / "expected.tsv"
+    combine(inputs, expected)
+    assert output.read_text() == expected.read_text()
+    assert (tmp_path / "combined.tsv.manifest.json").exists()
+
+
+def test_combine_tabular_columnar(tmp_path: Path) -> None:
+    """A columnar copy of the combined table is written next to it, partitioned by virus."""
+    pa = pytest.importorskip("pyarrow")
+    from ViroConstrictor.workflow.helpers.columnar import read_columnar
+
+    inputs = []
+    for number, virus in enumerate(["VirusA", "VirusB", "VirusA"]):
+        inputs.append(tmp_path / f"amplicons{number}.csv")
+        inputs[-1].write_text(f"amplicon_names,scheme_001,scheme_002\nsample{number},{number}.5,{number}\n")
+    output = tmp_path / "combined_amplicon_coverage.csv"
+
+    CombineTabular(
+        input="",
+        output=output,
+        input_files=inputs,
+        virus_list=["VirusA", "VirusB", "VirusA"],
+        refid_list=["RefA", "NA", "RefC"],
+        file_type="amplicon_coverage",
+        separator=",",
+        columnar="arrow",
+    ).run()
+
+    data = read_columnar(tmp_path / "combined_amplicon_coverage.arrow", "arrow", viruses=["VirusA"])
+    assert data.column("amplicon_names").to_pylist() == ["sample0", "sample2"]
+    assert data.schema.field("scheme_002").type == pa.float64()
+    assert read_columnar(tmp_path / "combined_amplicon_coverage.arrow", "arrow", viruses=["VirusB"]).column("Reference_ID").to_pylist() == ["NA"]
@@ -1,9 +1,16 @@
+import re
 import sys
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+import pytest
+from Bio import SeqIO
+
 PROJECT_ROOT = Path(__file__).resolve().parents[3]
 sys.path.insert(0, str(PROJECT_ROOT.joinpath("ViroConstrictor/workflow")))
 from ViroConstrictor.workflow.main.scripts.group_aminoacids import GroupAminoAcids  # isort:skip
+from tests.utils.aminoacid_generator import generate_aminoacid_inputs  # isort:skip
 
 # def test_group_amino_acids(tmp_path: Path) -> None:
 #     input = "tests/unit/data/aa.faa"
@@ -33,3 +40,62 @@ def test_group_amino_acids2(tmp_path: Path) -> None:
 
     a = GroupAminoAcids(input=str(input), output=str(result_string), space=str(pkl))
     a.run()
+
+
+def legacy_group_amino_acids(input: str, output: str, space: Path) -> None:
+    """Reference copy of the original per-record DataFrame implementation, used to verify the streaming implementation."""
+    input_files = input.split()
+    output_files = output.split()
+    space_data: pd.DataFrame = pd.read_pickle(space)
+
+    def feature_in_id(feature: str, record_id: str) -> bool:
+        pattern = rf"(?:^|[.\-_ ]){re.escape(feature)}(?:$|[.\-_ ])"
+        return re.search(pattern, record_id, re.IGNORECASE) is not None
+
+    def process_record(record: SeqIO.SeqRecord, space_data: pd.DataFrame) -> pd.DataFrame:
+        sample = record.id.split(".")[0]
+        sample_data = space_data.loc[space_data["sample"] == sample]
+        sample_data = sample_data.explode("AA_FEAT_NAMES").reset_index(drop=True)
+        sample_data = sample_data[["sample", "Virus", "RefID", "AA_FEAT_NAMES"]]
+        for feature in list(sample_data["AA_FEAT_NAMES"].unique()):
+            if feature_in_id(feature, record.id):
+                return sample_data.loc[sample_data["AA_FEAT_NAMES"] == feature].assign(AA_SEQ=str(record.seq))
+        aa_feature = ".".join(record.id.split(".")[1:])
+        return sample_data.loc[sample_data["AA_FEAT_NAMES"] == aa_feature].assign(AA_SEQ=str(record.seq))
+
+    seq_records_df = pd.DataFrame()
+    for input_file in input_files:
+        for record in SeqIO.parse(input_file, "fasta"):
+            seq_records_df = pd.concat([seq_records_df, process_record(record, space_data)], ignore_index=True)
+
+    for virus in np.array(seq_records_df["Virus"].unique(), dtype=np.str_):
+        virus_df = seq_records_df.loc[seq_records_df["Virus"] == virus]
+        for ref_id in np.array(virus_df["RefID"].unique(), dtype=np.str_):
+            ref_df = virus_df.loc[virus_df["RefID"] == ref_id]
+            for feature_name in np.array(ref_df["AA_FEAT_NAMES"].unique(), dtype=np.str_):
+                output_path = f"results/Virus~{virus}/RefID~{ref_id}/aminoacids/{feature_name}.faa"
+                if output_path in output_files:
+                    filtered_data = ref_df.loc[ref_df["AA_FEAT_NAMES"] == feature_name]
+                    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+                    with open(output_path, "w", encoding="utf-8") as file:
+                        for _, row in filtered_data.iterrows():
+                            file.write(f">{row['sample']}.{row['AA_FEAT_NAMES']}\n{row['AA_SEQ']}\n")
+
+
+def test_group_amino_acids_identical_to_legacy(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    input_files, output_files, space = generate_aminoacid_inputs(tmp_path / "data", number_of_samples=30)
+    expected_dir, result_dir = tmp_path / "expected", tmp_path / "result"
+    expected_dir.mkdir()
+    result_dir.mkdir()
+
+    monkeypatch.chdir(expected_dir)
+    legacy_group_amino_acids(" ".join(input_files), " ".join(output_files), space)
+    monkeypatch.chdir(result_dir)
+    GroupAminoAcids(input=" ".join(input_files), output=" ".join(output_files), space=str(space)).run()
+
+    expected = sorted(path.relative_to(expected_dir) for path in expected_dir.rglob("*.faa"))
+    result = sorted(path.relative_to(result_dir) for path in result_dir.rglob("*.faa"))
+    assert result == expected
+    assert len(result) == len(output_files)
+    for path in result:
+        assert (result_dir / path).read_bytes() == (expected_dir / path).read_bytes()
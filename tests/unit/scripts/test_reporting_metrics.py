@@ -0,0 +1,123 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(project_root.joinpath("ViroConstrictor/workflow")))
+from helpers.base_script_class import manifest_line, read_manifest  # isort:skip
+from ViroConstrictor.workflow.main.scripts.amplicon_covs import AmpliconCovs  # isort:skip
+from ViroConstrictor.workflow.main.scripts.boc import Boc  # isort:skip
+from ViroConstrictor.workflow.main.scripts.reporting_metrics import ReportingMetrics  # isort:skip
+from ViroConstrictor.workflow.main.scripts.vcf_to_tsv import VcfToTsv  # isort:skip
+
+DATA = project_root / "tests" / "unit" / "data"
+VCF = "##fileformat=VCFv4.2\n#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\nref\t10\t.\tA\tT\t.\tPASS\tDP=20;AF=1\nref\t20\t.\tC\tN\t.\tPASS\tDP=3\n"
+
+
+@pytest.fixture()
+def reference(tmp_path: Path) -> Path:
+    path = tmp_path / "reference.fasta"
+    path.write_text(">MN908947.3\n" + "ACGT" * 7475 + "\n")
+    return path
+
+
+@pytest.mark.parametrize("primers", ["ESIB_EQA_2024_SARS1_01_primers.bed", None])
+def test_reporting_metrics_identical_to_individual_scripts(tmp_path: Path, reference: Path, primers: str | None) -> None:
+    coverage = DATA / "ESIB_EQA_2024_SARS1_01_coverage.tsv"
+    vcf = tmp_path / "sample.vcf"
+    vcf.write_text(VCF)
+    if primers:
+        primer_bed = DATA / primers
+    else:
+        primer_bed = tmp_path / "empty_primers.bed"
+        primer_bed.touch()
+
+    VcfToTsv(input=vcf, output=tmp_path / "expected_mutations.tsv", samplename="sample").run()
+    Boc(input=reference, output=tmp_path / "expected_boc.tsv", samplename="sample", coverage=coverage).run()
+    AmpliconCovs(input=primer_bed, coverages=coverage, key="sample", output=tmp_path / "expected_amplicons.csv").run()
+    ReportingMetrics(
+        input=coverage,
+        output=tmp_path / "boc.tsv",
+        samplename="sample",
+        reference=reference,
+        vcf=vcf,
+        primers=primer_bed,
+        mutations_output=tmp_path / "mutations.tsv",
+        amplicon_output=tmp_path / "amplicons.csv",
+        scheme_cache=tmp_path / "scheme_index",
+    ).run()
+
+    for output in ("mutations.tsv", "boc.tsv", "amplicons.csv"):
+        assert (tmp_path / output).read_bytes() == (tmp_path / f"expected_{output}").read_bytes()
+
+
+def test_reporting_metrics_batch(tmp_path: Path, reference: Path) -> None:
+    coverage = DATA / "ESIB_EQA_2024_SARS1_01_coverage.tsv"
+    primer_bed = DATA / "ESIB_EQA_2024_SARS1_01_primers.bed"
+    vcf = tmp_path / "sample.vcf"
+    vcf.write_text(VCF)
+    items = [
+        {
+            "input": coverage,
+            "output": tmp_path / f"{sample}_boc.tsv",
+            "samplename": sample,
+            "reference": reference,
+            "vcf": vcf,
+            "primers": primer_bed,
+            "mutations-output": tmp_path / f"{sample}_mutations.tsv",
+            "amplicon-output": tmp_path / f"{sample}_amplicons.csv",
+            "scheme-cache": tmp_path / "scheme_index",
+        }
+        for sample in ("sample1", "sample2")
+    ]
+    ReportingMetrics(
+        input=coverage,
+        output=tmp_path / "expected_boc.tsv",
+        samplename="sample2",
+        reference=reference,
+        vcf=vcf,
+        primers=primer_bed,
+        mutations_output=tmp_path / "expected_mutations.tsv",
+        amplicon_output=tmp_path / "expected_amplicons.csv",
+    ).run()
+
+    subprocess.run(
+        [sys.executable, "-m", "main.scripts.reporting_metrics", "--batch", "-", "--batch-workers", "2", "--batch-status", tmp_path / "status.jsonl"],
+        input="".join(manifest_line(item) + "\n" for item in items),
+        text=True,
+        check=True,
+        env=os.environ | {"PYTHONPATH": str(project_root.joinpath("ViroConstrictor/workflow"))},
+    )
+
+    assert [json.loads(line)["status"] for line in (tmp_path / "status.jsonl").read_text().splitlines()] == ["success", "success"]
+    for output in ("mutations.tsv", "boc.tsv", "amplicons.csv"):
+        assert (tmp_path / f"sample2_{output}").read_bytes() == (tmp_path / f"expected_{output}").read_bytes()
+
+
+@pytest.mark.parametrize(
+    "script, item",
+    [
+        (Boc, {"input": "reference.fasta", "coverage": "coverage.tsv"}),
+        (
+            ReportingMetrics,
+            {
+                "input": "coverage.tsv",
+                "reference": "reference.fasta",
+                "vcf": "sample.vcf",
+                "primers": "primers.bed",
+                "mutations-output": "mutations.tsv",
+                "amplicon-output": "amplicons.csv",
+            },
+        ),
+    ],
+)
+def test_manifest_thresholds(script, item: dict) -> None:
+    line = manifest_line(item | {"output": "boc.tsv", "samplename": "sample", "thresholds": [1, 5]})
+
+    (arguments,) = read_manifest([line])
+
+    assert script.build_parser().parse_args(arguments).thresholds == [1, 5]
@@ -0,0 +1,67 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from ViroConstrictor.workflow.helpers.aggregation import (
+    aggregation_inputs,
+    aggregation_outputs,
+    build_aggregation_plan,
+    write_aggregation_plan,
+)
+
+
+def samples_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            ("s1", "VirusA", "r1", ["F1", "F2"]),
+            ("s2", "VirusB", "r3", float("nan")),
+            ("s1", "VirusA", "r2", ["F1"]),
+            ("s2", "VirusA", "r1", ["F1"]),
+        ],
+        columns=["sample", "Virus", "RefID", "AA_FEAT_NAMES"],
+    )
+
+
+def test_build_aggregation_plan_groups_rows_by_sample() -> None:
+    plan = build_aggregation_plan(samples_df())
+
+    assert [(row["sample"], row["refid"]) for row in plan["rows"]] == [("s1", "r1"), ("s1", "r2"), ("s2", "r3"), ("s2", "r1")]
+    assert plan["rows"][0]["consensus"] == "data/Virus~VirusA/RefID~r1/consensus/sequences/s1.fa"
+    assert plan["rows"][0]["amplicon_coverage"] == "data/Virus~VirusA/RefID~r1/primers/s1_ampliconcoverage.csv"
+    assert list(plan["by_sample"]) == ["s1", "s2"]
+    assert list(plan["by_virus"]) == ["VirusA", "VirusB"]
+    assert plan["by_virus"]["VirusB"]["coverage"] == "results/Virus~VirusB/combined/Width_of_coverage.tsv"
+    assert plan["all_samples"]["consensus"] == "results/combined/all_samples/all_consensus.fasta"
+
+
+def test_build_aggregation_plan_aminoacids() -> None:
+    aminoacids = build_aggregation_plan(samples_df())["aminoacids"]
+
+    assert aminoacids["inputs"] == [
+        {"path": "results/Virus~VirusA/RefID~r1/aminoacids/F1.faa", "virus": "VirusA", "feature": "F1", "samples": ["s1", "s2"]},
+        {"path": "results/Virus~VirusA/RefID~r1/aminoacids/F2.faa", "virus": "VirusA", "feature": "F2", "samples": ["s1"]},
+        {"path": "results/Virus~VirusA/RefID~r2/aminoacids/F1.faa", "virus": "VirusA", "feature": "F1", "samples": ["s1"]},
+    ]
+    assert aminoacids["by_sample"] == {
+        "s1": {"F1": "results/combined/by_sample/s1/aminoacids/F1.faa", "F2": "results/combined/by_sample/s1/aminoacids/F2.faa"},
+        "s2": {"F1": "results/combined/by_sample/s2/aminoacids/F1.faa"},
+    }
+    assert list(aminoacids["by_virus"]) == ["VirusA"]
+    assert list(aminoacids["all_samples"]) == ["F1", "F2"]
+
+
+def test_aggregation_inputs_and_outputs(tmp_path: Path) -> None:
+    plan = build_aggregation_plan(samples_df())
+
+    inputs = aggregation_inputs(plan)
+    outputs = aggregation_outputs(plan)
+
+    assert len(inputs) == 4 * 4 + 3
+    assert len(set(inputs)) == len(inputs)
+    # 4 files per sample and per virus, 4 all samples files and 3 + 2 + 2 amino acid files
+    assert len(outputs) == 4 * 2 + 4 * 2 + 4 + 7
+    assert len(set(outputs)) == len(outputs)
+
+    write_aggregation_plan(plan, str(tmp_path / "data" / "plan.json"))
+    assert json.loads((tmp_path / "data" / "plan.json").read_text()) == plan
@@ -0,0 +1,71 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from ViroConstrictor.workflow.helpers.columnar import columnar_path, read_columnar, write_columnar
+
+pa = pytest.importorskip("pyarrow")
+
+MUTATIONS = (
+    "Sample\tVirus\tReference_ID\tPosition\tReference_Base\tVariant_Base\tDepth\n"
+    "s1\tVirusA\tr1\t10\tA\tG\t30\n"
+    "s2\tVirusB\tNA\t20\tC\tT\t8\n"
+    "s3\tVirusA\tr2\t30\tG\tA\t12\n"
+)
+
+
+def test_columnar_path() -> None:
+    assert columnar_path("results/all_mutations.tsv", "parquet") == Path("results/all_mutations.parquet")
+    assert columnar_path("results/all_amplicon_coverage.csv", "arrow") == Path("results/all_amplicon_coverage.arrow")
+    with pytest.raises(ValueError):
+        columnar_path("results/all_mutations.tsv", "feather")
+
+
+@pytest.mark.parametrize("columnar_format", ["parquet", "arrow"])
+def test_write_columnar_partitioned_and_typed(tmp_path: Path, columnar_format: str) -> None:
+    table = tmp_path / "all_mutations.tsv"
+    table.write_text(MUTATIONS)
+
+    dataset = write_columnar(table, "\t", columnar_format)
+
+    assert dataset == tmp_path / f"all_mutations.{columnar_format}"
+    assert sorted(path.name for path in dataset.iterdir()) == ["Virus=VirusA", "Virus=VirusB"]
+    virus_a = read_columnar(dataset, columnar_format, viruses=["VirusA"])
+    assert virus_a.num_rows == 2
+    assert pa.types.is_dictionary(virus_a.schema.field("Sample").type)
+    assert pa.types.is_dictionary(virus_a.schema.field("Virus").type)
+    assert virus_a.schema.field("Position").type == pa.int64()
+    # the reference ID "NA" is not a missing value
+    virus_b = read_columnar(dataset, columnar_format, viruses=["VirusB"], columns=["Reference_ID", "Depth"]).to_pandas()
+    assert virus_b.to_dict(orient="list") == {"Reference_ID": ["NA"], "Depth": [8]}
+    expected = pd.read_csv(table, sep="\t", keep_default_na=False)
+    combined = read_columnar(dataset, columnar_format).to_pandas()[expected.columns].astype({"Sample": str, "Virus": str})
+    pd.testing.assert_frame_equal(
+        combined.sort_values("Position").reset_index(drop=True), expected, check_categorical=False, check_dtype=False
+    )
+
+
+def test_write_columnar_amplicon_coverage(tmp_path: Path) -> None:
+    table = tmp_path / "all_amplicon_coverage.csv"
+    table.write_text("Virus,Reference_ID,amplicon_names,scheme_001,scheme_002\nVirusA,r1,s1,10.5,3\nVirusB,r2,s2,,7\n")
+
+    data = read_columnar(write_columnar(table, ",", "parquet"), "parquet")
+
+    assert pa.types.is_dictionary(data.schema.field("amplicon_names").type)
+    assert data.schema.field("scheme_001").type == pa.float64()
+    assert data.schema.field("scheme_002").type == pa.float64()
+    assert data.column("scheme_001").null_count == 1
+
+
+def test_write_columnar_replaces_and_empty(tmp_path: Path) -> None:
+    table = tmp_path / "all_mutations.tsv"
+    table.write_text(MUTATIONS)
+    dataset = write_columnar(table, "\t", "parquet")
+
+    # partitions of viruses that are no longer part of the table are removed
+    table.write_text(MUTATIONS.split("s2")[0])
+    assert sorted(path.name for path in write_columnar(table, "\t", "parquet").iterdir()) == ["Virus=VirusA"]
+    table.write_text("")
+    assert list(write_columnar(table, "\t", "parquet").iterdir()) == []
+    assert dataset.is_dir()
@@ -0,0 +1,74 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ViroConstrictor.workflow.helpers.depth_matrix import (
+    DepthMatrix,
+    read_depths,
+    write_depth_matrix,
+)
+
+
+def write_coverage(path: Path, depths: list[int], first: int = 1, header: bool = True) -> Path:
+    lines = ["position\tdepth\n"] if header else []
+    lines.extend(f"{position}\t{depth}\n" for position, depth in enumerate(depths, start=first))
+    path.write_text("".join(lines))
+    return path
+
+
+def test_read_depths(tmp_path: Path) -> None:
+    first, depths = read_depths(write_coverage(tmp_path / "a.tsv", [3, 0, 7]))
+    assert (first, depths.tolist()) == (1, [3, 0, 7])
+    first, depths = read_depths(write_coverage(tmp_path / "b.tsv", [5, 6], first=0, header=False))
+    assert first == 0
+    assert depths.tolist() == [5, 6]
+    (tmp_path / "gap.tsv").write_text("1\t4\n4\t9\n")
+    assert read_depths(tmp_path / "gap.tsv")[1].tolist() == [4, 0, 0, 9]
+    (tmp_path / "empty.tsv").write_text("")
+    assert len(read_depths(tmp_path / "empty.tsv")[1]) == 0
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 1000])
+def test_depth_matrix_slices(tmp_path: Path, chunk_size: int) -> None:
+    rng = np.random.default_rng(1)
+    depths = {f"s{number}": rng.integers(0, 500, 20 + number) for number in range(3)}
+    coverages = [(sample, write_coverage(tmp_path / f"{sample}.tsv", values.tolist())) for sample, values in depths.items()]
+
+    matrix = DepthMatrix(write_depth_matrix(tmp_path / "matrix", coverages, chunk_size=chunk_size))
+
+    assert matrix.samples == ["s0", "s1", "s2"]
+    assert matrix.shape == (3, 22)
+    assert matrix.dtype == np.uint16
+    assert matrix.ranges["s0"] == (1, 20)
+    assert matrix.sample("s2").tolist() == depths["s2"].tolist()
+    # positions that are not part of the coverage file of a sample have a depth of 0
+    assert matrix.sample("s0").tolist() == depths["s0"].tolist() + [0, 0]
+    region = matrix.depths(samples=["s2", "s1"], start=5, end=9)
+    assert region.tolist() == [depths["s2"][4:9].tolist(), depths["s1"][4:9].tolist()]
+    assert matrix.depths(start=3, end=2).shape == (3, 0)
+    with pytest.raises(IndexError):
+        matrix.depths(start=0, end=5)
+    with pytest.raises(KeyError):
+        matrix.sample("other")
+
+
+def test_depth_matrix_layout(tmp_path: Path) -> None:
+    coverages = [
+        ("deep", write_coverage(tmp_path / "deep.tsv", [70000, 1, 2])),
+        ("missing", tmp_path / "missing.tsv"),
+    ]
+    (tmp_path / "missing.tsv").write_text("position\tdepth\n")
+
+    output = write_depth_matrix(tmp_path / "matrix", coverages, chunk_size=2)
+
+    index = json.loads((output / "index.json").read_text())
+    assert index["chunks"] == ["chunk_00000.npy", "chunk_00001.npy"]
+    assert index["ranges"] == [[1, 3], None]
+    assert np.load(output / "chunk_00001.npy").shape == (2, 1)
+    matrix = DepthMatrix(output)
+    assert matrix.dtype == np.uint32
+    assert matrix.depths().tolist() == [[70000, 1, 2], [0, 0, 0]]
+    with pytest.raises(ValueError):
+        write_depth_matrix(tmp_path / "matrix", [("s", tmp_path / "deep.tsv"), ("s", tmp_path / "deep.tsv")])
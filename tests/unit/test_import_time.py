@@ -0,0 +1,64 @@
+import importlib.util
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from ViroConstrictor.functions import lazy_import
+
+# the cumulative import time (s) of the CLI entry point, it took ~1.2 s when everything was imported at startup
+IMPORT_BUDGET = 0.8
+# dependencies that are only imported once the workflows are started or the inputs are read
+HEAVY_MODULES = {"snakemake", "pandas", "numpy", "fpdf", "Bio", "BCBio", "AminoExtract", "biovalid"}
+
+
+def import_times(*arguments: str) -> dict[str, float]:
+    """Run python with `-X importtime` and return the cumulative import time (s) of every imported module."""
+    process = subprocess.run([sys.executable, "-X", "importtime", *arguments], capture_output=True, text=True, check=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+@pytest.mark.parametrize("arguments", [["-c", "import ViroConstrictor.__main__"], ["-m", "ViroConstrictor", "--version"]])
+def test_startup_does_not_import_heavy_modules(arguments: list[str]) -> None:
+    imported = {name.split(".", 1)[0] for name in import_times(*arguments)}
+    assert not imported & HEAVY_MODULES
+
+
+def test_startup_import_budget() -> None:
+    # the fastest of three runs, so a busy machine does not fail the test
+    cumulative = min(import_times("-c", "import ViroConstrictor.__main__")["ViroConstrictor.__main__"] for _ in range(3))
+    assert cumulative < IMPORT_BUDGET
+
+
+def test_lazy_import() -> None:
+    assert lazy_import("sys") is sys
+    json = lazy_import("json")
+    assert json.loads("[1]") == [1]
+    with pytest.raises(ModuleNotFoundError):
+        lazy_import("not_a_module")
+
+
+def test_lazy_import_defers_execution(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    executed = tmp_path / "executed"
+    (tmp_path / "lazy_probe.py").write_text(f"from pathlib import Path\nPath({str(executed)!r}).touch()\nVALUE = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    assert "lazy_probe" not in sys.modules
+
+    try:
+        module = lazy_import("lazy_probe")
+
+        assert isinstance(module, importlib.util._LazyModule)
+        assert sys.modules["lazy_probe"] is module
+        assert not executed.exists()
+        assert module.VALUE == 42
+        assert executed.exists()
+        assert lazy_import("lazy_probe") is module
+    finally:
+        sys.modules.pop("lazy_probe", None)
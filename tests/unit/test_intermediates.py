@@ -0,0 +1,40 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from ViroConstrictor.workflow.helpers.intermediates import (
+    fastq_suffix,
+    intermediate_bytes_written,
+    write_intermediate_report,
+)
+
+
+def test_fastq_suffix() -> None:
+    assert fastq_suffix("plain") == ".fastq"
+    assert fastq_suffix("pipe") == ".fastq"
+    assert fastq_suffix("link") == ".fastq"
+    assert fastq_suffix("compressed") == ".fastq.gz"
+    with pytest.raises(ValueError):
+        fastq_suffix("zip")
+
+
+def test_intermediate_bytes_written(tmp_path: Path) -> None:
+    clean = tmp_path / "data" / "Virus~v" / "RefID~r" / "cleaned_fastq"
+    (clean / "without_adapters").mkdir(parents=True)
+    (clean / "QC_filter").mkdir()
+    (clean / "without_primers").mkdir()
+    (clean / "without_adapters" / "s1.fastq").write_bytes(b"a" * 100)
+    (clean / "QC_filter" / "s1.fastq").write_bytes(b"b" * 60)
+    os.link(clean / "QC_filter" / "s1.fastq", clean / "without_primers" / "s1.fastq")
+    os.mkfifo(clean / "without_adapters" / "s2.fastq")
+
+    written = intermediate_bytes_written(str(tmp_path / "data"), "cleaned_fastq/")
+
+    # the hardlinked file and the named pipe do not add to the number of bytes written
+    assert written == {"QC_filter": 60, "without_adapters": 100, "total": 160}
+
+    report = tmp_path / "logs" / "intermediate_files.json"
+    write_intermediate_report(str(tmp_path / "data"), "cleaned_fastq/", "link", str(report))
+    assert json.loads(report.read_text()) == {"intermediate_format": "link", "bytes_written": written}
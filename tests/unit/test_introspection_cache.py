@@ -0,0 +1,68 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from ViroConstrictor.workflow.helpers.generic_workflow_methods import (
+    get_reference_header,
+    segmented_ref_groups,
+)
+from ViroConstrictor.workflow.helpers.introspection_cache import IntrospectionCache
+
+
+def test_results_cached_by_content(tmp_path: Path) -> None:
+    first, second = tmp_path / "first.fasta", tmp_path / "second.fasta"
+    first.write_text(">a\nACGT\n")
+    second.write_text(">a\nACGT\n")
+    calls = []
+    cache = IntrospectionCache()
+
+    def compute() -> list[str]:
+        calls.append(1)
+        return ["a"]
+
+    assert cache.get("headers", [first], compute) == ["a"]
+    # a file with the same content is not read again, other extra values are cached separately
+    assert cache.get("headers", [second], compute) == ["a"]
+    assert cache.get("headers", [second], compute, "other") == ["a"]
+    assert len(calls) == 2
+    assert cache.stats == {"hits": 1, "misses": 2}
+
+    first.write_text(">b\nACGT\n")
+    os.utime(first, ns=(0, 0))
+    assert cache.get("headers", [first], lambda: ["b"]) == ["b"]
+
+
+def test_cache_persisted(tmp_path: Path) -> None:
+    reference = tmp_path / "reference.fasta"
+    reference.write_text(">a\nACGT\n")
+    cache_file = tmp_path / "data" / "introspection_cache.json"
+
+    cache = IntrospectionCache(cache_file)
+    cache.get("headers", [reference], lambda: ["a"])
+    cache.save()
+    assert cache_file.exists()
+
+    cache = IntrospectionCache(cache_file)
+    assert cache.get("headers", [reference], lambda: ["recomputed"]) == ["a"]
+    assert cache.stats == {"hits": 1, "misses": 0}
+
+    # an unreadable cache file is ignored and replaced
+    cache_file.write_text("{not json")
+    cache = IntrospectionCache(cache_file)
+    assert cache.get("headers", [reference], lambda: ["recomputed"]) == ["recomputed"]
+    cache.save()
+    assert IntrospectionCache(cache_file).get("headers", [reference], lambda: []) == ["recomputed"]
+
+
+def test_workflow_methods_use_cache(tmp_path: Path) -> None:
+    reference = tmp_path / "reference.fasta"
+    reference.write_text(">ref1 HA|x\nACGT\n>ref2 NA|y\nACGT\n")
+    cache = IntrospectionCache()
+
+    assert get_reference_header(str(reference), cache=cache) == ["ref1", "ref2"]
+    assert get_reference_header(str(reference), cache=cache) == ["ref1", "ref2"]
+    df = pd.DataFrame({"sample": ["s1", "s2"], "REFERENCE": [str(reference)] * 2, "SEGMENTED": [True, True]})
+    df = segmented_ref_groups(df, cache=cache)
+    assert df["segment"].tolist() == [{"HA", "NA"}, {"HA", "NA"}]
+    assert cache.stats == {"hits": 2, "misses": 2}
@@ -0,0 +1,126 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from ViroConstrictor.workflow.helpers.manifest import (
+    FileDigests,
+    IncrementalOutput,
+    content_hash,
+    discard_manifest,
+    file_signature,
+)
+
+
+def write_combined(output: Path, inputs: list[Path], header: str = "name\tvalue\n") -> tuple[dict[str, int], list[str]]:
+    """Combine the inputs by upper-casing their content, returns the segment stats and the converted inputs."""
+    converted = []
+
+    def convert(path: Path) -> str:
+        converted.append(path.name)
+        return path.read_text().upper()
+
+    with IncrementalOutput(output, header, [(str(path), "key") for path in inputs]) as combined:
+        for path in inputs:
+            combined.write(str(path), "key", lambda: convert(path))
+    return combined.stats, converted
+
+
+@pytest.fixture
+def inputs(tmp_path: Path) -> list[Path]:
+    paths = []
+    for number in range(4):
+        path = tmp_path / f"input_{number}.tsv"
+        path.write_text(f"sample_{number}\t{number}\n")
+        paths.append(path)
+    return paths
+
+
+def test_incremental_output_first_build(tmp_path: Path, inputs: list[Path]) -> None:
+    output = tmp_path / "combined.tsv"
+
+    stats, converted = write_combined(output, inputs)
+
+    assert output.read_text() == "name\tvalue\n" + "".join(path.read_text().upper() for path in inputs)
+    assert stats == {"copied": 0, "converted": 4, "appended": 0}
+    assert converted == [path.name for path in inputs]
+    manifest = json.loads((tmp_path / "combined.tsv.manifest.json").read_text())
+    assert manifest["output"] == file_signature(output)
+    assert [entry["offset"] for entry in manifest["inputs"]] == [11, 22, 33, 44]
+    assert manifest["inputs"][0]["sha256"] == content_hash(inputs[0])
+
+
+def test_incremental_output_unchanged_and_appended(tmp_path: Path, inputs: list[Path]) -> None:
+    output = tmp_path / "combined.tsv"
+    write_combined(output, inputs[:2])
+
+    assert write_combined(output, inputs[:2]) == ({"copied": 0, "converted": 0, "appended": 0}, [])
+    stats, converted = write_combined(output, inputs)
+
+    assert stats == {"copied": 0, "converted": 0, "appended": 2}
+    assert converted == ["input_2.tsv", "input_3.tsv"]
+    assert output.read_text() == "name\tvalue\n" + "".join(path.read_text().upper() for path in inputs)
+
+
+def test_incremental_output_changed_input(tmp_path: Path, inputs: list[Path]) -> None:
+    output = tmp_path / "combined.tsv"
+    write_combined(output, inputs)
+    inputs[1].write_text("changed\t10\n")
+    # a new modification time with the same content is detected by the content hash
+    os.utime(inputs[2], ns=(0, 0))
+
+    stats, converted = write_combined(output, [inputs[3], *inputs[:3]])
+
+    assert stats == {"copied": 3, "converted": 1, "appended": 0}
+    assert converted == ["input_1.tsv"]
+    assert output.read_text() == "name\tvalue\n" + "".join(path.read_text().upper() for path in [inputs[3], *inputs[:3]])
+    assert write_combined(output, [inputs[3], *inputs[:3]])[1] == []
+
+
+def test_incremental_output_rebuilds_untrusted_output(tmp_path: Path, inputs: list[Path]) -> None:
+    output = tmp_path / "combined.tsv"
+    write_combined(output, inputs)
+
+    # a different header or an output that was modified after the manifest was written are rebuilt completely
+    assert write_combined(output, inputs, header="other\n")[0]["converted"] == 4
+    with open(output, "a") as handle:
+        handle.write("extra\n")
+    assert write_combined(output, inputs, header="other\n")[0]["converted"] == 4
+    (tmp_path / "combined.tsv.manifest.json").write_text("not json")
+    assert write_combined(output, inputs, header="other\n")[0]["converted"] == 4
+    assert output.read_text() == "other\n" + "".join(path.read_text().upper() for path in inputs)
+
+
+def test_incremental_output_error(tmp_path: Path, inputs: list[Path]) -> None:
+    output = tmp_path / "combined.tsv"
+    write_combined(output, inputs[:2])
+    expected = output.read_text()
+
+    with pytest.raises(ValueError):
+        with IncrementalOutput(output, "name\tvalue\n", [(str(path), "key") for path in reversed(inputs)]) as combined:
+            combined.write(str(inputs[3]), "key", lambda: "partial\n")
+            raise ValueError("conversion failed")
+
+    assert output.read_text() == expected
+    assert not (tmp_path / "combined.tsv.partial").exists()
+    assert not (tmp_path / "combined.tsv.manifest.json").exists()
+    discard_manifest(output)
+
+
+def test_file_digests(tmp_path: Path, inputs: list[Path]) -> None:
+    digests = FileDigests(tmp_path / "digests.json")
+    digest = digests.digest(inputs[0])
+    assert digest == content_hash(inputs[0])
+    digests.save()
+
+    reopened = FileDigests(tmp_path / "digests.json")
+    assert reopened.digest(inputs[0]) == digest
+    assert reopened._dirty is False
+    inputs[0].write_text("changed\n")
+    assert reopened.digest(inputs[0]) == content_hash(inputs[0]) != digest
+
+    # an unreadable file is ignored, and without a path nothing is written
+    (tmp_path / "digests.json").write_text("{not json")
+    assert FileDigests(tmp_path / "digests.json").digest(inputs[1]) == content_hash(inputs[1])
+    FileDigests().save()
@@ -0,0 +1,82 @@
+from pathlib import Path
+
+import pytest
+
+from ViroConstrictor.workflow.helpers.manifest import content_hash
+from ViroConstrictor.workflow.helpers.preparation import PreparationPlan, features_method, primers_method
+
+
+@pytest.fixture
+def files(tmp_path: Path) -> dict[str, str]:
+    contents = {
+        "reference.fasta": ">ref1\nACGT\n>ref2\nTTGA\n",
+        "copy_of_reference.fasta": ">ref1\nACGT\n>ref2\nTTGA\n",
+        "primers.fasta": ">p1_LEFT\nACG\n",
+        "primers.bed": "ref1\t0\t3\tp1_LEFT\t1\t+\n",
+        "features.gff": "##gff-version 3\n",
+    }
+    for name, content in contents.items():
+        (tmp_path / name).write_text(content)
+    return {name: str(tmp_path / name) for name in contents}
+
+
+def sample(
+    files: dict[str, str], reference: str = "reference.fasta", primers: str = "primers.fasta", features: str = "features.gff", rate: float = 0.1
+) -> dict:
+    return {
+        "REFERENCE": files[reference],
+        "PRIMERS": files.get(primers, primers),
+        "FEATURES": files.get(features, features),
+        "PRIMER-MISMATCH-RATE": rate,
+    }
+
+
+def test_methods() -> None:
+    assert [primers_method(primers) for primers in ("NONE", "primers.bed", "primers.fasta")] == ["none", "bed", "fasta"]
+    assert [features_method(features) for features in ("NONE", "", None, "features.gff")] == ["prodigal"] * 3 + ["gff"]
+
+
+def test_shared_between_samples(files: dict[str, str]) -> None:
+    samples = {
+        "s1": sample(files),
+        # the same content in another file
+        "s2": sample(files, reference="copy_of_reference.fasta"),
+        "s3": sample(files, rate=0.2),
+    }
+    rows = [("SARS-CoV-2", "ref1", name) for name in samples] + [("SARS-CoV-2", "ref2", "s1")]
+    plan = PreparationPlan(rows, samples, content_hash)
+
+    s1, s2, s3 = (plan.samples[("SARS-CoV-2", "ref1", name)] for name in samples)
+    assert s1 == s2
+    # the primer search depends on the mismatch rate, the reference and features do not
+    assert s1["reference"] == s3["reference"] and s1["features"] == s3["features"]
+    assert s1["primers"] != s3["primers"]
+    assert plan.samples[("SARS-CoV-2", "ref2", "s1")]["reference"] != s1["reference"]
+
+    assert len(plan.references) == 2
+    assert plan.references[s1["reference"]] == {"file": files["reference.fasta"], "RefID": "ref1"}
+    assert plan.primers[s3["primers"]] | {"file": ""} == {
+        "method": "fasta",
+        "file": "",
+        "RefID": "ref1",
+        "reference": s1["reference"],
+        "mismatch_rate": 0.2,
+    }
+    assert plan.features[s1["features"]]["method"] == "gff"
+
+
+def test_methods_in_plan(files: dict[str, str]) -> None:
+    samples = {
+        "bed": sample(files, primers="primers.bed", features="NONE"),
+        "none": sample(files, primers="NONE", features="NONE"),
+        "none2": sample(files, reference="copy_of_reference.fasta", primers="NONE", features="NONE", rate=0.5),
+    }
+    plan = PreparationPlan([("SARS-CoV-2", "ref1", name) for name in samples], samples, content_hash)
+
+    bed, none, none2 = (plan.samples[("SARS-CoV-2", "ref1", name)] for name in samples)
+    assert plan.primers[bed["primers"]]["method"] == "bed"
+    # empty primer files and the predicted features of a reference are shared by all samples
+    assert none["primers"] == none2["primers"] and plan.primers[none["primers"]]["method"] == "none"
+    assert bed["features"] == none["features"] == none2["features"]
+    assert plan.features[bed["features"]]["method"] == "prodigal"
+    assert len(plan.references) == 1
@@ -0,0 +1,68 @@
+from collections import defaultdict
+from typing import Any
+
+import pytest
+
+from ViroConstrictor.workflow.helpers.presets import (
+    collapse_preset_group,
+    get_preset_parameter,
+    preset_table,
+    presets,
+    resolved_preset_parameters,
+)
+
+# read by get_preset_parameter from the globals of the calling module, like in the workflows
+VC_STAGE = "MAIN"
+
+
+def legacy_get_preset_parameter(preset_name: str, parameter_name: str, stage_identifier: str) -> Any:
+    """Reference copy of the former implementation, which collapsed the preset groups on every call."""
+    presets_main = collapse_preset_group(preset_name, ["STAGE_MAIN", "STAGE_GLOBAL"], stage_identifier)
+    presets_matchref = collapse_preset_group(preset_name, ["STAGE_MATCHREF", "STAGE_GLOBAL"], stage_identifier)
+    preset = defaultdict(dict[str, str], presets_matchref | presets_main, default=None)
+    parameter: Any = preset[f"{stage_identifier}_{parameter_name}"]
+    if isinstance(parameter, dict):
+        preset_params = collapse_preset_group("DEFAULT", ["STAGE_MAIN", "STAGE_GLOBAL"], stage_identifier)
+        return preset_params[f"{stage_identifier}_{parameter_name}"]
+    return parameter
+
+
+def all_parameter_names() -> set[str]:
+    return {name for preset in presets.values() for group in preset.values() for name in group}
+
+
+@pytest.mark.parametrize("stage", ["MAIN", "MATCHREF", "GLOBAL"])
+def test_get_preset_parameter_identical_to_legacy(stage: str) -> None:
+    for preset_name in presets:
+        for parameter_name in sorted(all_parameter_names()):
+            try:
+                expected = legacy_get_preset_parameter(preset_name, parameter_name, stage)
+            except KeyError:
+                with pytest.raises(KeyError):
+                    get_preset_parameter(preset_name, parameter_name, stage)
+                continue
+            assert get_preset_parameter(preset_name, parameter_name, stage) == expected, (preset_name, parameter_name)
+
+
+def test_get_preset_parameter_stage_from_caller() -> None:
+    for parameter_name in ("Minimap2_Settings_Base", "AmpliGone_AlignmentPreset_nanopore"):
+        assert get_preset_parameter("SARSCOV2", parameter_name) == get_preset_parameter("SARSCOV2", parameter_name, "MAIN")
+    # rule params call the function from a lambda, which shares the globals of the workflow
+    assert (lambda: get_preset_parameter("INFLUENZA", "Minimap2_Settings_Base"))() == legacy_get_preset_parameter(
+        "INFLUENZA", "Minimap2_Settings_Base", "MAIN"
+    )
+
+
+def test_preset_table_built_once() -> None:
+    assert preset_table("SARSCOV2", "MAIN") is preset_table("SARSCOV2", "MAIN")
+    with pytest.raises(KeyError):
+        preset_table("UNKNOWN", "MAIN")
+
+
+def test_resolved_preset_parameters() -> None:
+    for preset_name in ("DEFAULT", "SARSCOV2", "INFLUENZA"):
+        resolved = resolved_preset_parameters(preset_name, "MAIN")
+        assert resolved, preset_name
+        for parameter_name, value in resolved.items():
+            assert value == get_preset_parameter(preset_name, parameter_name, "MAIN")
+    assert resolved_preset_parameters("SARSCOV2", "MAIN") != resolved_preset_parameters("INFLUENZA", "MAIN")
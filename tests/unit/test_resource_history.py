@@ -0,0 +1,103 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from ViroConstrictor.workflow.helpers import resource_history
+from ViroConstrictor.workflow.helpers.resource_history import (
+    MEMORY_HEADROOM,
+    ResourceModel,
+    fit_linear,
+    read_benchmark,
+    read_history,
+    record_benchmarks,
+)
+from ViroConstrictor.workflow.helpers.resources import estimate_memory, estimate_runtime
+
+
+def write_benchmark(path: Path, rule: str, sample: str | None, input_mb: float, seconds: float, max_rss: float | str) -> Path:
+    """Write a benchmark file in the extended JSON lines format of Snakemake."""
+    record = {
+        "s": f"{seconds:.4f}",
+        "max_rss": max_rss,
+        "rule_name": rule,
+        "wildcards": {"sample": sample, "Virus": "SARS-CoV-2"} if sample else {},
+        "threads": 2,
+        "input_size_mb": {"reads.fastq": input_mb * 0.75, "reference.fasta": input_mb * 0.25},
+    }
+    path.write_text(json.dumps(record) + "\n")
+    return path
+
+
+def measurement(rule: str, input_mb: float, seconds: float, max_rss_mb: float | None, preset: str = "SARSCOV2") -> dict:
+    return {"rule": rule, "platform": "nanopore", "preset": preset, "input_mb": input_mb, "seconds": seconds, "max_rss_mb": max_rss_mb}
+
+
+def test_read_benchmark(tmp_path: Path) -> None:
+    (measured,) = read_benchmark(write_benchmark(tmp_path / "a.jsonl", "ampligone", "s1", 100, 30, 512.5), "nanopore", {"s1": "SARSCOV2"})
+    assert measured | {"time": 0} == {
+        "rule": "ampligone",
+        "platform": "nanopore",
+        "preset": "SARSCOV2",
+        "input_mb": 100.0,
+        "threads": 2,
+        "seconds": 30.0,
+        "max_rss_mb": 512.5,
+        "time": 0,
+    }
+    (unmeasured,) = read_benchmark(write_benchmark(tmp_path / "b.jsonl", "multiqc_report", None, 1, 2, "NA"), "nanopore", {})
+    assert unmeasured["preset"] == ""
+    assert unmeasured["max_rss_mb"] is None
+
+
+def test_record_benchmarks(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    benchmarks, history = tmp_path / "benchmark", tmp_path / "profile" / "resource_history.jsonl"
+    benchmarks.mkdir()
+    for number in range(3):
+        write_benchmark(benchmarks / f"ampligone_{number}.jsonl", "ampligone", f"s{number}", number, 10, 100)
+    (benchmarks / "broken.jsonl").write_text("{not json")
+
+    assert record_benchmarks(history, benchmarks, "nanopore", {}) == 3
+    # benchmark files are only recorded once
+    assert record_benchmarks(history, benchmarks, "nanopore", {}) == 0
+    write_benchmark(benchmarks / "ampligone_0.jsonl", "ampligone", "s0", 5, 10, 100)
+    # only the most recent measurements are kept per rule, platform and preset
+    monkeypatch.setattr(resource_history, "MAX_MEASUREMENTS", 2)
+    assert record_benchmarks(history, benchmarks, "nanopore", {}) == 1
+    assert [measured["input_mb"] for measured in read_history(history)] == [2.0, 5.0]
+    assert read_history(tmp_path / "missing.jsonl") == []
+
+
+def test_fit_linear() -> None:
+    assert fit_linear([1, 2, 3], [3, 5, 7]) == pytest.approx((1, 2))
+    assert fit_linear([1, 1], [2, 4]) == (3, 0.0)
+    # the slope is never negative
+    assert fit_linear([1, 2, 3], [7, 5, 3]) == (5, 0.0)
+
+
+def test_resource_model_predictions() -> None:
+    measurements = [measurement("ampligone", size, 60 + 6 * size, 100 + 10 * size) for size in range(5)]
+    measurements.append(measurement("ampligone", 1, 6000, 100000, preset="INFLUENZA"))
+    measurements.append(measurement("trueconsense", 1, 60, None))
+
+    model = ResourceModel(measurements + [measurement("ampligone", 1, 1, 1) | {"platform": "illumina"}], "nanopore")
+
+    assert model.predict_memory("AmpliGone", "SARSCOV2", 10) == pytest.approx(200 * MEMORY_HEADROOM)
+    assert model.predict_runtime("ampligone", "SARSCOV2", 10) == 3  # 120 s with headroom, in minutes
+    # the fit over all presets is used for presets without enough measurements
+    assert model.predict_memory("ampligone", "OTHER", 0) > 100 * MEMORY_HEADROOM
+    assert model.predict_memory("trueconsense", "SARSCOV2", 1) is None
+    assert model.predict_runtime("unknown", "SARSCOV2", 1) is None
+
+
+def test_estimates_use_model(tmp_path: Path) -> None:
+    reads = tmp_path / "reads.fastq"
+    with open(reads, "wb") as handle:
+        handle.truncate(10 * 1024**2)
+    model = ResourceModel([measurement("ampligone", size, 60 + 6 * size, 100 + 10 * size) for size in range(5)], "nanopore")
+    config = {"computing_execution": "grid", "max_local_mem": 8000}
+
+    assert estimate_memory("high", "ampligone", [str(reads)], 4, 2, config, model, "SARSCOV2") == 2 * 250
+    assert estimate_runtime("high", "ampligone", [str(reads)], 1, config, model, "SARSCOV2") == 3
+    # rules without enough measurements use the coefficients
+    assert estimate_memory("low", "trueconsense", [], 1, 1, config, model, "SARSCOV2") == estimate_memory("low", "trueconsense", [], 1, 1, config)
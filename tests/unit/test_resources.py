@@ -0,0 +1,88 @@
+import configparser
+from pathlib import Path
+
+import pytest
+
+from ViroConstrictor.workflow.helpers.resources import (
+    COMPRESSED_SIZE_FACTOR,
+    DEFAULT_COEFFICIENTS,
+    estimate_memory,
+    estimate_runtime,
+    input_size_gb,
+    parse_resource_coefficients,
+    rule_coefficients,
+)
+
+GIB = 1024**3
+
+
+def sparse_file(path: Path, size: int) -> str:
+    with open(path, "wb") as handle:
+        handle.truncate(size)
+    return str(path)
+
+
+@pytest.fixture
+def fastq(tmp_path: Path) -> str:
+    return sparse_file(tmp_path / "sample.fastq", 2 * GIB)
+
+
+def test_input_size_gb(tmp_path: Path, fastq: str) -> None:
+    compressed = sparse_file(tmp_path / "sample.fastq.gz", GIB // 2)
+    assert input_size_gb([fastq]) == 2
+    assert input_size_gb([fastq, compressed]) == 2 + COMPRESSED_SIZE_FACTOR / 2
+    # input files that do not exist yet count as empty
+    assert input_size_gb([str(tmp_path / "missing.fastq")]) == 0
+    assert input_size_gb([]) == 0
+
+
+@pytest.mark.parametrize("resource_class", ["low", "medium", "high"])
+def test_estimate_memory_scales_with_input_size(resource_class: str, fastq: str) -> None:
+    config = {"computing_execution": "grid", "max_local_mem": 8000}
+    coefficients = DEFAULT_COEFFICIENTS[resource_class]
+
+    empty = estimate_memory(resource_class, "rule", [], 2, 1, config)
+    assert empty == coefficients["mem_base"] + 2 * coefficients["mem_per_thread"]
+    assert estimate_memory(resource_class, "rule", [fastq], 2, 1, config) == empty + 2 * coefficients["mem_per_gb"]
+
+
+def test_estimate_memory_local_cap(fastq: str) -> None:
+    config = {"computing_execution": "local", "max_local_mem": 8000}
+    assert estimate_memory("low", "rule", [fastq], 1, 1, config) == 1500
+    assert estimate_memory("high", "rule", [fastq], 4, 3, config) == 8000
+    # grid execution is not capped
+    assert estimate_memory("high", "rule", [fastq], 4, 3, config | {"computing_execution": "grid"}) == 42000
+
+
+def test_retries_scale_linearly(fastq: str) -> None:
+    config = {"computing_execution": "grid", "max_local_mem": 8000}
+    memory = [estimate_memory("medium", "rule", [fastq], 2, attempt, config) for attempt in (1, 2, 3)]
+    runtime = [estimate_runtime("medium", "rule", [fastq], attempt, config) for attempt in (1, 2, 3)]
+    assert memory == [5000, 10000, 15000]
+    assert runtime == [40, 80, 120]
+    assert estimate_runtime("low", "rule", [], 1, config) == DEFAULT_COEFFICIENTS["low"]["runtime_base"]
+
+
+def test_rule_coefficients_overrides(fastq: str) -> None:
+    overrides = {"high": {"mem_per_thread": 1000}, "ampligone": {"mem_per_gb": 4000, "runtime_base": 45}}
+
+    coefficients = rule_coefficients("high", "AmpliGone", overrides)
+    assert coefficients == DEFAULT_COEFFICIENTS["high"] | {"mem_per_thread": 1000, "mem_per_gb": 4000, "runtime_base": 45}
+    assert rule_coefficients("high", "other", overrides)["mem_per_gb"] == DEFAULT_COEFFICIENTS["high"]["mem_per_gb"]
+
+    config = {"computing_execution": "grid", "max_local_mem": 8000, "resource_coefficients": overrides}
+    assert estimate_memory("high", "ampligone", [fastq], 1, 1, config) == 2000 + 1000 + 8000
+    assert estimate_runtime("high", "ampligone", [fastq], 1, config) == 45 + 60
+
+
+def test_parse_resource_coefficients() -> None:
+    profile = configparser.ConfigParser()
+    profile.read_string("[RESOURCES]\nhigh.mem_per_gb = 3000\nAmpliGone.runtime_base = 45.5\n")
+
+    assert parse_resource_coefficients(dict(profile.items("RESOURCES"))) == {
+        "high": {"mem_per_gb": 3000.0},
+        "ampligone": {"runtime_base": 45.5},
+    }
+    for section in ({"high.memory": "1"}, {"mem_per_gb": "1"}, {"high.mem_per_gb": "a lot"}, {"high.mem_per_gb": "-1"}):
+        with pytest.raises(ValueError):
+            parse_resource_coefficients(section)
@@ -0,0 +1,108 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from ViroConstrictor.workflow.helpers import manifest
+from ViroConstrictor.workflow.helpers.introspection_cache import IntrospectionCache
+from ViroConstrictor.workflow.helpers.manifest import FileDigests
+from ViroConstrictor.workflow.helpers.result_cache import CACHED_RESULTS, STATS_FILE, ResultCache, result_key
+
+
+@pytest.fixture
+def inputs(tmp_path: Path) -> dict[str, str]:
+    (tmp_path / "reads.fastq").write_text("@read\nACGT\n+\nIIII\n")
+    (tmp_path / "reference.fasta").write_text(">ref\nACGT\n")
+    return {"INPUTFILE": str(tmp_path / "reads.fastq"), "REFERENCE": str(tmp_path / "reference.fasta"), "PRIMERS": "NONE"}
+
+
+def write_results(directory: Path, names: list[str]) -> dict[str, str]:
+    directory.mkdir(parents=True, exist_ok=True)
+    results = {}
+    for name in names:
+        results[name] = str(directory / f"{name}.out")
+        Path(results[name]).write_text(f"{name}\n")
+    return results
+
+
+def test_result_key(inputs: dict[str, str]) -> None:
+    key = result_key(inputs, {"sample": "s1", "preset": {"MinCov": 30}})
+    assert key == result_key(dict(reversed(inputs.items())), {"preset": {"MinCov": 30}, "sample": "s1"})
+    assert key != result_key(inputs, {"sample": "s2", "preset": {"MinCov": 30}})
+    assert key != result_key(inputs | {"PRIMERS": inputs["REFERENCE"]}, {"sample": "s1", "preset": {"MinCov": 30}})
+    # the key depends on the content of the files, not on their path or modification time
+    Path(inputs["REFERENCE"]).write_text(">ref\nACGA\n")
+    assert key != result_key(inputs, {"sample": "s1", "preset": {"MinCov": 30}})
+
+
+def test_file_digest_is_kept(tmp_path: Path, inputs: dict[str, str]) -> None:
+    cache = ResultCache(tmp_path / "cache")
+    digest = cache.file_digest(inputs["REFERENCE"])
+    cache.save_digests()
+
+    reopened = ResultCache(tmp_path / "cache")
+    assert reopened.file_digest(inputs["REFERENCE"]) == digest
+    assert reopened.digests._dirty is False
+    Path(inputs["REFERENCE"]).write_text(">ref\nACGTACGT\n")
+    assert reopened.file_digest(inputs["REFERENCE"]) != digest
+
+
+
+def test_file_digests_shared_with_introspection_cache(tmp_path: Path, inputs: dict[str, str], monkeypatch: pytest.MonkeyPatch) -> None:
+    hashed = []
+    monkeypatch.setattr(manifest, "content_hash", lambda path: hashed.append(path) or "digest")
+    digests = FileDigests(tmp_path / "cache" / "digests.json")
+
+    IntrospectionCache(digests=digests).get("headers", [inputs["REFERENCE"]], lambda: ["ref"])
+    cache = ResultCache(tmp_path / "cache", digests=digests)
+
+    assert cache.file_digest(inputs["REFERENCE"]) == "digest"
+    assert hashed == [inputs["REFERENCE"]]
+
+
+def test_store_and_restore(tmp_path: Path) -> None:
+    cache = ResultCache(tmp_path / "cache")
+    assert cache.lookup("abc") is False
+    assert not any(Path(path).exists() for path in cache.entry_files("abc", ["consensus"]))
+
+    results = write_results(tmp_path / "run1", ["consensus", "vcf"])
+    assert cache.store("abc", results, {"sample": "s1"}) is True
+    assert cache.store("abc", results) is False
+    assert cache.lookup("abc") is True
+    assert sorted(os.listdir(cache.entry("abc"))) == sorted(["entry.json", CACHED_RESULTS["consensus"], CACHED_RESULTS["vcf"]])
+
+    restored = {"consensus": str(tmp_path / "run2" / "data" / "s1.fa")}
+    cache.restore("abc", restored)
+    assert Path(restored["consensus"]).read_text() == "consensus\n"
+    assert cache.stats == {"hits": 1, "misses": 1, "stored": 1, "evicted": 0}
+
+
+def test_evict_least_recently_used(tmp_path: Path) -> None:
+    cache = ResultCache(tmp_path / "cache")
+    for number, key in enumerate(["old", "used", "new"]):
+        cache.store(key, write_results(tmp_path / key, ["consensus", "vcf"]))
+        os.utime(cache.entry(key) / "entry.json", (number, number))
+    # restoring an entry marks it as recently used
+    cache.restore("old", {"consensus": str(tmp_path / "restored.fa")})
+
+    # one entry too large
+    cache.max_size = cache.size() - 1
+    assert cache.evict() == 1
+    assert not cache.entry("used").exists()
+    assert cache.entry("old").exists() and cache.entry("new").exists()
+    assert cache.size() <= cache.max_size
+    # a cache without a maximum size is never evicted
+    assert ResultCache(tmp_path / "cache").evict() == 0
+
+
+def test_write_stats(tmp_path: Path) -> None:
+    cache = ResultCache(tmp_path / "cache")
+    cache.lookup("abc")
+    cache.write_stats(workdir="run1")
+    cache.write_stats(workdir="run2")
+
+    records = [json.loads(line) for line in (tmp_path / "cache" / STATS_FILE).read_text().splitlines()]
+    assert [record["workdir"] for record in records] == ["run1", "run2"]
+    assert records[0]["misses"] == 1
+    assert records[0]["size_mb"] == 0
@@ -4,6 +4,7 @@ Tests the PDF creation functionality without requiring actual file I/O.
 """
 
 import configparser
+import json
 import os
 import sys
 import tempfile
@@ -16,7 +17,24 @@ from fpdf import FPDF
 from snakemake.api import OutputSettings, ResourceSettings
 
 from ViroConstrictor.parser import CLIparser
-from ViroConstrictor.runreport import PDF, WriteReport, analysis_details, directory_sections
+from ViroConstrictor.runreport import (
+    PDF,
+    WriteReport,
+    analysis_details,
+    critical_path,
+    directory_sections,
+    performance_summary,
+    read_job_benchmarks,
+    workflow_rules,
+)
+
+
+@pytest.fixture(autouse=True)
+def restore_working_directory():
+    """WriteReport changes into the working directory of the report, restore the current directory after every test."""
+    cwd = os.getcwd()
+    yield
+    os.chdir(cwd)
 
 
 class TestPDFClass:
@@ -482,3 +500,120 @@ class TestReportErrorHandling:
                 inputs_config=cli_parser,
                 status="Success",
             )
+
+
+def write_benchmark(benchmark_dir: Path, rule: str, sample: str | None, start: float, seconds: float, threads: int = 1) -> None:
+    """Write a benchmark file in the extended JSON lines format of Snakemake, for a job that ran from `start`."""
+    record = {
+        "s": f"{seconds:.4f}",
+        "cpu_time": seconds * threads,
+        "max_rss": 250.5 if sample else "NA",
+        "io_in": 10.0,
+        "io_out": 5.0,
+        "rule_name": rule,
+        "threads": threads,
+        "wildcards": {"Virus": "SARS-CoV-2", "RefID": "MN908947.3", "sample": sample} if sample else {},
+    }
+    path = benchmark_dir / f"{rule}_{sample}.jsonl"
+    path.write_text(json.dumps(record) + "\n")
+    os.utime(path, (start + seconds, start + seconds))
+
+
+@pytest.fixture
+def benchmark_dir(tmp_path: Path) -> Path:
+    """Benchmarks of two samples that ran in parallel after the match-reference stage, followed by an aggregation."""
+    benchmark_dir = tmp_path / "logs" / "benchmark"
+    benchmark_dir.mkdir(parents=True)
+    write_benchmark(benchmark_dir, "align_to_refs", "s1", 1000, 10)
+    write_benchmark(benchmark_dir, "qc_filter", "s1", 1020, 20, threads=4)
+    write_benchmark(benchmark_dir, "qc_filter", "s2", 1020, 5, threads=4)
+    write_benchmark(benchmark_dir, "ampligone", "s1", 1041, 100, threads=2)
+    write_benchmark(benchmark_dir, "ampligone", "s2", 1026, 30, threads=2)
+    write_benchmark(benchmark_dir, "concat_aminoacids", None, 1150, 10)
+    (benchmark_dir / "broken.jsonl").write_text("{not json")
+    return benchmark_dir
+
+
+class TestPerformance:
+    """Test the performance section gathered from the benchmark files."""
+
+    def test_workflow_rules(self):
+        rules = workflow_rules()
+        assert rules["align_to_refs"] == "match_ref"
+        assert rules["ampligone"] == "main"
+        assert rules["qc_filter"] == "main"
+
+    def test_read_job_benchmarks(self, benchmark_dir):
+        jobs = {(job["rule"], job["sample"]): job for job in read_job_benchmarks(benchmark_dir)}
+        assert len(jobs) == 6
+        assert jobs[("ampligone", "s1")] | {"start": 0, "end": 0} == {
+            "rule": "ampligone",
+            "stage": "main",
+            "sample": "s1",
+            "threads": 2,
+            "wall_s": 100.0,
+            "cpu_s": 200.0,
+            "max_rss_mb": 250.5,
+            "io_in_mb": 10.0,
+            "io_out_mb": 5.0,
+            "start": 0,
+            "end": 0,
+        }
+        assert jobs[("ampligone", "s1")]["start"] == pytest.approx(1041)
+        assert jobs[("concat_aminoacids", None)]["max_rss_mb"] is None
+        assert read_job_benchmarks(benchmark_dir / "missing") == []
+
+    def test_critical_path(self, benchmark_dir):
+        path = critical_path(read_job_benchmarks(benchmark_dir))
+        assert [(job["rule"], job["sample"]) for job in path] == [
+            ("align_to_refs", "s1"),
+            ("qc_filter", "s1"),
+            ("ampligone", "s1"),
+            ("concat_aminoacids", None),
+        ]
+        assert critical_path([]) == []
+
+    def test_performance_summary(self, benchmark_dir):
+        summary = performance_summary(read_job_benchmarks(benchmark_dir))
+
+        assert [rule["rule"] for rule in summary["rules"]] == ["ampligone", "qc_filter", "align_to_refs", "concat_aminoacids"]
+        assert summary["rules"][0] | {"core_hours": 0} == {
+            "rule": "ampligone",
+            "stage": "main",
+            "jobs": 2,
+            "wall_s": 130.0,
+            "max_wall_s": 100.0,
+            "cpu_s": 260.0,
+            "max_rss_mb": 250.5,
+            "io_in_mb": 20.0,
+            "io_out_mb": 10.0,
+            "core_hours": 0,
+        }
+        assert summary["stages"]["match_ref"]["core_hours"] == pytest.approx(10 / 3600, abs=1e-4)
+        assert summary["stages"]["main"]["core_hours"] == pytest.approx((80 + 20 + 200 + 60 + 10) / 3600, abs=1e-4)
+        assert summary["stages"]["main"]["elapsed_s"] == pytest.approx(140)
+        assert summary["critical_path"]["length_s"] == 140
+        assert [sample["sample"] for sample in summary["samples"]] == ["s1", "s2"]
+
+    @patch("ViroConstrictor.runreport.sys.argv", ["viroconstrictor"])
+    def test_write_report_performance(self, benchmark_dir):
+        workdir = benchmark_dir.parent.parent
+        config = configparser.ConfigParser()
+        config.read_dict({"COMPUTING": {"compmode": "local"}})
+        cli_parser = Mock(spec=CLIparser)
+        cli_parser.flags = Mock(platform="nanopore", amplicon_type="end-to-end")
+        WriteReport(
+            str(workdir),
+            "/test",
+            "/test",
+            config,
+            Mock(spec=ResourceSettings, cores=4),
+            Mock(spec=OutputSettings, dryrun=False),
+            cli_parser,
+            "Success",
+        )
+
+        assert (workdir / "Runinfomation.pdf").exists()
+        performance = json.loads((workdir / "performance.json").read_text())
+        assert set(performance) == {"rules", "stages", "critical_path", "samples"}
+        assert set(performance["stages"]) == {"match_ref", "main"}
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from ViroConstrictor.workflow.helpers.sample_index import SampleIndex
+
+
+def samples_dataframe() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "sample": ["s1", "s1", "s2", "s3", "s4"],
+            "Virus": ["Influenza", "Influenza", "Influenza", "SARS-CoV-2", "SARS-CoV-2"],
+            "RefID": ["HA", "NA", "HA", "MN908947.3", "MN908947.3"],
+            "AA_FEAT_NAMES": [("HA1", "HA2"), ("NA",), ("HA1", "HA2"), np.nan, np.nan],
+        }
+    )
+
+
+def test_sample_index_matches_dataframe_filters() -> None:
+    samples_df = samples_dataframe()
+    index = SampleIndex(samples_df)
+
+    assert index.samples == list(samples_df["sample"].unique())
+    assert index.viruses == list(samples_df["Virus"].unique())
+    for virus, refid in samples_df[["Virus", "RefID"]].drop_duplicates().itertuples(index=False):
+        expected = samples_df.loc[(samples_df["Virus"] == virus) & (samples_df["RefID"] == refid), "sample"]
+        assert index.samples_of(virus, refid) == list(expected)
+    for sample in samples_df["sample"]:
+        rows = samples_df[samples_df["sample"] == sample]
+        assert index.values(sample, "Virus") == list(rows["Virus"])
+        assert index.references(rows["Virus"].iloc[0], sample) == list(rows["RefID"].unique())
+
+    assert index.samples_of("Influenza") == ["s1", "s2"]
+    assert index.rows("unknown") == []
+    assert index.samples_of("unknown", "HA") == []
+
+
+def test_sample_index_features() -> None:
+    index = SampleIndex(samples_dataframe())
+
+    assert index.features(sample="s1") == ["HA1", "HA2", "NA"]
+    assert index.features(sample="s3") == []
+    assert index.features(virus="Influenza") == ["HA1", "HA2", "NA"]
+    assert index.features() == ["HA1", "HA2", "NA"]
+    assert index.viruses_with_features() == ["Influenza"]
+
+
+def test_sample_index_reference_column() -> None:
+    samples_df = pd.DataFrame({"sample": ["s1", "s1"], "Virus": ["Influenza"] * 2, "segment": ["HA", "NA"]})
+    index = SampleIndex(samples_df, reference_column="segment")
+
+    assert index.values("s1", "segment") == ["HA", "NA"]
+    assert index.samples_of("Influenza", "NA") == ["s1"]
+    assert index.features() == []
+
+
+def test_sample_index_batches() -> None:
+    index = SampleIndex(samples_dataframe())
+
+    batches = index.batches(2)
+    assert [[(row["sample"], row["RefID"]) for row in batch] for batch in batches] == [
+        [("s1", "HA"), ("s1", "NA")],
+        [("s2", "HA"), ("s3", "MN908947.3")],
+        [("s4", "MN908947.3")],
+    ]
+    assert len(index.batches(10)) == 1
@@ -0,0 +1,53 @@
+import json
+from pathlib import Path
+
+from ViroConstrictor.workflow.helpers.script_profiles import collect_profiles, format_table, hot_paths
+
+
+def write_profile(path: Path, script: str, wall: float, functions: tuple[tuple[str, float], ...] = (), status: str = "success") -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    profile = {
+        "script": script,
+        "input": "input",
+        "output": str(path).removesuffix(".profile.json"),
+        "status": status,
+        "wall_s": wall,
+        "cpu_s": wall / 2,
+        "peak_rss_mb": 100 * wall,
+        "python_peak_mb": wall,
+        "top_allocations": [],
+        "cprofile": None,
+        "top_functions": [{"function": function, "calls": 1, "tottime": cumtime / 2, "cumtime": cumtime} for function, cumtime in functions],
+    }
+    path.write_text(json.dumps(profile))
+
+
+def test_hot_paths(tmp_path: Path) -> None:
+    write_profile(tmp_path / "data" / "s1_boc.tsv.profile.json", "ReportingMetrics", 2, [("boc.py:10(run)", 1.5), ("io.py:1(read)", 1)])
+    write_profile(tmp_path / "data" / "s2_boc.tsv.profile.json", "ReportingMetrics", 4, [("boc.py:10(run)", 3)], status="failed")
+    write_profile(tmp_path / "results" / "depth.tsv.profile.json", "BuildDepthMatrix", 5, [("io.py:1(read)", 4)])
+    (tmp_path / "broken.profile.json").write_text("{not json")
+
+    profiles = collect_profiles(tmp_path)
+    summary = hot_paths(profiles)
+
+    assert len(profiles) == 3
+    assert summary["scripts"][0] == {
+        "script": "ReportingMetrics",
+        "runs": 2,
+        "failed": 1,
+        "wall_s": 6,
+        "mean_wall_s": 3,
+        "max_wall_s": 4,
+        "cpu_s": 3,
+        "peak_rss_mb": 400,
+        "python_peak_mb": 4,
+        "slowest_output": str(tmp_path / "data" / "s2_boc.tsv"),
+    }
+    assert [script["script"] for script in summary["scripts"]] == ["ReportingMetrics", "BuildDepthMatrix"]
+    assert [(function["function"], function["cumtime"], function["scripts"]) for function in summary["functions"]] == [
+        ("io.py:1(read)", 5, ["ReportingMetrics", "BuildDepthMatrix"]),
+        ("boc.py:10(run)", 4.5, ["ReportingMetrics"]),
+    ]
+    assert "ReportingMetrics" in format_table(summary)
+    assert format_table(hot_paths([])).startswith("Script")
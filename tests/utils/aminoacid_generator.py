@@ -0,0 +1,71 @@
+"""Module for generating amino acid inputs of the GroupAminoAcids script for testing and benchmarking purposes."""
+
+from pathlib import Path
+from random import Random
+
+import pandas as pd
+
+FEATURES = ["ORF1a", "ORF1ab", "S", "ORF3a", "E", "M", "ORF6", "ORF7a", "ORF7b", "ORF8", "N", "ORF10"]
+
+
+def generate_aminoacid_inputs(
+    directory: Path,
+    number_of_samples: int,
+    number_of_features: int = 12,
+    protein_length: int = 50,
+    seed: int = 1,
+) -> tuple[list[str], list[str], Path]:
+    """
+    Generate per-sample amino acid FASTA files and the matching sample information pickle.
+
+    Samples are spread over two viruses, every third sample is analysed against two references and some samples list
+    a feature more than once. Feature names overlap (e.g. ``ORF1a`` and ``ORF1ab``) and some records have an id that
+    does not contain any of the sample's features, so every matching path of the script is used.
+
+    Parameters
+    ----------
+    directory : Path
+        Directory to write the FASTA files and pickle to.
+    number_of_samples : int
+        Number of samples to generate.
+    number_of_features : int, optional
+        Number of amino acid features per reference, at most 12 (default is 12).
+    protein_length : int, optional
+        Length of every generated protein sequence (default is 50).
+    seed : int, optional
+        Seed for the random number generator so the generated files are reproducible (default is 1).
+
+    Returns
+    -------
+    tuple[list[str], list[str], Path]
+        The input FASTA files, the expected output files (relative to the working directory of the script) and the
+        path to the sample information pickle.
+    """
+    rng = Random(seed)
+    features = FEATURES[:number_of_features]
+    rows = []
+    input_files = []
+    outputs: dict[str, None] = {}
+    for sample_num in range(number_of_samples):
+        sample = f"sample_{sample_num}"
+        virus = "SARS-CoV-2" if sample_num % 2 == 0 else "Influenza"
+        ref_ids = ["ref1", "ref2"] if sample_num % 3 == 0 else ["ref1"]
+        for ref_id in ref_ids:
+            sample_features = list(features)
+            if sample_num % 5 == 0:
+                sample_features.append(features[0])
+            rows.append({"sample": sample, "Virus": virus, "RefID": ref_id, "AA_FEAT_NAMES": tuple(sample_features)})
+
+            fasta = directory / f"Virus~{virus}" / f"RefID~{ref_id}" / sample / "aa.faa"
+            fasta.parent.mkdir(parents=True, exist_ok=True)
+            with open(fasta, "w", encoding="utf-8") as fasta_file:
+                for feature in features:
+                    record_id = f"{sample}.ID-{sample}-{feature}" if rng.random() < 0.8 else f"{sample}.{feature}"
+                    fasta_file.write(f">{record_id}\n{''.join(rng.choices('ACDEFGHIKLMNPQRSTVWY', k=protein_length))}*\n")
+                    outputs[f"results/Virus~{virus}/RefID~{ref_id}/aminoacids/{feature}.faa"] = None
+                fasta_file.write(f">{sample}.unknown_feature\nMKV*\n")
+            input_files.append(str(fasta))
+
+    space = directory / "sampleinfo.pkl"
+    pd.DataFrame(rows).to_pickle(space, compression=None)
+    return input_files, list(outputs), space
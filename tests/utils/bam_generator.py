@@ -0,0 +1,93 @@
+"""Module for generating BAM files for testing and benchmarking purposes."""
+
+from pathlib import Path
+from random import Random
+
+import pysam
+
+
+def generate_bam_file(
+    output_path: Path,
+    number_of_reads: int,
+    reference_length: int = 1000,
+    max_aligned_length: int | None = None,
+    reference_name: str = "ref",
+    seed: int = 1,
+    index: bool = True,
+) -> None:
+    """
+    Generate a coordinate sorted BAM file with random alignments against a single reference.
+
+    The generated reads cover the features the Clipper script filters on: forward and reverse strand reads,
+    soft-clipped ends, insertions and deletions, spliced alignments (including consecutive ``N`` operations),
+    very short and very long aligned sections and ambiguous IUPAC nucleotide codes.
+
+    Parameters
+    ----------
+    output_path : Path
+        Path to the output BAM file.
+    number_of_reads : int
+        Number of alignments to generate.
+    reference_length : int, optional
+        Length of the reference sequence the reads are aligned against (default is 1000).
+    max_aligned_length : int | None, optional
+        Maximum length of the aligned section of a read, defaults to half of the reference length.
+    reference_name : str, optional
+        Name of the reference sequence (default is "ref").
+    seed : int, optional
+        Seed for the random number generator so the generated file is reproducible (default is 1).
+    index : bool, optional
+        Whether to create a ``.bai`` index next to the BAM file (default is True).
+
+    Returns
+    -------
+    None
+        Writes the generated alignments to the specified BAM file.
+    """
+    rng = Random(seed)
+    header = pysam.AlignmentHeader.from_dict({"HD": {"VN": "1.6", "SO": "coordinate"}, "SQ": [{"SN": reference_name, "LN": reference_length}]})
+    reads = []
+    for read_num in range(number_of_reads):
+        left_clip = rng.choice([0, 0, rng.randint(1, 30)])
+        right_clip = rng.choice([0, 0, rng.randint(1, 30)])
+        aligned_length = rng.randint(1, max(1, max_aligned_length or reference_length // 2))
+        cigar = [(4, left_clip)] if left_clip else []
+        reference_span = aligned_length
+        layout = rng.random()
+        if layout < 0.15 and aligned_length > 20:
+            first = aligned_length // 2
+            skip = rng.randint(1, 200)
+            cigar += [(0, first), (3, skip)]
+            if rng.random() < 0.3:
+                extra_skip = rng.randint(1, 50)
+                cigar.append((3, extra_skip))
+                skip += extra_skip
+            cigar.append((0, aligned_length - first))
+            reference_span += skip
+        elif layout < 0.3 and aligned_length > 20:
+            first = aligned_length // 3
+            cigar += [(0, first), (1, 2), (0, first), (2, 3), (0, aligned_length - 2 * first - 2)]
+            reference_span = aligned_length - 2 + 3
+        else:
+            cigar.append((0, aligned_length))
+        if right_clip:
+            cigar.append((4, right_clip))
+
+        query_length = left_clip + aligned_length + right_clip
+        segment = pysam.AlignedSegment(header)
+        segment.query_name = f"read_{read_num}"
+        segment.query_sequence = "".join(rng.choices("ACGTACGTACGTRYKMSWBVDHN", k=query_length))
+        segment.flag = 16 if rng.random() < 0.5 else 0
+        segment.reference_id = 0
+        segment.reference_start = rng.randint(0, max(0, reference_length - reference_span))
+        segment.mapping_quality = 60
+        segment.cigartuples = cigar
+        segment.query_qualities = pysam.qualitystring_to_array("".join(rng.choices("!+5?DI", k=query_length)))
+        reads.append(segment)
+
+    reads.sort(key=lambda segment: segment.reference_start)
+    with pysam.AlignmentFile(str(output_path), "wb", header=header) as bamfile:
+        for segment in reads:
+            bamfile.write(segment)
+    if index:
+        pysam.index(str(output_path))